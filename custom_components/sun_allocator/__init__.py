@@ -2,17 +2,20 @@
 
 import asyncio
 import re
+import time
 from datetime import timedelta
 
 import voluptuous as vol
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CoreState, HomeAssistant, SupportsResponse, callback
 from homeassistant.helpers import (
     config_validation as cv,
+    device_registry as dr,
     entity_registry as er,
 )
 from homeassistant.helpers.typing import ConfigType
 from homeassistant.helpers.event import (
+    async_track_point_in_time,
     async_track_state_change_event,
     async_track_time_interval,
 )
@@ -24,33 +27,74 @@ from homeassistant.const import (
 )
 
 from .core.entity_control import set_mode_for_entity, parse_relay_entity
-from .core.logger import log_info, log_debug, log_warning, log_error
-from .core.settings import LOG_STARTUP_DEVICES
+from .core.logger import log_info, log_debug, log_warning, log_error, journal_event
+from .core.settings import (
+    LOG_STARTUP_DEVICES,
+    ENERGY_MAX_INTEGRATION_GAP_SECONDS,
+    RESTORE_READY_TIMEOUT_SECONDS,
+    ALLOCATION_REFRESH_INTERVAL_SECONDS,
+    DRAW_MODEL_MIN_SAMPLES,
+    EXCESS_FEED_DEADBAND_W,
+    PROBE_PRIOR_BUCKET_MINUTES,
+    PROBE_PRIOR_SOC_BAND,
+    PROBE_PRIOR_HOLD_TICKS,
+    PROBE_PRIOR_ALPHA,
+    PROBE_PRIOR_MIN_SAMPLES,
+)
 from .core.device_restore import (
     persist_device_state,
     restore_entity_state,
     restore_all_devices,
     load_grace_state,
+    load_energy_state,
+    load_draw_model,
+    load_power_curves,
+    load_mppt_calibration,
+    load_probe_prior,
+    load_auto_control,
+    persist_learned_state,
+    async_unload_restore_store,
     _load_restore_data,
 )
-from .core.services import handle_set_relay_mode, handle_set_relay_power, rebuild_device_index
+from .core.services import (
+    handle_get_diagnostics,
+    handle_set_relay_mode,
+    handle_set_relay_power,
+    rebuild_device_index,
+)
 from .core.migrations import ConfigEntryMigrator
 from .core.mode_select import mode_select_state_listener
-from .core.power_processor import process_excess_power, _read_battery_soc
+from .core.power_processor import (
+    process_excess_power,
+    learned_state_snapshot,
+    _read_battery_soc,
+)
 from .core.watchdog import watchdog_check
-from .core import probe
-from .sensor.utils import get_sensor_state_safely
+from .core.preemption import note_budget_drop
+from .core import (
+    auto_control,
+    config_diff,
+    draw_model,
+    probe,
+    probe_prior,
+    energy,
+    power_curve,
+    mppt_calibration,
+)
+from .core.deadlines import DeadlineScheduler, input_fingerprint
+from .core.input_cache import drop_input_cache, get_input_cache
 
 from .const import (
     DOMAIN,
     SERVICE_SET_RELAY_MODE,
     SERVICE_SET_RELAY_POWER,
+    SERVICE_GET_DIAGNOSTICS,
     RELAY_MODE_OFF,
     RELAY_MODE_ON,
     RELAY_MODE_PROPORTIONAL,
     CONF_ESPHOME_MODE_SELECT_ENTITY,
-    CONF_DEVICE_ENTITY,
     CONF_AUTO_CONTROL_ENABLED,
+    CONF_DEVICE_ENTITY,
     CONF_DEVICES,
     CONF_DEVICE_ID,
     CONF_DEVICE_NAME,
@@ -117,6 +161,8 @@ SET_RELAY_POWER_SCHEMA = vol.Schema(
     }
 )
 
+GET_DIAGNOSTICS_SCHEMA = vol.Schema({vol.Optional("entry_id"): cv.string})
+
 
 async def _setup_entity_state_listeners(hass, config_entry, entry_data):
     """Setup listeners for entity state changes to persist and restore state."""
@@ -146,7 +192,7 @@ async def _setup_entity_state_listeners(hass, config_entry, entry_data):
             elif domain == DOMAIN_CLIMATE:
                 is_on = new_state.state != "off"
                 percent = 100 if is_on else 0
-            await persist_device_state(
+            persist_device_state(
                 hass, config_entry, entity_id, percent=percent, is_on=is_on
             )
         except (TypeError, ValueError, OSError) as exc:
@@ -237,7 +283,9 @@ async def _setup_esphome_mode_tracking(hass, config_entry, entry_data):
             await set_mode_for_entity(hass, _entity_id, _desired)
 
 
-async def _queue_process_excess_power(hass, config_entry, entry_data, excess_power):
+async def _queue_process_excess_power(
+    hass, config_entry, entry_data, excess_power, only_devices=None
+):
     """Serialize allocator runs and coalesce overlapping triggers.
 
     The excess sensor can fire several state changes in quick succession (e.g. a
@@ -250,68 +298,327 @@ async def _queue_process_excess_power(hass, config_entry, entry_data, excess_pow
     - If a run is already in progress, just record the latest value in
       ``_pending_excess`` and return; the active runner will pick it up. Rapid bursts
       thus collapse into a single trailing run on the most recent value.
+
+    ``only_devices`` (deadline re-runs) limits the pass to those devices. Pending
+    scopes merge by union, and any full-pass trigger widens the pending run to a
+    full pass.
+
+    A value more than ``PREEMPT_DROP_THRESHOLD_W`` below the running pass's
+    preempts it at its next device boundary (core/preemption.py); the pending
+    value then runs at once as a shed-first pass.
     """
     lock = entry_data.setdefault("_process_lock", asyncio.Lock())
-    if lock.locked():
-        entry_data["_pending_excess"] = excess_power
+    if lock.locked() or not _restore_ready(entry_data):
+        # Busy, or the post-restart restore is still asserting device states: keep
+        # only the latest value. The initial pass runs once restore completes.
+        _set_pending(entry_data, excess_power, only_devices)
+        if lock.locked():
+            note_budget_drop(entry_data, excess_power)
         return
 
-    next_excess = excess_power
+    note_budget_drop(entry_data, excess_power)
+    next_excess, next_scope = excess_power, only_devices
     while True:
         async with lock:
+            shed_first = bool(entry_data.pop("_preempt", False))
+            entry_data["_run_excess"] = next_excess
             try:
-                await process_excess_power(hass, config_entry, next_excess)
+                await process_excess_power(
+                    hass, config_entry, next_excess,
+                    only_devices=next_scope, shed_first=shed_first,
+                )
+                _record_first_allocation(entry_data)
             except (ValueError, TypeError) as exc:
                 log_error(f"Error processing excess power value: {exc}")
             except Exception as exc:
                 log_error(f"Unexpected error in process_excess_power: {exc}")
+            else:
+                # A deadline re-run never looked at the other devices' inputs.
+                if next_scope is None:
+                    _remember_allocation_inputs(hass, config_entry, entry_data, next_excess)
         # No await between lock release and this pop → no trigger can interleave here.
         pending = entry_data.pop("_pending_excess", None)
+        next_scope = entry_data.pop("_pending_scope", None)
         if pending is None:
-            return
+            break
         next_excess = pending
+    _arm_deadline_timer(hass, config_entry, entry_data)
 
 
-async def _initial_pass_with_retry(hass, config_entry, entry_data, excess_sensor_id):
-    """Perform an initial pass to set the state of the devices."""
-    for i in range(3):
-        initial_state = hass.states.get(excess_sensor_id)
-        log_debug(
-            "--- INITIAL PASS (attempt %d) ---: id=%s, state=%s",
-            i + 1,
-            excess_sensor_id,
-            initial_state,
+def _set_pending(entry_data, excess_power, only_devices) -> None:
+    """Record a deferred trigger, merging its device scope with one already pending."""
+    if "_pending_excess" in entry_data:
+        current = entry_data.get("_pending_scope")
+        if current is None or only_devices is None:
+            only_devices = None
+        else:
+            only_devices = set(current) | set(only_devices)
+    entry_data["_pending_excess"] = excess_power
+    entry_data["_pending_scope"] = None if only_devices is None else set(only_devices)
+
+
+def _remember_allocation_inputs(hass, config_entry, entry_data, excess_power) -> None:
+    """Record the inputs as the pass left them; the probe tick skips the next
+    pass while they are unchanged. Only relevant once auto-control is tracking."""
+    if not entry_data.get("excess_sensor_id"):
+        return
+    entry_data["_allocation_fingerprint"] = _allocation_fingerprint(
+        hass, config_entry, entry_data, excess_power
+    )
+    entry_data["_last_allocation_ts"] = time.monotonic()
+
+
+def _allocation_fingerprint(hass, config_entry, entry_data, excess_power):
+    """Fingerprint of the inputs a pass on ``excess_power`` would read now."""
+    return input_fingerprint(
+        hass,
+        auto_control.effective_devices(entry_data, config_entry.data.get(CONF_DEVICES, [])),
+        excess_power,
+        headroom_w=entry_data.get("probe_headroom_w", 0.0),
+        battery_healthy=entry_data.get("probe_battery_healthy", False),
+        battery_soc=_read_battery_soc(hass, config_entry.data),
+    )
+
+
+def _read_excess_value(hass, excess_sensor_id, entry_data=None) -> float:
+    """Current excess, 0 W when it is not numeric.
+
+    The exact value last fed by the excess sensor (``excess_feed_w``) wins over
+    the published, rounded and deadbanded state.
+    """
+    fed = (entry_data or {}).get("excess_feed_w")
+    if fed is not None:
+        return fed
+    state = hass.states.get(excess_sensor_id)
+    if state and state.state not in (STATE_UNKNOWN, STATE_UNAVAILABLE):
+        try:
+            return float(state.state)
+        except (ValueError, TypeError):
+            pass
+    return 0.0
+
+
+def _arm_deadline_timer(hass, config_entry, entry_data) -> None:
+    """Refresh the deadline heap and (re)arm one timer for its head.
+
+    Manual-override TTLs, startup grace, min on-time, command retries, debounce,
+    the daily on-time budget and schedule edges expire at known instants. Each
+    device's earliest one sits in ``entry_data["deadline_scheduler"]``; when the
+    single HA timer fires, only the devices that are due are re-run. Only active
+    once auto-control tracks an excess sensor.
+    """
+    excess_sensor_id = entry_data.get("excess_sensor_id")
+    scheduler = entry_data.get("deadline_scheduler")
+    if not excess_sensor_id or scheduler is None:
+        return
+    scheduler.update_from(
+        entry_data,
+        auto_control.effective_devices(entry_data, config_entry.data.get(CONF_DEVICES, [])),
+        dt_util.now(),
+    )
+    deadline = scheduler.next_at()
+    if deadline == entry_data.get("_deadline_at") and entry_data.get("unsub_deadline_timer"):
+        return
+    _call_unsubscribers(entry_data, ["unsub_deadline_timer"])
+    entry_data["_deadline_at"] = deadline
+    if deadline is None:
+        return
+
+    async def _deadline_reached(now):
+        entry_data["unsub_deadline_timer"] = None
+        entry_data["_deadline_at"] = None
+        due = scheduler.pop_due(now)
+        # The watchdog fail-safe owns the devices while the excess sensor is stale;
+        # the next full pass after recovery re-collects the deadlines.
+        if entry_data.get("watchdog_alerted") or not due:
+            _arm_deadline_timer(hass, config_entry, entry_data)
+            return
+        log_debug("[deadline] Re-evaluating %s at %s", sorted(due), now)
+        await _queue_process_excess_power(
+            hass, config_entry, entry_data,
+            _read_excess_value(hass, excess_sensor_id, entry_data), only_devices=due,
         )
-        if initial_state and initial_state.state not in (STATE_UNKNOWN, STATE_UNAVAILABLE):
-            try:
-                excess_power = float(initial_state.state)
-                entry_data["watchdog_last_seen"] = dt_util.utcnow()
-                entry_data["watchdog_alerted"] = False
-                await _queue_process_excess_power(
-                    hass, config_entry, entry_data, excess_power
-                )
-                log_info(
-                    "Initial pass successful for %s: %sW",
-                    initial_state.entity_id,
-                    excess_power,
-                )
-                return
-            except (ValueError, TypeError):
-                log_debug(
-                    "Excess sensor state not numeric yet for initial pass: %s",
-                    initial_state.state,
-                )
-            except Exception as exc:
-                log_error("Unexpected error during initial pass: %s", exc)
-        await asyncio.sleep(0.1 * (i + 1))
-    log_warning("Failed to perform initial pass after multiple retries.")
+
+    entry_data["unsub_deadline_timer"] = async_track_point_in_time(
+        hass, _deadline_reached, deadline
+    )
+
+
+def _allocation_inputs_unchanged(hass, config_entry, entry_data, excess_power) -> bool:
+    """True when the last pass saw these exact inputs and is recent enough."""
+    last = entry_data.get("_allocation_fingerprint")
+    last_ts = entry_data.get("_last_allocation_ts")
+    if last is None or last_ts is None:
+        return False
+    if time.monotonic() - last_ts >= ALLOCATION_REFRESH_INTERVAL_SECONDS:
+        return False
+    return _allocation_fingerprint(hass, config_entry, entry_data, excess_power) == last
+
+
+async def _battery_fast_lane(hass, config_entry, entry_data, now_ts) -> None:
+    """Feed a fresh battery-power reading into the probe's event-driven back-off.
+
+    The dwell-timer tick confirms a discharge over ``PROBE_BACKOFF_STREAK`` ticks;
+    this lane integrates the Wh drawn beyond the assist tolerance on every reading
+    and backs the headroom off (and re-allocates) as soon as the budget is spent.
+    Growth stays on the tick.
+    """
+    if entry_data.get("watchdog_alerted"):
+        return
+    cfg = config_entry.data
+    value, ok = get_input_cache(hass).reading(
+        hass, cfg.get(CONF_BATTERY_POWER), "Battery Power"
+    )
+    if not ok:
+        return
+    fast_state, backed = probe.fast_lane_step(
+        entry_data.get("probe_fast_state"),
+        entry_data.get("probe_state"),
+        net_charge_w=probe.battery_net_charge_w(
+            value, cfg.get(CONF_BATTERY_POWER_REVERSED, False)
+        ),
+        battery_soc=_read_battery_soc(hass, cfg),
+        discharge_tolerance_w=cfg.get(
+            CONF_PROBE_BATTERY_ASSIST_W, DEFAULT_PROBE_BATTERY_ASSIST_W
+        ),
+        now_ts=now_ts,
+    )
+    entry_data["probe_fast_state"] = fast_state
+    if backed is None:
+        return
+    prev = float(entry_data.get("probe_headroom_w", 0.0) or 0.0)
+    entry_data["probe_state"] = backed
+    entry_data["probe_headroom_w"] = backed["headroom_w"]
+    entry_data["probe_battery_healthy"] = False
+    log_debug(
+        "[probe] fast back-off: headroom %.0f -> %.0f W (battery %.0f W)",
+        prev, backed["headroom_w"], value,
+    )
+    await _queue_process_excess_power(
+        hass, config_entry, entry_data,
+        _read_excess_value(hass, entry_data.get("excess_sensor_id"), entry_data),
+    )
+
+
+def _probe_prior_key(now, soc) -> str:
+    """Prior cell (local time-of-day bucket, SOC band) for a probe tick at ``now``."""
+    return probe_prior.bucket_key(
+        dt_util.as_local(now), soc,
+        bucket_minutes=PROBE_PRIOR_BUCKET_MINUTES, soc_band=PROBE_PRIOR_SOC_BAND,
+    )
+
+
+def _probe_seed_w(entry_data, now, soc):
+    """Learned headroom the first growth step of the session or day may jump to.
+
+    ``None`` once that step was taken today, or when the current cell has no
+    trusted prior yet.
+    """
+    if entry_data.get("_probe_seeded_on") == dt_util.as_local(now).date():
+        return None
+    return probe_prior.seed_w(
+        entry_data.get("probe_prior", {}), _probe_prior_key(now, soc),
+        min_samples=PROBE_PRIOR_MIN_SAMPLES,
+    )
+
+
+def _learn_probe_prior(entry_data, prev_w, new_state, now, soc) -> None:
+    """Consume the seed on the first step of the day; feed sustained holds.
+
+    A hold counts once the same non-zero headroom has been kept for
+    ``PROBE_PRIOR_HOLD_TICKS`` ticks with the battery out of discharge.
+    """
+    headroom = new_state["headroom_w"]
+    if headroom > prev_w or new_state["backed_off"]:
+        entry_data["_probe_seeded_on"] = dt_util.as_local(now).date()
+    hold = entry_data.get("_probe_hold")
+    if (
+        headroom <= 0
+        or headroom != prev_w
+        or new_state["backed_off"]
+        or new_state["discharge_streak"]
+    ):
+        entry_data.pop("_probe_hold", None)
+        return
+    ticks = (hold or {}).get("ticks", 0) + 1
+    if ticks >= PROBE_PRIOR_HOLD_TICKS:
+        probe_prior.record_hold(
+            entry_data.setdefault("probe_prior", probe_prior.initial_prior()),
+            _probe_prior_key(now, soc), headroom, alpha=PROBE_PRIOR_ALPHA,
+        )
+        ticks = 0
+    entry_data["_probe_hold"] = {"ticks": ticks}
+
+
+def _restore_ready(entry_data) -> bool:
+    """True once the post-restart restore finished (or none was needed)."""
+    event = entry_data.get("restore_ready")
+    return event is None or event.is_set()
+
+
+def _record_first_allocation(entry_data) -> None:
+    """Report startup-to-steady-state time on the first completed allocation pass."""
+    metrics = entry_data.get("startup_metrics")
+    if metrics is None or "first_allocation_s" in metrics:
+        return
+    metrics["first_allocation_s"] = round(time.monotonic() - metrics.pop("_t0"), 3)
+    log_info(
+        "[Startup] Steady state after %.2fs (restore: %s devices in %ss)",
+        metrics["first_allocation_s"],
+        metrics.get("restored_devices", 0),
+        metrics.get("restore_s", 0.0),
+    )
+    journal_event("startup_timing", dict(metrics))
+
+
+async def _initial_pass(hass, config_entry, entry_data, excess_sensor_id):
+    """Run the first allocation pass as soon as the startup restore is done.
+
+    Waits on the ``restore_ready`` event instead of polling, so allocation never
+    races the restore that is still asserting persisted device states. If the
+    excess sensor is not numeric yet, the state-change listener performs the first
+    pass when it is.
+    """
+    event = entry_data.get("restore_ready")
+    if event is not None and not event.is_set():
+        try:
+            await asyncio.wait_for(event.wait(), RESTORE_READY_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            log_warning(
+                "Device restore still running after %ss; starting allocation anyway",
+                RESTORE_READY_TIMEOUT_SECONDS,
+            )
+            event.set()
+
+    # A trigger deferred while restore ran carries the latest value; the live
+    # sensor state is preferred when it is readable.
+    excess_power = entry_data.pop("_pending_excess", None)
+    entry_data.pop("_pending_scope", None)
+    initial_state = hass.states.get(excess_sensor_id)
+    log_debug("--- INITIAL PASS ---: id=%s, state=%s", excess_sensor_id, initial_state)
+    if initial_state and initial_state.state not in (STATE_UNKNOWN, STATE_UNAVAILABLE):
+        try:
+            excess_power = float(initial_state.state)
+        except (ValueError, TypeError):
+            log_debug(
+                "Excess sensor state not numeric yet for initial pass: %s",
+                initial_state.state,
+            )
+    if excess_power is None:
+        log_debug("Initial pass deferred until the excess sensor reports a value")
+        return
+
+    entry_data["watchdog_last_seen"] = dt_util.utcnow()
+    entry_data["watchdog_alerted"] = False
+    await _queue_process_excess_power(hass, config_entry, entry_data, excess_power)
+    log_info("Initial pass successful for %s: %sW", excess_sensor_id, excess_power)
 
 
 # Per-device entity unique_id tail: "<device_uuid>_<suffix>". Hub sensors
 # (e.g. "<entry>_excess") never match, so reconciliation can't touch them.
 _DEVICE_UID_TAIL_RE = re.compile(
     r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
-    r"_(?:power_percent|power|status|auto_control)$"
+    r"_(?:power_percent|power|status|energy|auto_control)$"
 )
 
 
@@ -385,6 +692,9 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigType):
         "config": config_entry.data,
         "unsub_update_listener": None,
         "unsub_auto_control": None,
+        # Set once the post-restart device restore is done; allocation waits on it.
+        "restore_ready": asyncio.Event(),
+        "startup_metrics": {"_t0": time.monotonic()},
     }
     hass.data[DOMAIN][config_entry.entry_id] = entry_data
     rebuild_device_index(hass)
@@ -405,20 +715,60 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigType):
             log_info("[Startup] No devices loaded from config.")
 
     async def _on_ha_started(_):
-        await restore_all_devices(hass, config_entry)
         _entry_data = hass.data[DOMAIN][config_entry.entry_id]
+        started = time.monotonic()
+        try:
+            restored = await restore_all_devices(hass, config_entry)
+        finally:
+            _entry_data["restore_ready"].set()
+        _entry_data["startup_metrics"].update(
+            restore_s=round(time.monotonic() - started, 3), restored_devices=restored,
+        )
         if not _entry_data.get("unsub_auto_control"):
             log_info("Retrying auto-control setup after HA started (sensor was not ready at initial setup)")
             await setup_auto_control(hass, config_entry)
 
-    unsub_ha_start = hass.bus.async_listen_once("homeassistant_started", _on_ha_started)
-    entry_data["unsub_ha_start"] = unsub_ha_start
+    if hass.state is CoreState.running:
+        # Entry (re)loaded into a running HA: no restart happened, nothing to restore.
+        entry_data["restore_ready"].set()
+        entry_data["unsub_ha_start"] = None
+    else:
+        entry_data["unsub_ha_start"] = hass.bus.async_listen_once(
+            "homeassistant_started", _on_ha_started
+        )
 
     # Drop entities for devices that no longer exist (a device removal reloads the
     # entry) before re-creating the current ones.
     _cleanup_orphan_device_entities(hass, config_entry)
     _fix_power_percent_entity_ids(hass, config_entry)
 
+    # Load the diverted-energy totals before the sensors are added: a
+    # total_increasing sensor that briefly reports 0 would be read as a meter reset.
+    entry_data["energy_state"] = energy.from_storage(
+        await load_energy_state(hass, config_entry),
+        [dev.get(CONF_DEVICE_ID) for dev in devices],
+    )
+    entry_data["draw_model"] = draw_model.from_storage(
+        await load_draw_model(hass, config_entry),
+        [dev.get(CONF_DEVICE_ID) for dev in devices],
+    )
+    entry_data["power_curves"] = power_curve.from_storage(
+        await load_power_curves(hass, config_entry),
+        [dev.get(CONF_DEVICE_ID) for dev in devices],
+    )
+    entry_data["mppt_calibration"] = mppt_calibration.from_storage(
+        await load_mppt_calibration(hass, config_entry)
+    )
+    entry_data["probe_prior"] = probe_prior.from_storage(
+        await load_probe_prior(hass, config_entry)
+    )
+    # Runtime auto-control toggles, before the switches are added and before
+    # auto-control picks its devices.
+    entry_data["auto_control"] = auto_control.from_storage(
+        await load_auto_control(hass, config_entry),
+        [dev.get(CONF_DEVICE_ID) for dev in devices],
+    )
+
     await _setup_entity_state_listeners(hass, config_entry, entry_data)
     await hass.config_entries.async_forward_entry_setups(config_entry, ["sensor", "switch"])
 
@@ -433,6 +783,9 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigType):
         async def _handle_set_relay_power(call):
             await handle_set_relay_power(hass, call)
 
+        async def _handle_get_diagnostics(call):
+            return await handle_get_diagnostics(hass, call)
+
         hass.services.async_register(
             DOMAIN, SERVICE_SET_RELAY_MODE, _handle_set_relay_mode,
             schema=SET_RELAY_MODE_SCHEMA,
@@ -441,6 +794,10 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigType):
             DOMAIN, SERVICE_SET_RELAY_POWER, _handle_set_relay_power,
             schema=SET_RELAY_POWER_SCHEMA,
         )
+        hass.services.async_register(
+            DOMAIN, SERVICE_GET_DIAGNOSTICS, _handle_get_diagnostics,
+            schema=GET_DIAGNOSTICS_SCHEMA, supports_response=SupportsResponse.ONLY,
+        )
         root["_services_registered"] = True
 
     root["_entry_count"] = int(root.get("_entry_count", 0)) + 1
@@ -462,16 +819,29 @@ async def setup_auto_control(hass: HomeAssistant, config_entry: ConfigType):
 
     _call_unsubscribers(
         entry_data,
-        ["unsub_auto_control", "unsub_watchdog_timer", "unsub_probe_timer"],
+        [
+            "unsub_auto_control",
+            "unsub_watchdog_timer",
+            "unsub_probe_timer",
+            "unsub_battery_listener",
+            "unsub_deadline_timer",
+        ],
     )
+    entry_data.pop("_allocation_fingerprint", None)
+    entry_data.pop("_deadline_at", None)
+    entry_data.pop("excess_feed_w", None)
+    entry_data.pop("_excess_queued_w", None)
+    entry_data["deadline_scheduler"] = DeadlineScheduler()
 
     devices = config_entry.data.get(CONF_DEVICES, [])
+    if not devices:
+        log_debug("No devices configured")
+        return
+    # Every device can be switched to auto-control at runtime without a reload,
+    # so the loop runs even while none of them is.
     auto_control_devices = [
-        dev for dev in devices if dev.get(CONF_AUTO_CONTROL_ENABLED, False)
+        dev for dev in devices if auto_control.is_enabled(entry_data, dev)
     ]
-    if not auto_control_devices:
-        log_debug("No devices with auto-control enabled")
-        return
 
     auto_control_devices.sort(
         key=lambda dev: int(dev.get(CONF_DEVICE_PRIORITY, 50)), reverse=True
@@ -518,18 +888,30 @@ async def setup_auto_control(hass: HomeAssistant, config_entry: ConfigType):
 
     entry_data.setdefault("_process_lock", asyncio.Lock())
 
-    async def handle_state_change(event):
-        new_state = event.data.get("new_state") if hasattr(event, "data") else None
-        if not new_state or new_state.state in (STATE_UNKNOWN, STATE_UNAVAILABLE):
-            return
-        entry_data["watchdog_last_seen"] = dt_util.utcnow()
-        entry_data["watchdog_alerted"] = False
-        try:
-            excess_power = float(new_state.state)
-        except (ValueError, TypeError) as exc:
-            log_error(f"Error processing excess power value: {exc}")
+    @callback
+    def _excess_feed(excess_power: float) -> None:
+        """Take the excess straight from the sensor's computation.
+
+        The value is exact (not rounded or deadbanded for display), so the
+        allocator applies its own, finer ``EXCESS_FEED_DEADBAND_W``.
+        """
+        entry_data["excess_feed_w"] = excess_power
+        last = entry_data.get("_excess_queued_w")
+        if (
+            last is not None
+            and (excess_power == 0) == (last == 0)
+            and abs(excess_power - last) < EXCESS_FEED_DEADBAND_W
+        ):
             return
-        await _queue_process_excess_power(hass, config_entry, entry_data, excess_power)
+        entry_data["_excess_queued_w"] = excess_power
+        hass.async_create_task(
+            _queue_process_excess_power(hass, config_entry, entry_data, excess_power)
+        )
+
+    @callback
+    def _unsub_excess_feed() -> None:
+        if entry_data.get("excess_feed") is _excess_feed:
+            entry_data.pop("excess_feed")
 
     registry = er.async_get(hass)
     excess_sensor_id = registry.async_get_entity_id(
@@ -545,9 +927,11 @@ async def setup_auto_control(hass: HomeAssistant, config_entry: ConfigType):
         return
 
     log_info("Tracking excess sensor: %s", excess_sensor_id)
-    entry_data["unsub_auto_control"] = async_track_state_change_event(
-        hass, [excess_sensor_id], handle_state_change
-    )
+    entry_data["excess_sensor_id"] = excess_sensor_id
+    # The excess sensor calls the feed from its computation; its state write
+    # is for display only and no longer drives the allocator.
+    entry_data["excess_feed"] = _excess_feed
+    entry_data["unsub_auto_control"] = _unsub_excess_feed
 
     async def _probe_timer_callback(now):
         """Periodic probe tick (mppt_probe): grow/back-off the headroom budget by
@@ -582,7 +966,9 @@ async def setup_auto_control(hass: HomeAssistant, config_entry: ConfigType):
         else:
             bp_entity = cfg.get(CONF_BATTERY_POWER)
             if bp_entity:
-                value, ok = get_sensor_state_safely(hass, bp_entity, "Battery Power")
+                value, ok = get_input_cache(hass).reading(
+                    hass, bp_entity, "Battery Power"
+                )
                 if ok:
                     net_charge = probe.battery_net_charge_w(value, reversed_)
         if sim and cfg.get(CONF_SIM_OVERRIDE_BATTERY_SOC):
@@ -654,6 +1040,21 @@ async def setup_auto_control(hass: HomeAssistant, config_entry: ConfigType):
         floor_w = probe.running_controllable_floor_w(
             entry_data.get("device_status", {}), entry_data.get("device_on_state", {})
         )
+        # Size the step to the next waiting device's learned real draw, so a large
+        # load is reached (and battery-validated) in one tick, not many blind steps.
+        jump_to = probe.jump_target_w(
+            entry_data.get("device_status", {}),
+            draw_model.learned_map(
+                entry_data.get("draw_model", {}), min_samples=DRAW_MODEL_MIN_SAMPLES
+            ),
+            untapped_w=gate_untapped,
+        )
+        # After a restart and at the start of each day, the first growth step may
+        # jump to the headroom that held at this time of day and SOC before; the
+        # battery validates it on the next tick like any other step.
+        seed = _probe_seed_w(entry_data, now, soc)
+        if seed is not None:
+            jump_to = max(jump_to or 0.0, seed)
         new_state = probe.plan_headroom(
             enabled=enabled,
             has_target=has_target,
@@ -667,67 +1068,163 @@ async def setup_auto_control(hass: HomeAssistant, config_entry: ConfigType):
             target_w=target,
             approach_fraction=PROBE_FORECAST_APPROACH_FRACTION,
             floor_w=floor_w,
+            jump_to_w=jump_to,
         )
         entry_data["probe_state"] = new_state
         prev = float(entry_data.get("probe_headroom_w", 0.0) or 0.0)
         entry_data["probe_headroom_w"] = new_state["headroom_w"]
+        _learn_probe_prior(entry_data, prev, new_state, now, soc)
         # Cache battery health for the allocator's race-free floor (see
         # process_excess_power): a manual→auto transition allocates before the next
         # probe tick, so the allocator re-applies the running-load floor itself, but
         # only while the probe is active and the battery is not discharging.
         entry_data["probe_battery_healthy"] = bool(enabled) and net_charge >= -assist_w
+        # Battery energy spent on probing: discharge, bounded by the load the last
+        # allocation funded from probe headroom (the rest is the house's own draw).
+        energy.integrate_probe_battery(
+            entry_data.setdefault("energy_state", energy.initial_state()),
+            min(max(0.0, -net_charge), float(entry_data.get("probe_funded_w", 0.0) or 0.0)),
+            now.timestamp(),
+            max_gap_s=ENERGY_MAX_INTEGRATION_GAP_SECONDS,
+        )
 
-        # Always re-run allocation on this periodic tick — NOT only when the headroom
-        # changed. The excess sensor's write-deadband can leave excess stable for a
-        # long time, and allocation is otherwise triggered only by an excess state
-        # change; without a periodic run the device status freezes and stale refusals
-        # (an entity that was unavailable at restart, a schedule window that opened)
-        # never clear, and a load can stay on draining the battery. Re-running is
-        # cheap: device commands are skipped when the entity is already in the
-        # desired state. The watchdog-alerted early-return above still protects the
-        # fail-safe.
-        state = hass.states.get(excess_sensor_id)
-        excess_val = 0.0
-        if state and state.state not in (STATE_UNKNOWN, STATE_UNAVAILABLE):
-            try:
-                excess_val = float(state.state)
-            except (ValueError, TypeError):
-                excess_val = 0.0
+        # The excess sensor's write-deadband can leave excess stable for a long
+        # time, and allocation is otherwise triggered only by an excess state change,
+        # so the tick re-runs allocation whenever any input moved: headroom, excess,
+        # SOC, or a device's relay / mode / power / schedule-helper entity (an entity
+        # that was unavailable at restart, a load left on draining the battery).
+        # Time-based expiries (override TTL, grace, min on-time, retries, schedule
+        # edges) have their own deadline timer, so an unchanged fingerprint means the
+        # pass would only repeat itself. A full pass still runs every
+        # ALLOCATION_REFRESH_INTERVAL_SECONDS to refresh status and energy totals.
+        # The watchdog-alerted early-return above still protects the fail-safe.
+        excess_val = _read_excess_value(hass, excess_sensor_id, entry_data)
         if new_state["headroom_w"] != prev:
             log_debug(
                 "[probe] headroom %.0f -> %.0f W (net=%.0f soc=%s tgt=%s has_target=%s)",
                 prev, new_state["headroom_w"], net_charge, soc, target, has_target,
             )
+        if _allocation_inputs_unchanged(hass, config_entry, entry_data, excess_val):
+            log_debug("[probe] Inputs unchanged since the last pass; skipping allocation")
+            return
         await _queue_process_excess_power(hass, config_entry, entry_data, excess_val)
 
     # Start the probe from a clean slate on every (re)setup so a stale headroom or
     # ceiling from a previous session/method can't inflate the first allocation.
+    # Only the learned prior carries over: it seeds the first growth step.
     entry_data["probe_headroom_w"] = 0.0
     entry_data.pop("probe_state", None)
+    entry_data.pop("_probe_seeded_on", None)
+    entry_data.pop("_probe_hold", None)
     entry_data["unsub_probe_timer"] = async_track_time_interval(
         hass, _probe_timer_callback, timedelta(seconds=PROBE_DWELL_S)
     )
 
+    # Battery-power events drive the fast back-off lane (live sensor only: with a
+    # simulated battery the tick already sees the whole, static, picture).
+    entry_data.pop("probe_fast_state", None)
+    bp_entity = config_entry.data.get(CONF_BATTERY_POWER)
+    if bp_entity and not (
+        config_entry.data.get(CONF_SIM_ENABLED)
+        and config_entry.data.get(CONF_SIM_OVERRIDE_BATTERY_POWER)
+    ):
+        async def _battery_power_changed(event):
+            await _battery_fast_lane(
+                hass, config_entry, entry_data, dt_util.utcnow().timestamp()
+            )
+
+        entry_data["unsub_battery_listener"] = async_track_state_change_event(
+            hass, [bp_entity], _battery_power_changed
+        )
+
     entry_data["initial_pass_task"] = hass.async_create_task(
-        _initial_pass_with_retry(hass, config_entry, entry_data, excess_sensor_id)
+        _initial_pass(hass, config_entry, entry_data, excess_sensor_id)
     )
 
     log_info(f"Auto-control set up for {len(auto_control_devices)} devices")
 
 
 async def update_listener(hass: HomeAssistant, config_entry: ConfigType):
-    """Handle options update."""
+    """Handle options update.
+
+    Structural changes (see core/config_diff.py) reload the entry; everything
+    else is applied in place, keeping listeners, timers and the probe state.
+    """
     entry_data = hass.data.get(DOMAIN, {}).get(config_entry.entry_id, {})
+    previous = entry_data.get("config")
     # Keep cached config in sync with the latest entry data so the device index
-    # rebuild and switch-sync paths see the new values without a reload.
+    # rebuild sees the new values without a reload.
     if isinstance(entry_data, dict):
         entry_data["config"] = config_entry.data
+        entry_data.pop("_allocation_fingerprint", None)
     rebuild_device_index(hass)
-    if entry_data.pop("_skip_reload", False):
-        log_debug("--- UPDATE LISTENER ---: skipping reload (switch sync)")
+    change = config_diff.classify(previous, config_entry.data)
+    _apply_auto_control_changes(hass, config_entry, entry_data, previous)
+    if change.structural is not None:
+        log_debug(
+            "--- UPDATE LISTENER ---: Reloading (%s). Data: %s",
+            change.structural, config_entry.data,
+        )
+        await hass.config_entries.async_reload(config_entry.entry_id)
         return
-    log_debug("--- UPDATE LISTENER ---: Entry updated. Data: %s", config_entry.data)
-    await hass.config_entries.async_reload(config_entry.entry_id)
+    log_debug(
+        "--- UPDATE LISTENER ---: Hot-applying (hub=%s, devices=%s)",
+        change.hub, sorted(change.devices),
+    )
+    await _hot_apply_config(hass, config_entry, entry_data, change)
+
+
+def _apply_auto_control_changes(hass, config_entry, entry_data, previous) -> None:
+    """Make the runtime auto-control flag follow a changed configured value.
+
+    Runs once the options flow has saved the entry, so an aborted flow changes
+    nothing, and works whether or not the device's switch entity is enabled.
+    A reload picks the flag up from the restore store.
+    """
+    if not previous:
+        return
+    old = {
+        d.get(CONF_DEVICE_ID): bool(d.get(CONF_AUTO_CONTROL_ENABLED, False))
+        for d in previous.get(CONF_DEVICES, [])
+    }
+    switches = entry_data.get("auto_control_switches", {}) if isinstance(entry_data, dict) else {}
+    for dev in config_entry.data.get(CONF_DEVICES, []):
+        device_id = dev.get(CONF_DEVICE_ID)
+        enabled = bool(dev.get(CONF_AUTO_CONTROL_ENABLED, False))
+        if device_id not in old or old[device_id] == enabled:
+            continue
+        switch = switches.get(device_id)
+        if switch is not None:
+            switch.sync_state(enabled)
+        else:
+            auto_control.set_enabled(hass, config_entry.entry_id, device_id, enabled)
+
+
+async def _hot_apply_config(hass, config_entry, entry_data, change) -> None:
+    """Apply a non-structural config update to the running entry."""
+    if change.empty:
+        return
+    if change.hub:
+        for sensor in list(entry_data.get("hub_sensors", {}).values()):
+            sensor.apply_config(config_entry.data)
+        # The grid-meter loop restarts from the allocated load under the new
+        # method / target.
+        entry_data.pop("_grid_loop", None)
+    if change.renamed:
+        registry = dr.async_get(hass)
+        for dev in config_entry.data.get(CONF_DEVICES, []):
+            if dev.get(CONF_DEVICE_ID) not in change.renamed:
+                continue
+            device = registry.async_get_device(identifiers={(DOMAIN, dev[CONF_DEVICE_ID])})
+            if device is not None:
+                registry.async_update_device(device.id, name=dev.get(CONF_DEVICE_NAME))
+    # The pass reads the new device settings and re-collects their deadlines.
+    excess_sensor_id = entry_data.get("excess_sensor_id")
+    if excess_sensor_id and not entry_data.get("watchdog_alerted"):
+        await _queue_process_excess_power(
+            hass, config_entry, entry_data,
+            _read_excess_value(hass, excess_sensor_id, entry_data),
+        )
 
 
 async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigType):
@@ -745,6 +1242,8 @@ async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigType):
             "unsub_mode_listener",
             "unsub_watchdog_timer",
             "unsub_probe_timer",
+            "unsub_battery_listener",
+            "unsub_deadline_timer",
             "unsub_restore_listener",
             "unsub_ha_start",
         ],
@@ -755,6 +1254,9 @@ async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigType):
             await entry_data["initial_pass_task"]
         except asyncio.CancelledError:
             pass
+    if entry_data.get("energy_state"):
+        persist_learned_state(hass, config_entry, **learned_state_snapshot(entry_data))
+    await async_unload_restore_store(hass, config_entry)
 
     root = hass.data.get(DOMAIN, {})
     root.pop(config_entry.entry_id, None)
@@ -765,9 +1267,13 @@ async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigType):
     except (TypeError, ValueError):
         root["_entry_count"] = 0
 
+    if root.get("_entry_count", 0) == 0:
+        drop_input_cache(hass)
+
     if root.get("_entry_count", 0) == 0 and root.get("_services_registered"):
         hass.services.async_remove(DOMAIN, SERVICE_SET_RELAY_MODE)
         hass.services.async_remove(DOMAIN, SERVICE_SET_RELAY_POWER)
+        hass.services.async_remove(DOMAIN, SERVICE_GET_DIAGNOSTICS)
         root["_services_registered"] = False
 
     return True
@@ -230,7 +230,9 @@ class SunAllocatorOptionsFlowHandler(
         self._solar_config = {
             k: v for k, v in self._config_entry.data.items() if k != CONF_DEVICES
         }
-        self._devices = self._config_entry.data.get(CONF_DEVICES, [])
+        # A copy: edits must not reach the entry's current data before they are
+        # saved, or the update listener could not tell what changed.
+        self._devices = list(self._config_entry.data.get(CONF_DEVICES, []))
 
         log_debug("Loaded %d devices", len(self._devices))
         return await self.async_step_main_menu()
@@ -308,7 +310,6 @@ class SunAllocatorOptionsFlowHandler(
                 user_input.get(CONF_SIM_BATTERY_SOC, DEFAULT_SIM_BATTERY_SOC)
             )
             self._persist_config()
-            await self.hass.config_entries.async_reload(self._config_entry.entry_id)
             return await self.async_step_main_menu()
 
         sim_on = self._solar_config.get(CONF_SIM_ENABLED, False)
@@ -594,7 +595,9 @@ class SunAllocatorOptionsFlowHandler(
         """Persist current solar config and device list to the config entry."""
         data = dict(self._config_entry.data)
         data.update(self._solar_config)
-        data[CONF_DEVICES] = self._devices
+        # A copy: the entry data being replaced keeps its own list for the
+        # update listener to diff against.
+        data[CONF_DEVICES] = list(self._devices)
         data["devices_str"] = json.dumps(self._devices, default=_json_default)
         data.pop("test_array", None)
         self.hass.config_entries.async_update_entry(self._config_entry, data=data)
@@ -608,15 +611,18 @@ class SunAllocatorOptionsFlowHandler(
 
 
     async def _save_and_return(self):
-        """Save configuration, reload integration and return to main menu."""
+        """Save configuration and return to main menu.
+
+        The entry's update listener applies the change, reloading the entry only
+        when it is structural.
+        """
         log_debug("--- CONFIG FLOW SAVE ---: Saving %d devices.", len(self._devices))
         self._persist_config()
-        await self.hass.config_entries.async_reload(self._config_entry.entry_id)
         return await self.async_step_main_menu()
 
 
     async def _finalize_device_config(self):
-        """Finalize device configuration, persist, and reload."""
+        """Finalize device configuration and persist it (applied by the update listener)."""
         if self._action == ACTION_ADD:
             self._device_config[CONF_DEVICE_ID] = str(uuid.uuid4())
             self._devices.append(self._device_config)
@@ -629,7 +635,6 @@ class SunAllocatorOptionsFlowHandler(
 
         log_debug("--- CONFIG FLOW FINALIZE ---: Saving %d devices.", len(self._devices))
         self._persist_config()
-        await self.hass.config_entries.async_reload(self._config_entry.entry_id)
         return await self.async_step_manage_devices()
 
 
@@ -3,6 +3,7 @@
 from voluptuous import Schema, Required
 
 from ..config.ui_helpers import NumberSelectorBuilder, SelectSelectorBuilder, int_field
+from ..core.strategies import available_strategies
 
 from ..const import (
     CONF_MIN_INVERTER_VOLTAGE,
@@ -15,7 +16,8 @@ from ..const import (
     CONF_INVERTER_SELF_CONSUMPTION,
     CONF_DEVICE_ALLOCATION_STRATEGY,
     STRATEGY_FILL_ONE_BY_ONE,
-    STRATEGY_DISTRIBUTE_EVENLY,
+    CONF_SWITCHING_COST_W,
+    DEFAULT_SWITCHING_COST_W,
     CONF_BATTERY_DISCHARGE_TOLERANCE_W,
     DEFAULT_BATTERY_DISCHARGE_TOLERANCE_W,
     CONF_PROBE_BATTERY_ASSIST_W,
@@ -25,6 +27,34 @@ from ..const import (
     CALC_METHOD_MPPT,
     CALC_METHOD_MPPT_PROBE,
     CALC_METHOD_EXPORT,
+    CALC_METHOD_GRID_METER,
+    CONF_GRID_EXPORT_TARGET_W,
+    DEFAULT_GRID_EXPORT_TARGET_W,
+    CONF_FILTER_PV_POWER,
+    CONF_FILTER_PV_VOLTAGE,
+    CONF_FILTER_CONSUMPTION,
+    CONF_FILTER_BATTERY_POWER,
+    CONF_FILTER_WINDOW,
+    CONF_FILTER_EWMA_TAU_S,
+    DEFAULT_INPUT_FILTER,
+    DEFAULT_FILTER_WINDOW,
+    DEFAULT_FILTER_EWMA_TAU_S,
+    INPUT_FILTER_NONE,
+    INPUT_FILTER_MEDIAN,
+    INPUT_FILTER_EWMA,
+    INPUT_FILTER_OUTLIER,
+    CONF_INPUT_ALIGNMENT,
+    DEFAULT_INPUT_ALIGNMENT,
+    INPUT_ALIGNMENT_OFF,
+    INPUT_ALIGNMENT_HOLD,
+    INPUT_ALIGNMENT_INTERPOLATE,
+)
+
+_INPUT_FILTER_KEYS = (
+    CONF_FILTER_PV_POWER,
+    CONF_FILTER_PV_VOLTAGE,
+    CONF_FILTER_CONSUMPTION,
+    CONF_FILTER_BATTERY_POWER,
 )
 
 
@@ -33,6 +63,14 @@ def build_advanced_config_schema(defaults=None):
     if defaults is None:
         defaults = {}
 
+    filter_fields = {
+        Required(key, default=defaults.get(key, DEFAULT_INPUT_FILTER)): SelectSelectorBuilder(
+            options=[INPUT_FILTER_NONE, INPUT_FILTER_MEDIAN, INPUT_FILTER_EWMA, INPUT_FILTER_OUTLIER],
+            translation_key="input_filter",
+        ).build()
+        for key in _INPUT_FILTER_KEYS
+    }
+
     return Schema(
         {
             Required(
@@ -45,10 +83,16 @@ def build_advanced_config_schema(defaults=None):
                     CALC_METHOD_MPPT,
                     CALC_METHOD_MPPT_PROBE,
                     CALC_METHOD_EXPORT,
+                    CALC_METHOD_GRID_METER,
                 ],
                 translation_key=CONF_CALCULATION_METHOD,
             ).build(),
 
+            Required(
+                CONF_GRID_EXPORT_TARGET_W,
+                default=defaults.get(CONF_GRID_EXPORT_TARGET_W, DEFAULT_GRID_EXPORT_TARGET_W),
+            ): NumberSelectorBuilder(0, 1000, 5).build(),
+
             Required(
                 CONF_RESERVE_BATTERY_POWER,
                 default=defaults.get(CONF_RESERVE_BATTERY_POWER, 0),
@@ -63,13 +107,15 @@ def build_advanced_config_schema(defaults=None):
                 CONF_DEVICE_ALLOCATION_STRATEGY,
                 default=defaults.get(CONF_DEVICE_ALLOCATION_STRATEGY, STRATEGY_FILL_ONE_BY_ONE),
             ): SelectSelectorBuilder(
-                options=[
-                    STRATEGY_FILL_ONE_BY_ONE,
-                    STRATEGY_DISTRIBUTE_EVENLY
-                ],
+                options=available_strategies(),
                 translation_key=CONF_DEVICE_ALLOCATION_STRATEGY,
             ).build(),
 
+            Required(
+                CONF_SWITCHING_COST_W,
+                default=defaults.get(CONF_SWITCHING_COST_W, DEFAULT_SWITCHING_COST_W),
+            ): NumberSelectorBuilder(0, 2000, 10).build(),
+
             Required(
                 CONF_MIN_INVERTER_VOLTAGE,
                 default=defaults.get(CONF_MIN_INVERTER_VOLTAGE, 100.0),
@@ -105,5 +151,25 @@ def build_advanced_config_schema(defaults=None):
                     CONF_PROBE_BATTERY_ASSIST_W, DEFAULT_PROBE_BATTERY_ASSIST_W
                 ),
             ): NumberSelectorBuilder(0, 1000, 10).build(),
+
+            **filter_fields,
+
+            Required(
+                CONF_FILTER_WINDOW,
+                default=defaults.get(CONF_FILTER_WINDOW, DEFAULT_FILTER_WINDOW),
+            ): int_field(3, 9),
+
+            Required(
+                CONF_FILTER_EWMA_TAU_S,
+                default=defaults.get(CONF_FILTER_EWMA_TAU_S, DEFAULT_FILTER_EWMA_TAU_S),
+            ): NumberSelectorBuilder(1, 300, 1).build(),
+
+            Required(
+                CONF_INPUT_ALIGNMENT,
+                default=defaults.get(CONF_INPUT_ALIGNMENT, DEFAULT_INPUT_ALIGNMENT),
+            ): SelectSelectorBuilder(
+                options=[INPUT_ALIGNMENT_OFF, INPUT_ALIGNMENT_HOLD, INPUT_ALIGNMENT_INTERPOLATE],
+                translation_key=CONF_INPUT_ALIGNMENT,
+            ).build(),
         }
     )
@@ -11,6 +11,9 @@ from homeassistant.helpers.template import Template
 
 from ..core.logger import log_debug, log_info, log_error, audit_action, log_exception
 from ..utils import clean_entity_id_and_mode
+from ..core.settings import ENTITY_PICKER_MAX_OPTIONS
+from ..core import auto_control
+from .entity_catalog import EntityCatalogMixin
 from .device_config_form import (
     build_device_name_type_schema,
     build_device_selection_schema,
@@ -23,6 +26,7 @@ from ..const import (
     DOMAIN,
     CONF_DEVICE_ENTITY,
     CONF_DEVICE_ENTITY_FRIENDLY_NAME,
+    CONF_ENTITY_SEARCH,
     DOMAIN_CLIMATE,
     CONF_AUTO_CONTROL_ENABLED,
     CONF_DEVICES,
@@ -61,89 +65,144 @@ from ..const import (
 )
 
 
-class DeviceConfigMixin:
-    """Mixin for device configuration steps."""
+_DEVICE_ENTITY_ICONS = {
+    DOMAIN_LIGHT: "💡",
+    DOMAIN_SWITCH: "🔌",
+    DOMAIN_INPUT_BOOLEAN: "☑️",
+    DOMAIN_AUTOMATION: "⚙️",
+    DOMAIN_SCRIPT: "📜",
+    DOMAIN_CLIMATE: "🌡️",
+}
 
-    def _get_device_entities(self, hass: HomeAssistant) -> Dict[str, list]:
-        """Get available device entities for selection."""
-        allowed_domains = [
-            DOMAIN_LIGHT,
+
+def _device_entity_domains(device_type) -> list:
+    """Domains the device picker offers for a device type."""
+    if device_type == DEVICE_TYPE_CUSTOM:
+        return [
             DOMAIN_SWITCH,
+            DOMAIN_LIGHT,
             DOMAIN_INPUT_BOOLEAN,
-            DOMAIN_AUTOMATION,
             DOMAIN_SCRIPT,
-            DOMAIN_CLIMATE,
+            DOMAIN_AUTOMATION,
         ]
-        icon_map = {
-            DOMAIN_LIGHT: "💡",
-            DOMAIN_SWITCH: "🔌",
-            DOMAIN_INPUT_BOOLEAN: "☑️",
-            DOMAIN_AUTOMATION: "⚙️",
-            DOMAIN_SCRIPT: "📜",
-            DOMAIN_CLIMATE: "🌡️",
+    return list(_DEVICE_ENTITY_ICONS)
+
+
+class DeviceConfigMixin(EntityCatalogMixin):
+    """Mixin for device configuration steps."""
+
+    def _get_device_entities(
+        self, hass: HomeAssistant, search: Optional[str] = None, limit: Optional[int] = None
+    ) -> Dict[str, list]:
+        """Get available device entities for selection.
+
+        Candidates come from the session entity catalog (only the controllable
+        domains are touched) and are memoized per catalog version and device type,
+        so rendering and submitting the step build the list once. ``search`` asks the
+        catalog for matching entity_ids / friendly names and builds options for those
+        only; ``limit`` caps the options shown and ``truncated`` tells the form
+        whether to offer the search field. The entity of the device being edited
+        is always offered, since the form pre-selects it.
+        """
+        catalog = self._get_entity_catalog(hass)
+        device_type = getattr(self, "_device_config", {}).get(CONF_DEVICE_TYPE)
+        domains = _device_entity_domains(device_type)
+        if search:
+            # Only the states the catalog matches are turned into options.
+            all_entities = self._build_device_entity_options(
+                catalog.search(search, domains), device_type
+            )
+        else:
+            cache_key = (catalog.version, device_type)
+            cached = getattr(self, "_device_entities_cache", None)
+            if cached is None or cached[0] != cache_key:
+                cached = (
+                    cache_key,
+                    self._build_device_entity_options(catalog.states(domains), device_type),
+                )
+                self._device_entities_cache = cached
+            all_entities = cached[1]
+
+        truncated = limit is not None and len(all_entities) > limit
+        if truncated:
+            all_entities = all_entities[:limit]
+        current = self._current_device_entity_option(hass, device_type)
+        if current is not None and all(value != current[0] for value, _, _ in all_entities):
+            # The edited device's entity is the form default; keep it selectable.
+            all_entities = [current] + all_entities
+        return {
+            "all_entities": [(NONE_OPTION, NONE_OPTION, "")] + all_entities,
+            "truncated": truncated,
         }
+
+
+    def _current_device_entity_option(self, hass: HomeAssistant, device_type):
+        """Return the option for the entity of the device being edited, if any."""
+        device_config = getattr(self, "_device_config", {})
+        entity_id = device_config.get(CONF_DEVICE_ENTITY)
+        if not entity_id or entity_id == NONE_OPTION:
+            return None
+        value = entity_id
+        if device_config.get("hvac_mode"):
+            value = f"{entity_id}|{device_config['hvac_mode']}"
+        state = hass.states.get(entity_id)
+        if state is not None:
+            for option in self._build_device_entity_options([state], device_type):
+                if option[0] == value:
+                    return option
+        return (value, value, "")
+
+
+    def _build_device_entity_options(self, states, device_type) -> list:
+        """Return sorted ``(value, label, friendly_name)`` candidates for a device type."""
         all_entities = []
-        device_type = getattr(self, "_device_config", {}).get(CONF_DEVICE_TYPE)
-        for e in hass.states.async_all():
+        for e in states:
             domain = e.entity_id.split(".")[0]
-            icon = icon_map.get(domain, "")
+            icon = _DEVICE_ENTITY_ICONS.get(domain, "")
             state = e.state
             friendly = e.attributes.get("friendly_name", "")
-            is_esphome = (
-                ".esphome_" in e.entity_id
-                or e.attributes.get("integration") == "esphome"
-            )
             if device_type == DEVICE_TYPE_CUSTOM:
+                is_esphome = (
+                    ".esphome_" in e.entity_id
+                    or e.attributes.get("integration") == "esphome"
+                )
+                if is_esphome:
+                    value = e.entity_id
+                    label = f"{icon} {friendly}" if friendly else f"{icon} {value}"
+                    all_entities.append((value, label, friendly))
+            elif domain == DOMAIN_CLIMATE:
+                hvac_modes = e.attributes.get("hvac_modes") or []
+                active_modes = [m for m in hvac_modes if m != "off"]
+                if not active_modes:
+                    # Entity unavailable or no info yet — show single entry, runtime will auto-detect
+                    label = f"{icon} {friendly}" if friendly else f"{icon} {e.entity_id}"
+                    all_entities.append((e.entity_id, label, friendly))
+                elif len(active_modes) == 1:
+                    # Only one non-off mode — no need for suffix
+                    label = f"{icon} {friendly}" if friendly else f"{icon} {e.entity_id}"
+                    all_entities.append((f"{e.entity_id}|{active_modes[0]}", label, friendly))
+                else:
+                    for mode in active_modes:
+                        value = f"{e.entity_id}|{mode}"
+                        label = (
+                            f"{icon} {friendly} ({mode.replace('_', ' ').title()})"
+                            if friendly
+                            else f"{icon} {e.entity_id} ({mode})"
+                        )
+                        all_entities.append((value, label, friendly))
+            elif state in [STATE_ON, STATE_OFF]:
                 if (
-                    domain
-                    in [
-                        DOMAIN_SWITCH,
-                        DOMAIN_LIGHT,
-                        DOMAIN_INPUT_BOOLEAN,
-                        DOMAIN_SCRIPT,
-                        DOMAIN_AUTOMATION,
-                    ]
-                    and is_esphome
+                    "sun_allocator" not in e.entity_id.lower()
+                    and "sunallocator" not in e.entity_id.lower()
                 ):
                     value = e.entity_id
-                    label = f"{icon} {friendly}" if friendly else f"{icon} {value}"
+                    label = (
+                        f"{icon} {friendly}" if friendly else f"{icon} {value}"
+                    )
                     all_entities.append((value, label, friendly))
-            else:
-                if domain in allowed_domains:
-                    if domain == DOMAIN_CLIMATE:
-                        hvac_modes = e.attributes.get("hvac_modes") or []
-                        active_modes = [m for m in hvac_modes if m != "off"]
-                        if not active_modes:
-                            # Entity unavailable or no info yet — show single entry, runtime will auto-detect
-                            label = f"{icon} {friendly}" if friendly else f"{icon} {e.entity_id}"
-                            all_entities.append((e.entity_id, label, friendly))
-                        elif len(active_modes) == 1:
-                            # Only one non-off mode — no need for suffix
-                            label = f"{icon} {friendly}" if friendly else f"{icon} {e.entity_id}"
-                            all_entities.append((f"{e.entity_id}|{active_modes[0]}", label, friendly))
-                        else:
-                            for mode in active_modes:
-                                value = f"{e.entity_id}|{mode}"
-                                label = (
-                                    f"{icon} {friendly} ({mode.replace('_', ' ').title()})"
-                                    if friendly
-                                    else f"{icon} {e.entity_id} ({mode})"
-                                )
-                                all_entities.append((value, label, friendly))
-                    elif state in [STATE_ON, STATE_OFF]:
-                        if (
-                            "sun_allocator" not in e.entity_id.lower()
-                            and "sunallocator" not in e.entity_id.lower()
-                        ):
-                            value = e.entity_id
-                            label = (
-                                f"{icon} {friendly}" if friendly else f"{icon} {value}"
-                            )
-                            all_entities.append((value, label, friendly))
 
         all_entities.sort(key=lambda x: x[1])
-        all_entities = [(NONE_OPTION, NONE_OPTION, "")] + all_entities
-        return {"all_entities": all_entities}
+        return all_entities
 
 
     def _validate_device_name(self, user_input: Dict[str, Any]) -> Dict[str, str]:
@@ -319,10 +378,13 @@ class DeviceConfigMixin:
 
 
     def _get_device_selection_schema(
-        self, entities: Dict[str, list], defaults: Optional[Dict[str, Any]] = None
+        self,
+        entities: Dict[str, list],
+        defaults: Optional[Dict[str, Any]] = None,
+        search: str = "",
     ) -> vol.Schema:
         """Get the schema for device selection configuration."""
-        return build_device_selection_schema(entities, defaults)
+        return build_device_selection_schema(entities, defaults, search=search)
 
 
     def _get_device_basic_settings_schema(
@@ -364,7 +426,9 @@ class DeviceConfigMixin:
         if hasattr(self, "hass") and hasattr(self, "config_entry"):
             try:
                 data = dict(self.config_entry.data)
-                data[CONF_DEVICES] = self._devices
+                # A copy: the entry data being replaced keeps its own list for the
+                # update listener to diff against.
+                data[CONF_DEVICES] = list(self._devices)
                 self.hass.config_entries.async_update_entry(
                     self.config_entry, data=data
                 )
@@ -410,14 +474,22 @@ class DeviceConfigMixin:
     async def async_step_device_selection(self, user_input=None):
         """Handle the device selection step."""
         errors = {}
-        entities = self._get_device_entities(self.hass)
-
+        search = ""
         if user_input is not None:
-            user_input = self._process_device_input(user_input, entities)
-            self._device_config.update(user_input)
-            return await self.async_step_device_basic_settings()
+            search = (user_input.pop(CONF_ENTITY_SEARCH, "") or "").strip()
+            # A search submitted without a pick re-renders the narrowed list.
+            if not search or user_input.get(CONF_DEVICE_ENTITY) not in (None, NONE_OPTION):
+                entities = self._get_device_entities(self.hass)
+                user_input = self._process_device_input(user_input, entities)
+                self._device_config.update(user_input)
+                return await self.async_step_device_basic_settings()
 
-        schema = self._get_device_selection_schema(entities, self._device_config)
+        entities = self._get_device_entities(
+            self.hass, search=search, limit=ENTITY_PICKER_MAX_OPTIONS
+        )
+        schema = self._get_device_selection_schema(
+            entities, self._device_config, search=search
+        )
 
         return self.async_show_form(
             step_id=STEP_DEVICE_SELECTION,
@@ -445,17 +517,10 @@ class DeviceConfigMixin:
             errors = self._validate_basic_settings(user_input)
 
             if not errors:
+                # The runtime auto-control flag follows once the entry is
+                # saved (see update_listener).
                 self._device_config.update(user_input)
 
-                # Sync the auto-control switch entity to the new config value.
-                device_id = self._device_config.get(CONF_DEVICE_ID)
-                new_enabled = self._device_config.get(CONF_AUTO_CONTROL_ENABLED, False)
-                entry_data = self._get_entry_data()
-                if device_id and entry_data is not None:
-                    switch = entry_data.get("auto_control_switches", {}).get(device_id)
-                    if switch:
-                        switch.sync_state(new_enabled)
-
                 schedule_mode = self._device_config.get(CONF_DEVICE_SCHEDULE_MODE)
                 if schedule_mode == SCHEDULE_MODE_STANDARD:
                     return await self.async_step_device_schedule()
@@ -464,15 +529,14 @@ class DeviceConfigMixin:
 
                 return await self._finalize_device_config()
 
-        # Pre-fill auto_control_enabled from the live switch state if available.
+        # Pre-fill auto_control_enabled from the runtime flag if available.
         display_defaults = dict(self._device_config)
-        device_id = display_defaults.get(CONF_DEVICE_ID)
-        if device_id:
+        if display_defaults.get(CONF_DEVICE_ID):
             entry_data = self._get_entry_data()
             if entry_data is not None:
-                switch = entry_data.get("auto_control_switches", {}).get(device_id)
-                if switch is not None:
-                    display_defaults[CONF_AUTO_CONTROL_ENABLED] = bool(switch.is_on)
+                display_defaults[CONF_AUTO_CONTROL_ENABLED] = auto_control.is_enabled(
+                    entry_data, display_defaults
+                )
 
         schema = self._get_device_basic_settings_schema(display_defaults)
 
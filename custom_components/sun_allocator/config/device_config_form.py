@@ -19,6 +19,7 @@ from ..const import (
     DEVICE_TYPE_CUSTOM,
     DEVICE_TYPE_STANDARD,
     CONF_DEVICE_ENTITY,
+    CONF_ENTITY_SEARCH,
     NONE_OPTION,
     CONF_AUTO_CONTROL_ENABLED,
     CONF_DEVICE_MIN_EXPECTED_W,
@@ -35,6 +36,12 @@ from ..const import (
     CONF_DAYS_OF_WEEK,
     CONF_DEVICE_DEBOUNCE_TIME,
     DEFAULT_DEBOUNCE_TIME,
+    CONF_DEVICE_DEBOUNCE_MODE,
+    DEFAULT_DEBOUNCE_MODE,
+    DEBOUNCE_MODE_TIME,
+    DEBOUNCE_MODE_ENERGY,
+    CONF_DEVICE_DEBOUNCE_ENERGY_WH,
+    DEFAULT_DEBOUNCE_ENERGY_WH,
     CONF_DEVICE_MIN_ON_TIME,
     CONF_DEVICE_MIN_BATTERY_SOC,
     CONF_DEVICE_TURN_OFF_ON_AUTO_CONTROL_DISABLE,
@@ -45,6 +52,11 @@ from ..const import (
     CONF_DEVICE_MAX_ON_TIME_PER_DAY,
     CONF_DEVICE_ALLOW_PROBE,
     DEFAULT_DEVICE_ALLOW_PROBE,
+    CONF_DEVICE_POWER_FEEDBACK,
+    DEFAULT_DEVICE_POWER_FEEDBACK,
+    CONF_DEVICE_ESPHOME_NODE,
+    CONF_DEVICE_ESPHOME_CHANNEL,
+    DEFAULT_DEVICE_ESPHOME_CHANNEL,
 )
 
 
@@ -74,8 +86,12 @@ def build_device_name_type_schema(defaults=None):
     )
 
 
-def build_device_selection_schema(entities, defaults=None):
-    """Builds the schema for device selection configuration."""
+def build_device_selection_schema(entities, defaults=None, search=""):
+    """Builds the schema for device selection configuration.
+
+    When the option list was capped (very large installs) or a search is active,
+    an ``entity_search`` text field is added to narrow the list.
+    """
     if defaults is None:
         defaults = {}
 
@@ -94,14 +110,15 @@ def build_device_selection_schema(entities, defaults=None):
     if default_entity != NONE_OPTION and defaults.get("hvac_mode"):
         default_entity = f"{default_entity}|{defaults['hvac_mode']}"
 
-    return Schema(
-        {
-            Optional(
-                CONF_DEVICE_ENTITY,
-                default=default_entity,
-            ): SelectSelectorBuilder(options).build()
-        }
-    )
+    fields = {
+        Optional(
+            CONF_DEVICE_ENTITY,
+            default=default_entity,
+        ): SelectSelectorBuilder(options).build()
+    }
+    if entities.get("truncated") or search:
+        fields[Optional(CONF_ENTITY_SEARCH, default=search)] = selector({"text": {}})
+    return Schema(fields)
 
 
 def _get_schedule_mode_default(defaults):
@@ -135,6 +152,19 @@ def build_device_basic_settings_schema(defaults=None):
             default=defaults.get(CONF_DEVICE_DEBOUNCE_TIME, DEFAULT_DEBOUNCE_TIME),
         ): NumberSelectorBuilder(5, 600, 1, unit="s").build(),
 
+        Required(
+            CONF_DEVICE_DEBOUNCE_MODE,
+            default=defaults.get(CONF_DEVICE_DEBOUNCE_MODE, DEFAULT_DEBOUNCE_MODE),
+        ): SelectSelectorBuilder(
+            options=[DEBOUNCE_MODE_TIME, DEBOUNCE_MODE_ENERGY],
+            translation_key=CONF_DEVICE_DEBOUNCE_MODE,
+        ).build(),
+
+        Optional(
+            CONF_DEVICE_DEBOUNCE_ENERGY_WH,
+            default=defaults.get(CONF_DEVICE_DEBOUNCE_ENERGY_WH, DEFAULT_DEBOUNCE_ENERGY_WH),
+        ): NumberSelectorBuilder(0.1, 100, 0.1, unit="Wh").build(),
+
         Optional(
             CONF_DEVICE_MIN_ON_TIME,
             default=defaults.get(CONF_DEVICE_MIN_ON_TIME, 0),
@@ -211,6 +241,26 @@ def build_device_basic_settings_schema(defaults=None):
                 default=defaults.get(CONF_DEVICE_MAX_EXPECTED_W, 100.0),
             )
         ] = NumberSelectorBuilder(1, 50000, 1, unit="W").build()
+        schema_dict[
+            Required(
+                CONF_DEVICE_POWER_FEEDBACK,
+                default=defaults.get(CONF_DEVICE_POWER_FEEDBACK, DEFAULT_DEVICE_POWER_FEEDBACK),
+            )
+        ] = selector({"boolean": {}})
+        esphome_node_val = defaults.get(CONF_DEVICE_ESPHOME_NODE)
+        schema_dict[
+            Optional(
+                CONF_DEVICE_ESPHOME_NODE,
+                **({"default": esphome_node_val} if esphome_node_val else {}),
+                description={"suggested_value": esphome_node_val},
+            )
+        ] = selector({"text": {}})
+        schema_dict[
+            Optional(
+                CONF_DEVICE_ESPHOME_CHANNEL,
+                default=defaults.get(CONF_DEVICE_ESPHOME_CHANNEL, DEFAULT_DEVICE_ESPHOME_CHANNEL),
+            )
+        ] = NumberSelectorBuilder(1, 16, 1).build()
 
     return Schema(schema_dict)
 
@@ -0,0 +1,144 @@
+"""Domain-indexed entity catalog for Sun Allocator config-flow pickers.
+
+Picker steps used to walk the whole state machine every time a form rendered
+(and again on submit). On installs with thousands of entities that made the
+options flow slow to open. The catalog takes one snapshot per flow session,
+indexes it by domain and ``(domain, device_class)``, and keeps itself current
+from entity-registry events while the flow is open. Queries then touch only the
+requested domains (and device classes), and ``search`` narrows them by name for
+the picker's search field.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from homeassistant.core import Event, HomeAssistant, State, callback
+from homeassistant.helpers.entity_registry import EVENT_ENTITY_REGISTRY_UPDATED
+
+from ..core.logger import log_debug
+
+
+class EntityCatalog:
+    """Snapshot of HA entities indexed by domain and device class."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Build the index with a single pass over the state machine."""
+        self._hass = hass
+        self._by_domain: Dict[str, Dict[str, State]] = {}
+        self._by_device_class: Dict[Tuple[str, str], Set[str]] = {}
+        # Bumped on every incremental change so callers can memoize derived lists.
+        self.version = 0
+        for state in hass.states.async_all():
+            self._add(state)
+        self._unsub = hass.bus.async_listen(
+            EVENT_ENTITY_REGISTRY_UPDATED, self._async_registry_updated
+        )
+        log_debug(
+            "[EntityCatalog] Indexed %d entities in %d domains",
+            sum(len(v) for v in self._by_domain.values()),
+            len(self._by_domain),
+        )
+
+    def _add(self, state: State) -> None:
+        domain = state.entity_id.split(".", 1)[0]
+        self._by_domain.setdefault(domain, {})[state.entity_id] = state
+        device_class = state.attributes.get("device_class")
+        if device_class:
+            self._by_device_class.setdefault((domain, device_class), set()).add(
+                state.entity_id
+            )
+
+    def _remove(self, entity_id: str) -> None:
+        domain = entity_id.split(".", 1)[0]
+        state = self._by_domain.get(domain, {}).pop(entity_id, None)
+        if state is None:
+            return
+        device_class = state.attributes.get("device_class")
+        if device_class:
+            self._by_device_class.get((domain, device_class), set()).discard(entity_id)
+
+    @callback
+    def _async_registry_updated(self, event: Event) -> None:
+        """Apply one entity-registry change (create / remove / rename / update)."""
+        action = event.data.get("action")
+        entity_id = event.data.get("entity_id")
+        if not entity_id:
+            return
+        if action == "remove":
+            self._remove(entity_id)
+        else:
+            old_entity_id = event.data.get("old_entity_id")
+            if old_entity_id:
+                self._remove(old_entity_id)
+            self._remove(entity_id)
+            # A freshly created entity may not have a state yet; it is picked up
+            # by the next flow session.
+            state = self._hass.states.get(entity_id)
+            if state is not None:
+                self._add(state)
+        self.version += 1
+
+    @callback
+    def async_close(self) -> None:
+        """Stop listening for registry updates."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+
+    def states(
+        self, domains: Iterable[str], device_classes: Optional[Iterable[str]] = None
+    ) -> List[State]:
+        """Return states in ``domains``, optionally limited to ``device_classes``."""
+        result: List[State] = []
+        for domain in domains:
+            by_id = self._by_domain.get(domain, {})
+            if device_classes is None:
+                result.extend(by_id.values())
+                continue
+            for device_class in device_classes:
+                for entity_id in self._by_device_class.get((domain, device_class), ()):
+                    if entity_id in by_id:
+                        result.append(by_id[entity_id])
+        return result
+
+    def search(
+        self,
+        query: str,
+        domains: Iterable[str],
+        device_classes: Optional[Iterable[str]] = None,
+    ) -> List[State]:
+        """States in ``domains`` whose entity_id or friendly_name contains ``query``.
+
+        Case-insensitive; an empty query matches everything.
+        """
+        needle = (query or "").strip().lower()
+        return [
+            state
+            for state in self.states(domains, device_classes)
+            if not needle
+            or needle in state.entity_id.lower()
+            or needle in str(state.attributes.get("friendly_name", "")).lower()
+        ]
+
+
+class EntityCatalogMixin:
+    """Flow mixin: one lazily-built catalog per flow session, closed with the flow."""
+
+    _entity_catalog: Optional[EntityCatalog] = None
+
+    def _get_entity_catalog(self, hass: HomeAssistant) -> EntityCatalog:
+        """Return the session catalog, building it on first use."""
+        if self._entity_catalog is None:
+            self._entity_catalog = EntityCatalog(hass)
+        return self._entity_catalog
+
+    @callback
+    def async_remove(self) -> None:
+        """Release the catalog's registry listener when the flow is removed."""
+        if self._entity_catalog is not None:
+            self._entity_catalog.async_close()
+            self._entity_catalog = None
+        parent = getattr(super(), "async_remove", None)
+        if parent is not None:
+            parent()
@@ -14,6 +14,7 @@ from ..const import (
     CONF_PANEL_VOC,
     CONF_PANEL_COUNT,
     CONF_BATTERY_POWER,
+    CONF_GRID_POWER,
     CONF_BATTERY_SOC_SENSOR,
     NONE_OPTION,
 )
@@ -98,7 +99,7 @@ class SolarConfigMixin:
 
         Replaces NONE_OPTION / empty string with None for optional sensor fields.
         """
-        for field in [CONF_CONSUMPTION, CONF_BATTERY_POWER, CONF_BATTERY_SOC_SENSOR]:
+        for field in [CONF_CONSUMPTION, CONF_BATTERY_POWER, CONF_BATTERY_SOC_SENSOR, CONF_GRID_POWER]:
             if field in user_input and (
                 not user_input[field]
                 or user_input[field] == NONE_OPTION
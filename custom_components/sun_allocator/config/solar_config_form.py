@@ -30,6 +30,8 @@ from ..const import (
     CONF_BATTERY_POWER_REVERSED,
     CONF_BATTERY_SOC_SENSOR,
     CONF_BATTERY_SHARING_SOC,
+    CONF_GRID_POWER,
+    CONF_GRID_POWER_REVERSED,
     CONF_PV_FORECAST_SENSOR,
     MPPT_MAX_COUNT,
     PANEL_CONFIG_SERIES,
@@ -103,6 +105,20 @@ def build_solar_hub_schema(defaults: Optional[Dict[str, Any]] = None) -> Schema:
             default=defaults.get(CONF_BATTERY_SHARING_SOC, 0),
         ): NumberSelectorBuilder(0, 100, 1, unit="%").build(),
 
+        # Signed grid meter (+ import / − export) for the grid_meter method.
+        _opt_entity_key(CONF_GRID_POWER, defaults): selector.EntitySelector(
+            selector.EntitySelectorConfig(
+                domain="sensor",
+                multiple=False,
+                filter=[{"device_class": ["power"]}],
+            )
+        ),
+
+        VolOptional(
+            CONF_GRID_POWER_REVERSED,
+            default=defaults.get(CONF_GRID_POWER_REVERSED, False),
+        ): BooleanSelectorBuilder().build(),
+
         # Optional external PV-production forecast (W) — diagnostic metric only.
         # Combine multi-slope forecasts into one entity via a helper.
         _opt_entity_key(CONF_PV_FORECAST_SENSOR, defaults): selector.EntitySelector(
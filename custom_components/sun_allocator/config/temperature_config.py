@@ -8,6 +8,7 @@ from homeassistant.core import HomeAssistant
 
 from ..core.logger import log_error, log_exception, audit_action
 from ..config.ui_helpers import CustomEntitySelectorBuilder
+from .entity_catalog import EntityCatalogMixin
 from .temperature_config_form import build_temperature_config_schema
 
 from ..const import (
@@ -21,20 +22,22 @@ from ..const import (
 )
 
 
-class TemperatureConfigMixin:
+class TemperatureConfigMixin(EntityCatalogMixin):
     """Mixin for temperature compensation configuration steps."""
 
     def _get_temperature_sensors(self, hass: HomeAssistant) -> list:
         """Get available temperature sensors with label/value for selector."""
         icon_map = {"sensor": "🌡️"}
-        sensors = [
+        catalog = self._get_entity_catalog(hass)
+        # Temperature sensors come straight from the device-class index; sensors
+        # without a device class are recognized by name or unit.
+        sensors = catalog.states(["sensor"], ["temperature"]) + [
             entity
-            for entity in hass.states.async_all()
-            if entity.entity_id.startswith("sensor.")
+            for entity in catalog.states(["sensor"])
+            if not entity.attributes.get("device_class")
             and (
                 "temp" in entity.entity_id.lower()
-                or "temperature" in entity.entity_id.lower()
-                or (entity.attributes.get("unit_of_measurement") in ["°C", "°F", "K"])
+                or entity.attributes.get("unit_of_measurement") in ["°C", "°F", "K"]
             )
         ]
 
@@ -18,6 +18,7 @@ VERSION = _read_version()
 # Service constants
 SERVICE_SET_RELAY_MODE = "set_relay_mode"
 SERVICE_SET_RELAY_POWER = "set_relay_power"
+SERVICE_GET_DIAGNOSTICS = "get_diagnostics"
 
 # Relay modes
 RELAY_MODE_OFF = "Off"
@@ -39,6 +40,11 @@ CONF_PV_VOLTAGE = "pv_voltage"
 CONF_CONSUMPTION = "consumption"
 CONF_BATTERY_POWER = "battery_power"
 CONF_BATTERY_POWER_REVERSED = "battery_power_reversed"
+# Signed grid meter (W) for the grid_meter method: positive = import,
+# negative = export (the Energy dashboard convention); grid_power_reversed
+# flips it for meters that report export as positive.
+CONF_GRID_POWER = "grid_power"
+CONF_GRID_POWER_REVERSED = "grid_power_reversed"
 CONF_PANEL_VMP = "vmp"
 CONF_PANEL_IMP = "imp"
 CONF_PANEL_VOC = "voc"
@@ -53,6 +59,8 @@ CONF_DEVICE_NAME = "device_name"
 CONF_DEVICE_ENTITY = "device_entity"
 CONF_ESPHOME_MODE_SELECT_ENTITY = "esphome_mode_select_entity"
 CONF_DEVICE_ENTITY_FRIENDLY_NAME = "device_entity_friendly_name"
+# Transient device-picker search text (never stored in the config entry).
+CONF_ENTITY_SEARCH = "entity_search"
 CONF_AUTO_CONTROL_ENABLED = "auto_control_enabled"
 CONF_DEVICE_MIN_EXCESS_POWER = "min_excess_power"
 CONF_DEVICE_MIN_ON_TIME = "min_on_time"
@@ -60,6 +68,14 @@ CONF_DEVICE_TYPE = "device_type"
 CONF_DEVICE_MIN_EXPECTED_W = "min_expected_w"
 CONF_DEVICE_MAX_EXPECTED_W = "max_expected_w"
 CONF_DEVICE_DEBOUNCE_TIME = "debounce_time"
+# How a device's debounce commits: "time" waits the debounce time; "energy"
+# integrates the surplus/deficit beyond the threshold since the candidate flip
+# and commits once it reaches debounce_energy_wh (the debounce time stays the
+# upper bound), so large deficits shed fast and small jitter waits.
+CONF_DEVICE_DEBOUNCE_MODE = "debounce_mode"
+DEBOUNCE_MODE_TIME = "time"
+DEBOUNCE_MODE_ENERGY = "energy"
+CONF_DEVICE_DEBOUNCE_ENERGY_WH = "debounce_energy_wh"
 CONF_DEVICE_PRIORITY = "priority"
 CONF_DEVICE_ACTUAL_POWER_SENSOR = "actual_power_sensor"
 CONF_DEVICE_ACTUAL_POWER_THRESHOLD_W = "actual_power_threshold_w"
@@ -71,6 +87,21 @@ CONF_DEVICE_MAX_ON_TIME_PER_DAY = "max_on_time_per_day"
 # on genuine (cautious) excess, never on speculative probe budget.
 CONF_DEVICE_ALLOW_PROBE = "allow_probe"
 DEFAULT_DEVICE_ALLOW_PROBE = True
+# Proportional devices only: drive the percent from the actual-power sensor with
+# a PI loop and learn the device's percent→watts curve for budget accounting,
+# instead of assuming power is linear in percent. Needs an actual-power sensor.
+CONF_DEVICE_POWER_FEEDBACK = "power_feedback"
+DEFAULT_DEVICE_POWER_FEEDBACK = False
+# Custom devices only: the channel's ESPHome node (its name as in the
+# ``esphome.<node>_set_channels`` action) and 1-based channel index. Channels
+# sharing a node get all their percents in one ``set_channels`` call per pass
+# instead of one light call each (see esphome_component/).
+CONF_DEVICE_ESPHOME_NODE = "esphome_node"
+CONF_DEVICE_ESPHOME_CHANNEL = "esphome_channel"
+DEFAULT_DEVICE_ESPHOME_CHANNEL = 1
+ESPHOME_SET_CHANNELS_ACTION = "set_channels"
+# Vector entry for a channel this pass did not decide: the node leaves it as is.
+ESPHOME_CHANNEL_UNCHANGED = -1.0
 
 # Scheduling constants
 CONF_DEVICE_SCHEDULE_MODE = "schedule_mode"
@@ -106,6 +137,33 @@ CONF_BATTERY_SHARING_SOC = "battery_sharing_soc"
 # inverter self-draw jitter; 0 = strict (any discharge blocks excess).
 CONF_BATTERY_DISCHARGE_TOLERANCE_W = "battery_discharge_tolerance_w"
 
+# Streaming filter applied to each hub input before the excess math
+# (core/input_filter.py), chosen per input: none, median of the last
+# filter_window samples, EWMA with time constant filter_ewma_tau_s, or outlier
+# rejection (a sample far from the recent median is replaced by that median).
+CONF_FILTER_PV_POWER = "filter_pv_power"
+CONF_FILTER_PV_VOLTAGE = "filter_pv_voltage"
+CONF_FILTER_CONSUMPTION = "filter_consumption"
+CONF_FILTER_BATTERY_POWER = "filter_battery_power"
+CONF_FILTER_WINDOW = "filter_window"
+CONF_FILTER_EWMA_TAU_S = "filter_ewma_tau_s"
+INPUT_FILTER_NONE = "none"
+INPUT_FILTER_MEDIAN = "median"
+INPUT_FILTER_EWMA = "ewma"
+INPUT_FILTER_OUTLIER = "outlier"
+DEFAULT_INPUT_FILTER = INPUT_FILTER_NONE
+DEFAULT_FILTER_WINDOW = 5
+DEFAULT_FILTER_EWMA_TAU_S = 10.0
+# Time alignment of the power-balance inputs (PV power/voltage, consumption,
+# battery power) in the hub snapshot (core/input_align.py): off, evaluate every
+# input at the latest time all have reported (hold each value), or the same
+# instant with linear interpolation between samples.
+CONF_INPUT_ALIGNMENT = "input_alignment"
+INPUT_ALIGNMENT_OFF = "off"
+INPUT_ALIGNMENT_HOLD = "hold"
+INPUT_ALIGNMENT_INTERPOLATE = "interpolate"
+DEFAULT_INPUT_ALIGNMENT = INPUT_ALIGNMENT_OFF
+
 # Excess-power calculation method (Phase B). Selects how available surplus is
 # estimated so it matches the inverter topology:
 #   mppt       — untapped-headroom from the I-V model (cautious, default). Reads
@@ -118,10 +176,16 @@ CONF_BATTERY_DISCHARGE_TOLERANCE_W = "battery_discharge_tolerance_w"
 #   export     — energy balance (pv − consumption − self − reserve-modulated
 #                battery_charge), for grid-export inverters where pv_power
 #                reflects true generation rather than load-following output.
+#   grid_meter — feedback from a grid meter: measured export plus the load
+#                already allocated, closed by a PI step per meter reading so
+#                proportional devices hold a small export target
+#                (grid_export_target_w). Same battery guard as export.
 CONF_CALCULATION_METHOD = "calculation_method"
 CALC_METHOD_MPPT = "mppt"
 CALC_METHOD_MPPT_PROBE = "mppt_probe"
 CALC_METHOD_EXPORT = "export"
+CALC_METHOD_GRID_METER = "grid_meter"
+CONF_GRID_EXPORT_TARGET_W = "grid_export_target_w"
 
 # Optional external PV-production forecast sensor (W), e.g. Forecast.Solar /
 # Open-Meteo Solar Forecast. Surfaced as a diagnostic metric on the excess sensor
@@ -156,6 +220,8 @@ CONF_TEMP_COEFFICIENT_PMAX = "temp_coefficient_pmax"
 # These constants define default values for settings and internal algorithm parameters.
 DEFAULT_STARTUP_GRACE_PERIOD = 90
 DEFAULT_DEBOUNCE_TIME = 15
+DEFAULT_DEBOUNCE_MODE = DEBOUNCE_MODE_TIME
+DEFAULT_DEBOUNCE_ENERGY_WH = 2.0
 DEFAULT_HYSTERESIS_W = 40.0
 DEFAULT_BATTERY_SOC_HYSTERESIS = 2.0
 DEFAULT_ACTUAL_POWER_THRESHOLD_W = 10.0
@@ -165,6 +231,7 @@ DEFAULT_ACTUAL_POWER_THRESHOLD_W = 10.0
 DEFAULT_SOC_MAX_AGE_S = 1800.0
 DEFAULT_BATTERY_DISCHARGE_TOLERANCE_W = 20.0
 DEFAULT_CALCULATION_METHOD = CALC_METHOD_MPPT
+DEFAULT_GRID_EXPORT_TARGET_W = 50.0
 DEFAULT_SIM_PV_POWER = 300.0
 DEFAULT_SIM_PV_VOLTAGE = 35.0
 DEFAULT_SIM_CONSUMPTION = 200.0
@@ -229,15 +296,27 @@ DEFAULT_PROBE_BATTERY_ASSIST_W = 100.0
 # compressor peak or a passing cloud) from collapsing the headroom and dropping a
 # device — the deficit must be confirmed sustained first.
 PROBE_BACKOFF_STREAK = 2
+# Event-driven back-off: battery energy (Wh) drawn beyond the assist tolerance,
+# integrated from battery-power state changes, after which the probe backs off
+# without waiting for the next tick. 0.5 Wh is ~6 s of a 300 W overshoot, while
+# a one-second 1 kW compressor peak stays under it.
+PROBE_FAST_BACKOFF_WH = 0.5
 # Fraction of the remaining gap to the forecast target the probe closes per tick
 # when a forecast target is set (vs the fixed PROBE_STEP_W when probing blind).
 # Reaches the target geometrically — fast while far, gentle near it — with
 # PROBE_STEP_W as the minimum step so it never stalls just short of the target.
 PROBE_FORECAST_APPROACH_FRACTION = 0.25
 
-# Proportional strategy options
+# Device allocation strategies (core/strategies.py registry)
 STRATEGY_FILL_ONE_BY_ONE = "fill"
 STRATEGY_DISTRIBUTE_EVENLY = "distribute"
+STRATEGY_MAX_UTILIZATION = "max_utilization"
+STRATEGY_MIN_SWITCHING = "min_switching"
+# min_switching: diverted watts each extra relay flip must gain before the
+# strategy trades the running set for a fuller one. Flips cost service calls,
+# radio traffic and contactor wear; 0 always takes the fuller set.
+CONF_SWITCHING_COST_W = "switching_cost_w"
+DEFAULT_SWITCHING_COST_W = 100.0
 
 # Other internal constants
 MAX_BRIGHTNESS = 255
@@ -332,6 +411,7 @@ SENSOR_MAX_POWER_SUFFIX = "max_power"
 SENSOR_CURRENT_MAX_POWER_SUFFIX = "current_max_power"
 SENSOR_USAGE_PERCENT_SUFFIX = "usage_percent"
 SENSOR_POWER_DISTRIBUTION_SUFFIX = "power_distribution"
+SENSOR_DIVERTED_ENERGY_SUFFIX = "diverted_energy"
 
 # Temperature compensation defaults
 DEFAULT_STANDARD_TEMPERATURE = 25.0
@@ -350,6 +430,7 @@ DOMAIN_INPUT_BOOLEAN = "input_boolean"
 DOMAIN_AUTOMATION = "automation"
 DOMAIN_SCRIPT = "script"
 DOMAIN_CLIMATE = "climate"
+DOMAIN_ESPHOME = "esphome"
 
 # Dictionary keys for debug info
 KEY_PMAX = "pmax"
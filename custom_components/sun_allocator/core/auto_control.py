@@ -0,0 +1,83 @@
+"""Runtime auto-control flags.
+
+The per-device auto-control switch used to write its state into the config
+entry on every toggle. That rewrites ``core.config_entries`` (every
+integration's entries in one shared JSON file) and wakes the entry's update
+listener, so automations that flip several devices around tariff or
+occupancy changes caused a burst of full-file writes.
+
+The switch state is runtime state, not configuration. It now lives in
+``entry_data["auto_control"]`` (``{device_id: bool}``). That map is
+written to the entry's shared restore store, whose delayed save folds a
+burst of toggles into one write, and the switch entity itself keeps it
+through ``RestoreEntity``.
+The config entry's ``auto_control_enabled`` is only the configured default,
+changed through the options flow; once a changed value is saved the update
+listener sets the runtime flag to it.
+
+Everything that decides which devices are under auto-control reads
+``is_enabled`` or works on ``effective_devices``, so the allocator, its
+deadlines and its per-cycle snapshot all agree on the runtime flag.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from homeassistant.core import HomeAssistant
+
+from .device_restore import persist_auto_control
+from ..const import CONF_AUTO_CONTROL_ENABLED, CONF_DEVICE_ID, DOMAIN
+
+
+def is_enabled(entry_data: Optional[Mapping[str, Any]], device: Mapping[str, Any]) -> bool:
+    """Runtime flag of ``device``, falling back to its configured default."""
+    flags = (entry_data or {}).get("auto_control") or {}
+    device_id = device.get(CONF_DEVICE_ID)
+    if device_id in flags:
+        return bool(flags[device_id])
+    return bool(device.get(CONF_AUTO_CONTROL_ENABLED, False))
+
+
+def effective_devices(
+    entry_data: Optional[Mapping[str, Any]], devices: Iterable[Mapping[str, Any]]
+) -> List[Mapping[str, Any]]:
+    """``devices`` with ``auto_control_enabled`` replaced by the runtime flag.
+
+    Only devices whose runtime flag differs from the config are copied.
+    """
+    out = []
+    for device in devices:
+        enabled = is_enabled(entry_data, device)
+        if enabled != bool(device.get(CONF_AUTO_CONTROL_ENABLED, False)):
+            device = {**device, CONF_AUTO_CONTROL_ENABLED: enabled}
+        out.append(device)
+    return out
+
+
+def from_storage(raw: Optional[Mapping[str, Any]], device_ids: Iterable[str]) -> Dict[str, bool]:
+    """Persisted flags of the devices that still exist."""
+    if not isinstance(raw, Mapping):
+        return {}
+    known = set(device_ids)
+    return {
+        str(device_id): bool(flag)
+        for device_id, flag in raw.items()
+        if device_id in known and isinstance(flag, bool)
+    }
+
+
+def set_enabled(hass: HomeAssistant, entry_id: str, device_id: str, is_on: bool) -> None:
+    """Set a device's runtime flag and write it to the restore store."""
+    entry_data = hass.data.get(DOMAIN, {}).get(entry_id)
+    if entry_data is None or not device_id:
+        return
+    flags = entry_data.setdefault("auto_control", {})
+    if flags.get(device_id) == is_on:
+        return
+    flags[device_id] = bool(is_on)
+    # The next probe tick must not skip the pass as "inputs unchanged".
+    entry_data.pop("_allocation_fingerprint", None)
+    config_entry = hass.config_entries.async_get_entry(entry_id)
+    if config_entry is not None:
+        persist_auto_control(hass, config_entry, flags)
@@ -0,0 +1,90 @@
+"""Per-pass batching of channel percents for multi-channel ESPHome nodes.
+
+The multi-channel ESPHome examples expose one light per channel, and every
+Proportional channel used to cost its own ``light.turn_on`` round-trip to the
+same node each pass. A custom device that names its node and channel
+(``esphome_node`` / ``esphome_channel``) is instead collected here while the
+allocation pass runs, and each node gets one ``esphome.<node>_set_channels``
+call after the pass, carrying a ``float[]`` vector indexed by channel. Channels
+this pass did not decide (filtered, manual override, not re-run) are sent as
+``ESPHOME_CHANNEL_UNCHANGED`` so the node leaves them as they are.
+
+The channels stay separate devices: each keeps its own priority, limits and
+gates, and the mode select and light entities are still read for state. A node
+whose firmware predates the ``set_channels`` action gets the per-light calls
+instead.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from homeassistant.core import HomeAssistant
+
+from .entity_control import parse_relay_entity, set_channel_percents
+from ..const import (
+    CONF_DEVICE_ENTITY,
+    CONF_DEVICE_ESPHOME_CHANNEL,
+    CONF_DEVICE_ESPHOME_NODE,
+    DEFAULT_DEVICE_ESPHOME_CHANNEL,
+    ESPHOME_CHANNEL_UNCHANGED,
+)
+
+
+def channel_of(device: Mapping[str, Any]) -> Optional[Tuple[str, int]]:
+    """``(node, 1-based channel)`` of a batched device, else ``None``."""
+    node = str(device.get(CONF_DEVICE_ESPHOME_NODE) or "").strip()
+    if not node:
+        return None
+    try:
+        channel = int(device.get(CONF_DEVICE_ESPHOME_CHANNEL, DEFAULT_DEVICE_ESPHOME_CHANNEL))
+    except (TypeError, ValueError):
+        return None
+    if channel < 1:
+        return None
+    # ESPHome registers actions as esphome.<node name with "-" as "_">_<action>.
+    return node.lower().replace("-", "_"), channel
+
+
+class ChannelBatch:
+    """Channel percents decided in one pass, pushed once per node."""
+
+    __slots__ = ("_nodes", "_entities")
+
+    def __init__(self) -> None:
+        self._nodes: Dict[str, Dict[int, float]] = {}
+        # Light entity of each queued channel, for the per-light fallback.
+        self._entities: Dict[str, Dict[int, str]] = {}
+
+    def set_percent(self, device: Mapping[str, Any], percent: float) -> bool:
+        """Queue ``percent`` for ``device``'s channel; ``False`` if it is not batched."""
+        channel = channel_of(device)
+        if channel is None:
+            return False
+        node, index = channel
+        self._nodes.setdefault(node, {})[index] = round(max(0.0, float(percent)), 1)
+        entity_id, _ = parse_relay_entity(device.get(CONF_DEVICE_ENTITY))
+        if entity_id:
+            self._entities.setdefault(node, {})[index] = entity_id
+        return True
+
+    def vectors(self) -> Dict[str, List[float]]:
+        """Per-node percent vectors, channel 1 first, up to the highest queued channel."""
+        return {
+            node: [
+                channels.get(index, ESPHOME_CHANNEL_UNCHANGED)
+                for index in range(1, max(channels) + 1)
+            ]
+            for node, channels in self._nodes.items()
+        }
+
+    async def async_flush(self, hass: HomeAssistant) -> None:
+        """Send one ``set_channels`` call per node and clear the batch."""
+        vectors, entities = self.vectors(), self._entities
+        self._nodes, self._entities = {}, {}
+        for node, percents in vectors.items():
+            channels = entities.get(node, {})
+            await set_channel_percents(
+                hass, node, percents,
+                [channels.get(index) for index in range(1, len(percents) + 1)],
+            )
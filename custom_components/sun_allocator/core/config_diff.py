@@ -0,0 +1,134 @@
+"""Classify a config entry update as hot-applicable or structural.
+
+Every options save used to reload the whole entry: all listeners, timers and
+entities were torn down, the probe lost its headroom, and the first pass ran
+again from scratch. Most edits do not need any of that. The allocator, the
+probe tick and the hub sensors read thresholds, schedules, priorities, the
+strategy, templates, panel parameters and the calculation method from the
+config on every pass, so they only need to be handed the new config.
+
+A change is **structural** only when it alters what the entry subscribes to or
+which entities exist:
+
+* a device added or removed (its sensors and switch are created at setup);
+* a device's relay entity or ESPHome mode select (the restore / mode listeners
+  are built from them);
+* a hub input entity, the number of MPPT trackers, temperature compensation
+  on/off, or the simulation switches that replace the live battery listener.
+
+Everything else is hot. ``classify`` is pure; the update listener applies a
+hot change in place and reloads the entry for a structural one.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, FrozenSet, Mapping, Optional
+
+from ..const import (
+    CONF_BATTERY_POWER,
+    CONF_BATTERY_SOC_SENSOR,
+    CONF_CONSUMPTION,
+    CONF_DEVICE_ENTITY,
+    CONF_DEVICE_ID,
+    CONF_DEVICE_NAME,
+    CONF_DEVICES,
+    CONF_ESPHOME_MODE_SELECT_ENTITY,
+    CONF_GRID_POWER,
+    CONF_MPPT_INPUTS,
+    CONF_PV_FORECAST_SENSOR,
+    CONF_PV_POWER,
+    CONF_PV_VOLTAGE,
+    CONF_SIM_ENABLED,
+    CONF_SIM_OVERRIDE_BATTERY_POWER,
+    CONF_TEMPERATURE_COMPENSATION_ENABLED,
+    CONF_TEMPERATURE_SENSOR,
+)
+
+# Hub keys the entry's listeners are built from.
+STRUCTURAL_HUB_KEYS = (
+    CONF_PV_POWER,
+    CONF_PV_VOLTAGE,
+    CONF_CONSUMPTION,
+    CONF_BATTERY_POWER,
+    CONF_BATTERY_SOC_SENSOR,
+    CONF_GRID_POWER,
+    CONF_PV_FORECAST_SENSOR,
+    CONF_TEMPERATURE_COMPENSATION_ENABLED,
+    CONF_TEMPERATURE_SENSOR,
+    CONF_SIM_ENABLED,
+    CONF_SIM_OVERRIDE_BATTERY_POWER,
+)
+# Serialized copy of the device list, compared through the devices themselves.
+_DEVICES_STR = "devices_str"
+# Device keys the entry's listeners are built from.
+STRUCTURAL_DEVICE_KEYS = (CONF_DEVICE_ENTITY, CONF_ESPHOME_MODE_SELECT_ENTITY)
+
+
+@dataclass(frozen=True)
+class ConfigChange:
+    """What an update changed.
+
+    ``structural`` is ``None`` for a hot change, otherwise the reason a reload
+    is needed. ``hub`` tells whether any hub-level key changed, ``devices``
+    which existing devices changed, ``renamed`` which of them got a new name.
+    """
+
+    structural: Optional[str] = None
+    hub: bool = False
+    devices: FrozenSet[str] = frozenset()
+    renamed: FrozenSet[str] = frozenset()
+
+    @property
+    def empty(self) -> bool:
+        """True when nothing the entry uses changed."""
+        return self.structural is None and not self.hub and not self.devices
+
+
+def _tracker_inputs(config: Mapping[str, Any]) -> tuple:
+    return tuple(
+        (mppt.get(CONF_PV_POWER), mppt.get(CONF_PV_VOLTAGE))
+        for mppt in config.get(CONF_MPPT_INPUTS) or ()
+    )
+
+
+def _devices_by_id(config: Mapping[str, Any]) -> dict:
+    return {
+        dev.get(CONF_DEVICE_ID): dev
+        for dev in config.get(CONF_DEVICES) or ()
+        if dev.get(CONF_DEVICE_ID)
+    }
+
+
+def classify(old: Optional[Mapping[str, Any]], new: Mapping[str, Any]) -> ConfigChange:
+    """Compare two versions of the entry data."""
+    if old is None:
+        return ConfigChange(structural="no previous config")
+
+    for key in STRUCTURAL_HUB_KEYS:
+        if old.get(key) != new.get(key):
+            return ConfigChange(structural=f"hub input {key}")
+    if _tracker_inputs(old) != _tracker_inputs(new):
+        return ConfigChange(structural="MPPT tracker inputs")
+
+    old_devices, new_devices = _devices_by_id(old), _devices_by_id(new)
+    if old_devices.keys() != new_devices.keys():
+        return ConfigChange(structural="devices added or removed")
+    changed, renamed = set(), set()
+    for device_id, dev in new_devices.items():
+        before = old_devices[device_id]
+        if before == dev:
+            continue
+        for key in STRUCTURAL_DEVICE_KEYS:
+            if before.get(key) != dev.get(key):
+                return ConfigChange(structural=f"device {device_id} {key}")
+        changed.add(device_id)
+        if before.get(CONF_DEVICE_NAME) != dev.get(CONF_DEVICE_NAME):
+            renamed.add(device_id)
+
+    hub = any(
+        old.get(key) != new.get(key)
+        for key in old.keys() | new.keys()
+        if key not in (CONF_DEVICES, _DEVICES_STR)
+    )
+    return ConfigChange(hub=hub, devices=frozenset(changed), renamed=frozenset(renamed))
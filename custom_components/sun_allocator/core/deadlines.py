@@ -0,0 +1,233 @@
+"""When the allocator has to run again although no trigger arrived.
+
+Allocation is event-driven (excess sensor changes), plus the periodic probe
+tick. The tick used to re-run the full pass every ``PROBE_DWELL_S`` purely so
+time-based conditions could expire. This module replaces that blanket poll with
+two targeted mechanisms:
+
+* ``input_fingerprint`` — a hashable summary of everything a pass reads from the
+  outside world. When it matches the fingerprint recorded after the previous
+  pass, re-running would reproduce the same decisions and the tick skips it.
+* ``device_deadline`` — the earliest instant at which a time-based condition
+  can flip one device's decision even with unchanged inputs (manual-override
+  TTL, startup grace, min on-time, command retry, debounce, daily on-time
+  budget, schedule window edge).
+* ``DeadlineScheduler`` — a per-entry min-heap of those per-device deadlines.
+  The caller arms one HA timer for the head and, when it fires, re-runs only
+  the devices that are due instead of the whole allocation.
+
+The functions are pure reads of ``entry_data`` / the state machine.
+"""
+
+from __future__ import annotations
+
+import datetime as dt_stdlib
+import heapq
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from .power_processor import (
+    MANUAL_OVERRIDE_TTL_SECONDS,
+    RETRY_INTERVAL_SECONDS,
+    _daily_on_time_sec,
+)
+from .schedule import next_schedule_change
+from .snapshot import referenced_entities
+from .settings import COUNTER_DEBOUNCE_FRACTION
+
+from ..const import (
+    CONF_AUTO_CONTROL_ENABLED,
+    CONF_DEVICE_CHECK_USABLE_TEMPLATE,
+    CONF_DEVICE_DEBOUNCE_TIME,
+    CONF_DEVICE_ID,
+    CONF_DEVICE_MAX_ON_TIME_PER_DAY,
+    CONF_DEVICE_MIN_ON_TIME,
+    DEFAULT_DEBOUNCE_TIME,
+)
+
+# Fire a little after the nominal instant: the allocator's comparisons are a mix
+# of ``>`` and ``>=``, and a timer that fires a few ms early would just re-arm.
+_SLACK = dt_stdlib.timedelta(seconds=1)
+
+
+def _auto_devices(devices: Iterable[Mapping[str, Any]]):
+    return [d for d in devices if d.get(CONF_AUTO_CONTROL_ENABLED, False)]
+
+
+def input_fingerprint(
+    hass,
+    devices: Iterable[Mapping[str, Any]],
+    excess_power: float,
+    *,
+    headroom_w: float,
+    battery_healthy: bool,
+    battery_soc: Optional[float],
+) -> Optional[tuple]:
+    """Return a hashable summary of the inputs an allocation pass reads.
+
+    Per device this covers the relay, mode-select, actual-power and schedule
+    helper entities (state + ``last_updated``, so attribute changes such as a
+    light's brightness count too). Returns ``None`` when the inputs cannot be
+    captured cheaply — a ``check_usable`` template may read any entity — in which
+    case the caller must always run the pass.
+    """
+    parts: list = [
+        round(float(excess_power), 1),
+        round(float(headroom_w or 0.0), 1),
+        bool(battery_healthy),
+        battery_soc,
+    ]
+    devices = _auto_devices(devices)
+    if any(device.get(CONF_DEVICE_CHECK_USABLE_TEMPLATE) for device in devices):
+        return None
+    for entity_id in referenced_entities({}, devices):
+        state = hass.states.get(entity_id)
+        parts.append(
+            (entity_id, None, None)
+            if state is None
+            else (entity_id, state.state, state.last_updated)
+        )
+    return tuple(parts)
+
+
+def _as_datetime(value) -> Optional[dt_stdlib.datetime]:
+    """Deadlines reloaded from storage are ISO strings; normalise them."""
+    if isinstance(value, str):
+        try:
+            return dt_stdlib.datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return value if isinstance(value, dt_stdlib.datetime) else None
+
+
+def _device_deadlines(device, entry_data, now):
+    """Yield every instant at which this device's time-based gates can change."""
+    device_id = device.get(CONF_DEVICE_ID)
+
+    override = entry_data.get("manual_overrides", {}).get(device_id)
+    if override and override.get("since"):
+        yield override["since"] + dt_stdlib.timedelta(seconds=MANUAL_OVERRIDE_TTL_SECONDS)
+
+    retry = entry_data.get("command_retries", {}).get(device_id)
+    if retry and retry.get("last_retry_at"):
+        yield retry["last_retry_at"] + dt_stdlib.timedelta(seconds=RETRY_INTERVAL_SECONDS)
+
+    debounce = entry_data.get("device_debounce_state", {}).get(device_id) or {}
+    debounce_s = float(device.get(CONF_DEVICE_DEBOUNCE_TIME, DEFAULT_DEBOUNCE_TIME) or 0)
+    if debounce.get("state_change_time"):
+        yield debounce["state_change_time"] + dt_stdlib.timedelta(seconds=debounce_s)
+    if debounce.get("counter_debounce_start"):
+        yield debounce["counter_debounce_start"] + dt_stdlib.timedelta(
+            seconds=debounce_s * COUNTER_DEBOUNCE_FRACTION
+        )
+    if debounce.get("energy_due"):
+        # Energy-mode debounce: when the integral reaches its budget at the current margin.
+        yield debounce["energy_due"]
+
+    on_time = entry_data.get("device_on_time_state", {}).get(device_id) or {}
+    startup_until = _as_datetime(on_time.get("startup_until"))
+    if startup_until:
+        yield startup_until
+    last_on = on_time.get("last_on_time")
+    min_on_s = float(device.get(CONF_DEVICE_MIN_ON_TIME, 0) or 0)
+    if last_on and min_on_s > 0:
+        yield last_on + dt_stdlib.timedelta(seconds=min_on_s)
+
+    max_minutes = float(device.get(CONF_DEVICE_MAX_ON_TIME_PER_DAY, 0) or 0)
+    if max_minutes > 0:
+        entry_on_time_state = entry_data.get("device_on_time_state", {})
+        if last_on:
+            used = _daily_on_time_sec(entry_on_time_state, device_id, now, currently_on=True)
+            yield now + dt_stdlib.timedelta(seconds=max(0.0, max_minutes * 60.0 - used))
+        # The budget resets at local midnight.
+        yield (now + dt_stdlib.timedelta(days=1)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+
+    edge = next_schedule_change(device, now)
+    if edge:
+        yield edge
+
+
+def device_deadline(
+    device: Mapping[str, Any],
+    entry_data: Mapping[str, Any],
+    now: dt_stdlib.datetime,
+) -> Optional[dt_stdlib.datetime]:
+    """Return the earliest future instant one device's time-based gates can change.
+
+    Deadlines already in the past are ignored: they were evaluated by the pass
+    that just ran (e.g. a min on-time that elapsed while excess stayed high).
+    """
+    best = None
+    for deadline in _device_deadlines(device, entry_data, now):
+        deadline = deadline + _SLACK
+        if deadline > now and (best is None or deadline < best):
+            best = deadline
+    return best
+
+
+class DeadlineScheduler:
+    """Min-heap of per-device deadlines with lazy invalidation.
+
+    Each device has at most one live deadline (its earliest). Replacing it pushes
+    a new heap entry; the superseded one stays in the heap and is discarded when
+    it surfaces, so updates are O(log n) and nothing is ever searched.
+    """
+
+    def __init__(self) -> None:
+        self._heap: List[Tuple[dt_stdlib.datetime, int, str]] = []
+        self._live: Dict[str, Tuple[dt_stdlib.datetime, int]] = {}
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def set(self, device_id: str, deadline: Optional[dt_stdlib.datetime]) -> None:
+        """Replace ``device_id``'s deadline (``None`` removes it)."""
+        current = self._live.get(device_id)
+        if current is not None and current[0] == deadline:
+            return
+        if deadline is None:
+            self._live.pop(device_id, None)
+            return
+        self._seq += 1
+        self._live[device_id] = (deadline, self._seq)
+        heapq.heappush(self._heap, (deadline, self._seq, device_id))
+
+    def update_from(
+        self,
+        entry_data: Mapping[str, Any],
+        devices: Iterable[Mapping[str, Any]],
+        now: dt_stdlib.datetime,
+    ) -> None:
+        """Recompute the deadline of every auto-controlled device in ``devices``."""
+        seen = set()
+        for device in _auto_devices(devices):
+            device_id = device.get(CONF_DEVICE_ID)
+            seen.add(device_id)
+            self.set(device_id, device_deadline(device, entry_data, now))
+        for device_id in [d for d in self._live if d not in seen]:
+            self.set(device_id, None)
+
+    def _prune(self) -> None:
+        while self._heap:
+            when, seq, device_id = self._heap[0]
+            if self._live.get(device_id) == (when, seq):
+                return
+            heapq.heappop(self._heap)
+
+    def next_at(self) -> Optional[dt_stdlib.datetime]:
+        """Earliest live deadline, or ``None`` when nothing is pending."""
+        self._prune()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: dt_stdlib.datetime) -> Set[str]:
+        """Remove and return the ids of all devices whose deadline is ``<= now``."""
+        due: Set[str] = set()
+        self._prune()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, device_id = heapq.heappop(self._heap)
+            self._live.pop(device_id, None)
+            due.add(device_id)
+            self._prune()
+        return due
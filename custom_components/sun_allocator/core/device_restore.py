@@ -2,14 +2,17 @@
 
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime
+from typing import Callable
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import STATE_ON
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.storage import Store
 
-from .logger import log_info, log_debug
+from .logger import log_info, log_debug, log_warning
+from .settings import RESTORE_MAX_CONCURRENCY, RESTORE_SAVE_DELAY_SECONDS
 from .entity_control import set_power_for_entity, set_mode_for_entity, parse_relay_entity
 
 from ..const import (
@@ -26,24 +29,103 @@ STORAGE_VERSION = 1
 # Reserved (non-entity-id) key inside the per-entry restore dict for cross-entity state
 # such as device_id-keyed startup grace deadlines.
 _GRACE_STORAGE_KEY = "_grace_state"
+# Reserved key holding the diverted-energy accumulators (see core/energy.py).
+_ENERGY_STORAGE_KEY = "_energy_state"
+# Reserved key holding the learned per-device draw model (see core/draw_model.py).
+_DRAW_MODEL_STORAGE_KEY = "_draw_model"
+# Reserved key holding the learned percent→watts curves (see core/power_curve.py).
+_POWER_CURVES_STORAGE_KEY = "_power_curves"
+# Reserved key holding the fitted per-tracker MPPT model (see core/mppt_calibration.py).
+_MPPT_CALIBRATION_STORAGE_KEY = "_mppt_calibration"
+# Reserved key holding the probe's time-of-day headroom prior (see core/probe_prior.py).
+_PROBE_PRIOR_STORAGE_KEY = "_probe_prior"
+# Reserved key holding the runtime auto-control flags (see core/auto_control.py).
+_AUTO_CONTROL_STORAGE_KEY = "_auto_control"
+
+
+# hass.data[DOMAIN] key holding the per-entry RestoreStore instances.
+_STORES_KEY = "_restore_stores"
+
+
+class RestoreStore:
+    """The restore dict of one config entry, loaded once and saved with a delay.
+
+    Every writer mutates this one in-memory dict and schedules a delayed save.
+    Writers used to do a read-modify-write through a freshly built ``Store``
+    each; two of them in flight at once (a relay state change during the
+    periodic learned-state save, say) each saved their own copy and the last
+    one silently dropped the other's keys. A burst of writes now also costs a
+    single file write.
+
+    Writes made before the first load are queued and applied on top of it.
+    """
 
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}_{entry_id}_restore")
+        self._data: dict | None = None
+        self._pending: list[Callable[[dict], bool]] = []
+        self._dirty = False
+
+    async def async_load(self) -> dict:
+        """Return the restore dict, reading it from disk on first use."""
+        if self._data is None:
+            data = await self._store.async_load() or {}
+            if self._data is None:
+                self._data = data
+                pending, self._pending = self._pending, []
+                if any([mutate(data) for mutate in pending]):
+                    self._schedule_save()
+        return self._data
+
+    @callback
+    def async_update(self, mutate: Callable[[dict], bool]) -> None:
+        """Apply ``mutate`` (returns whether it changed anything) and schedule a save."""
+        if self._data is None:
+            self._pending.append(mutate)
+        elif mutate(self._data):
+            self._schedule_save()
+
+    def _schedule_save(self) -> None:
+        # Store.async_delay_save pushes a pending write back on every call;
+        # re-arming it on each change would starve the save while the
+        # allocator keeps writing. The pending write reads the live dict.
+        if self._dirty:
+            return
+        self._dirty = True
+        self._store.async_delay_save(self._data_to_save, RESTORE_SAVE_DELAY_SECONDS)
 
-def _get_store(hass, config_entry) -> Store:
-    return Store(hass, STORAGE_VERSION, f"{DOMAIN}_{config_entry.entry_id}_restore")
+    def _data_to_save(self) -> dict:
+        self._dirty = False
+        return self._data
 
+    async def async_flush(self) -> None:
+        """Write a pending delayed save now."""
+        if self._dirty:
+            await self._store.async_save(self._data_to_save())
 
-async def _load_restore_data(hass, config_entry) -> dict:
-    store = _get_store(hass, config_entry)
-    data = await store.async_load()
-    return data or {}
 
+def get_restore_store(hass: HomeAssistant, config_entry: ConfigEntry) -> RestoreStore:
+    """The entry's shared restore store, created on first use."""
+    stores = hass.data.setdefault(DOMAIN, {}).setdefault(_STORES_KEY, {})
+    store = stores.get(config_entry.entry_id)
+    if not isinstance(store, RestoreStore):
+        store = stores[config_entry.entry_id] = RestoreStore(hass, config_entry.entry_id)
+    return store
 
-async def _save_restore_data(hass, config_entry, data: dict):
-    store = _get_store(hass, config_entry)
-    await store.async_save(data)
 
+async def async_unload_restore_store(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """Flush the entry's pending write and release its store."""
+    store = hass.data.get(DOMAIN, {}).get(_STORES_KEY, {}).pop(config_entry.entry_id, None)
+    if isinstance(store, RestoreStore):
+        await store.async_flush()
 
-async def persist_device_state(
+
+async def _load_restore_data(hass, config_entry) -> dict:
+    return await get_restore_store(hass, config_entry).async_load()
+
+
+@callback
+def persist_device_state(
     hass: HomeAssistant,
     config_entry: ConfigEntry,
     entity_id: str,
@@ -51,25 +133,26 @@ async def persist_device_state(
     is_on: bool | None = None,
 ) -> None:
     """Persist the device state to storage (NOT config_entry.data)."""
-    restore_data = await _load_restore_data(hass, config_entry)
-    device_data = restore_data.get(entity_id, {})
-    changed = False
-
-    if percent is not None and device_data.get("last_percent") != percent:
-        device_data["last_percent"] = percent
-        changed = True
 
-    if is_on is not None and device_data.get("_restore_on") != is_on:
-        device_data["_restore_on"] = is_on
-        changed = True
-
-    if changed:
-        restore_data[entity_id] = device_data
-        log_debug("--- DEVICE RESTORE ---: Saving state for %s: %s", entity_id, device_data)
-        await _save_restore_data(hass, config_entry, restore_data)
-
-
-async def persist_grace_state(
+    def _mutate(restore_data: dict) -> bool:
+        device_data = restore_data.get(entity_id, {})
+        changed = False
+        if percent is not None and device_data.get("last_percent") != percent:
+            device_data["last_percent"] = percent
+            changed = True
+        if is_on is not None and device_data.get("_restore_on") != is_on:
+            device_data["_restore_on"] = is_on
+            changed = True
+        if changed:
+            restore_data[entity_id] = device_data
+            log_debug("--- DEVICE RESTORE ---: Saving state for %s: %s", entity_id, device_data)
+        return changed
+
+    get_restore_store(hass, config_entry).async_update(_mutate)
+
+
+@callback
+def persist_grace_state(
     hass: HomeAssistant,
     config_entry: ConfigEntry,
     device_id: str,
@@ -83,19 +166,22 @@ async def persist_grace_state(
     if not device_id:
         return
     iso = startup_until.isoformat() if isinstance(startup_until, datetime) else None
-    restore_data = await _load_restore_data(hass, config_entry)
-    grace = dict(restore_data.get(_GRACE_STORAGE_KEY, {}))
-    if iso is None:
-        if device_id not in grace:
-            return
-        grace.pop(device_id, None)
-    else:
-        if grace.get(device_id) == iso:
-            return
-        grace[device_id] = iso
-    restore_data[_GRACE_STORAGE_KEY] = grace
-    log_debug("--- GRACE RESTORE ---: device=%s until=%s", device_id, iso)
-    await _save_restore_data(hass, config_entry, restore_data)
+
+    def _mutate(restore_data: dict) -> bool:
+        grace = dict(restore_data.get(_GRACE_STORAGE_KEY, {}))
+        if iso is None:
+            if device_id not in grace:
+                return False
+            grace.pop(device_id, None)
+        else:
+            if grace.get(device_id) == iso:
+                return False
+            grace[device_id] = iso
+        restore_data[_GRACE_STORAGE_KEY] = grace
+        log_debug("--- GRACE RESTORE ---: device=%s until=%s", device_id, iso)
+        return True
+
+    get_restore_store(hass, config_entry).async_update(_mutate)
 
 
 async def load_grace_state(hass: HomeAssistant, config_entry: ConfigEntry) -> dict[str, datetime]:
@@ -115,18 +201,116 @@ async def load_grace_state(hass: HomeAssistant, config_entry: ConfigEntry) -> di
     return out
 
 
-async def persist_mode_state(
+async def load_energy_state(hass: HomeAssistant, config_entry: ConfigEntry) -> dict:
+    """Return the persisted diverted-energy accumulators (empty dict if none)."""
+    restore_data = await _load_restore_data(hass, config_entry)
+    return restore_data.get(_ENERGY_STORAGE_KEY) or {}
+
+
+@callback
+def persist_learned_state(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    *,
+    energy: dict,
+    draw_model: dict,
+    power_curves: dict,
+    mppt_calibration: dict | None = None,
+    probe_prior: dict | None = None,
+) -> None:
+    """Persist the energy accumulators and the learned models.
+
+    A ``None`` ``mppt_calibration`` or ``probe_prior`` leaves the stored one
+    as it is.
+    """
+
+    def _mutate(restore_data: dict) -> bool:
+        if (
+            restore_data.get(_ENERGY_STORAGE_KEY) == energy
+            and restore_data.get(_DRAW_MODEL_STORAGE_KEY) == draw_model
+            and restore_data.get(_POWER_CURVES_STORAGE_KEY) == power_curves
+            and mppt_calibration in (None, restore_data.get(_MPPT_CALIBRATION_STORAGE_KEY))
+            and probe_prior in (None, restore_data.get(_PROBE_PRIOR_STORAGE_KEY))
+        ):
+            return False
+        restore_data[_ENERGY_STORAGE_KEY] = energy
+        restore_data[_DRAW_MODEL_STORAGE_KEY] = draw_model
+        restore_data[_POWER_CURVES_STORAGE_KEY] = power_curves
+        if mppt_calibration is not None:
+            restore_data[_MPPT_CALIBRATION_STORAGE_KEY] = mppt_calibration
+        if probe_prior is not None:
+            restore_data[_PROBE_PRIOR_STORAGE_KEY] = probe_prior
+        log_debug(
+            "--- LEARNED STATE RESTORE ---: total=%.3f kWh, %d draw models, %d power curves",
+            energy.get("total_kwh", 0.0), len(draw_model), len(power_curves),
+        )
+        return True
+
+    get_restore_store(hass, config_entry).async_update(_mutate)
+
+
+async def load_draw_model(hass: HomeAssistant, config_entry: ConfigEntry) -> dict:
+    """Return the persisted per-device draw model (empty dict if none)."""
+    restore_data = await _load_restore_data(hass, config_entry)
+    return restore_data.get(_DRAW_MODEL_STORAGE_KEY) or {}
+
+
+async def load_power_curves(hass: HomeAssistant, config_entry: ConfigEntry) -> dict:
+    """Return the persisted per-device percent→watts curves (empty dict if none)."""
+    restore_data = await _load_restore_data(hass, config_entry)
+    return restore_data.get(_POWER_CURVES_STORAGE_KEY) or {}
+
+
+async def load_mppt_calibration(hass: HomeAssistant, config_entry: ConfigEntry) -> dict:
+    """Return the persisted per-tracker MPPT model fit (empty dict if none)."""
+    restore_data = await _load_restore_data(hass, config_entry)
+    return restore_data.get(_MPPT_CALIBRATION_STORAGE_KEY) or {}
+
+
+async def load_probe_prior(hass: HomeAssistant, config_entry: ConfigEntry) -> dict:
+    """Return the persisted probe headroom prior (empty dict if none)."""
+    restore_data = await _load_restore_data(hass, config_entry)
+    return restore_data.get(_PROBE_PRIOR_STORAGE_KEY) or {}
+
+
+@callback
+def persist_auto_control(
+    hass: HomeAssistant, config_entry: ConfigEntry, flags: dict
+) -> None:
+    """Persist the runtime ``{device_id: bool}`` auto-control flags."""
+
+    def _mutate(restore_data: dict) -> bool:
+        if restore_data.get(_AUTO_CONTROL_STORAGE_KEY) == flags:
+            return False
+        restore_data[_AUTO_CONTROL_STORAGE_KEY] = dict(flags)
+        log_debug("--- AUTO-CONTROL RESTORE ---: %s", flags)
+        return True
+
+    get_restore_store(hass, config_entry).async_update(_mutate)
+
+
+async def load_auto_control(hass: HomeAssistant, config_entry: ConfigEntry) -> dict:
+    """Return the persisted runtime auto-control flags (empty dict if none)."""
+    restore_data = await _load_restore_data(hass, config_entry)
+    return restore_data.get(_AUTO_CONTROL_STORAGE_KEY) or {}
+
+
+@callback
+def persist_mode_state(
     hass: HomeAssistant, config_entry: ConfigEntry, entity_id: str, mode: str
 ) -> None:
     """Persist the mode state to storage (NOT config_entry.data)."""
-    restore_data = await _load_restore_data(hass, config_entry)
-    device_data = restore_data.get(entity_id, {})
 
-    if device_data.get("last_mode") != mode:
+    def _mutate(restore_data: dict) -> bool:
+        device_data = restore_data.get(entity_id, {})
+        if device_data.get("last_mode") == mode:
+            return False
         device_data["last_mode"] = mode
         restore_data[entity_id] = device_data
         log_debug("--- MODE RESTORE ---: Saving mode for %s: %s", entity_id, mode)
-        await _save_restore_data(hass, config_entry, restore_data)
+        return True
+
+    get_restore_store(hass, config_entry).async_update(_mutate)
 
 
 def _build_climate_target(base_entity: str, hvac_suffix: str | None) -> str:
@@ -209,21 +393,46 @@ async def restore_entity_state(
             await _restore_mode(hass, device, restore_data, force=True)
 
 
-async def restore_all_devices(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
-    """Restore all devices after Home Assistant restart."""
-    restore_data = await _load_restore_data(hass, config_entry)
-    devices = config_entry.data.get(CONF_DEVICES, [])
-    log_info("Found %d devices to check for restore state", len(devices))
-    restored_any = False
+async def _restore_device(hass, device, restore_data, semaphore: asyncio.Semaphore) -> bool:
+    """Restore one device under the shared fan-out limit; mode before relay."""
+    async with semaphore:
+        log_info(f"Checking restore state for device_id: {device.get(CONF_DEVICE_ID)}")
+        # Mode first: an ESPHome node switched to proportional must be in that mode
+        # before its percent is asserted, or the percent lands in the wrong mode.
+        restored_mode = await _restore_mode(hass, device, restore_data, force=False)
+        restored_relay = await _restore_relay(hass, device, restore_data, force=False)
+        return restored_mode or restored_relay
 
-    for device in devices:
-        device_id = device.get(CONF_DEVICE_ID)
-        log_info(f"Checking restore state for device_id: {device_id}")
 
-        if await _restore_mode(hass, device, restore_data, force=False):
-            restored_any = True
-        if await _restore_relay(hass, device, restore_data, force=False):
-            restored_any = True
+async def restore_all_devices(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    max_concurrency: int = RESTORE_MAX_CONCURRENCY,
+) -> int:
+    """Restore all devices after Home Assistant restart; return how many changed.
 
-    if not restored_any:
+    Devices are restored concurrently (at most ``max_concurrency`` in flight) so
+    one slow entity no longer delays every device behind it. Ordering is kept only
+    where it matters — mode before relay within a device.
+    """
+    restore_data = await _load_restore_data(hass, config_entry)
+    devices = config_entry.data.get(CONF_DEVICES, [])
+    log_info("Found %d devices to check for restore state", len(devices))
+    semaphore = asyncio.Semaphore(max(1, int(max_concurrency)))
+
+    results = await asyncio.gather(
+        *(_restore_device(hass, device, restore_data, semaphore) for device in devices),
+        return_exceptions=True,
+    )
+    restored = 0
+    for device, result in zip(devices, results):
+        if isinstance(result, Exception):
+            log_warning(
+                "[Restore] Failed to restore %s: %s", device.get(CONF_DEVICE_ID), result
+            )
+        elif result:
+            restored += 1
+
+    if not restored:
         log_info("No device states needed to be restored after restart.")
+    return restored
@@ -0,0 +1,77 @@
+"""Learned per-device power draw for Sun Allocator.
+
+``min_expected_w`` is what the user *declared*; what a device really pulls once
+it runs is often different (an AC rated "500 W" settles at 700 W). The allocator
+already reads each device's actual-power sensor every cycle, so while a device
+is fully on and drawing above its idle threshold the reading is folded into an
+exponentially-weighted moving average. The probe uses it to size its next step
+to the real draw of the next waiting device (see ``probe.jump_target_w``).
+
+All functions are pure and operate on a plain ``{device_id: {"w", "n"}}`` dict
+that is written to the restore Store as-is.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+
+def initial_model() -> Dict[str, Dict[str, float]]:
+    """Return an empty model."""
+    return {}
+
+
+def observe(
+    model: Dict[str, Dict[str, float]], device_id: str, watts: float, *, alpha: float
+) -> float:
+    """Fold one on-state reading into the device's EWMA; return the new estimate."""
+    entry = model.get(device_id)
+    if entry is None:
+        model[device_id] = {"w": float(watts), "n": 1}
+        return float(watts)
+    entry["w"] = float(entry["w"]) + alpha * (float(watts) - float(entry["w"]))
+    entry["n"] = int(entry.get("n", 0)) + 1
+    return entry["w"]
+
+
+def learned_w(
+    model: Mapping[str, Mapping[str, float]], device_id: str, *, min_samples: int
+) -> Optional[float]:
+    """Learned draw of ``device_id`` once it has ``min_samples`` readings, else ``None``."""
+    entry = model.get(device_id)
+    if not entry or int(entry.get("n", 0)) < min_samples:
+        return None
+    return float(entry["w"])
+
+
+def learned_map(
+    model: Mapping[str, Mapping[str, float]], *, min_samples: int
+) -> Dict[str, float]:
+    """All devices with a trusted estimate, as ``{device_id: watts}``."""
+    out = {}
+    for device_id in model:
+        value = learned_w(model, device_id, min_samples=min_samples)
+        if value is not None:
+            out[device_id] = value
+    return out
+
+
+def from_storage(
+    raw: Optional[Mapping[str, Any]], device_ids: Optional[Iterable[str]] = None
+) -> Dict[str, Dict[str, float]]:
+    """Rebuild a model from storage, dropping malformed and removed devices."""
+    model = initial_model()
+    if not isinstance(raw, Mapping):
+        return model
+    keep = set(device_ids) if device_ids is not None else None
+    for device_id, entry in raw.items():
+        if keep is not None and device_id not in keep:
+            continue
+        try:
+            watts = float(entry["w"])
+            samples = int(entry.get("n", 0))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            continue
+        if watts > 0 and samples > 0:
+            model[device_id] = {"w": watts, "n": samples}
+    return model
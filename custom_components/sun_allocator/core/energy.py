@@ -0,0 +1,148 @@
+"""Diverted-energy accounting for Sun Allocator.
+
+The allocator already knows, every cycle, how many watts it handed to each
+device. Integrating that over time gives the one KPI the power sensors can't:
+how much energy the integration actually diverted into controlled loads.
+
+Integration is incremental and trapezoidal — each call adds
+``(P_prev + P_now) / 2 * dt`` per device, where ``P_prev`` is the power recorded
+at the previous call. It runs inside the existing allocation cycle (and the probe
+tick for battery draw), so it costs O(devices) per cycle and needs no extra
+subscriptions or timers.
+
+Gaps longer than ``max_gap_s`` (HA restart, long watchdog stand-down) are NOT
+integrated: the baseline is re-armed instead, so downtime is never credited as
+diverted energy. Only the accumulators are persisted; the baseline is in-memory.
+
+All functions are pure (no HA imports) and operate on a single plain dict so the
+state can be written to the restore Store as-is.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+_WS_PER_KWH = 3_600_000.0
+
+
+def initial_state() -> Dict[str, Any]:
+    """Return an empty accounting state."""
+    return {
+        "devices_kwh": {},
+        "total_kwh": 0.0,
+        "probe_battery_kwh": 0.0,
+        # Per-session trapezoid baselines (never persisted).
+        "last_ts": None,
+        "last_w": {},
+        "probe_last_ts": None,
+        "probe_last_w": 0.0,
+    }
+
+
+def _trapezoid_kwh(prev_w: float, cur_w: float, dt_s: float) -> float:
+    return max(0.0, (prev_w + cur_w) / 2.0) * dt_s / _WS_PER_KWH
+
+
+def _gap_ok(last_ts: Optional[float], now_ts: float, max_gap_s: float) -> bool:
+    return last_ts is not None and 0.0 < now_ts - last_ts <= max_gap_s
+
+
+def integrate_cycle(
+    state: Dict[str, Any],
+    powers_w: Mapping[str, float],
+    now_ts: float,
+    *,
+    max_gap_s: float,
+) -> float:
+    """Add one allocation cycle's worth of energy per device; return kWh added.
+
+    ``powers_w`` maps device_id → watts the device drew for this cycle. Devices
+    absent from the map are treated as 0 W (they were filtered or turned off), so
+    the falling edge of a device that just switched off is still integrated.
+    """
+    last_w: Dict[str, float] = state.setdefault("last_w", {})
+    devices_kwh: Dict[str, float] = state.setdefault("devices_kwh", {})
+    added = 0.0
+
+    if _gap_ok(state.get("last_ts"), now_ts, max_gap_s):
+        dt_s = now_ts - state["last_ts"]
+        for device_id in set(last_w) | set(powers_w):
+            kwh = _trapezoid_kwh(
+                float(last_w.get(device_id, 0.0)),
+                float(powers_w.get(device_id, 0.0)),
+                dt_s,
+            )
+            if kwh > 0.0:
+                devices_kwh[device_id] = devices_kwh.get(device_id, 0.0) + kwh
+                added += kwh
+        state["total_kwh"] = float(state.get("total_kwh", 0.0)) + added
+
+    # Keep only non-zero baselines: idle devices add nothing on the next edge.
+    state["last_w"] = {k: float(v) for k, v in powers_w.items() if v > 0.0}
+    state["last_ts"] = now_ts
+    return added
+
+
+def integrate_probe_battery(
+    state: Dict[str, Any],
+    battery_w: float,
+    now_ts: float,
+    *,
+    max_gap_s: float,
+) -> float:
+    """Add battery energy drawn by probe-driven loads since the last tick; return kWh.
+
+    ``battery_w`` is the battery discharge attributable to probe headroom (the
+    caller bounds it by the probe-funded load). It is tracked separately from the
+    per-device totals so the cost of probing stays visible next to its yield.
+    """
+    battery_w = max(0.0, float(battery_w))
+    added = 0.0
+    if _gap_ok(state.get("probe_last_ts"), now_ts, max_gap_s):
+        added = _trapezoid_kwh(
+            float(state.get("probe_last_w", 0.0)), battery_w,
+            now_ts - state["probe_last_ts"],
+        )
+        state["probe_battery_kwh"] = float(state.get("probe_battery_kwh", 0.0)) + added
+    state["probe_last_w"] = battery_w
+    state["probe_last_ts"] = now_ts
+    return added
+
+
+def to_storage(state: Mapping[str, Any]) -> Dict[str, Any]:
+    """Return the JSON-serialisable subset of ``state`` that survives a restart."""
+    return {
+        "devices_kwh": dict(state.get("devices_kwh", {})),
+        "total_kwh": float(state.get("total_kwh", 0.0)),
+        "probe_battery_kwh": float(state.get("probe_battery_kwh", 0.0)),
+    }
+
+
+def from_storage(
+    raw: Optional[Mapping[str, Any]], device_ids: Optional[Iterable[str]] = None
+) -> Dict[str, Any]:
+    """Rebuild a fresh state from persisted accumulators.
+
+    Malformed values are dropped. When ``device_ids`` is given, totals of devices
+    that no longer exist are pruned (their entities are removed on reload);
+    ``total_kwh`` keeps their contribution so the hub total never decreases.
+    """
+    state = initial_state()
+    if not isinstance(raw, Mapping):
+        return state
+    keep = set(device_ids) if device_ids is not None else None
+    for device_id, kwh in (raw.get("devices_kwh") or {}).items():
+        if keep is not None and device_id not in keep:
+            continue
+        try:
+            state["devices_kwh"][device_id] = max(0.0, float(kwh))
+        except (TypeError, ValueError):
+            continue
+    for key in ("total_kwh", "probe_battery_kwh"):
+        try:
+            state[key] = max(0.0, float(raw.get(key, 0.0)))
+        except (TypeError, ValueError):
+            state[key] = 0.0
+    # Legacy/partial stores: the total can never be below the per-device sum.
+    state["total_kwh"] = max(state["total_kwh"], sum(state["devices_kwh"].values()))
+    return state
@@ -25,6 +25,8 @@ from ..const import (
     DOMAIN_AUTOMATION,
     DOMAIN_SCRIPT,
     DOMAIN_CLIMATE,
+    DOMAIN_ESPHOME,
+    ESPHOME_SET_CHANNELS_ACTION,
     MAX_BRIGHTNESS,
     MAX_PERCENTAGE,
 )
@@ -197,3 +199,31 @@ async def set_power_for_entity(hass: HomeAssistant, entity_id: str, power_percen
             return
 
     await _async_call_service(hass, *call, entity_id)
+
+
+async def set_channel_percents(
+    hass: HomeAssistant,
+    node: str,
+    percents: list[float],
+    entities: list[str | None] | None = None,
+) -> None:
+    """Push every channel percent of an ESPHome node in one ``set_channels`` call.
+
+    ``entities[i]`` is the light of channel ``i + 1``. When the node does not
+    register the action (firmware older than it, or the node is offline) each
+    decided channel gets its own per-light call instead.
+    """
+    service = f"{node}_{ESPHOME_SET_CHANNELS_ACTION}"
+    if not hass.services.has_service(DOMAIN_ESPHOME, service):
+        log_debug(
+            f"Service {DOMAIN_ESPHOME}.{service} not registered (old firmware or node "
+            f"offline?), setting channels {percents} one light at a time"
+        )
+        for entity_id, percent in zip(entities or [], percents):
+            if entity_id and percent >= 0:
+                await set_power_for_entity(hass, entity_id, percent)
+        return
+    log_debug(f"Setting channels of ESPHome node {node} to {percents}")
+    await _async_call_service(
+        hass, DOMAIN_ESPHOME, service, {"percents": percents}, node
+    )
@@ -0,0 +1,44 @@
+"""Feedback loop of the grid_meter calculation method.
+
+A grid meter is the most direct measure of unused surplus on export-limited
+and zero-export installs: whatever is exported now could have been used. The
+method reads the excess off the meter instead of estimating it from the panel
+operating point: the load the allocator has already placed, plus a correction
+driven by the export error (measured export minus ``grid_export_target_w``).
+
+The correction is a PI step in velocity form, taken once per meter reading:
+``KI · error`` closes most of the gap at once and ``KP · (error − previous
+error)`` damps the swing when a load reacts slower than the meter. Because the
+step is added to the load actually allocated rather than to an internal
+integral, the loop cannot wind up when devices are saturated or off. Between
+readings the budget stays latched: the allocation that follows a step already
+contains it, and counting it again before the meter has seen the new load
+would overshoot. Proportional devices absorb the step; on/off devices still
+start and stop in the allocator's priority loop with their usual debounce and
+hysteresis.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+from .settings import GRID_METER_KI, GRID_METER_KP
+
+
+class GridLoop:
+    """Per-entry state of the grid-meter loop: last reading, its error and budget."""
+
+    __slots__ = ("read_at", "error_w", "excess_w")
+
+    def __init__(self) -> None:
+        self.read_at: Optional[float] = None
+        self.error_w: Optional[float] = None
+        self.excess_w: float = 0.0
+
+    def step(self, read_at: float, error_w: float) -> Optional[float]:
+        """Correction (W) for the meter reading at ``read_at``; ``None`` if already stepped."""
+        if self.read_at is not None and read_at <= self.read_at:
+            return None
+        previous = error_w if self.error_w is None else self.error_w
+        self.read_at, self.error_w = read_at, error_w
+        return GRID_METER_KI * error_w + GRID_METER_KP * (error_w - previous)
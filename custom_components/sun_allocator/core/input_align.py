@@ -0,0 +1,67 @@
+"""Time alignment of the hub's power-balance inputs.
+
+PV power, PV voltage, consumption and battery power are separate entities
+that update at different moments, sometimes from different polling
+integrations. The hub snapshot used whatever each state held when it was
+rebuilt, so a fresh PV power could meet a 10 s old voltage or battery reading
+and produce a short, spurious excess spike that still cost an allocation pass.
+
+With alignment on, every input keeps a small ring buffer of timestamped
+samples and the snapshot is evaluated at one common instant: the latest time
+all inputs have reported (``common_time``). Each input is taken at that
+instant, either as the last sample at or before it (``hold``) or interpolated
+between the samples around it (``interpolate``). While that instant has not
+moved — one input changed, the others have not caught up — the previous
+aligned snapshot is kept and nothing is recomputed. An input that lags the
+freshest one by more than ``INPUT_ALIGN_MAX_WAIT_S`` no longer holds the
+common time back.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Any, Dict, Iterable, Optional
+
+from .settings import INPUT_ALIGN_HISTORY, INPUT_ALIGN_MAX_WAIT_S
+
+
+class InputAligner:
+    """Per-entry sample history of the aligned inputs and the last aligned snapshot."""
+
+    __slots__ = ("_history", "aligned_at", "snapshot")
+
+    def __init__(self) -> None:
+        self._history: Dict[str, deque] = {}
+        self.aligned_at: Optional[float] = None
+        self.snapshot: Optional[Dict[str, Any]] = None
+
+    def observe(self, entity_id: str, ts: float, value: float) -> None:
+        """Record ``value`` reported at ``ts`` (epoch seconds); repeats are ignored."""
+        history = self._history.get(entity_id)
+        if history is None:
+            history = self._history[entity_id] = deque(maxlen=INPUT_ALIGN_HISTORY)
+        if history and history[-1][0] >= ts:
+            return
+        history.append((ts, float(value)))
+
+    def common_time(self, entity_ids: Iterable[str]) -> Optional[float]:
+        """Latest instant every (not long-silent) input has reported by, if any."""
+        latest = [self._history[e][-1][0] for e in entity_ids if self._history.get(e)]
+        if not latest:
+            return None
+        newest = max(latest)
+        return min(ts for ts in latest if ts >= newest - INPUT_ALIGN_MAX_WAIT_S)
+
+    def value_at(self, entity_id: str, ts: float, interpolate: bool = False) -> float:
+        """``entity_id``'s value at ``ts``: held, or interpolated between samples."""
+        history = self._history[entity_id]
+        after = None
+        for sample in reversed(history):
+            if sample[0] <= ts:
+                if not interpolate or after is None or after[0] == sample[0]:
+                    return sample[1]
+                weight = (ts - sample[0]) / (after[0] - sample[0])
+                return sample[1] + weight * (after[1] - sample[1])
+            after = sample
+        # ``ts`` predates the history: the oldest sample is the best estimate.
+        return history[0][1]
@@ -0,0 +1,133 @@
+"""Domain-wide cache of parsed hub-input readings.
+
+Two hubs on a split array usually point at the same battery, SOC, consumption
+or temperature sensor. Every hub used to read and parse those states for its own
+``_sensor_snapshot``, and the allocator and the probe parsed them once more. The
+cache lives at ``hass.data[DOMAIN]["_input_cache"]`` and holds, per entity_id,
+the parsed float, its availability flag and the state's ``last_updated``, so each
+distinct input is parsed once per change however many hubs reference it.
+
+Entries are dropped by the state-change events the hub sensors already listen
+to (``invalidate``). A reader that runs ahead of that event (the allocator, the
+probe tick) still compares the cached ``State`` with the live one, so it is
+never served a parse of an older state.
+
+A reader may pass an ``input_filter`` spec (core/input_filter.py). The filter's
+state is kept per entity and spec across invalidations, and it is fed each new
+parsed state once, however many hubs read it.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import homeassistant.util.dt as dt_util
+from homeassistant.core import HomeAssistant, State
+
+from .input_filter import FilterSpec, InputFilter
+from ..const import DOMAIN
+from ..sensor.utils import get_sensor_state_safely, is_reading_stale
+
+_CACHE_KEY = "_input_cache"
+
+
+class _Reading(NamedTuple):
+    state: Optional[State]
+    value: float
+    ok: bool
+    updated: Optional[datetime]
+
+
+class InputCache:
+    """Parsed ``(value, ok)`` and ``last_updated`` per input entity."""
+
+    __slots__ = ("_readings", "_filters")
+
+    def __init__(self) -> None:
+        self._readings: Dict[str, _Reading] = {}
+        # (entity_id, spec) -> [filter, last State fed to it]
+        self._filters: Dict[Tuple[str, FilterSpec], list] = {}
+
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self._readings
+
+    def __len__(self) -> int:
+        return len(self._readings)
+
+    def _lookup(
+        self, hass: HomeAssistant, entity_id: str, states
+    ) -> Tuple[Optional[State], Optional[_Reading]]:
+        state = (states if states is not None else hass.states).get(entity_id)
+        cached = self._readings.get(entity_id)
+        if cached is not None and cached.state is not state:
+            cached = None
+        return state, cached
+
+    def reading(
+        self, hass: HomeAssistant, entity_id: Optional[str], sensor_name: str, states=None,
+        input_filter: Optional[FilterSpec] = None,
+    ) -> Tuple[float, bool]:
+        """Numeric ``(value, ok)`` of ``entity_id``, parsed once per state change.
+
+        ``states`` is an optional ``hass.states``-like view (the allocator's cycle
+        snapshot); the cached parse is reused when it holds the same state.
+        With ``input_filter`` the value is the filter's output; unavailable
+        readings are returned as-is and not fed to it.
+        """
+        if not entity_id:
+            return get_sensor_state_safely(hass, entity_id, sensor_name)
+        state, cached = self._lookup(hass, entity_id, states)
+        if cached is None:
+            value, ok = get_sensor_state_safely(
+                hass, entity_id, sensor_name, states={entity_id: state}
+            )
+            updated = None
+            if state is not None:
+                updated = getattr(state, "last_updated", None) or getattr(
+                    state, "last_changed", None
+                )
+            cached = _Reading(state, value, ok, updated)
+            self._readings[entity_id] = cached
+        if input_filter is None or not cached.ok:
+            return cached.value, cached.ok
+        slot = self._filters.get((entity_id, input_filter))
+        if slot is None:
+            slot = self._filters[(entity_id, input_filter)] = [InputFilter(input_filter), None]
+        if slot[1] is not cached.state:
+            slot[1] = cached.state
+            slot[0].push(
+                cached.value, cached.updated.timestamp() if cached.updated else None
+            )
+        return slot[0].value, True
+
+    def is_stale(
+        self, hass: HomeAssistant, entity_id: Optional[str], max_age_s: float, states=None
+    ) -> bool:
+        """``is_reading_stale`` on the cached timestamp, when the entry is current."""
+        if not entity_id or max_age_s <= 0:
+            return False
+        _, cached = self._lookup(hass, entity_id, states)
+        if cached is None:
+            return is_reading_stale(hass, entity_id, max_age_s, states=states)
+        if cached.updated is None:
+            return False
+        return (dt_util.utcnow() - cached.updated).total_seconds() > max_age_s
+
+    def invalidate(self, entity_id: Optional[str]) -> None:
+        """Forget ``entity_id``'s reading (its state changed)."""
+        self._readings.pop(entity_id, None)
+
+
+def get_input_cache(hass: HomeAssistant) -> InputCache:
+    """The domain's shared input cache, created on first use."""
+    root = hass.data.setdefault(DOMAIN, {})
+    cache = root.get(_CACHE_KEY)
+    if not isinstance(cache, InputCache):
+        cache = root[_CACHE_KEY] = InputCache()
+    return cache
+
+
+def drop_input_cache(hass: HomeAssistant) -> None:
+    """Release the cache once no config entry is left."""
+    hass.data.get(DOMAIN, {}).pop(_CACHE_KEY, None)
@@ -0,0 +1,113 @@
+"""Streaming filters between the hub input reads and the excess math.
+
+The excess and MPPT sensors used the raw instantaneous state of every input.
+PV voltage feeds the ill-conditioned Vmp–Voc back-estimate, and battery power
+spikes for a sample or two on every compressor start; both showed up as excess
+jitter, recomputes and allocator flips. Each input can now be given one filter
+(``filter_pv_power`` …, see const.py):
+
+* ``median``  — median of the last ``filter_window`` samples.
+* ``ewma``    — exponential average with time constant ``filter_ewma_tau_s``.
+  States only change when the value does, so the previous sample is held
+  across the gap (zero-order hold) and the new one enters with the weight of
+  ``INPUT_FILTER_EWMA_SAMPLE_S``; a long steady stretch no longer hands the
+  next sample (possibly a spike) the whole gap's weight.
+* ``outlier`` — a sample further than ``INPUT_OUTLIER_K`` scaled MADs from the
+  window median is replaced by the median; the sample still enters the window,
+  so a real step is accepted once it fills half of it.
+
+A filter is fed once per state change (``InputCache`` calls ``push`` when it
+parses a new ``State``) and keeps a fixed-size buffer, so each sample costs
+O(window) with a window of at most a handful of samples.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import deque
+from typing import Any, Mapping, Optional, Tuple
+
+from .settings import (
+    INPUT_FILTER_EWMA_SAMPLE_S,
+    INPUT_OUTLIER_K,
+    INPUT_OUTLIER_MIN_SPREAD,
+    INPUT_OUTLIER_MIN_SPREAD_FRACTION,
+)
+from ..const import (
+    CONF_FILTER_EWMA_TAU_S,
+    CONF_FILTER_WINDOW,
+    DEFAULT_FILTER_EWMA_TAU_S,
+    DEFAULT_FILTER_WINDOW,
+    DEFAULT_INPUT_FILTER,
+    INPUT_FILTER_EWMA,
+    INPUT_FILTER_MEDIAN,
+    INPUT_FILTER_OUTLIER,
+)
+
+# Scales the median absolute deviation to a standard deviation for normal noise.
+_MAD_TO_SIGMA = 1.4826
+
+FilterSpec = Tuple[str, int, float]
+
+
+def filter_spec(config: Mapping[str, Any], key: str) -> Optional[FilterSpec]:
+    """Hashable ``(kind, window, tau_s)`` for the input filter ``key``; ``None`` if off."""
+    kind = config.get(key, DEFAULT_INPUT_FILTER)
+    if kind not in (INPUT_FILTER_MEDIAN, INPUT_FILTER_EWMA, INPUT_FILTER_OUTLIER):
+        return None
+    window = max(1, int(config.get(CONF_FILTER_WINDOW, DEFAULT_FILTER_WINDOW) or 1))
+    tau_s = max(0.0, float(config.get(CONF_FILTER_EWMA_TAU_S, DEFAULT_FILTER_EWMA_TAU_S) or 0.0))
+    return kind, window, tau_s
+
+
+def _median(values) -> float:
+    ordered = sorted(values)
+    mid = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[mid]
+    return (ordered[mid - 1] + ordered[mid]) / 2.0
+
+
+class InputFilter:
+    """One input's filter state; ``push`` returns the filtered value."""
+
+    __slots__ = ("kind", "_window", "_tau_s", "_value", "_ts", "_sample")
+
+    def __init__(self, spec: FilterSpec) -> None:
+        self.kind, window, self._tau_s = spec
+        self._window: deque = deque(maxlen=window)
+        self._value: Optional[float] = None
+        self._ts: Optional[float] = None
+        # Last raw sample (the EWMA holds it until the next one arrives).
+        self._sample: Optional[float] = None
+
+    @property
+    def value(self) -> Optional[float]:
+        """Last filtered value (``None`` before the first sample)."""
+        return self._value
+
+    def push(self, sample: float, ts: Optional[float] = None) -> float:
+        """Feed one sample taken at ``ts`` (epoch seconds) and return the output."""
+        if self.kind == INPUT_FILTER_EWMA:
+            if self._value is None or ts is None or self._ts is None or self._tau_s <= 0:
+                self._value = sample
+            else:
+                held = 1.0 - math.exp(-max(0.0, ts - self._ts) / self._tau_s)
+                self._value += held * (self._sample - self._value)
+                alpha = 1.0 - math.exp(-INPUT_FILTER_EWMA_SAMPLE_S / self._tau_s)
+                self._value += alpha * (sample - self._value)
+            self._ts, self._sample = ts, sample
+            return self._value
+
+        self._window.append(sample)
+        median = _median(self._window)
+        if self.kind == INPUT_FILTER_MEDIAN:
+            self._value = median
+            return median
+
+        spread = _MAD_TO_SIGMA * _median(abs(v - median) for v in self._window)
+        spread = max(
+            spread, INPUT_OUTLIER_MIN_SPREAD, INPUT_OUTLIER_MIN_SPREAD_FRACTION * abs(median)
+        )
+        self._value = median if abs(sample - median) > INPUT_OUTLIER_K * spread else sample
+        return self._value
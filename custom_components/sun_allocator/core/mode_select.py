@@ -27,7 +27,7 @@ async def mode_select_state_listener(
 
     if new_state.state in VALID_MODES:
         desired_modes[entity_id] = new_state.state
-        await persist_mode_state(hass, config_entry, entity_id, new_state.state)
+        persist_mode_state(hass, config_entry, entity_id, new_state.state)
 
     was_unavailable = (old_state is None) or (
         old_state.state in (STATE_UNKNOWN, STATE_UNAVAILABLE)
@@ -0,0 +1,141 @@
+"""Online calibration of the per-tracker MPPT model parameters.
+
+``calculate_current_max_power`` models the I-V curve below Vmp with two
+constants, the curve factor ``k`` and an efficiency correction, and the same
+values (``INTERNAL_CURVE_FACTOR_K`` / ``INTERNAL_EFFICIENCY_CORRECTION_FACTOR``)
+used to apply to every array. Real arrays differ: mismatch, soiling, cable
+losses and a datasheet Vmp that is not where the inverter really tracks all
+move the curve, and a biased model leaves more to slow probe discovery.
+
+When the array is provably unconstrained, the inverter holds it at its real
+maximum power point, so the model should predict exactly what it produces:
+``current_max_power == pv_power``, i.e.
+``relative_voltage · current_ratio(relative_voltage, k) · efficiency == 1``.
+"Unconstrained" means the battery is actively charging (below its limit, so
+nothing throttles the panels), ``detect_curtailment`` does not fire, the
+tracker is harvesting with enough light to measure, and its voltage sits in a
+band just below Vmp — the only region where these two parameters act.
+
+Each such sample is folded into a two-parameter recursive least squares
+estimate of ``θ = (ln efficiency, k)`` on the log of that identity,
+linearised around the current estimate. Memory is bounded twice over: an
+exponential forgetting factor lets old samples fade as the seasons move the
+operating point, and the covariance is never allowed to grow past the prior,
+so a long run of near-identical samples cannot blow the gain up. Estimates
+are clamped to physical bounds, and a tracker uses its fitted parameters only
+after ``min_samples`` samples.
+
+All functions are pure and operate on a plain
+``{tracker_index: {"theta": [...], "p": [...], "n": ...}}``
+dict that is written to the restore Store as-is.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, Mapping, Optional
+
+from ..const import CONF_CURVE_FACTOR_K, CONF_EFFICIENCY_CORRECTION_FACTOR
+
+# Physical bounds of the fitted parameters.
+K_BOUNDS = (0.05, 1.0)
+EFFICIENCY_BOUNDS = (0.9, 1.2)
+# Prior covariance of (ln efficiency, k); also the ceiling the covariance is
+# held under.
+_PRIOR_P = (25.0, 0.0, 200.0)
+
+
+def initial_calibration() -> Dict[str, Dict[str, Any]]:
+    """Return an empty calibration."""
+    return {}
+
+
+def _ln_current_ratio(relative_voltage: float, fill_factor: float, k: float) -> tuple:
+    """``ln current_ratio`` of the below-Vmp model and its derivative in ``k``."""
+    knee = (1.0 - fill_factor) * relative_voltage ** k
+    value = math.log((1.0 - knee) / fill_factor)
+    slope = -knee * math.log(relative_voltage) / (1.0 - knee)
+    return value, slope
+
+
+def observe(
+    calibration: Dict[str, Dict[str, Any]],
+    tracker: int,
+    relative_voltage: float,
+    fill_factor: float,
+    prior: Mapping[str, float],
+    *,
+    forgetting: float,
+) -> bool:
+    """Fold one unconstrained sample of ``tracker`` into its estimate.
+
+    ``prior`` supplies the starting parameters. Returns ``False`` when the
+    sample cannot be used (voltage or fill factor out of the model's range).
+    """
+    if not 0.0 < relative_voltage <= 1.0 or not 0.0 < fill_factor < 1.0:
+        return False
+    state = calibration.get(str(tracker))
+    if state is None:
+        state = calibration[str(tracker)] = {
+            "theta": [
+                math.log(float(prior[CONF_EFFICIENCY_CORRECTION_FACTOR])),
+                float(prior[CONF_CURVE_FACTOR_K]),
+            ],
+            "p": list(_PRIOR_P),
+            "n": 0,
+        }
+    (ln_eff, k), (p00, p01, p11) = state["theta"], state["p"]
+
+    ln_ratio, phi_k = _ln_current_ratio(relative_voltage, fill_factor, k)
+    error = -math.log(relative_voltage) - (ln_eff + ln_ratio)
+    # Gain of the RLS update with regressor (1, phi_k).
+    g0 = p00 + p01 * phi_k
+    g1 = p01 + p11 * phi_k
+    denominator = forgetting + g0 + g1 * phi_k
+    gain0, gain1 = g0 / denominator, g1 / denominator
+
+    ln_eff = min(math.log(EFFICIENCY_BOUNDS[1]), max(math.log(EFFICIENCY_BOUNDS[0]), ln_eff + gain0 * error))
+    k = min(K_BOUNDS[1], max(K_BOUNDS[0], k + gain1 * error))
+    p00 = (p00 - gain0 * g0) / forgetting
+    p01 = (p01 - gain0 * g1) / forgetting
+    p11 = (p11 - gain1 * g1) / forgetting
+    ceiling = _PRIOR_P[0] + _PRIOR_P[2]
+    if p00 + p11 > ceiling:
+        scale = ceiling / (p00 + p11)
+        p00, p01, p11 = p00 * scale, p01 * scale, p11 * scale
+
+    state["theta"] = [ln_eff, k]
+    state["p"] = [p00, p01, p11]
+    state["n"] = int(state.get("n", 0)) + 1
+    return True
+
+
+def model_params(
+    calibration: Mapping[str, Mapping[str, Any]], tracker: int, *, min_samples: int
+) -> Optional[Dict[str, float]]:
+    """Fitted ``curve_factor_k`` / ``efficiency_correction_factor`` once trusted, else ``None``."""
+    state = calibration.get(str(tracker))
+    if not state or int(state.get("n", 0)) < min_samples:
+        return None
+    ln_eff, k = state["theta"]
+    return {
+        CONF_CURVE_FACTOR_K: round(float(k), 4),
+        CONF_EFFICIENCY_CORRECTION_FACTOR: round(math.exp(float(ln_eff)), 4),
+    }
+
+
+def from_storage(raw: Optional[Mapping[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Rebuild the calibration from storage, dropping malformed trackers."""
+    calibration = initial_calibration()
+    if not isinstance(raw, Mapping):
+        return calibration
+    for tracker, entry in raw.items():
+        try:
+            theta = [float(v) for v in entry["theta"]]
+            p = [float(v) for v in entry["p"]]
+            samples = int(entry["n"])
+        except (KeyError, TypeError, ValueError, AttributeError):
+            continue
+        if len(theta) == 2 and len(p) == 3 and all(map(math.isfinite, theta + p)):
+            calibration[str(tracker)] = {"theta": theta, "p": p, "n": samples}
+    return calibration
@@ -0,0 +1,171 @@
+"""Learned percent→watts curve of proportional devices.
+
+A proportional device is driven by a percent, and the allocator used to assume
+it draws ``max_expected_w × percent / 100``. A resistive load behind a
+phase-angle dimmer does not: its power follows the conducted area of the sine
+wave, so the middle of the range is far off the straight line. The budget then
+mis-accounts the device and the next one gets the wrong share.
+
+The curve is a piecewise-linear table with a knot every ``CURVE_STEP_PERCENT``.
+A settled actual-power reading at percent ``p`` pulls the two knots around ``p``
+toward it, each in proportion to its interpolation weight. A knot learns fast
+from its first samples, then as an EWMA. Knots with too few samples are
+interpolated between their trusted neighbours, so an untrained device keeps the
+straight line it had before. Lookups keep the table non-decreasing, so it can be
+inverted (watts → percent).
+
+All functions are pure and operate on a plain
+``{device_id: {"w": [...], "n": [...]}}`` dict that is written to the restore
+Store as-is.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+CURVE_STEP_PERCENT = 10
+CURVE_KNOTS = 100 // CURVE_STEP_PERCENT + 1
+
+
+def initial_curves() -> Dict[str, Dict[str, List[float]]]:
+    """Return an empty set of curves."""
+    return {}
+
+
+def _bracket(percent: float) -> Tuple[int, float]:
+    """Lower knot index and the weight of the upper knot for ``percent``."""
+    position = min(100.0, max(0.0, float(percent))) / CURVE_STEP_PERCENT
+    low = min(int(position), CURVE_KNOTS - 2)
+    return low, position - low
+
+
+def observe(
+    curves: Dict[str, Dict[str, List[float]]],
+    device_id: str,
+    percent: float,
+    watts: float,
+    max_w: float,
+    *,
+    alpha: float,
+) -> None:
+    """Fold one settled reading at ``percent`` into ``device_id``'s curve."""
+    curve = curves.get(device_id)
+    if curve is None:
+        curve = curves[device_id] = {
+            "w": [max_w * i / (CURVE_KNOTS - 1) for i in range(CURVE_KNOTS)],
+            "n": [0] * CURVE_KNOTS,
+        }
+    low, upper = _bracket(percent)
+    knots, samples = curve["w"], curve["n"]
+    error = float(watts) - (knots[low] * (1.0 - upper) + knots[low + 1] * upper)
+    for index, weight in ((low, 1.0 - upper), (low + 1, upper)):
+        if index == 0 or weight <= 0.0:
+            continue  # 0 % is off: the first knot stays at 0 W
+        rate = max(alpha, 1.0 / (samples[index] + 1))
+        knots[index] += rate * weight * error
+        if weight >= 0.5:
+            samples[index] += 1
+
+
+def _table(
+    curves: Mapping[str, Mapping[str, List[float]]],
+    device_id: str,
+    max_w: float,
+    min_samples: int,
+) -> List[float]:
+    """Knot watts, non-decreasing.
+
+    Trusted knots keep their learned value. The others are interpolated between
+    the nearest trusted knots, with 0 W at 0 % and ``max_w`` at 100 % as anchors
+    unless those are learned too.
+    """
+    curve = curves.get(device_id) or {}
+    knots, samples = curve.get("w") or [], curve.get("n") or []
+    anchors = {0: 0.0}
+    if len(knots) == CURVE_KNOTS and len(samples) == CURVE_KNOTS:
+        anchors.update(
+            (i, knots[i]) for i in range(1, CURVE_KNOTS) if samples[i] >= min_samples
+        )
+    anchors.setdefault(CURVE_KNOTS - 1, max_w)
+    points = sorted(anchors.items())
+    table, floor = [], 0.0
+    for (left, left_w), (right, right_w) in zip(points, points[1:]):
+        for index in range(left, right):
+            value = left_w + (right_w - left_w) * (index - left) / (right - left)
+            floor = max(floor, value)
+            table.append(floor)
+    table.append(max(floor, points[-1][1]))
+    return table
+
+
+def watts_at(
+    curves: Mapping[str, Mapping[str, List[float]]],
+    device_id: str,
+    percent: float,
+    max_w: float,
+    *,
+    min_samples: int,
+) -> float:
+    """Expected draw of ``device_id`` at ``percent``."""
+    table = _table(curves, device_id, max_w, min_samples)
+    low, upper = _bracket(percent)
+    return table[low] * (1.0 - upper) + table[low + 1] * upper
+
+
+def percent_for(
+    curves: Mapping[str, Mapping[str, List[float]]],
+    device_id: str,
+    watts: float,
+    max_w: float,
+    *,
+    min_samples: int,
+) -> float:
+    """Percent at which ``device_id`` is expected to draw ``watts`` (0–100)."""
+    table = _table(curves, device_id, max_w, min_samples)
+    if watts <= 0.0:
+        return 0.0
+    for index in range(1, CURVE_KNOTS):
+        if table[index] >= watts:
+            span = table[index] - table[index - 1]
+            upper = (watts - table[index - 1]) / span if span > 0 else 1.0
+            return (index - 1 + upper) * CURVE_STEP_PERCENT
+    return 100.0
+
+
+def trusted_at(
+    curves: Mapping[str, Mapping[str, List[float]]],
+    device_id: str,
+    percent: float,
+    *,
+    min_samples: int,
+) -> bool:
+    """True when both knots around ``percent`` are learned (0 % always is)."""
+    samples = (curves.get(device_id) or {}).get("n") or []
+    if len(samples) != CURVE_KNOTS:
+        return False
+    low, upper = _bracket(percent)
+    return all(
+        index == 0 or samples[index] >= min_samples
+        for index in (low, low + 1) if index == low or upper > 0.0
+    )
+
+
+def from_storage(
+    raw: Optional[Mapping[str, Any]], device_ids: Optional[Iterable[str]] = None
+) -> Dict[str, Dict[str, List[float]]]:
+    """Rebuild the curves from storage, dropping malformed and removed devices."""
+    curves = initial_curves()
+    if not isinstance(raw, Mapping):
+        return curves
+    keep = set(device_ids) if device_ids is not None else None
+    for device_id, entry in raw.items():
+        if keep is not None and device_id not in keep:
+            continue
+        try:
+            knots = [float(w) for w in entry["w"]]
+            samples = [int(n) for n in entry["n"]]
+        except (KeyError, TypeError, ValueError, AttributeError):
+            continue
+        if len(knots) == CURVE_KNOTS and len(samples) == CURVE_KNOTS:
+            curves[device_id] = {"w": knots, "n": samples}
+    return curves
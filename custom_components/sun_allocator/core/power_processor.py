@@ -15,9 +15,28 @@ from homeassistant.const import (
 # Local imports from the same 'core' directory
 from .logger import log_debug, log_warning
 from .schedule import is_device_in_schedule
-from .settings import COUNTER_DEBOUNCE_FRACTION
-from .device_restore import persist_grace_state
+from .settings import (
+    COUNTER_DEBOUNCE_FRACTION,
+    ENERGY_MAX_INTEGRATION_GAP_SECONDS,
+    DRAW_MODEL_ALPHA,
+    POWER_CURVE_ALPHA,
+    POWER_CURVE_MIN_SAMPLES,
+    POWER_FEEDBACK_DEADBAND_PERCENT,
+    POWER_FEEDBACK_INTEGRAL_BLEED,
+    POWER_FEEDBACK_INTEGRAL_LIMIT,
+    POWER_FEEDBACK_KI,
+    POWER_FEEDBACK_KP,
+    POWER_FEEDBACK_MAX_DT_SECONDS,
+    POWER_FEEDBACK_SETTLE_SECONDS,
+)
+from .device_restore import persist_grace_state, persist_learned_state
+from . import auto_control, draw_model, energy, power_curve
 from .probe import running_controllable_floor_w
+from .input_cache import get_input_cache
+from .snapshot import CycleSnapshot
+from .channel_batch import ChannelBatch
+from .preemption import TurnOnHold, record_shed_latency
+from .strategies import AllocationView, DeviceView, plan_allocation
 from .constants_internal import SUPPORTED_DOMAINS
 from .entity_control import (
     is_entity_on,
@@ -49,13 +68,19 @@ from ..const import (
     CONF_HYSTERESIS_W,
     CONF_DEVICE_DEBOUNCE_TIME,
     DEFAULT_DEBOUNCE_TIME,
+    CONF_DEVICE_DEBOUNCE_MODE,
+    DEFAULT_DEBOUNCE_MODE,
+    DEBOUNCE_MODE_ENERGY,
+    CONF_DEVICE_DEBOUNCE_ENERGY_WH,
+    DEFAULT_DEBOUNCE_ENERGY_WH,
     RELAY_MODE_ON,
     RELAY_MODE_PROPORTIONAL,
     CONF_ESPHOME_MODE_SELECT_ENTITY,
     CONF_AUTO_CONTROL_ENABLED,
     CONF_DEVICE_ALLOCATION_STRATEGY,
     STRATEGY_FILL_ONE_BY_ONE,
-    STRATEGY_DISTRIBUTE_EVENLY,
+    CONF_SWITCHING_COST_W,
+    DEFAULT_SWITCHING_COST_W,
     KEY_STARTUP_GRACE_PERIOD,
     DEFAULT_STARTUP_GRACE_PERIOD,
     CONF_BATTERY_SOC_SENSOR,
@@ -69,17 +94,29 @@ from ..const import (
     CONF_DEVICE_MAX_ON_TIME_PER_DAY,
     CONF_DEVICE_ALLOW_PROBE,
     DEFAULT_DEVICE_ALLOW_PROBE,
+    CONF_DEVICE_POWER_FEEDBACK,
+    DEFAULT_DEVICE_POWER_FEEDBACK,
 )
-from ..sensor.utils import get_sensor_state_safely, is_reading_stale
+from ..sensor.utils import get_sensor_state_safely
+
+def _initialize_run(entry_data, devices_config, only_devices=None):
+    """Initialize states for the processing run.
 
-def _initialize_run(entry_data, devices_config):
-    """Initialize states for the processing run."""
+    For a partial re-run (``only_devices``), devices outside the set keep their
+    allocation and filter reason from the previous pass.
+    """
     power_allocation = entry_data.get(CONF_POWER_ALLOCATION, {})
     for dev_id in power_allocation:
-        power_allocation[dev_id] = 0
+        if only_devices is None or dev_id in only_devices:
+            power_allocation[dev_id] = 0
 
     entry_data.setdefault("device_status", {})
-    entry_data["device_filter_reasons"] = {}
+    if only_devices is None:
+        entry_data["device_filter_reasons"] = {}
+    else:
+        filter_reasons = entry_data.setdefault("device_filter_reasons", {})
+        for dev_id in only_devices:
+            filter_reasons.pop(dev_id, None)
 
     auto_control_devices = [
         d for d in devices_config if d.get(CONF_AUTO_CONTROL_ENABLED, False)
@@ -91,25 +128,24 @@ def _initialize_run(entry_data, devices_config):
     return auto_control_devices
 
 
-def _read_battery_soc(hass, cfg) -> float | None:
+def _read_battery_soc(hass, cfg, snapshot=None) -> float | None:
     """Return current battery SOC % from the configured sensor, or None if unavailable."""
     soc_sensor = cfg.get(CONF_BATTERY_SOC_SENSOR)
     if not soc_sensor:
         return None
-    state = hass.states.get(soc_sensor)
-    if not state or state.state in (STATE_UNKNOWN, STATE_UNAVAILABLE):
+    # Parsed once per state change, shared with the hub sensors of every entry.
+    cache = get_input_cache(hass)
+    value, ok = cache.reading(hass, soc_sensor, "Battery SOC", states=snapshot)
+    if not ok:
         return None
     # Stale SOC is treated as unavailable so the per-device gate fails safe.
-    if is_reading_stale(hass, soc_sensor, DEFAULT_SOC_MAX_AGE_S):
+    if cache.is_stale(hass, soc_sensor, DEFAULT_SOC_MAX_AGE_S, states=snapshot):
         log_debug(
             "Battery SOC '%s' is stale (>%ss old) — ignoring",
             soc_sensor, int(DEFAULT_SOC_MAX_AGE_S),
         )
         return None
-    try:
-        return float(state.state)
-    except (ValueError, TypeError):
-        return None
+    return value
 
 
 def _apply_battery_soc_gate(
@@ -262,8 +298,9 @@ def _apply_max_on_time_gate(
     return is_active
 
 
-async def _filter_device(hass, device, now):
+async def _filter_device(hass, device, now, snapshot=None):
     """Filter out devices that are unavailable, unsupported, or outside of their schedule."""
+    states = snapshot if snapshot is not None else hass.states
     device_name = device.get(CONF_DEVICE_NAME)
     relay_entity, _ = parse_relay_entity(device.get(CONF_DEVICE_ENTITY))
 
@@ -275,12 +312,12 @@ async def _filter_device(hass, device, now):
         log_warning(f"Device '{device_name}' skipped: Unsupported or missing entity_id: {relay_entity}")
         return "Unsupported or missing entity_id"
 
-    relay_state_obj = hass.states.get(relay_entity)
+    relay_state_obj = states.get(relay_entity)
     if relay_state_obj is None or relay_state_obj.state in (STATE_UNKNOWN, STATE_UNAVAILABLE):
         log_debug(f"Device '{device_name}' skipped: Entity {relay_entity} not found or unavailable.")
         return "Entity unavailable or not found"
 
-    if not is_device_in_schedule(device, now, hass):
+    if not is_device_in_schedule(device, now, hass, states=states):
         log_debug(f"Device '{device_name}' skipped: Outside of schedule.")
         if is_entity_on(service_domain, relay_state_obj):
             await turn_off_entity(hass, relay_entity, device_name)
@@ -306,10 +343,46 @@ async def _filter_device(hass, device, now):
     return None
 
 
+def _integrate_debounce_energy(debounce_info, margin_w, now, budget_wh) -> float:
+    """Advance the energy integral of an energy-mode debounce and return it (Wh).
+
+    ``margin_w`` is how far the excess is past the threshold toward the
+    candidate state (negative while it has reverted). The excess only changes on
+    a trigger, so each margin is held until the next pass. The integral never
+    goes below 0; ``energy_due`` is when the budget is reached if the current
+    margin holds, for the deadline timer.
+    """
+    energy_wh = float(debounce_info.get("energy_wh") or 0.0)
+    since = debounce_info.get("energy_at")
+    if since is not None:
+        held_w = float(debounce_info.get("energy_margin_w") or 0.0)
+        energy_wh = max(0.0, energy_wh + held_w * max(0.0, (now - since).total_seconds()) / 3600.0)
+    due = None
+    if margin_w > 0 and energy_wh < budget_wh:
+        due = now + dt_stdlib.timedelta(seconds=(budget_wh - energy_wh) * 3600.0 / margin_w)
+    debounce_info.update(
+        {"energy_wh": energy_wh, "energy_margin_w": margin_w, "energy_at": now, "energy_due": due}
+    )
+    return energy_wh
+
+
+def _clear_debounce(debounce_info) -> None:
+    """End the running debounce (time and energy bookkeeping)."""
+    debounce_info["state_change_time"] = None
+    debounce_info["counter_debounce_start"] = None
+    for key in ("energy_wh", "energy_margin_w", "energy_at", "energy_due"):
+        debounce_info.pop(key, None)
+
+
 def _calculate_device_state(
     device, excess_power, device_on_state, device_debounce_state, cfg, now
 ):
-    """Calculate the desired state (on/off) for a device based on power, hysteresis, and debounce."""
+    """Calculate the desired state (on/off) for a device based on power, hysteresis, and debounce.
+
+    In ``energy`` debounce mode the transition also commits once the surplus
+    (turn-on) or deficit (turn-off) integrated since the candidate flip reaches
+    the device's energy budget; the debounce time stays the upper bound.
+    """
     device_id = device.get(CONF_DEVICE_ID)
     device_name = device.get(CONF_DEVICE_NAME)
 
@@ -329,6 +402,14 @@ def _calculate_device_state(
     log_debug(f"Device {device_name}: excess_power={excess_power}, on_threshold={on_threshold}, off_threshold={off_threshold}, prev_on={prev_on}, is_active_candidate={is_active_candidate}")
 
     debounce_time_s = device.get(CONF_DEVICE_DEBOUNCE_TIME, DEFAULT_DEBOUNCE_TIME)
+    energy_budget_wh = 0.0
+    if device.get(CONF_DEVICE_DEBOUNCE_MODE, DEFAULT_DEBOUNCE_MODE) == DEBOUNCE_MODE_ENERGY:
+        energy_budget_wh = float(
+            device.get(CONF_DEVICE_DEBOUNCE_ENERGY_WH, DEFAULT_DEBOUNCE_ENERGY_WH) or 0.0
+        )
+    # Watts past the threshold toward the other state: surplus above the ON
+    # threshold while off, deficit below the OFF threshold while on.
+    margin_w = (off_threshold - excess_power) if prev_on else (excess_power - on_threshold)
 
     if device_id not in device_debounce_state:
         log_debug(f"Device {device_name}: Initializing new debounce state")
@@ -351,11 +432,18 @@ def _calculate_device_state(
                 debounce_info["candidate_state"] = is_active_candidate
                 debounce_info["state_change_time"] = now
                 debounce_info["counter_debounce_start"] = None
+                if energy_budget_wh > 0:
+                    _integrate_debounce_energy(debounce_info, margin_w, now, energy_budget_wh)
                 device_debounce_state[device_id] = debounce_info
             device_on_state[device_id] = prev_on
         else:
             # Debounce is active
             debounce_elapsed = (now - debounce_info["state_change_time"]).total_seconds()
+            energy_wh = None
+            if energy_budget_wh > 0:
+                energy_wh = _integrate_debounce_energy(
+                    debounce_info, margin_w, now, energy_budget_wh
+                )
 
             if is_active_candidate == prev_on:
                 # Signal reverted to original state — use counter-debounce to avoid
@@ -368,8 +456,7 @@ def _calculate_device_state(
                     log_debug(f"Device {device_name}: Counter-debounce elapsed={counter_elapsed:.1f}s / {debounce_time_s * COUNTER_DEBOUNCE_FRACTION:.1f}s")
                     if counter_elapsed >= debounce_time_s * COUNTER_DEBOUNCE_FRACTION:
                         log_debug(f"Device {device_name}: Cancelling debounce — sustained reversal for {counter_elapsed:.1f}s")
-                        debounce_info["state_change_time"] = None
-                        debounce_info["counter_debounce_start"] = None
+                        _clear_debounce(debounce_info)
                         device_debounce_state[device_id] = debounce_info
                 device_on_state[device_id] = prev_on
             else:
@@ -377,13 +464,14 @@ def _calculate_device_state(
                 debounce_info["counter_debounce_start"] = None
                 log_debug(f"Device {device_name}: debounce elapsed={debounce_elapsed:.1f}s / {debounce_time_s}s, candidate={debounce_info['candidate_state']} vs target={is_active_candidate}")
 
-                if debounce_elapsed >= debounce_time_s:
+                if debounce_elapsed >= debounce_time_s or (
+                    energy_wh is not None and energy_wh >= energy_budget_wh
+                ):
                     is_active = is_active_candidate
                     device_on_state[device_id] = is_active
-                    debounce_info["state_change_time"] = None
-                    debounce_info["counter_debounce_start"] = None
+                    _clear_debounce(debounce_info)
                     device_debounce_state[device_id] = debounce_info
-                    log_debug(f"Device {device_name}: Debounce complete: {prev_on} -> {is_active}")
+                    log_debug(f"Device {device_name}: Debounce complete: {prev_on} -> {is_active} (energy={energy_wh} Wh)")
                 else:
                     log_debug(f"Device {device_name}: Still debouncing ({debounce_elapsed:.1f}s < {debounce_time_s}s)")
                     device_on_state[device_id] = prev_on
@@ -392,7 +480,7 @@ def _calculate_device_state(
     return is_active, is_active_candidate
 
 
-def _initialize_status_entry(hass, device):
+def _initialize_status_entry(hass, device, snapshot=None):
     """Initialize the status dictionary for a device."""
     min_expected_w = float(device.get(CONF_DEVICE_MIN_EXPECTED_W, 0) or 0)
     max_expected_w = float(device.get(CONF_DEVICE_MAX_EXPECTED_W, 0) or 0)
@@ -403,7 +491,8 @@ def _initialize_status_entry(hass, device):
     if device.get(CONF_DEVICE_TYPE) == DEVICE_TYPE_CUSTOM:
         mode_select_entity = device.get(CONF_ESPHOME_MODE_SELECT_ENTITY)
         if mode_select_entity:
-            mode_state = hass.states.get(mode_select_entity)
+            states = snapshot if snapshot is not None else hass.states
+            mode_state = states.get(mode_select_entity)
             if mode_state:
                 mode = mode_state.state
 
@@ -484,16 +573,23 @@ def _resolve_standard_power_used(
 
 async def _control_standard_device(
     hass, device, is_active, prev_on, remaining_power, cfg, status_entry, device_on_state,
-    device_sensor_cache=None, device_on_time_state=None, now=None,
+    device_sensor_cache=None, device_on_time_state=None, now=None, snapshot=None,
+    batch=None, hold=None,
 ):
-    """Control logic for a standard (on/off) device."""
+    """Control logic for a standard (on/off) device.
+
+    ``batch`` (a ``ChannelBatch``) takes the command instead when the device is a
+    channel of a multi-channel ESPHome node. ``hold`` (a ``TurnOnHold``, shed-first
+    passes only) keeps a turn-on until the pass's turn-offs are sent; a channel's
+    turn-on goes to the hold's own batch.
+    """
     power_used = 0.0
     relay_entity, hvac_mode = parse_relay_entity(device.get(CONF_DEVICE_ENTITY))
     device_id = device.get(CONF_DEVICE_ID)
     device_name = device.get(CONF_DEVICE_NAME)
     service_domain = relay_entity.split(".")[0] if relay_entity else ""
 
-    actual_state = hass.states.get(relay_entity)
+    actual_state = (snapshot if snapshot is not None else hass.states).get(relay_entity)
     is_actually_on = is_entity_on(service_domain, actual_state) if actual_state else False
 
     # is_enabled = relay commanded ON this cycle. Tracked separately from allocated
@@ -507,7 +603,13 @@ async def _control_standard_device(
 
         if not prev_on or not is_actually_on:
             log_debug(f"Turning on standard device {device_name} (prev_on={prev_on}, actual={actual_state.state if actual_state else 'N/A'})")
-            await turn_on_entity(hass, relay_entity, hvac_mode, device_name)
+            on_batch = hold.batch if hold is not None else batch
+            if on_batch is not None and on_batch.set_percent(device, MAX_PERCENTAGE):
+                pass
+            elif hold is not None:
+                hold.hold(turn_on_entity, hass, relay_entity, hvac_mode, device_name)
+            else:
+                await turn_on_entity(hass, relay_entity, hvac_mode, device_name)
 
         power_used = _resolve_standard_power_used(
             hass, device, status_entry, device_on_time_state or {}, device_id, now,
@@ -519,7 +621,8 @@ async def _control_standard_device(
             device_on_state[device_id] = False
         if prev_on or is_actually_on:
             log_debug(f"Turning off standard device {device_name} (remaining={remaining_power}W)")
-            await turn_off_entity(hass, relay_entity, device_name)
+            if batch is None or not batch.set_percent(device, 0.0):
+                await turn_off_entity(hass, relay_entity, device_name)
 
         status_entry.pop("is_idle", None)
         status_entry.update({"percent_target": 0.0, "percent_actual": 0.0, "allocated_w": 0.0})
@@ -527,10 +630,93 @@ async def _control_standard_device(
     return power_used, status_entry
 
 
+def _feedback_percent(
+    entry_data, device, target_w, max_w, device_sensor_cache, snapshot, now,
+):
+    """Closed-loop percent for a proportional device with ``power_feedback``.
+
+    The learned curve (core/power_curve.py) turns ``target_w`` into a
+    feed-forward percent. A PI term on the last settled actual-power reading
+    (error in percent of ``max_w``) corrects what the curve does not know yet.
+    Each settled reading is also folded into the curve at the percent that
+    produced it; once the curve is trusted there, the integral bleeds off. A
+    reading counts as settled once it is at least
+    ``POWER_FEEDBACK_SETTLE_SECONDS`` newer than the last command.
+    """
+    device_id = device.get(CONF_DEVICE_ID)
+    curves = entry_data.setdefault("power_curves", power_curve.initial_curves())
+    loops = entry_data.setdefault("power_feedback_state", {})
+    loop = loops.setdefault(device_id, {})
+    now_ts = now.timestamp()
+
+    sensor = device.get(CONF_DEVICE_ACTUAL_POWER_SENSOR)
+    measured_w, ok = (device_sensor_cache or {}).get(sensor, (0.0, False))
+    reading = snapshot.get(sensor) if sensor and snapshot is not None else None
+    read_at = None
+    if reading is not None:
+        read_at = (getattr(reading, "last_reported", None) or reading.last_updated).timestamp()
+
+    integral = float(loop.get("integral", 0.0))
+    error_pct = 0.0
+    if (
+        ok and read_at is not None and loop.get("percent")
+        and read_at >= loop["ts"] + POWER_FEEDBACK_SETTLE_SECONDS
+        and read_at > loop.get("read_at", 0.0)
+    ):
+        power_curve.observe(
+            curves, device_id, loop["percent"], measured_w, max_w, alpha=POWER_CURVE_ALPHA
+        )
+        error_pct = (loop["target_w"] - measured_w) / max_w * 100.0
+        dt = min(POWER_FEEDBACK_MAX_DT_SECONDS, now_ts - loop.get("integrated_ts", loop["ts"]))
+        integral += POWER_FEEDBACK_KI * error_pct * max(0.0, dt)
+        if power_curve.trusted_at(
+            curves, device_id, loop["percent"], min_samples=POWER_CURVE_MIN_SAMPLES
+        ):
+            integral *= POWER_FEEDBACK_INTEGRAL_BLEED
+        integral = max(-POWER_FEEDBACK_INTEGRAL_LIMIT, min(POWER_FEEDBACK_INTEGRAL_LIMIT, integral))
+        loop["read_at"] = read_at
+        loop["integrated_ts"] = now_ts
+
+    feed_forward = power_curve.percent_for(
+        curves, device_id, target_w, max_w, min_samples=POWER_CURVE_MIN_SAMPLES
+    )
+    unclamped = feed_forward + POWER_FEEDBACK_KP * error_pct + integral
+    percent = min(MAX_PERCENTAGE, max(5, unclamped))
+    if percent != unclamped and (unclamped > percent) == (error_pct > 0):
+        integral = float(loop.get("integral", 0.0))  # anti-windup: hold at the limit
+    loop["integral"] = integral
+    # A small trim keeps the settle clock: the load is already near the new point.
+    if abs(percent - float(loop.get("percent", 0.0))) > POWER_FEEDBACK_DEADBAND_PERCENT:
+        loop.update({"ts": now_ts, "integrated_ts": now_ts})
+    loop.update({"percent": percent, "target_w": target_w})
+    return percent
+
+
+def _proportional_power_used(entry_data, device, power_to_allocate, max_w, percent) -> float:
+    """Accounted draw at ``percent``: the learned curve where trusted, else linear."""
+    curves = entry_data.get("power_curves", {}) if entry_data is not None else {}
+    device_id = device.get(CONF_DEVICE_ID)
+    if device.get(CONF_DEVICE_POWER_FEEDBACK, DEFAULT_DEVICE_POWER_FEEDBACK) and (
+        power_curve.trusted_at(curves, device_id, percent, min_samples=POWER_CURVE_MIN_SAMPLES)
+    ):
+        return power_curve.watts_at(
+            curves, device_id, percent, max_w, min_samples=POWER_CURVE_MIN_SAMPLES
+        )
+    return min(power_to_allocate, max_w * (percent / MAX_PERCENTAGE))
+
+
 async def _control_custom_device(
-    hass, device, is_active, prev_on, power_to_allocate, cfg, status_entry, device_on_state
+    hass, device, is_active, prev_on, power_to_allocate, cfg, status_entry, device_on_state,
+    snapshot=None, entry_data=None, device_sensor_cache=None, now=None, batch=None,
+    hold=None,
 ):
-    """Control logic for a custom (ESPHome) device."""
+    """Control logic for a custom (ESPHome) device.
+
+    Channels of a multi-channel node queue their percent in ``batch`` instead of
+    calling the light themselves. In a shed-first pass ``hold`` keeps a percent
+    that raises the device's draw until the pass's sheds are sent (a channel's in
+    the hold's own batch).
+    """
     power_used = 0.0
     device_name = device.get(CONF_DEVICE_NAME)
     relay_entity, _ = parse_relay_entity(device.get(CONF_DEVICE_ENTITY))
@@ -539,27 +725,49 @@ async def _control_custom_device(
         log_warning(f"Device {device_name} has no valid entity_id, skipping control")
         return 0.0, status_entry
 
+    feedback = (
+        entry_data is not None and now is not None
+        and device.get(CONF_DEVICE_POWER_FEEDBACK, DEFAULT_DEVICE_POWER_FEEDBACK)
+        and bool(device.get(CONF_DEVICE_ACTUAL_POWER_SENSOR))
+    )
     if status_entry.get("mode") == RELAY_MODE_PROPORTIONAL:
         if is_active:
             max_w = status_entry["max_expected_w"]
             target_percent = 0.0
             if max_w <= 0:
                 log_warning(f"Device {device_name} in Proportional has no max_expected_w; forcing 0%/OFF")
+            elif feedback:
+                target_percent = _feedback_percent(
+                    entry_data, device, min(power_to_allocate, max_w), max_w,
+                    device_sensor_cache, snapshot, now,
+                )
             else:
                 target_percent = min(MAX_PERCENTAGE, max(5, (power_to_allocate / max_w) * 100))
             log_debug(f"Proportional target for {device_name}: {target_percent}% ({power_to_allocate}W)")
             status_entry["percent_target"] = float(target_percent)
-            await set_power_for_entity(hass, relay_entity, target_percent)
-            power_used = min(power_to_allocate, max_w * (target_percent / MAX_PERCENTAGE))
+            power_used = _proportional_power_used(
+                entry_data, device, power_to_allocate, max_w, target_percent
+            )
+            adds_load = hold is not None and hold.adds_load(device.get(CONF_DEVICE_ID), power_used)
+            percent_batch = hold.batch if adds_load else batch
+            if percent_batch is not None and percent_batch.set_percent(device, target_percent):
+                pass
+            elif adds_load:
+                hold.hold(set_power_for_entity, hass, relay_entity, target_percent)
+            else:
+                await set_power_for_entity(hass, relay_entity, target_percent)
             status_entry["allocated_w"] = float(power_used)
         else:
             log_debug(f"Proportional below threshold for {device_name} -> target 0 / OFF")
-            if prev_on:
+            if entry_data is not None:
+                entry_data.get("power_feedback_state", {}).pop(device.get(CONF_DEVICE_ID), None)
+            if prev_on and (batch is None or not batch.set_percent(device, 0.0)):
                 await turn_off_entity(hass, relay_entity, device_name)
 
     elif status_entry.get("mode") == RELAY_MODE_ON:
         power_used, status_entry = await _control_standard_device(
-            hass, device, is_active, prev_on, power_to_allocate, cfg, status_entry, device_on_state
+            hass, device, is_active, prev_on, power_to_allocate, cfg, status_entry, device_on_state,
+            snapshot=snapshot, batch=batch, hold=hold,
         )
 
     return power_used, status_entry
@@ -616,7 +824,7 @@ def _dismiss_retry_notification(hass, device_id: str) -> None:
 
 
 def _detect_external_change(
-    hass, device, device_id, entry_data, status_entry, device_on_state, now,
+    hass, device, device_id, entry_data, status_entry, device_on_state, now, snapshot=None,
 ):
     """Reconcile the desired state with the actual entity state.
 
@@ -629,7 +837,8 @@ def _detect_external_change(
     retry_failed = entry_data.setdefault("device_retry_failed", {})
 
     relay_entity, _ = parse_relay_entity(device.get(CONF_DEVICE_ENTITY))
-    actual_state = hass.states.get(relay_entity) if relay_entity else None
+    states = snapshot if snapshot is not None else hass.states
+    actual_state = states.get(relay_entity) if relay_entity else None
     expected_on = device_on_state.get(device_id)
 
     if (
@@ -730,8 +939,44 @@ def _apply_manual_override(entry_data, device_id, status_entry, device_on_state,
     return True
 
 
-def _finalize_run(entry_data, excess_power, remaining_power):
-    """Update global state and prepare for dispatcher signal."""
+def _keep_unvisited(entry_data, devices, prev_allocation, prev_status) -> dict:
+    """Restore last pass's status and allocation of devices a preempted pass
+    skipped; returns the restored allocation in W per device, in pass order."""
+    kept = {}
+    for device in devices:
+        device_id = device.get(CONF_DEVICE_ID)
+        allocated = float(prev_allocation.get(device_id, 0.0) or 0.0)
+        entry_data[CONF_POWER_ALLOCATION][device_id] = allocated
+        kept[device_id] = allocated
+        if device_id in prev_status:
+            entry_data["device_status"][device_id] = prev_status[device_id]
+    return kept
+
+
+def _allows_probe(entry_data, device_id) -> bool:
+    status_entry = entry_data["device_status"].get(device_id)
+    return status_entry.get("allow_probe", True) if status_entry else True
+
+
+def _draw_from_pools(power_used, real_pool, extra_pool, allow_probe):
+    """Consume ``power_used`` from the real pool first, then (for probe-allowed
+    devices) the extra pool; returns ``(real_pool, extra_pool, from_extra)``."""
+    from_real = min(power_used, real_pool)
+    real_pool -= from_real
+    from_extra = 0.0
+    if allow_probe:
+        from_extra = min(extra_pool, max(0.0, power_used - from_real))
+        extra_pool -= from_extra
+    return real_pool, extra_pool, from_extra
+
+
+def _finalize_run(entry_data, excess_power, remaining_power, prev_status=None):
+    """Update global state and prepare for dispatcher signal.
+
+    Devices whose status entry or allocation differ from ``prev_status`` (last
+    pass's entries) are added to ``distribution_changed``, the delta the
+    power_distribution sensor drains on its next update.
+    """
     epsilon = 1e-9
     allocation = entry_data.get(CONF_POWER_ALLOCATION, {}).copy()
     for k, v in allocation.items():
@@ -740,15 +985,106 @@ def _finalize_run(entry_data, excess_power, remaining_power):
 
     _finalize_device_status(entry_data)
 
+    allocation = {k: round(v, 1) for k, v in allocation.items()}
+    prev_allocation = (entry_data.get(CONF_POWER_DISTRIBUTION) or {}).get("allocation", {})
+    prev_status = prev_status or {}
+    device_status = entry_data["device_status"]
+    changed = entry_data.setdefault("distribution_changed", set())
+    changed.update(
+        dev_id for dev_id in device_status.keys() | prev_status.keys()
+        if device_status.get(dev_id) != prev_status.get(dev_id)
+    )
+    changed.update(
+        dev_id for dev_id in allocation.keys() | prev_allocation.keys()
+        if allocation.get(dev_id) != prev_allocation.get(dev_id)
+    )
+
     entry_data[CONF_POWER_DISTRIBUTION] = {
         "total_power": round(excess_power, 1),
         "remaining_power": round(remaining_power, 1),
         "allocated_power": round(excess_power - remaining_power, 1),
-        "allocation": {k: round(v, 1) for k, v in allocation.items()},
+        "allocation": allocation,
     }
 
 
-def _sync_initial_device_states(hass, devices, device_on_state, entry_data) -> None:
+def _account_energy(hass, config_entry, entry_data, devices, device_sensor_cache, now):
+    """Integrate this cycle's per-device power into the diverted-energy totals.
+
+    Uses the device's actual-power sensor reading (from the per-cycle cache) when
+    one is configured and readable, otherwise the allocated watts. A device only
+    counts while it holds an allocation, so manually-driven loads are not credited.
+    Hands the accumulators to the restore store every cycle; the store batches
+    the file writes.
+    """
+    allocation = entry_data.get(CONF_POWER_DISTRIBUTION, {}).get("allocation", {})
+    powers_w: dict[str, float] = {}
+    for device in devices:
+        device_id = device.get(CONF_DEVICE_ID)
+        allocated_w = float(allocation.get(device_id, 0.0) or 0.0)
+        if allocated_w <= 0.0:
+            continue
+        sensor = device.get(CONF_DEVICE_ACTUAL_POWER_SENSOR)
+        measured_w, ok = device_sensor_cache.get(sensor, (0.0, False)) if sensor else (0.0, False)
+        powers_w[device_id] = max(0.0, measured_w) if ok else allocated_w
+
+    state = entry_data.setdefault("energy_state", energy.initial_state())
+    now_ts = now.timestamp()
+    energy.integrate_cycle(
+        state, powers_w, now_ts, max_gap_s=ENERGY_MAX_INTEGRATION_GAP_SECONDS
+    )
+    persist_learned_state(hass, config_entry, **learned_state_snapshot(entry_data))
+
+
+def learned_state_snapshot(entry_data) -> dict:
+    """Copy the energy totals and learned models for ``persist_learned_state``.
+
+    The models keep being updated in place, so the store gets its own copies.
+    """
+    return {
+        "energy": energy.to_storage(entry_data.get("energy_state") or energy.initial_state()),
+        "draw_model": {
+            k: dict(v) for k, v in entry_data.get("draw_model", {}).items()
+        },
+        "power_curves": {
+            k: {"w": list(v["w"]), "n": list(v["n"])}
+            for k, v in entry_data.get("power_curves", {}).items()
+        },
+        "mppt_calibration": {
+            k: {"theta": list(v["theta"]), "p": list(v["p"]), "n": v["n"]}
+            for k, v in entry_data.get("mppt_calibration", {}).items()
+        },
+        "probe_prior": {
+            k: dict(v) for k, v in entry_data.get("probe_prior", {}).items()
+        },
+    }
+
+
+def _learn_device_draw(entry_data, devices, device_sensor_cache) -> None:
+    """Fold this cycle's measured on-state draw into the per-device EWMA.
+
+    Only devices commanded fully on (100 %) whose actual-power sensor reads at or
+    above the idle threshold are sampled, so idle, ramping and proportional
+    partial loads never drag the estimate down.
+    """
+    model = entry_data.setdefault("draw_model", draw_model.initial_model())
+    for device in devices:
+        sensor = device.get(CONF_DEVICE_ACTUAL_POWER_SENSOR)
+        if not sensor:
+            continue
+        status = entry_data["device_status"].get(device.get(CONF_DEVICE_ID)) or {}
+        if not status.get("is_enabled") or status.get("percent_target", 0.0) < MAX_PERCENTAGE:
+            continue
+        measured_w, ok = device_sensor_cache.get(sensor, (0.0, False))
+        threshold = float(
+            device.get(CONF_DEVICE_ACTUAL_POWER_THRESHOLD_W) or DEFAULT_ACTUAL_POWER_THRESHOLD_W
+        )
+        if ok and measured_w >= threshold:
+            draw_model.observe(
+                model, device.get(CONF_DEVICE_ID), measured_w, alpha=DRAW_MODEL_ALPHA
+            )
+
+
+def _sync_initial_device_states(hass, devices, device_on_state, entry_data, snapshot=None) -> None:
     """First-run-after-startup sync of ``device_on_state`` from actual HA entity states.
 
     Without this, every device defaults to ``False`` (off) on a fresh
@@ -757,12 +1093,13 @@ def _sync_initial_device_states(hass, devices, device_on_state, entry_data) -> N
     """
     if entry_data.get("_device_on_state_initialized"):
         return
+    states = snapshot if snapshot is not None else hass.states
     for _dev in devices:
         _dev_id = _dev.get(CONF_DEVICE_ID)
         _relay, _ = parse_relay_entity(_dev.get(CONF_DEVICE_ENTITY))
         if not _relay or "." not in _relay:
             continue
-        _state = hass.states.get(_relay)
+        _state = states.get(_relay)
         if _state is None or _state.state in (STATE_UNKNOWN, STATE_UNAVAILABLE):
             continue
         _domain = _relay.split(".")[0]
@@ -772,38 +1109,54 @@ def _sync_initial_device_states(hass, devices, device_on_state, entry_data) -> N
     entry_data["_device_on_state_initialized"] = True
 
 
-def _compute_proportional_allocations(
-    devices, device_status, remaining_power, device_on_state, device_debounce_state, cfg, now
-) -> dict:
-    """Pre-allocate excess across active proportional ESPHome devices for STRATEGY_DISTRIBUTE_EVENLY.
+def _build_allocation_view(
+    devices, device_status, device_on_state, device_debounce_state, prev_allocation,
+    real_pool, extra_pool, cfg, now,
+) -> AllocationView:
+    """Immutable per-pass view the allocation strategy plans on.
 
-    Each active proportional device gets a share of ``remaining_power``
-    weighted by its ``max_expected_w``. Inactive devices and non-proportional
-    custom devices are excluded from the pool.
+    ``would_run`` is the on/off threshold (with hysteresis) against the whole
+    budget. For proportional ESPHome devices it is the full debounce-aware
+    decision, evaluated on copies of the state so the pass itself is unaffected.
     """
-    proportional_devices = []
-    total_max_w = 0.0
+    budget = real_pool + extra_pool
+    hysteresis_w = float(cfg.get(CONF_HYSTERESIS_W, DEFAULT_HYSTERESIS_W))
+    on_state_copy = dict(device_on_state)
+    debounce_copy = {k: dict(v) for k, v in device_debounce_state.items()}
+    views = []
     for device in devices:
         device_id = device.get(CONF_DEVICE_ID)
-        status_entry = device_status.get(device_id)
-        if (
+        status_entry = device_status.get(device_id) or {}
+        min_w = float(status_entry.get(CONF_DEVICE_MIN_EXPECTED_W, 0) or 0)
+        running = bool(device_on_state.get(device_id, False))
+        proportional = (
             device.get(CONF_DEVICE_TYPE) == DEVICE_TYPE_CUSTOM
-            and status_entry
             and status_entry.get("mode") == RELAY_MODE_PROPORTIONAL
-        ):
-            is_active, _ = _calculate_device_state(
-                device, remaining_power, device_on_state, device_debounce_state, cfg, now
+        )
+        if proportional:
+            would_run, _ = _calculate_device_state(
+                device, budget, on_state_copy, debounce_copy, cfg, now
             )
-            if is_active:
-                proportional_devices.append((device_id, status_entry["max_expected_w"]))
-                total_max_w += status_entry["max_expected_w"]
-
-    if total_max_w <= 0:
-        return {}
-    return {
-        device_id: remaining_power * (max_w / total_max_w)
-        for device_id, max_w in proportional_devices
-    }
+        else:
+            would_run = budget >= (max(0.0, min_w - hysteresis_w) if running else min_w)
+        draw_w = float(prev_allocation.get(device_id, 0.0) or 0.0) if running else 0.0
+        views.append(DeviceView(
+            device_id=device_id,
+            priority=int(device.get(CONF_DEVICE_PRIORITY, 50)),
+            min_w=min_w,
+            max_w=float(status_entry.get(CONF_DEVICE_MAX_EXPECTED_W, 0) or 0),
+            draw_w=draw_w if draw_w > 0 else min_w,
+            proportional=proportional,
+            running=running,
+            would_run=bool(would_run),
+            allow_probe=status_entry.get("allow_probe", True) is not False,
+        ))
+    return AllocationView(
+        devices=tuple(views),
+        real_w=real_pool,
+        extra_w=extra_pool,
+        switching_cost_w=float(cfg.get(CONF_SWITCHING_COST_W, DEFAULT_SWITCHING_COST_W)),
+    )
 
 
 def _record_grace_deadline(hass, config_entry, device_on_time_state, device_id, now, startup_grace):
@@ -813,12 +1166,12 @@ def _record_grace_deadline(hass, config_entry, device_on_time_state, device_id,
     log_debug(
         f"[grace] Startup grace period set for {device_id}: {startup_grace}s until {startup_until}"
     )
-    hass.async_create_task(persist_grace_state(hass, config_entry, device_id, startup_until))
+    persist_grace_state(hass, config_entry, device_id, startup_until)
 
 
 def _clear_grace_deadline(hass, config_entry, device_on_time_state, device_id):
     device_on_time_state.get(device_id, {}).pop("startup_until", None)
-    hass.async_create_task(persist_grace_state(hass, config_entry, device_id, None))
+    persist_grace_state(hass, config_entry, device_id, None)
 
 
 def _apply_min_on_time(
@@ -852,7 +1205,7 @@ def _apply_min_on_time(
     device_on_time_state.setdefault(device_id, {})["last_off_time"] = now
     device_on_time_state[device_id].pop("last_on_time", None)
     device_on_time_state[device_id].pop("startup_until", None)
-    hass.async_create_task(persist_grace_state(hass, config_entry, device_id, None))
+    persist_grace_state(hass, config_entry, device_id, None)
     status_entry["last_off_time"] = now
     return is_active
 
@@ -891,8 +1244,9 @@ def _apply_startup_grace(
 
 async def _dispatch_device_control(
     hass, device, is_active, prev_on, status_entry, cfg, device_on_state,
-    strategy, proportional_allocations, remaining_power, device_sensor_cache=None,
-    device_on_time_state=None, now=None,
+    plan, remaining_power, device_sensor_cache=None,
+    device_on_time_state=None, now=None, snapshot=None, entry_data=None, batch=None,
+    hold=None,
 ):
     """Forward to the per-type control coroutine and return ``(power_used, status_entry)``."""
     device_id = device.get(CONF_DEVICE_ID)
@@ -902,19 +1256,18 @@ async def _dispatch_device_control(
         return await _control_standard_device(
             hass, device, is_active, prev_on, remaining_power, cfg, status_entry,
             device_on_state, device_sensor_cache=device_sensor_cache,
-            device_on_time_state=device_on_time_state, now=now,
+            device_on_time_state=device_on_time_state, now=now, snapshot=snapshot,
+            hold=hold,
         )
 
     if device_type == DEVICE_TYPE_CUSTOM:
-        # Under DISTRIBUTE_EVENLY a device not pre-allocated as proportional must
-        # NOT consume the entire remaining budget. Under FILL_ONE_BY_ONE the next
-        # device greedily takes whatever is still left.
-        if strategy == STRATEGY_DISTRIBUTE_EVENLY:
-            power_to_allocate = proportional_allocations.get(device_id, 0.0)
-        else:
-            power_to_allocate = proportional_allocations.get(device_id, remaining_power)
+        # The strategy's share for this device; without one it takes whatever is
+        # still left (fill) or nothing (distribute), as the plan says.
+        power_to_allocate = plan.power_to_allocate(device_id, remaining_power)
         return await _control_custom_device(
             hass, device, is_active, prev_on, power_to_allocate, cfg, status_entry, device_on_state,
+            snapshot=snapshot, entry_data=entry_data,
+            device_sensor_cache=device_sensor_cache, now=now, batch=batch, hold=hold,
         )
 
     return 0.0, status_entry
@@ -922,8 +1275,9 @@ async def _dispatch_device_control(
 
 async def _control_one_device(
     hass, config_entry, device, *,
-    cfg, entry_data, now, strategy, proportional_allocations, remaining_power, battery_soc,
-    battery_soc_configured=False, device_sensor_cache=None,
+    cfg, entry_data, now, plan, remaining_power, battery_soc,
+    battery_soc_configured=False, device_sensor_cache=None, snapshot=None, batch=None,
+    hold=None,
 ):
     """Run the full per-device control pipeline for one cycle.
 
@@ -942,7 +1296,7 @@ async def _control_one_device(
     device_debounce_state = entry_data["device_debounce_state"]
     device_on_time_state = entry_data["device_on_time_state"]
 
-    filter_reason = await _filter_device(hass, device, now)
+    filter_reason = await _filter_device(hass, device, now, snapshot)
     log_debug(f"Filter reason for {device_id}: {filter_reason}")
 
     if entry_data.get("device_retry_failed", {}).get(device_id):
@@ -958,7 +1312,7 @@ async def _control_one_device(
 
     # Reconcile expected vs actual; "give_up" = unresponsive ON beyond max retries.
     if _detect_external_change(
-        hass, device, device_id, entry_data, status_entry, device_on_state, now
+        hass, device, device_id, entry_data, status_entry, device_on_state, now, snapshot
     ) == "give_up":
         return 0.0
 
@@ -999,9 +1353,10 @@ async def _control_one_device(
     log_debug(f"Control logic for {device_id}: prev_on={prev_on}, prev_on_before_calc={prev_on_before_calc}")
     power_used, _ = await _dispatch_device_control(
         hass, device, is_active, prev_on, status_entry, cfg, device_on_state,
-        strategy, proportional_allocations, remaining_power,
+        plan, remaining_power,
         device_sensor_cache=device_sensor_cache,
-        device_on_time_state=device_on_time_state, now=now,
+        device_on_time_state=device_on_time_state, now=now, snapshot=snapshot,
+        entry_data=entry_data, batch=batch, hold=hold,
     )
 
     if device_id and is_active != prev_on_before_calc:
@@ -1012,9 +1367,24 @@ async def _control_one_device(
 
 
 async def process_excess_power(
-    hass: HomeAssistant, config_entry: ConfigType, excess_power: float
+    hass: HomeAssistant,
+    config_entry: ConfigType,
+    excess_power: float,
+    only_devices: set[str] | None = None,
+    shed_first: bool = False,
 ) -> None:
-    """Process excess power value and control devices accordingly."""
+    """Process excess power value and control devices accordingly.
+
+    ``only_devices`` limits the control pipeline to those device ids (a deadline
+    re-run, see core/deadlines.py). The other devices are not re-evaluated: they
+    keep their previous allocation, which is still subtracted from the pools in
+    priority order so the re-run devices see the same budget a full pass would.
+
+    A large budget drop raises ``_preempt`` (core/preemption.py); the pass then
+    stops at the next device boundary and the devices it has not reached keep
+    their previous status and allocation. ``shed_first`` (the re-plan after such
+    a drop) sends every turn-off and reduction before any command that adds load.
+    """
     log_debug(f"--- process_excess_power START, excess_power={excess_power} ---")
     now = dt_util.now()
     entry_data = hass.data[DOMAIN][config_entry.entry_id]
@@ -1025,22 +1395,44 @@ async def process_excess_power(
     entry_data.setdefault("device_debounce_state", {})
     entry_data.setdefault("device_on_time_state", {})
 
-    auto_control_devices = _initialize_run(entry_data, cfg.get(CONF_DEVICES, []))
-    _sync_initial_device_states(hass, auto_control_devices, device_on_state, entry_data)
+    # Last pass's allocation (zeroed below) is the strategy's estimate of what a
+    # running device draws.
+    prev_allocation = dict(entry_data.get(CONF_POWER_ALLOCATION, {}))
+    auto_control_devices = _initialize_run(
+        entry_data,
+        auto_control.effective_devices(entry_data, cfg.get(CONF_DEVICES, [])),
+        only_devices,
+    )
+    # One consistent read of every entity this pass references (relays, mode
+    # selects, actual-power sensors, schedule helpers, SOC); every step below reads
+    # from it instead of the live state machine.
+    snapshot = CycleSnapshot.collect(hass, cfg, auto_control_devices)
+    _sync_initial_device_states(
+        hass, auto_control_devices, device_on_state, entry_data, snapshot
+    )
     log_debug(f"auto_control_devices: {auto_control_devices}")
 
+    # Status entries are replaced below, so last pass's are kept intact for the
+    # power_distribution delta (see _finalize_run).
+    prev_status = dict(entry_data["device_status"])
     for device in auto_control_devices:
         device_id = device.get(CONF_DEVICE_ID)
-        entry_data["device_status"][device_id] = _initialize_status_entry(hass, device)
+        # Untouched devices of a partial re-run keep last pass's status entry.
+        if (
+            only_devices is None
+            or device_id in only_devices
+            or device_id not in entry_data["device_status"]
+        ):
+            entry_data["device_status"][device_id] = _initialize_status_entry(
+                hass, device, snapshot
+            )
 
-    # Pre-read all per-device sensors once per cycle to avoid redundant state
-    # lookups when multiple devices share the same entity (e.g. a shared power
-    # meter), and to give every device a consistent snapshot of the same instant.
+    # Parse every actual-power sensor once per cycle (shared meters are read once).
     device_sensor_cache: dict[str, tuple[float, bool]] = {}
     for _dev in auto_control_devices:
         _sensor = _dev.get(CONF_DEVICE_ACTUAL_POWER_SENSOR)
         if _sensor and _sensor not in device_sensor_cache:
-            device_sensor_cache[_sensor] = get_sensor_state_safely(hass, _sensor, "Actual Power")
+            device_sensor_cache[_sensor] = snapshot.sensor_value(_sensor, "Actual Power")
 
     # Probe budget (mppt_probe). ABSOLUTE model: probe_headroom_w is the discovered
     # sustainable controllable-load budget, NOT an increment on the (volatile)
@@ -1071,44 +1463,85 @@ async def process_excess_power(
     real_pool = max(0.0, excess_power)
     extra_pool = max(0.0, probe_headroom_w - real_pool)
     starting_budget = real_pool + extra_pool  # == max(excess, headroom); finalize total
-    strategy = cfg.get(CONF_DEVICE_ALLOCATION_STRATEGY, STRATEGY_FILL_ONE_BY_ONE)
-    battery_soc = _read_battery_soc(hass, cfg)
+    battery_soc = _read_battery_soc(hass, cfg, snapshot)
     battery_soc_configured = bool(cfg.get(CONF_BATTERY_SOC_SENSOR))
-    proportional_allocations: dict = {}
-    if strategy == STRATEGY_DISTRIBUTE_EVENLY:
-        proportional_allocations = _compute_proportional_allocations(
+    probe_funded_w = 0.0
+    # The configured strategy (core/strategies.py) proposes the visiting order,
+    # proportional shares and the devices to leave off; the per-device pipeline
+    # below still applies every gate.
+    plan = plan_allocation(
+        cfg.get(CONF_DEVICE_ALLOCATION_STRATEGY, STRATEGY_FILL_ONE_BY_ONE),
+        _build_allocation_view(
             auto_control_devices,
             entry_data["device_status"],
-            starting_budget,
-            dict(entry_data["device_on_state"]),
-            {k: dict(v) for k, v in entry_data["device_debounce_state"].items()},
-            cfg, now,
-        )
-
-    for device in auto_control_devices:
-        status_entry = entry_data["device_status"].get(device.get(CONF_DEVICE_ID))
-        allow_probe = status_entry.get("allow_probe", True) if status_entry else True
+            entry_data["device_on_state"],
+            entry_data["device_debounce_state"],
+            prev_allocation, real_pool, extra_pool, cfg, now,
+        ),
+    )
+    # Channel percents of multi-channel ESPHome nodes, sent once per node below.
+    batch = ChannelBatch()
+    hold = TurnOnHold(prev_allocation) if shed_first else None
+    ordered_devices = auto_control_devices
+    if plan.order is not None:
+        by_id = {d.get(CONF_DEVICE_ID): d for d in auto_control_devices}
+        ordered_devices = [by_id[i] for i in plan.order if i in by_id]
+
+    for index, device in enumerate(ordered_devices):
+        if entry_data.get("_preempt"):
+            kept = _keep_unvisited(
+                entry_data, ordered_devices[index:], prev_allocation, prev_status
+            )
+            for kept_id, kept_w in kept.items():
+                real_pool, extra_pool, from_extra = _draw_from_pools(
+                    kept_w, real_pool, extra_pool, _allows_probe(entry_data, kept_id)
+                )
+                probe_funded_w += from_extra
+            entry_data["preempted_runs"] = entry_data.get("preempted_runs", 0) + 1
+            log_debug(f"Pass preempted by a budget drop before {device.get(CONF_DEVICE_ID)}")
+            break
+        device_id = device.get(CONF_DEVICE_ID)
+        allow_probe = _allows_probe(entry_data, device_id)
         # Opt-out devices may draw only from the real (cautious) pool, never from
         # speculative probe headroom.
-        device_budget = real_pool + (extra_pool if allow_probe else 0.0)
-        power_used = await _control_one_device(
-            hass, config_entry, device,
-            cfg=cfg, entry_data=entry_data, now=now, strategy=strategy,
-            proportional_allocations=proportional_allocations,
-            remaining_power=device_budget,
-            battery_soc=battery_soc,
-            battery_soc_configured=battery_soc_configured,
-            device_sensor_cache=device_sensor_cache,
+        device_budget = plan.device_budget(
+            device_id, real_pool + (extra_pool if allow_probe else 0.0)
+        )
+        if only_devices is not None and device_id not in only_devices:
+            power_used = float(
+                entry_data[CONF_POWER_ALLOCATION].get(device_id, 0.0) or 0.0
+            )
+        else:
+            power_used = await _control_one_device(
+                hass, config_entry, device,
+                cfg=cfg, entry_data=entry_data, now=now, plan=plan,
+                remaining_power=device_budget,
+                battery_soc=battery_soc,
+                battery_soc_configured=battery_soc_configured,
+                device_sensor_cache=device_sensor_cache,
+                snapshot=snapshot,
+                batch=batch,
+                hold=hold,
+            )
+        real_pool, extra_pool, from_extra = _draw_from_pools(
+            power_used, real_pool, extra_pool, allow_probe
         )
-        # Consume the real pool first, then (for probe-allowed devices) the extra.
-        from_real = min(power_used, real_pool)
-        real_pool -= from_real
-        if allow_probe:
-            extra_pool = max(0.0, extra_pool - (power_used - from_real))
+        probe_funded_w += from_extra
         log_debug(
             f"Power used by {device.get(CONF_DEVICE_ID)}: {power_used}, "
             f"real_pool: {real_pool}, extra_pool: {extra_pool}"
         )
 
-    _finalize_run(entry_data, starting_budget, real_pool + extra_pool)
+    await batch.async_flush(hass)
+    if hold is not None:
+        record_shed_latency(entry_data)
+        await hold.async_release(hass)
+    _finalize_run(entry_data, starting_budget, real_pool + extra_pool, prev_status)
+    # Load funded by speculative probe headroom: the probe tick attributes battery
+    # discharge up to this many watts to probing (energy accounting).
+    entry_data["probe_funded_w"] = probe_funded_w
+    _learn_device_draw(entry_data, auto_control_devices, device_sensor_cache)
+    _account_energy(
+        hass, config_entry, entry_data, auto_control_devices, device_sensor_cache, now
+    )
     async_dispatcher_send(hass, f"{SIGNAL_POWER_DISTRIBUTION_UPDATED}_{config_entry.entry_id}")
@@ -0,0 +1,79 @@
+"""Preemption of allocation passes on large budget drops.
+
+Passes are serialized (see ``_queue_process_excess_power``), and a pass awaits
+one service call per device it switches. A drop in excess that arrives while a
+slow pass is running used to wait for the whole pass, turn-ons included, before
+any load was shed, leaving the battery to cover the gap. Now a trigger that
+lowers the budget by more than ``PREEMPT_DROP_THRESHOLD_W`` raises a flag the
+running pass checks before each device: it stops there, leaves the devices it
+has not reached as they were, and the queue re-plans on the new value at once.
+
+That re-plan (and any pass started by such a drop) is *shed-first*: commands
+that add load are held in a ``TurnOnHold`` and sent only after every turn-off
+and reduction of the pass. Channels of multi-channel ESPHome nodes are split
+the same way: their reductions go out in the pass's channel batch, their
+increases in a second push from the hold. The time from the drop to the last
+shed command is kept as ``shed_latency_ms``.
+"""
+
+from __future__ import annotations
+
+import time
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Mapping
+
+from homeassistant.core import HomeAssistant
+
+from .channel_batch import ChannelBatch
+from .settings import PREEMPT_DROP_THRESHOLD_W
+
+
+def note_budget_drop(entry_data: Dict[str, Any], excess_power: float) -> bool:
+    """Flag ``excess_power`` if it is a large drop; ``True`` if it is one.
+
+    The reference is the value the running pass started from, or the last
+    pass's when none is running. The first unshed drop starts the latency clock.
+    """
+    reference = entry_data.get("_run_excess")
+    if reference is None or reference - excess_power <= PREEMPT_DROP_THRESHOLD_W:
+        return False
+    entry_data["_preempt"] = True
+    entry_data.setdefault("_shed_requested_at", time.monotonic())
+    return True
+
+
+def record_shed_latency(entry_data: Dict[str, Any]) -> None:
+    """Close the latency clock once a shed-first pass has sent its sheds."""
+    requested = entry_data.pop("_shed_requested_at", None)
+    if requested is not None:
+        entry_data["shed_latency_ms"] = round((time.monotonic() - requested) * 1000.0, 1)
+
+
+class TurnOnHold:
+    """Load-adding commands of a shed-first pass, sent after its sheds.
+
+    ``batch`` collects the load-adding channel percents; it is pushed after the
+    held commands.
+    """
+
+    __slots__ = ("_prev_allocation", "_held", "batch")
+
+    def __init__(self, prev_allocation: Mapping[str, float]) -> None:
+        self._prev_allocation = prev_allocation
+        self._held: List[Callable[[], Awaitable[None]]] = []
+        self.batch = ChannelBatch()
+
+    def adds_load(self, device_id: str, power_w: float) -> bool:
+        """Whether ``power_w`` is more than the device was allocated last pass."""
+        return power_w > float(self._prev_allocation.get(device_id, 0.0) or 0.0)
+
+    def hold(self, command: Callable[..., Awaitable[None]], *args: Any) -> None:
+        """Keep ``command(*args)`` for ``async_release``."""
+        self._held.append(partial(command, *args))
+
+    async def async_release(self, hass: HomeAssistant) -> None:
+        """Send the held commands in pass order, then the held channel percents."""
+        held, self._held = self._held, []
+        for command in held:
+            await command()
+        await self.batch.async_flush(hass)
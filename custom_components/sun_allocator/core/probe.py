@@ -36,7 +36,7 @@ attributes, which the write-deadband freezes while excess is pinned at 0).
 
 from __future__ import annotations
 
-from typing import Any, Dict, Iterable, Optional
+from typing import Any, Dict, Iterable, Optional, Tuple
 
 from ..const import (
     CALC_METHOD_MPPT_PROBE,
@@ -46,6 +46,7 @@ from ..const import (
     PROBE_MAX_HEADROOM_W,
     PROBE_SOC_BACKOFF_DROP,
     PROBE_BACKOFF_STREAK,
+    PROBE_FAST_BACKOFF_WH,
     PROBE_START_GATE_FACTOR,
     BATTERY_CHARGE_IDLE_W,
     RELAY_MODE_PROPORTIONAL,
@@ -109,10 +110,8 @@ def growth_target_present(
     for st in status_entries:
         if st.get("allow_probe") is False:
             continue
-        refusals = st.get("refusal_reasons") or []
-        if not st.get("is_enabled") and not refusals and not st.get("is_active_candidate"):
-            need = float(st.get(CONF_DEVICE_MIN_EXPECTED_W, 0) or 0)
-            if untapped_w is not None and need > factor * max(0.0, float(untapped_w)):
+        if _is_waiting(st):
+            if not _passes_start_gate(st, untapped_w, factor):
                 continue  # too big for the plausible curtailed headroom — don't chase
             return True
         if (
@@ -124,6 +123,54 @@ def growth_target_present(
     return False
 
 
+def _is_waiting(st: Dict[str, Any]) -> bool:
+    """Not enabled, not refused, not a candidate → gated solely by the budget."""
+    return (
+        not st.get("is_enabled")
+        and not (st.get("refusal_reasons") or [])
+        and not st.get("is_active_candidate")
+    )
+
+
+def _passes_start_gate(st: Dict[str, Any], untapped_w: Optional[float], factor: float) -> bool:
+    need = float(st.get(CONF_DEVICE_MIN_EXPECTED_W, 0) or 0)
+    return untapped_w is None or need <= factor * max(0.0, float(untapped_w))
+
+
+def jump_target_w(
+    status_entries_by_id: Dict[str, Dict[str, Any]],
+    learned_w_by_id: Dict[str, float],
+    untapped_w: Optional[float] = None,
+    factor: float = PROBE_START_GATE_FACTOR,
+) -> Optional[float]:
+    """Headroom at which the next waiting device would run at its real draw.
+
+    Picks the highest-priority probe-eligible device that is waiting only for
+    surplus (same start-gate as ``growth_target_present``) and returns the load
+    already allocated to running probe-eligible devices plus that device's learned
+    draw (never below its declared minimum). ``None`` when the next device has no
+    learned draw yet — the probe then keeps its blind steps.
+    """
+    waiting = [
+        (did, st) for did, st in status_entries_by_id.items()
+        if st.get("allow_probe") is not False
+        and _is_waiting(st)
+        and _passes_start_gate(st, untapped_w, factor)
+    ]
+    if not waiting:
+        return None
+    did, st = max(waiting, key=lambda item: int(item[1].get("priority", 50) or 50))
+    learned = learned_w_by_id.get(did)
+    if learned is None:
+        return None
+    running = sum(
+        float(other.get("allocated_w", 0) or 0)
+        for other in status_entries_by_id.values()
+        if other.get("is_enabled") and other.get("allow_probe", True) is not False
+    )
+    return running + max(learned, float(st.get(CONF_DEVICE_MIN_EXPECTED_W, 0) or 0))
+
+
 def running_controllable_floor_w(
     status_entries_by_id: Dict[str, Dict[str, Any]],
     on_state: Dict[str, Any],
@@ -166,6 +213,23 @@ def initial_state() -> Dict[str, Any]:
     }
 
 
+def _backed_off_state(
+    headroom: float,
+    failures: int,
+    battery_soc: Optional[float],
+    now_ts: float,
+    step_w: float,
+) -> Dict[str, Any]:
+    """Back off below the offending level, lower the ceiling, start the cooldown."""
+    backed = max(0.0, headroom - step_w)
+    return {
+        "headroom_w": backed, "ceiling_w": backed,
+        "baseline_soc": battery_soc, "last_backoff_ts": now_ts,
+        "discharge_streak": 0, "failure_count": min(failures + 1, 6),
+        "backed_off": True,
+    }
+
+
 def forecast_target_w(
     forecast_untapped_w: Optional[float], max_headroom_w: float
 ) -> Optional[float]:
@@ -203,6 +267,7 @@ def plan_headroom(
     approach_fraction: float = 0.0,
     sharing_soc: float = 0.0,
     floor_w: float = 0.0,
+    jump_to_w: Optional[float] = None,
 ) -> Dict[str, Any]:
     """Pure scalar controller for one probe tick. Returns the new probe state
     ``{headroom_w, ceiling_w, baseline_soc, last_backoff_ts, discharge_streak,
@@ -234,6 +299,12 @@ def plan_headroom(
     measured ceiling and may exceed ``target_w``. The floor is **not** applied while
     the battery is discharging (the running load may not be free → it must be free to
     back off below it) nor while charge is being released to the battery.
+
+    ``jump_to_w`` (see ``jump_target_w``) is the level at which the next waiting
+    device runs at its learned real draw. When it lies above the current headroom
+    the growth step goes straight there (still capped, and validated against the
+    battery on the next tick like any other step) instead of crawling up in
+    ``step_w`` increments; ``None`` keeps the blind / forecast step.
     """
     st = state or initial_state()
     headroom = float(st.get("headroom_w", 0.0))
@@ -299,13 +370,7 @@ def plan_headroom(
         # which lengthens the (adaptive) cooldown so a load that cannot be sustained
         # is retried less and less often instead of cycling. backed_off=True signals
         # the caller (a forecast target was overshot — the forecast was optimistic).
-        backed = max(0.0, headroom - step_w)
-        return {
-            "headroom_w": backed, "ceiling_w": backed,
-            "baseline_soc": battery_soc, "last_backoff_ts": now_ts,
-            "discharge_streak": 0, "failure_count": min(failures + 1, 6),
-            "backed_off": True,
-        }
+        return _backed_off_state(headroom, failures, battery_soc, now_ts, step_w)
 
     # Battery healthy. Adaptive cooldown: base × 2**failures, capped — repeated
     # failures back the retry off exponentially. After it elapses the ceiling
@@ -332,6 +397,8 @@ def plan_headroom(
             step = max(step_w, approach_fraction * (cap - headroom))
         else:
             step = step_w
+        if jump_to_w is not None:
+            step = max(step, float(jump_to_w) - headroom)
         grown = max(min(cap, headroom + step), float(floor_w))
         return {
             "headroom_w": grown, "ceiling_w": ceiling,
@@ -350,3 +417,59 @@ def plan_headroom(
         "discharge_streak": 0, "failure_count": 0 if held > 0 else failures,
         "backed_off": False,
     }
+
+
+def initial_fast_state() -> Dict[str, Any]:
+    """Fresh fast-lane integrator state."""
+    return {"deficit_wh": 0.0, "deficit_w": 0.0, "last_ts": None}
+
+
+def fast_lane_step(
+    fast_state: Optional[Dict[str, Any]],
+    probe_state: Optional[Dict[str, Any]],
+    *,
+    net_charge_w: float,
+    battery_soc: Optional[float],
+    discharge_tolerance_w: float,
+    now_ts: float,
+    trip_wh: float = PROBE_FAST_BACKOFF_WH,
+    step_w: float = PROBE_STEP_W,
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Feed one battery-power reading into the event-driven back-off lane.
+
+    The dwell timer needs ``PROBE_BACKOFF_STREAK`` ticks of discharge before it
+    backs off, so an overshoot can drain the battery for a minute or more. This
+    lane runs on every battery-power state change instead: it integrates the
+    discharge beyond ``discharge_tolerance_w`` (each reading held until the next
+    one, as the sensor only reports changes) and, once ``trip_wh`` has been drawn,
+    returns the same back-off ``plan_headroom`` would apply. A short compressor
+    peak stays well under the budget; a sustained overshoot crosses it in seconds.
+
+    The integral restarts whenever a reading is back within tolerance, and only
+    runs while there is probe headroom to give back. Growth is never decided here
+    — it stays on the dwell timer, where each step is allowed to settle.
+
+    Returns ``(fast_state, probe_state_or_None)``; the second item is the new probe
+    state when the lane tripped.
+    """
+    headroom = float((probe_state or {}).get("headroom_w", 0.0) or 0.0)
+    if headroom <= 0:
+        return initial_fast_state(), None
+
+    st = fast_state or initial_fast_state()
+    deficit_wh = float(st.get("deficit_wh", 0.0))
+    last_ts = st.get("last_ts")
+    if last_ts is not None:
+        dt = max(0.0, now_ts - float(last_ts))
+        deficit_wh += float(st.get("deficit_w", 0.0)) * dt / 3600.0
+
+    deficit_w = max(0.0, -float(net_charge_w) - float(discharge_tolerance_w))
+    if deficit_w <= 0:
+        deficit_wh = 0.0
+
+    if deficit_wh >= trip_wh:
+        failures = int(probe_state.get("failure_count", 0))
+        return initial_fast_state(), _backed_off_state(
+            headroom, failures, battery_soc, now_ts, step_w
+        )
+    return {"deficit_wh": deficit_wh, "deficit_w": deficit_w, "last_ts": now_ts}, None
@@ -0,0 +1,89 @@
+"""Learned time-of-day prior for the probe's headroom.
+
+The probe (core/probe.py) starts every session from zero headroom and climbs in
+``PROBE_STEP_W`` steps, one per ``PROBE_DWELL_S`` tick. After a restart at noon
+that is minutes of curtailed surplus left on the table, even though yesterday
+at the same hour, with the battery in the same state, the same headroom held.
+
+This module keeps that knowledge as a compact prior: one EWMA of the validated
+headroom per (time-of-day bucket, SOC band). A sample is taken only from a
+*sustained hold* — the probe kept the same non-zero headroom for several ticks
+with the battery out of discharge — so it reflects what the battery actually
+validated, not what the probe merely attempted.
+
+The prior never sets the headroom directly. On restart and at the start of each
+day the probe gets one "seed": its first growth step may jump straight to the
+prior for the current bucket (as a learned device draw does, see
+``probe.jump_target_w``). That step is still capped by the forecast target and
+the ceiling, and validated against the battery on the next tick and by the fast
+back-off lane, so a stale or optimistic prior is backed off like any other step.
+
+All functions are pure and operate on a plain
+``{"<bucket>|<band>": {"w": ..., "n": ...}}`` dict that is written to the
+restore Store as-is.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Mapping, Optional
+
+
+def initial_prior() -> Dict[str, Dict[str, Any]]:
+    """Return an empty prior."""
+    return {}
+
+
+def bucket_key(
+    local_now: datetime,
+    battery_soc: Optional[float],
+    *,
+    bucket_minutes: int,
+    soc_band: float,
+) -> str:
+    """Key of the (time-of-day bucket, SOC band) cell ``local_now`` falls in.
+
+    An unknown SOC gets its own band, so systems without an SOC sensor still
+    learn a per-time-of-day prior.
+    """
+    bucket = (local_now.hour * 60 + local_now.minute) // int(bucket_minutes)
+    if battery_soc is None:
+        band = "na"
+    else:
+        band = str(int(min(100.0, max(0.0, float(battery_soc))) // soc_band))
+    return f"{bucket}|{band}"
+
+
+def record_hold(
+    prior: Dict[str, Dict[str, Any]], key: str, headroom_w: float, *, alpha: float
+) -> None:
+    """Fold one sustained-hold headroom into the cell's EWMA."""
+    cell = prior.get(key)
+    if cell is None:
+        prior[key] = {"w": round(float(headroom_w), 1), "n": 1}
+        return
+    cell["w"] = round(float(cell["w"]) + alpha * (float(headroom_w) - float(cell["w"])), 1)
+    cell["n"] = int(cell.get("n", 0)) + 1
+
+
+def seed_w(
+    prior: Mapping[str, Mapping[str, Any]], key: str, *, min_samples: int
+) -> Optional[float]:
+    """The learned headroom for ``key`` once trusted, else ``None``."""
+    cell = prior.get(key)
+    if not cell or int(cell.get("n", 0)) < min_samples:
+        return None
+    return float(cell["w"]) or None
+
+
+def from_storage(raw: Optional[Mapping[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Rebuild the prior from storage, dropping malformed cells."""
+    prior = initial_prior()
+    if not isinstance(raw, Mapping):
+        return prior
+    for key, cell in raw.items():
+        try:
+            prior[str(key)] = {"w": max(0.0, float(cell["w"])), "n": int(cell["n"])}
+        except (KeyError, TypeError, ValueError):
+            continue
+    return prior
@@ -1,6 +1,6 @@
 """Schedule handling for Sun Allocator."""
 
-from datetime import time
+from datetime import time, timedelta
 
 import homeassistant.util.dt as dt_util
 
@@ -38,20 +38,26 @@ def _ensure_time(value):
     return None
 
 
-def is_device_in_schedule(device, now=None, hass=None):
-    """Check if the device is within its scheduled time."""
+def is_device_in_schedule(device, now=None, hass=None, states=None):
+    """Check if the device is within its scheduled time.
+
+    Helper mode reads the helper entity from ``states`` (a ``hass.states``-like
+    view, e.g. the allocator's per-cycle snapshot) or ``hass.states``.
+    """
     schedule_mode = device.get(CONF_DEVICE_SCHEDULE_MODE, SCHEDULE_MODE_DISABLED)
 
     if schedule_mode == SCHEDULE_MODE_DISABLED:
         return True
 
     if schedule_mode == SCHEDULE_MODE_HELPER:
-        if hass is None:
-            return True
+        if states is None:
+            if hass is None:
+                return True
+            states = hass.states
         helper_entity = device.get(CONF_DEVICE_SCHEDULE_HELPER_ENTITY)
         if not helper_entity:
             return True
-        state = hass.states.get(helper_entity)
+        state = states.get(helper_entity)
         return state is not None and state.state == "on"
 
     # SCHEDULE_MODE_STANDARD — time-based schedule
@@ -87,3 +93,32 @@ def is_device_in_schedule(device, now=None, hass=None):
 
     # Active from start_time to end_time
     return start_time <= current_time <= end_time
+
+
+def next_schedule_change(device, now):
+    """Return the next instant a standard schedule window opens or closes.
+
+    Only the time-of-day edges are computed; an edge on a day that is not in
+    ``days_of_week`` merely causes one redundant re-evaluation. Returns ``None``
+    for disabled/helper schedules (helper changes arrive as state changes) and for
+    incomplete time settings.
+    """
+    if device.get(CONF_DEVICE_SCHEDULE_MODE, SCHEDULE_MODE_DISABLED) in (
+        SCHEDULE_MODE_DISABLED, SCHEDULE_MODE_HELPER,
+    ):
+        return None
+    start_time = _ensure_time(device.get(CONF_START_TIME))
+    end_time = _ensure_time(device.get(CONF_END_TIME))
+    if start_time is None or end_time is None or not device.get(CONF_DAYS_OF_WEEK, DAYS_OF_WEEK):
+        return None
+
+    candidates = []
+    # The window includes end_time itself, so it closes just after that minute starts.
+    for edge, offset in ((start_time, 0), (end_time, 1)):
+        at = now.replace(
+            hour=edge.hour, minute=edge.minute, second=0, microsecond=0
+        ) + timedelta(seconds=offset)
+        if at <= now:
+            at += timedelta(days=1)
+        candidates.append(at)
+    return min(candidates)
@@ -3,8 +3,9 @@
 from __future__ import annotations
 
 from homeassistant.const import ATTR_ENTITY_ID
-from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse
 
+from . import auto_control
 from .logger import log_error
 from .entity_control import set_power_for_entity, set_mode_for_entity
 
@@ -14,7 +15,9 @@ from ..const import (
     CONF_ESPHOME_MODE_SELECT_ENTITY,
     CONF_DEVICE_ENTITY,
     CONF_DEVICE_NAME,
+    CONF_DEVICE_TYPE,
     CONF_DEVICES,
+    CONF_AUTO_CONTROL_ENABLED,
 )
 
 
@@ -129,3 +132,67 @@ async def handle_set_relay_power(hass: HomeAssistant, call: ServiceCall) -> None
                 entity_id = device.get(CONF_DEVICE_ENTITY)
                 if entity_id:
                     await set_power_for_entity(hass, entity_id, power_percent)
+
+
+def build_distribution_diagnostics(hass: HomeAssistant, entry_data: dict) -> dict:
+    """Per-device configuration/visibility diagnostics of one config entry.
+
+    Formerly the ``diagnostics`` attribute of the power_distribution sensor;
+    built only on request because it checks every device entity.
+    """
+    device_status = entry_data.get("device_status", {}) or {}
+    filter_reasons = entry_data.get("device_filter_reasons", {}) or {}
+    config = entry_data.get("config", {}) or {}
+
+    def _entity_exists(eid: str | None) -> bool:
+        if not eid:
+            return False
+        # Strip |hvac_mode suffix for climate entities
+        return hass.states.get(eid.split("|")[0]) is not None
+
+    all_devices_info = []
+    for dev in config.get(CONF_DEVICES, []) or []:
+        dev_id = dev.get(CONF_DEVICE_ID)
+        entity_id = dev.get(CONF_DEVICE_ENTITY)
+        reason = None
+        if not entity_id:
+            reason = "No entity_id configured"
+        elif not _entity_exists(entity_id):
+            reason = "Entity not found in Home Assistant"
+        elif dev_id not in device_status:
+            reason = filter_reasons.get(dev_id, "Filtered (unknown reason)")
+        all_devices_info.append({
+            "device_id": dev_id,
+            "name": dev.get(CONF_DEVICE_NAME),
+            "entity_id": entity_id,
+            "type": dev.get(CONF_DEVICE_TYPE),
+            "auto_control": auto_control.is_enabled(entry_data, dev),
+            "auto_control_configured": dev.get(CONF_AUTO_CONTROL_ENABLED, "missing"),
+            "in_device_status": (dev_id in device_status) if dev_id else False,
+            "reason": reason,
+        })
+
+    return {
+        "all_devices_info": all_devices_info,
+        "visible_devices": list(device_status),
+        "not_found_entities": [
+            info["entity_id"] for info in all_devices_info
+            if info["entity_id"] and not _entity_exists(info["entity_id"])
+        ],
+        "device_count": len(all_devices_info),
+        "visible_count": len(device_status),
+        "raw_data_keys": [str(key) for key in entry_data],
+    }
+
+
+async def handle_get_diagnostics(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Handle the get_diagnostics service call: diagnostics per config entry."""
+    wanted = call.data.get("entry_id")
+    entries = {}
+    for entry_id, entry_data in hass.data.get(DOMAIN, {}).items():
+        if entry_id.startswith("_") or not isinstance(entry_data, dict):
+            continue
+        if wanted and entry_id != wanted:
+            continue
+        entries[entry_id] = build_distribution_diagnostics(hass, entry_data)
+    return {"entries": entries}
@@ -27,4 +27,115 @@ DEVICE_MAX_PERCENT_DEFAULT = 90.0
 # that keep oscillating across the threshold (e.g. kettle cycling).
 COUNTER_DEBOUNCE_FRACTION = 0.5
 
+# Startup restore: how many devices are restored concurrently after an HA
+# restart, and how long the first allocation pass waits for that restore to
+# finish before running anyway.
+RESTORE_MAX_CONCURRENCY = 8
+RESTORE_READY_TIMEOUT_SECONDS = 120
+# Writes to the per-entry restore store are batched: the file is written this
+# long after the first unsaved change (and on HA shutdown / entry unload).
+RESTORE_SAVE_DELAY_SECONDS = 10
+
+# Diverted-energy accounting (core/energy.py). Gaps between allocation cycles
+# longer than this are not integrated (restart / watchdog stand-down).
+ENERGY_MAX_INTEGRATION_GAP_SECONDS = 300
+
+# Learned device draw (core/draw_model.py): EWMA weight of each new on-state
+# reading, and how many readings a device needs before the probe trusts it.
+DRAW_MODEL_ALPHA = 0.2
+DRAW_MODEL_MIN_SAMPLES = 3
+
+# Proportional closed loop (per-device power_feedback): PI gains on the
+# target-vs-actual error in percent of max_expected_w (KI per second), the
+# integral clamp (percent), the longest gap integrated at once, how long after a
+# command an actual-power reading counts as settled, the percent change that
+# counts as a new command, and how much of the integral is kept per settled
+# reading once the learned curve is trusted at the operating point (the
+# feed-forward then carries the correction).
+POWER_FEEDBACK_KP = 0.3
+POWER_FEEDBACK_KI = 0.01
+POWER_FEEDBACK_INTEGRAL_LIMIT = 25.0
+POWER_FEEDBACK_MAX_DT_SECONDS = 60.0
+POWER_FEEDBACK_SETTLE_SECONDS = 3.0
+POWER_FEEDBACK_DEADBAND_PERCENT = 1.0
+POWER_FEEDBACK_INTEGRAL_BLEED = 0.5
+# Learned percent→watts curve (core/power_curve.py): EWMA weight of a knot once
+# it has history, and settled readings a knot needs before it replaces the
+# straight-line assumption.
+POWER_CURVE_ALPHA = 0.2
+POWER_CURVE_MIN_SAMPLES = 3
+
+# Periodic probe tick: with unchanged inputs the full allocation pass is skipped
+# (time-based expiries get their own timer), but one still runs at least this
+# often so device status and energy totals stay fresh. Must stay below
+# ENERGY_MAX_INTEGRATION_GAP_SECONDS or idle stretches stop being integrated.
+ALLOCATION_REFRESH_INTERVAL_SECONDS = 240
+
+# The excess sensor hands its exact value straight to the allocator (before the
+# display rounding and state-write deadband). A new pass is queued only when the
+# value moved at least this far from the one the last queued pass used
+# (crossings of 0 W always queue).
+EXCESS_FEED_DEADBAND_W = 2.0
+
+# A trigger that lowers the budget by more than this below the value the running
+# (or last) pass started from preempts the running pass at its next device
+# boundary; the re-plan sends its turn-offs before any turn-on.
+PREEMPT_DROP_THRESHOLD_W = 200.0
+
+# grid_meter method (core/grid_loop.py): velocity-form PI on the export error,
+# stepped once per meter reading. KI is the share of the error closed per
+# reading; KP acts on the change of the error since the previous reading.
+GRID_METER_KI = 0.7
+GRID_METER_KP = 0.1
+
+# MPPT model self-calibration (core/mppt_calibration.py): RLS forgetting factor
+# per unconstrained sample, samples a tracker needs before its fitted
+# curve_factor_k / efficiency replace the defaults, how far below Vmp
+# (relative voltage) a sample may sit, and the minimum light fraction
+# (pv_power / Pmax) for a sample to count.
+MPPT_CALIBRATION_FORGETTING = 0.995
+MPPT_CALIBRATION_MIN_SAMPLES = 30
+MPPT_CALIBRATION_VOLTAGE_BAND = 0.15
+MPPT_CALIBRATION_MIN_LIGHT = 0.1
+
+# Probe headroom prior (core/probe_prior.py): time-of-day bucket width, SOC
+# band width (%), probe ticks the same headroom must hold before it counts as
+# a sustained hold, EWMA weight of each hold, and holds a cell needs before it
+# seeds the first growth step after a restart or at day start.
+PROBE_PRIOR_BUCKET_MINUTES = 30
+PROBE_PRIOR_SOC_BAND = 20.0
+PROBE_PRIOR_HOLD_TICKS = 6
+PROBE_PRIOR_ALPHA = 0.3
+PROBE_PRIOR_MIN_SAMPLES = 2
+
+# Outlier-rejection input filter (core/input_filter.py): a sample further from
+# the window median than K scaled MADs is replaced by the median. The spread
+# never counts as less than the larger of the absolute floor (W or V) and the
+# fraction of |median|, so a flat window does not reject every small change.
+INPUT_OUTLIER_K = 3.0
+INPUT_OUTLIER_MIN_SPREAD = 5.0
+INPUT_OUTLIER_MIN_SPREAD_FRACTION = 0.05
+# EWMA input filter: between two state changes the input is held at the earlier
+# sample (zero-order hold); a new sample is then folded in as if it lasted this
+# long, so a spike after a long steady stretch does not take the whole gap's weight.
+INPUT_FILTER_EWMA_SAMPLE_S = 1.0
+
+# Input alignment (core/input_align.py): samples kept per input, and how far an
+# input may lag the freshest one before it stops holding the common time back
+# (it is then treated as steady at its last value).
+INPUT_ALIGN_HISTORY = 16
+INPUT_ALIGN_MAX_WAIT_S = 30.0
+
+# Allocation strategies (core/strategies.py): wall-clock budget one strategy may
+# spend planning a pass before it returns its best plan so far, and the margin
+# min_switching requires above a waiting device's minimum before starting it.
+STRATEGY_TIME_BUDGET_SECONDS = 0.005
+STRATEGY_START_MARGIN_W = 50.0
+# max_utilization packs on/off devices into the budget at this resolution.
+STRATEGY_PACKING_RESOLUTION_W = 10.0
+
+# Config flow: the device picker shows at most this many entities; larger
+# installs get a search field to narrow the list.
+ENTITY_PICKER_MAX_OPTIONS = 500
+
 # Other advanced settings can be added here
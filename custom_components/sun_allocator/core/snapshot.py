@@ -0,0 +1,100 @@
+"""Per-cycle entity-state snapshot for the allocator.
+
+A single allocation pass used to call ``hass.states.get`` for the same relay
+from the filter, the external-change check, the control step and the status
+entry, and read the SOC sensor twice (value + staleness). The snapshot reads
+every entity the plan references once, at the start of the pass, so every step
+sees the same instant and each entity is looked up exactly once. It is the
+generalisation of the old per-cycle ``device_sensor_cache``.
+
+``check_usable`` templates are rendered by HA's template engine, which always
+reads the live state machine; their dependencies are therefore not pinned.
+"""
+
+from __future__ import annotations
+
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+from homeassistant.core import HomeAssistant, State
+
+from .entity_control import parse_relay_entity
+from ..const import (
+    CONF_AUTO_CONTROL_ENABLED,
+    CONF_BATTERY_SOC_SENSOR,
+    CONF_DEVICE_ACTUAL_POWER_SENSOR,
+    CONF_DEVICE_ENTITY,
+    CONF_DEVICE_SCHEDULE_HELPER_ENTITY,
+    CONF_ESPHOME_MODE_SELECT_ENTITY,
+)
+from ..sensor.utils import get_sensor_state_safely
+
+
+def referenced_entities(
+    cfg: Mapping[str, Any], devices: Iterable[Mapping[str, Any]]
+) -> list[str]:
+    """Entity ids one allocation pass reads, de-duplicated in first-seen order."""
+    seen: Dict[str, None] = {}
+    soc_sensor = cfg.get(CONF_BATTERY_SOC_SENSOR)
+    if soc_sensor:
+        seen[soc_sensor] = None
+    for device in devices:
+        if not device.get(CONF_AUTO_CONTROL_ENABLED, False):
+            continue
+        relay_entity, _ = parse_relay_entity(device.get(CONF_DEVICE_ENTITY))
+        for entity_id in (
+            relay_entity,
+            device.get(CONF_ESPHOME_MODE_SELECT_ENTITY),
+            device.get(CONF_DEVICE_ACTUAL_POWER_SENSOR),
+            device.get(CONF_DEVICE_SCHEDULE_HELPER_ENTITY),
+        ):
+            if entity_id:
+                seen[entity_id] = None
+    return list(seen)
+
+
+class CycleSnapshot:
+    """Read-only, ``hass.states``-like view pinned at the start of one pass."""
+
+    __slots__ = ("_hass", "_states", "_values")
+
+    def __init__(self, hass: HomeAssistant, entity_ids: Iterable[str]) -> None:
+        self._hass = hass
+        self._states: Mapping[str, Optional[State]] = MappingProxyType(
+            {entity_id: hass.states.get(entity_id) for entity_id in entity_ids}
+        )
+        self._values: Dict[str, Tuple[float, bool]] = {}
+
+    @classmethod
+    def collect(
+        cls,
+        hass: HomeAssistant,
+        cfg: Mapping[str, Any],
+        devices: Iterable[Mapping[str, Any]],
+    ) -> "CycleSnapshot":
+        """Snapshot every entity referenced by ``cfg`` and its auto-controlled devices."""
+        return cls(hass, referenced_entities(cfg, devices))
+
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self._states
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def get(self, entity_id: Optional[str]) -> Optional[State]:
+        """Pinned state of ``entity_id``.
+
+        Entities outside the plan (not expected on the hot path) fall through to
+        the live state machine.
+        """
+        if entity_id in self._states:
+            return self._states[entity_id]
+        return self._hass.states.get(entity_id) if entity_id else None
+
+    def sensor_value(self, entity_id: Optional[str], sensor_name: str) -> Tuple[float, bool]:
+        """Numeric ``(value, ok)`` reading, parsed once per pass."""
+        if entity_id not in self._values:
+            self._values[entity_id] = get_sensor_state_safely(
+                self._hass, entity_id, sensor_name, states=self
+            )
+        return self._values[entity_id]
@@ -0,0 +1,326 @@
+"""Pluggable device-allocation strategies.
+
+``process_excess_power`` walks the auto-controlled devices one at a time and lets
+each take what it needs from the remaining budget. Every protective rule lives in
+that per-device pipeline: filters, manual overrides, hysteresis and debounce,
+min on-time, startup grace, and the SOC and daily-budget gates. A strategy runs
+once before the walk. It gets an immutable ``AllocationView`` of the pass (the
+devices in priority order and the two budget pools) and returns an
+``AllocationPlan``:
+
+* ``order`` — the order in which the pipeline visits devices (``None`` keeps
+  priority order);
+* ``shares`` — target watts for proportional devices;
+* ``greedy_remainder`` — whether a device without a share may take whatever is
+  left (``True``) or gets nothing (``False``);
+* ``deselected`` — devices the strategy leaves off this cycle.
+
+A strategy only proposes. The pipeline still applies every gate, so no strategy
+can start a device the SOC gate blocks or stop one inside its min on-time.
+
+Strategies register with ``@register_strategy(name)``. They must return their
+best plan so far once ``view.expired()`` reports the per-cycle time budget
+(``STRATEGY_TIME_BUDGET_SECONDS``) is spent.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+from typing import AbstractSet, Callable, Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+from .logger import log_debug
+from .settings import (
+    STRATEGY_PACKING_RESOLUTION_W,
+    STRATEGY_START_MARGIN_W,
+    STRATEGY_TIME_BUDGET_SECONDS,
+)
+from ..const import (
+    DEFAULT_SWITCHING_COST_W,
+    STRATEGY_DISTRIBUTE_EVENLY,
+    STRATEGY_FILL_ONE_BY_ONE,
+    STRATEGY_MAX_UTILIZATION,
+    STRATEGY_MIN_SWITCHING,
+)
+
+
+@dataclass(frozen=True)
+class DeviceView:
+    """What a strategy may know about one device in this pass."""
+
+    device_id: str
+    priority: int
+    min_w: float
+    max_w: float
+    # Expected draw if it runs: last pass's allocation while running, else min_w.
+    draw_w: float
+    proportional: bool
+    running: bool
+    # Could run on the whole budget (threshold with hysteresis; for proportional
+    # devices also debounce).
+    would_run: bool
+    allow_probe: bool = True
+
+
+@dataclass(frozen=True)
+class AllocationView:
+    """Immutable input of one planning step. ``devices`` are in priority order."""
+
+    devices: Tuple[DeviceView, ...]
+    real_w: float
+    extra_w: float
+    # Diverted watts an extra relay flip must gain (min_switching).
+    switching_cost_w: float = DEFAULT_SWITCHING_COST_W
+    deadline: float = math.inf
+
+    @property
+    def budget_w(self) -> float:
+        """Total budget: cautious excess plus probe headroom."""
+        return self.real_w + self.extra_w
+
+    def expired(self) -> bool:
+        """True once the strategy's time budget for this pass is spent."""
+        return time.monotonic() >= self.deadline
+
+
+@dataclass(frozen=True)
+class AllocationPlan:
+    """A strategy's proposal; the default is plain priority-order greedy fill."""
+
+    order: Optional[Tuple[str, ...]] = None
+    shares: Mapping[str, float] = field(default_factory=lambda: MappingProxyType({}))
+    greedy_remainder: bool = True
+    deselected: FrozenSet[str] = frozenset()
+
+    def device_budget(self, device_id: str, remaining_w: float) -> float:
+        """Budget the pipeline decides ``device_id``'s on/off state with."""
+        return 0.0 if device_id in self.deselected else remaining_w
+
+    def power_to_allocate(self, device_id: str, remaining_w: float) -> float:
+        """Watts a custom device is driven to."""
+        if device_id in self.shares:
+            return self.shares[device_id]
+        return remaining_w if self.greedy_remainder else 0.0
+
+
+Strategy = Callable[[AllocationView], AllocationPlan]
+
+_STRATEGIES: Dict[str, Strategy] = {}
+
+
+def register_strategy(name: str) -> Callable[[Strategy], Strategy]:
+    """Register ``func`` as the strategy selectable as ``name``."""
+
+    def _register(func: Strategy) -> Strategy:
+        _STRATEGIES[name] = func
+        return func
+
+    return _register
+
+
+def available_strategies() -> List[str]:
+    """Registered strategy names, in registration order (the options-flow list)."""
+    return list(_STRATEGIES)
+
+
+def plan_allocation(
+    name: Optional[str],
+    view: AllocationView,
+    time_budget_s: float = STRATEGY_TIME_BUDGET_SECONDS,
+) -> AllocationPlan:
+    """Run strategy ``name`` (``fill`` if unknown) within ``time_budget_s``."""
+    strategy = _STRATEGIES.get(name) or _STRATEGIES[STRATEGY_FILL_ONE_BY_ONE]
+    started = time.monotonic()
+    plan = strategy(replace(view, deadline=started + time_budget_s))
+    elapsed = time.monotonic() - started
+    if elapsed > time_budget_s:
+        log_debug(
+            "[strategy] %s took %.1f ms (budget %.1f ms)",
+            name, elapsed * 1000.0, time_budget_s * 1000.0,
+        )
+    return plan
+
+
+class _Pools:
+    """Real/extra pool bookkeeping, consumed the way the control loop does."""
+
+    def __init__(self, view: AllocationView) -> None:
+        self.real = max(0.0, view.real_w)
+        self.extra = max(0.0, view.extra_w)
+
+    def available(self, device: DeviceView) -> float:
+        return self.real + (self.extra if device.allow_probe else 0.0)
+
+    def take(self, device: DeviceView, watts: float) -> None:
+        from_real = min(watts, self.real)
+        self.real -= from_real
+        if device.allow_probe:
+            self.extra -= min(self.extra, max(0.0, watts - from_real))
+
+
+@register_strategy(STRATEGY_FILL_ONE_BY_ONE)
+def fill_one_by_one(view: AllocationView) -> AllocationPlan:
+    """Priority order, each device takes what is left."""
+    return AllocationPlan()
+
+
+@register_strategy(STRATEGY_DISTRIBUTE_EVENLY)
+def distribute_evenly(view: AllocationView) -> AllocationPlan:
+    """Split the budget across runnable proportional devices by ``max_w``.
+
+    Custom devices without a share get nothing; on/off devices still decide on
+    the remaining budget in priority order.
+    """
+    runnable = [d for d in view.devices if d.proportional and d.would_run]
+    total_max_w = sum(d.max_w for d in runnable)
+    if total_max_w <= 0:
+        return AllocationPlan(greedy_remainder=False)
+    return AllocationPlan(
+        shares=MappingProxyType({
+            d.device_id: view.budget_w * (d.max_w / total_max_w) for d in runnable
+        }),
+        greedy_remainder=False,
+    )
+
+
+def _pack(candidates: List[DeviceView], view: AllocationView) -> Tuple[str, ...]:
+    """On/off devices whose summed draw fills the budget best.
+
+    A subset-sum over ``STRATEGY_PACKING_RESOLUTION_W`` bins (draws rounded up, so
+    a packing never overspends). Opt-out devices must fit the real pool on their
+    own. Ties go to the higher summed priority. Devices not reached before the
+    deadline are added greedily in priority order.
+    """
+    res = STRATEGY_PACKING_RESOLUTION_W
+    cap = int(max(0.0, view.budget_w) // res)
+    cap_real = int(max(0.0, view.real_w) // res)
+    # total bins -> (opt-out bins, summed priority, chosen ids)
+    states: Dict[int, Tuple[int, int, Tuple[str, ...]]] = {0: (0, 0, ())}
+    reached = 0
+    for device in candidates:
+        if view.expired():
+            break
+        reached += 1
+        weight = int(math.ceil(device.draw_w / res))
+        grown = dict(states)
+        for total, (opt_out, score, chosen) in states.items():
+            new_total = total + weight
+            new_opt_out = opt_out + (0 if device.allow_probe else weight)
+            if new_total > cap or new_opt_out > cap_real:
+                continue
+            candidate = (new_opt_out, score + device.priority, chosen + (device.device_id,))
+            current = grown.get(new_total)
+            if current is None or (candidate[1], -candidate[0]) > (current[1], -current[0]):
+                grown[new_total] = candidate
+        states = grown
+
+    total, (opt_out, _, chosen) = max(states.items(), key=lambda kv: (kv[0], kv[1][1]))
+    for device in candidates[reached:]:
+        weight = int(math.ceil(device.draw_w / res))
+        extra_opt_out = 0 if device.allow_probe else weight
+        if total + weight <= cap and opt_out + extra_opt_out <= cap_real:
+            total += weight
+            opt_out += extra_opt_out
+            chosen += (device.device_id,)
+    return chosen
+
+
+@register_strategy(STRATEGY_MAX_UTILIZATION)
+def max_utilization(view: AllocationView) -> AllocationPlan:
+    """Minimise unallocated watts.
+
+    Picks the set of runnable on/off devices whose draws fill the budget most
+    tightly, even if that skips a higher-priority device that would strand a
+    larger remainder. Runnable proportional devices then take the leftover in
+    priority order.
+    """
+    on_off = [d for d in view.devices if not d.proportional and d.would_run]
+    chosen = set(_pack(on_off, view))
+    pools = _Pools(view)
+    for device in on_off:
+        if device.device_id in chosen:
+            pools.take(device, device.draw_w)
+
+    shares: Dict[str, float] = {}
+    deselected = {d.device_id for d in on_off if d.device_id not in chosen}
+    for device in view.devices:
+        if not (device.proportional and device.would_run):
+            continue
+        share = min(device.max_w, pools.available(device))
+        if share <= 0:
+            deselected.add(device.device_id)
+            continue
+        shares[device.device_id] = share
+        pools.take(device, share)
+    return AllocationPlan(
+        shares=MappingProxyType(shares), deselected=frozenset(deselected)
+    )
+
+
+def _flips(chosen: AbstractSet[str], devices: List[DeviceView]) -> int:
+    """Relays that change state if exactly ``chosen`` of ``devices`` run."""
+    return sum(1 for d in devices if (d.device_id in chosen) != d.running)
+
+
+@register_strategy(STRATEGY_MIN_SWITCHING)
+def min_switching(view: AllocationView) -> AllocationPlan:
+    """Keep what runs unless a swap diverts enough to pay for its relay flips.
+
+    The kept set serves running devices first (priority order) and starts a
+    waiting device only when the leftover covers its minimum plus
+    ``STRATEGY_START_MARGIN_W``. The tightest packing of the runnable on/off
+    devices (as in ``max_utilization``) is the alternative. It replaces the kept
+    set only when it diverts more than ``view.switching_cost_w`` per extra flip;
+    running devices it leaves out are then deselected so they make room.
+    """
+    pools = _Pools(view)
+    for device in view.devices:
+        if device.proportional and device.running:
+            pools.take(device, device.draw_w)
+
+    on_off = [d for d in view.devices if not d.proportional and d.would_run]
+    pack_view = replace(view, real_w=pools.real, extra_w=pools.extra)
+    kept = set()
+    for device in sorted(on_off, key=lambda d: not d.running):
+        needed = device.draw_w if device.running else device.min_w + STRATEGY_START_MARGIN_W
+        if pools.available(device) >= needed:
+            pools.take(device, device.draw_w)
+            kept.add(device.device_id)
+
+    # Waiting devices are packed with the start margin too.
+    candidates = [
+        d if d.running else replace(d, draw_w=d.min_w + STRATEGY_START_MARGIN_W)
+        for d in on_off
+    ]
+    packed = set(_pack(candidates, pack_view))
+    draws = {d.device_id: d.draw_w for d in on_off}
+    gain = sum(draws[i] for i in packed) - sum(draws[i] for i in kept)
+    extra_flips = max(0, _flips(packed, on_off) - _flips(kept, on_off))
+    chosen, swapped = kept, False
+    if gain > 0 and gain > view.switching_cost_w * extra_flips:
+        chosen, swapped = packed, True
+        pools = _Pools(pack_view)
+        for device in on_off:
+            if device.device_id in chosen:
+                pools.take(device, device.draw_w)
+
+    # Without a swap, a running device the kept set could not fit is left to
+    # the pipeline's hysteresis rather than forced off.
+    deselected = {
+        d.device_id for d in view.devices
+        if not d.proportional and d.device_id not in chosen
+        and (swapped or not d.running)
+    }
+    for device in view.devices:
+        if device.proportional and not device.running:
+            if pools.available(device) >= device.min_w + STRATEGY_START_MARGIN_W:
+                pools.take(device, device.draw_w)
+            else:
+                deselected.add(device.device_id)
+    running = [d.device_id for d in view.devices if d.running]
+    waiting = [d.device_id for d in view.devices if not d.running]
+    return AllocationPlan(
+        order=tuple(running + waiting), deselected=frozenset(deselected)
+    )
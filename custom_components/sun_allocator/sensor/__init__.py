@@ -11,12 +11,14 @@ from .sensors import (
     SunAllocatorCurrentMaxPowerSensor,
     SunAllocatorUsagePercentSensor,
     SunAllocatorPowerDistributionSensor,
+    SunAllocatorDivertedEnergySensor,
 )
 
 # Import per-device sensors
 from .sensors.device_power_alloc import SunAllocatorDevicePowerSensor
 from .sensors.device_status import SunAllocatorDeviceStatusSensor
 from .sensors.device_power_percent import SunAllocatorDevicePowerPercentSensor
+from .sensors.device_energy import SunAllocatorDeviceEnergySensor
 
 from ..const import DOMAIN, CONF_DEVICES, CONF_DEVICE_ID
 from ..core.logger import log_debug
@@ -50,6 +52,9 @@ async def async_setup_entry(
         SunAllocatorPowerDistributionSensor(
             hass, config_entry.entry_id, entry_index
         ),
+        SunAllocatorDivertedEnergySensor(
+            hass, config_entry.entry_id, entry_index
+        ),
     ]
 
     # Create sensors for each configured device
@@ -71,6 +76,11 @@ async def async_setup_entry(
                     hass, config_entry.entry_id, device_config
                 )
             )
+            sensors.append(
+                SunAllocatorDeviceEnergySensor(
+                    hass, config_entry.entry_id, device_config
+                )
+            )
 
     log_debug("Sensors: %s", [sensor.entity_id for sensor in sensors])
     async_add_entities(sensors)
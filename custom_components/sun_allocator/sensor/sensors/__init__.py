@@ -6,6 +6,7 @@ from .max_power import SunAllocatorMaxPowerSensor
 from .current_max_power import SunAllocatorCurrentMaxPowerSensor
 from .usage_percent import SunAllocatorUsagePercentSensor
 from .power_distribution import SunAllocatorPowerDistributionSensor
+from .diverted_energy import SunAllocatorDivertedEnergySensor
 
 __all__ = [
     "BaseSunAllocatorSensor",
@@ -14,4 +15,5 @@ __all__ = [
     "SunAllocatorCurrentMaxPowerSensor",
     "SunAllocatorUsagePercentSensor",
     "SunAllocatorPowerDistributionSensor",
+    "SunAllocatorDivertedEnergySensor",
 ]
@@ -4,16 +4,19 @@ from abc import ABC, abstractmethod
 from typing import Optional, Dict, Any, List, Tuple
 
 from homeassistant.components.sensor import SensorEntity
+from homeassistant.const import STATE_UNAVAILABLE, STATE_UNKNOWN
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.device_registry import DeviceEntryType
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.typing import StateType
 
+from ...core import input_cache, mppt_calibration
+from ...core.input_filter import filter_spec
+from ...core.input_align import InputAligner
 from ...core.logger import log_error, log_warning, journal_event
+from ...core.settings import MPPT_CALIBRATION_MIN_SAMPLES
 from ...core.solar_optimizer import get_panel_parameters_with_fallbacks
 from ..utils import (
-    get_sensor_state_safely,
-    is_reading_stale,
     get_temperature_compensation_data,
     create_sensor_attributes,
     setup_sensor_listeners,
@@ -30,6 +33,7 @@ from ...const import (
     CONF_CONSUMPTION,
     CONF_BATTERY_POWER,
     CONF_BATTERY_POWER_REVERSED,
+    CONF_GRID_POWER,
     CONF_PV_FORECAST_SENSOR,
     CONF_PANEL_VMP,
     CONF_PANEL_IMP,
@@ -51,6 +55,14 @@ from ...const import (
     CONF_SIM_OVERRIDE_CONSUMPTION,
     CONF_SIM_OVERRIDE_BATTERY_POWER,
     CONF_SIM_OVERRIDE_BATTERY_SOC,
+    CONF_FILTER_PV_POWER,
+    CONF_FILTER_PV_VOLTAGE,
+    CONF_FILTER_CONSUMPTION,
+    CONF_FILTER_BATTERY_POWER,
+    CONF_INPUT_ALIGNMENT,
+    DEFAULT_INPUT_ALIGNMENT,
+    INPUT_ALIGNMENT_OFF,
+    INPUT_ALIGNMENT_INTERPOLATE,
     DEFAULT_SIM_CONSUMPTION,
     DEFAULT_SIM_BATTERY_POWER,
     DEFAULT_SIM_BATTERY_SOC,
@@ -110,6 +122,7 @@ class BaseSunAllocatorSensor(SensorEntity, ABC):
         self._consumption = config.get(CONF_CONSUMPTION)
         self._battery_power = config.get(CONF_BATTERY_POWER)
         self._battery_soc_sensor = config.get(CONF_BATTERY_SOC_SENSOR)
+        self._grid_power = config.get(CONF_GRID_POWER)
         self._pv_forecast_sensor = config.get(CONF_PV_FORECAST_SENSOR)
 
         self._state = 0.0
@@ -167,8 +180,13 @@ class BaseSunAllocatorSensor(SensorEntity, ABC):
         entity_ids = self._get_entity_ids_to_listen()
 
         @callback
-        def _update_sensor(*_):
+        def _update_sensor(event=None):
             """Update the sensor when underlying data changes."""
+            # Drop the domain-wide parsed reading of the entity that changed; other
+            # hubs sharing it re-parse it once, not once each.
+            if event is not None:
+                cache = input_cache.get_input_cache(self._hass)
+                cache.invalidate(event.data.get("entity_id"))
             # Invalidate the shared snapshot so the next computation re-reads inputs.
             # All hub sensors listen to the same entities; when one input changes,
             # every sensor's listener fires and clears the cache before any of them
@@ -185,6 +203,9 @@ class BaseSunAllocatorSensor(SensorEntity, ABC):
         setup_sensor_listeners(
             self._hass, entity_ids, _update_sensor, self._unsub_listeners
         )
+        entry_data = self._hass.data.get(DOMAIN, {}).get(self._entry_id)
+        if entry_data is not None:
+            entry_data.setdefault("hub_sensors", {})[self._attr_unique_id] = self
 
         self.async_schedule_update_ha_state(True)
 
@@ -192,6 +213,21 @@ class BaseSunAllocatorSensor(SensorEntity, ABC):
     async def async_will_remove_from_hass(self) -> None:
         """Clean up when entity is removed."""
         cleanup_sensor_listeners(self._unsub_listeners)
+        entry_data = self._hass.data.get(DOMAIN, {}).get(self._entry_id)
+        if entry_data is not None:
+            entry_data.get("hub_sensors", {}).pop(self._attr_unique_id, None)
+
+
+    def apply_config(self, config: Dict[str, Any]) -> None:
+        """Adopt a hot-applied config update (see core/config_diff.py).
+
+        The input entities are unchanged by definition, so the listeners stay;
+        only the cached config and the per-tracker panel parameters are renewed.
+        """
+        self._config = config
+        self._mppt_inputs = _build_mppt_inputs_from_config(config)
+        self._invalidate_shared_snapshot()
+        self.async_schedule_update_ha_state(True)
 
 
     def _get_entity_ids_to_listen(self) -> list:
@@ -215,6 +251,9 @@ class BaseSunAllocatorSensor(SensorEntity, ABC):
         if self._battery_soc_sensor:
             entity_ids.append(self._battery_soc_sensor)
 
+        if self._grid_power:
+            entity_ids.append(self._grid_power)
+
         if self._pv_forecast_sensor:
             entity_ids.append(self._pv_forecast_sensor)
 
@@ -265,17 +304,20 @@ class BaseSunAllocatorSensor(SensorEntity, ABC):
             )
 
     def _get_sensor_values(self) -> Dict[str, Any]:
-        """Read shared sensor values (consumption, battery_power, battery_soc)."""
+        """Read shared sensor values (consumption, battery power/SOC, grid power)."""
+        cache = input_cache.get_input_cache(self._hass)
         consumption = 0.0
         if self._consumption:
-            consumption, _ = get_sensor_state_safely(
-                self._hass, self._consumption, "Consumption"
+            consumption, _ = cache.reading(
+                self._hass, self._consumption, "Consumption",
+                input_filter=filter_spec(self._config, CONF_FILTER_CONSUMPTION),
             )
 
         battery_power = 0.0
         if self._battery_power:
-            battery_power, battery_ok = get_sensor_state_safely(
-                self._hass, self._battery_power, "Battery Power"
+            battery_power, battery_ok = cache.reading(
+                self._hass, self._battery_power, "Battery Power",
+                input_filter=filter_spec(self._config, CONF_FILTER_BATTERY_POWER),
             )
             if battery_ok and not self._config.get(CONF_SIM_ENABLED):
                 self._check_battery_sign(battery_power)
@@ -284,19 +326,27 @@ class BaseSunAllocatorSensor(SensorEntity, ABC):
         # modulation fails open (configured reserve as-is) rather than to 0%.
         battery_soc = None
         if self._battery_soc_sensor:
-            soc_value, soc_ok = get_sensor_state_safely(
+            soc_value, soc_ok = cache.reading(
                 self._hass, self._battery_soc_sensor, "Battery SOC"
             )
-            if soc_ok and not is_reading_stale(
+            if soc_ok and not cache.is_stale(
                 self._hass, self._battery_soc_sensor, DEFAULT_SOC_MAX_AGE_S
             ):
                 battery_soc = soc_value
 
+        # Signed grid meter (W) for the grid_meter method. Stays None when
+        # unconfigured or unavailable so the method fails safe (no excess).
+        grid_power = None
+        if self._grid_power:
+            grid_value, grid_ok = cache.reading(self._hass, self._grid_power, "Grid Power")
+            if grid_ok:
+                grid_power = grid_value
+
         # Optional external PV-production forecast (W). Diagnostic only — stays
         # None when unconfigured or unavailable.
         pv_forecast = None
         if self._pv_forecast_sensor:
-            fc_value, fc_ok = get_sensor_state_safely(
+            fc_value, fc_ok = cache.reading(
                 self._hass, self._pv_forecast_sensor, "PV Forecast"
             )
             if fc_ok:
@@ -320,6 +370,7 @@ class BaseSunAllocatorSensor(SensorEntity, ABC):
             CONF_CONSUMPTION: consumption,
             CONF_BATTERY_POWER: battery_power,
             CONF_BATTERY_SOC_SENSOR: battery_soc,
+            CONF_GRID_POWER: grid_power,
             CONF_PV_FORECAST_SENSOR: pv_forecast,
         }
 
@@ -328,17 +379,22 @@ class BaseSunAllocatorSensor(SensorEntity, ABC):
         """Read per-MPPT pv_power, pv_voltage and panel parameters."""
         if self._config.get(CONF_SIM_ENABLED):
             return self._get_simulated_mppt_readings()
+        cache = input_cache.get_input_cache(self._hass)
+        power_filter = filter_spec(self._config, CONF_FILTER_PV_POWER)
+        voltage_filter = filter_spec(self._config, CONF_FILTER_PV_VOLTAGE)
         readings: List[Dict[str, Any]] = []
         for mppt in self._mppt_inputs:
             pv_power = 0.0
             if mppt.get(CONF_PV_POWER):
-                pv_power, _ = get_sensor_state_safely(
-                    self._hass, mppt.get(CONF_PV_POWER), "PV Power"
+                pv_power, _ = cache.reading(
+                    self._hass, mppt.get(CONF_PV_POWER), "PV Power",
+                    input_filter=power_filter,
                 )
             pv_voltage = 0.0
             if mppt.get(CONF_PV_VOLTAGE):
-                pv_voltage, _ = get_sensor_state_safely(
-                    self._hass, mppt.get(CONF_PV_VOLTAGE), "PV Voltage"
+                pv_voltage, _ = cache.reading(
+                    self._hass, mppt.get(CONF_PV_VOLTAGE), "PV Voltage",
+                    input_filter=voltage_filter,
                 )
             vmp, imp, voc, isc, panel_count = get_panel_parameters_with_fallbacks(
                 mppt.get(CONF_PANEL_VMP),
@@ -361,9 +417,24 @@ class BaseSunAllocatorSensor(SensorEntity, ABC):
                     ),
                 },
             })
+        self._apply_model_calibration(readings)
         return readings
 
 
+    def _apply_model_calibration(self, readings: List[Dict[str, Any]]) -> None:
+        """Attach each tracker's fitted model parameters (core/mppt_calibration.py), once trusted."""
+        entry_data = self._hass.data.get(DOMAIN, {}).get(self._entry_id)
+        calibration = (entry_data or {}).get("mppt_calibration")
+        if not calibration:
+            return
+        for index, reading in enumerate(readings):
+            fitted = mppt_calibration.model_params(
+                calibration, index, min_samples=MPPT_CALIBRATION_MIN_SAMPLES
+            )
+            if fitted is not None:
+                reading["model_params"] = fitted
+
+
     def _get_simulated_mppt_readings(self) -> List[Dict[str, Any]]:
         """Build synthetic MPPT readings from simulation config.
 
@@ -427,7 +498,10 @@ class BaseSunAllocatorSensor(SensorEntity, ABC):
 
     def _get_temperature_compensation(self) -> Optional[Dict[str, float]]:
         """Get temperature compensation data if enabled."""
-        return get_temperature_compensation_data(self._hass, self._config)
+        cache = input_cache.get_input_cache(self._hass)
+        return get_temperature_compensation_data(
+            self._hass, self._config, read_sensor=cache.reading
+        )
 
 
     def _invalidate_shared_snapshot(self) -> None:
@@ -446,7 +520,9 @@ class BaseSunAllocatorSensor(SensorEntity, ABC):
         identical across the four; caching the snapshot means it is built once per
         input change instead of four times. The cache is invalidated event-driven
         (see ``_update_sensor``), so it never serves data older than the latest
-        state change — no time-based staleness.
+        state change — no time-based staleness. With input alignment on, the
+        power-balance inputs are then evaluated at a common instant
+        (``_align_snapshot``).
         """
         entry_data = self._hass.data.get(DOMAIN, {}).get(self._entry_id)
         if entry_data is None:
@@ -466,10 +542,80 @@ class BaseSunAllocatorSensor(SensorEntity, ABC):
                 "mppt_config": self._get_mppt_config(),
                 "temp_compensation": self._get_temperature_compensation(),
             }
+            snapshot = self._align_snapshot(entry_data, snapshot)
             entry_data["_sensor_snapshot"] = snapshot
         return snapshot
 
 
+    def _aligned_slots(self, snapshot: Dict[str, Any]) -> List[Tuple[Dict[str, Any], str, str]]:
+        """``(container, key, entity_id)`` of every power-balance input in ``snapshot``."""
+        sensor_values = snapshot["sensor_values"]
+        slots = [
+            (sensor_values, CONF_CONSUMPTION, self._consumption),
+            (sensor_values, CONF_BATTERY_POWER, self._battery_power),
+        ]
+        for mppt, reading in zip(self._mppt_inputs, snapshot["mppt_readings"]):
+            slots.append((reading, "pv_power", mppt.get(CONF_PV_POWER)))
+            slots.append((reading, "pv_voltage", mppt.get(CONF_PV_VOLTAGE)))
+        return [slot for slot in slots if slot[2]]
+
+
+    def _align_snapshot(self, entry_data: Dict[str, Any], snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        """Evaluate the power-balance inputs at their latest common report time.
+
+        Returns the previous aligned snapshot while that time has not advanced
+        and nothing outside the aligned inputs changed (see core/input_align.py).
+        """
+        mode = self._config.get(CONF_INPUT_ALIGNMENT, DEFAULT_INPUT_ALIGNMENT)
+        if mode == INPUT_ALIGNMENT_OFF or self._config.get(CONF_SIM_ENABLED):
+            return snapshot
+        aligner = entry_data.get("_input_aligner")
+        if aligner is None:
+            aligner = entry_data["_input_aligner"] = InputAligner()
+
+        slots = []
+        for container, key, entity_id in self._aligned_slots(snapshot):
+            state = self._hass.states.get(entity_id)
+            reported = state and (
+                getattr(state, "last_reported", None) or state.last_updated
+            )
+            # Unavailable inputs (parsed as 0) are not samples.
+            if reported is None or state.state in (STATE_UNKNOWN, STATE_UNAVAILABLE):
+                continue
+            aligner.observe(entity_id, reported.timestamp(), container[key])
+            slots.append((container, key, entity_id))
+
+        common = aligner.common_time(entity_id for _, _, entity_id in slots)
+        if common is None:
+            return snapshot
+        previous = aligner.snapshot
+        if (
+            previous is not None
+            and aligner.aligned_at is not None
+            and common <= aligner.aligned_at
+            and self._unaligned_parts(previous) == self._unaligned_parts(snapshot)
+        ):
+            return previous
+        interpolate = mode == INPUT_ALIGNMENT_INTERPOLATE
+        for container, key, entity_id in slots:
+            container[key] = aligner.value_at(entity_id, common, interpolate)
+        aligner.aligned_at = common
+        aligner.snapshot = snapshot
+        return snapshot
+
+
+    @staticmethod
+    def _unaligned_parts(snapshot: Dict[str, Any]) -> Tuple[Any, ...]:
+        """The snapshot inputs alignment does not touch (SOC, forecast, config)."""
+        values = snapshot["sensor_values"]
+        return (
+            {k: v for k, v in values.items() if k not in (CONF_CONSUMPTION, CONF_BATTERY_POWER)},
+            [(r["panel_params"], r.get("model_params")) for r in snapshot["mppt_readings"]],
+            snapshot["mppt_config"],
+            snapshot["temp_compensation"],
+        )
+
+
     def _update_attributes(self, **kwargs) -> None:
         """Update sensor attributes."""
         self._attr_extra_state_attributes.update(kwargs)
@@ -8,7 +8,7 @@ from homeassistant.components.sensor import SensorEntity
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
 
-from ...const import CONF_DEVICE_ID, SIGNAL_POWER_DISTRIBUTION_UPDATED
+from ...const import CONF_DEVICE_ID, CONF_DEVICES, SIGNAL_POWER_DISTRIBUTION_UPDATED
 from ..utils import get_device_info
 
 
@@ -29,6 +29,13 @@ class BaseSunAllocatorDeviceSensor(SensorEntity):
     def device_info(self) -> DeviceInfo:
         return get_device_info(self._hass, self._device_config, self._entry_id)
 
+    def _current_device_config(self, entry_data: Dict[str, Any]) -> Dict[str, Any]:
+        """This device's entry in the current config (hot-applied edits included)."""
+        for device in (entry_data.get("config") or {}).get(CONF_DEVICES, []) or []:
+            if device.get(CONF_DEVICE_ID) == self._device_id:
+                return device
+        return self._device_config
+
     @callback
     def _update_state(self) -> None:
         """Override in subclass to update sensor state and attributes."""
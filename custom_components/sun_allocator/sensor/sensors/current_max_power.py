@@ -70,7 +70,7 @@ class SunAllocatorCurrentMaxPowerSensor(BaseSunAllocatorSensor):
                 isc=panel_params[CONF_PANEL_ISC],
                 panel_count=panel_params[CONF_PANEL_COUNT],
                 panel_configuration=panel_params[CONF_PANEL_CONFIGURATION],
-                **mppt_config,
+                **{**mppt_config, **r.get("model_params", {})},
                 temperature_compensation=temp_compensation,
             )
             total_cmp += float(cmp_value)
@@ -0,0 +1,39 @@
+"""Sensor for energy diverted to a single device by SunAllocator."""
+
+from __future__ import annotations
+from typing import Any, Dict
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.components.sensor import SensorDeviceClass, SensorStateClass
+from homeassistant.const import UnitOfEnergy
+
+from ...const import DOMAIN
+from .base_device import BaseSunAllocatorDeviceSensor
+
+
+class SunAllocatorDeviceEnergySensor(BaseSunAllocatorDeviceSensor):
+    """Cumulative energy the allocator delivered to one device (kWh)."""
+
+    _attr_has_entity_name = True
+    _attr_translation_key = "device_energy"
+    _attr_icon = "mdi:lightning-bolt"
+    _attr_device_class = SensorDeviceClass.ENERGY
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+    _attr_suggested_display_precision = 3
+
+    def __init__(
+        self, hass: HomeAssistant, entry_id: str, device_config: Dict[str, Any]
+    ):
+        super().__init__(hass, entry_id, device_config)
+        self._attr_unique_id = f"{entry_id}_{self._device_id}_energy"
+
+    @callback
+    def _update_state(self):
+        """Update the sensor's state from the allocator's energy accumulators."""
+        data = self._hass.data.get(DOMAIN, {}).get(self._entry_id)
+        if not data or "energy_state" not in data:
+            return
+        devices_kwh = data["energy_state"].get("devices_kwh", {})
+        self._attr_native_value = round(float(devices_kwh.get(self._device_id, 0.0)), 4)
+        self.async_write_ha_state()
@@ -29,7 +29,6 @@ class SunAllocatorDevicePowerSensor(BaseSunAllocatorDeviceSensor):
         self, hass: HomeAssistant, entry_id: str, device_config: Dict[str, Any]
     ):
         super().__init__(hass, entry_id, device_config)
-        self._schedule_mode = device_config.get(CONF_DEVICE_SCHEDULE_MODE, SCHEDULE_MODE_DISABLED)
         self._attr_unique_id = f"{entry_id}_{self._device_id}_power"
 
     @callback
@@ -48,7 +47,7 @@ class SunAllocatorDevicePowerSensor(BaseSunAllocatorDeviceSensor):
         self._attr_native_value = round(allocated_power, 1)
 
         auto_control_on = is_device_auto_control_enabled(
-            data.get("config", {}), self._device_id
+            data.get("config", {}), self._device_id, data.get("auto_control")
         )
         st = device_status.get(self._device_id, {}) or {}
 
@@ -57,7 +56,9 @@ class SunAllocatorDevicePowerSensor(BaseSunAllocatorDeviceSensor):
             "min_expected_w": st.get("min_expected_w"),
             "max_expected_w": st.get("max_expected_w") or None,
             "priority": st.get("priority"),
-            "schedule_mode": self._schedule_mode,
+            "schedule_mode": self._current_device_config(data).get(
+                CONF_DEVICE_SCHEDULE_MODE, SCHEDULE_MODE_DISABLED
+            ),
             "last_on_time": st.get("last_on_time"),
             "last_off_time": st.get("last_off_time"),
             "status": build_device_status(
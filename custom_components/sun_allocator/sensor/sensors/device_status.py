@@ -39,7 +39,7 @@ class SunAllocatorDeviceStatusSensor(BaseSunAllocatorDeviceSensor):
             (pd_data.get("allocation", {}) or {}).get(self._device_id, 0.0)
         )
         auto_control_on = is_device_auto_control_enabled(
-            data.get("config", {}), self._device_id
+            data.get("config", {}), self._device_id, data.get("auto_control")
         )
         st = device_status.get(self._device_id, {}) or {}
 
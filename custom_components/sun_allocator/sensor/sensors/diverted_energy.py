@@ -0,0 +1,79 @@
+"""Total diverted-energy sensor for SunAllocator."""
+
+from __future__ import annotations
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
+from homeassistant.const import UnitOfEnergy
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import DeviceInfo
+
+from ...const import (
+    DOMAIN,
+    SENSOR_DIVERTED_ENERGY_SUFFIX,
+    SIGNAL_POWER_DISTRIBUTION_UPDATED,
+)
+
+
+class SunAllocatorDivertedEnergySensor(SensorEntity):
+    """Cumulative energy the allocator delivered to all controlled devices (kWh).
+
+    Updated on the allocator's dispatcher signal; ``probe_battery_energy_kwh``
+    exposes how much of it the battery had to cover while probing.
+    """
+
+    _attr_has_entity_name = True
+    _attr_translation_key = SENSOR_DIVERTED_ENERGY_SUFFIX
+    _attr_icon = "mdi:solar-power-variant"
+    _attr_should_poll = False
+    _attr_device_class = SensorDeviceClass.ENERGY
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+    _attr_suggested_display_precision = 3
+
+    def __init__(self, hass: HomeAssistant, entry_id: str, entry_index: int):
+        """Initialize the sensor."""
+        self._hass = hass
+        self._entry_id = entry_id
+        self._attr_unique_id = f"{entry_id}_{SENSOR_DIVERTED_ENERGY_SUFFIX}"
+        self._attr_extra_state_attributes = {"probe_battery_energy_kwh": None}
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Return device information."""
+        entry = self._hass.config_entries.async_get_entry(self._entry_id)
+        name = entry.title if entry else "SunAllocator"
+        return DeviceInfo(
+            identifiers={(DOMAIN, self._entry_id)},
+            name=name,
+            manufacturer="Sun Allocator",
+        )
+
+    @callback
+    def _update_state(self) -> None:
+        data = self._hass.data.get(DOMAIN, {}).get(self._entry_id)
+        if not data or "energy_state" not in data:
+            return
+        state = data["energy_state"]
+        self._attr_native_value = round(float(state.get("total_kwh", 0.0)), 4)
+        self._attr_extra_state_attributes = {
+            "probe_battery_energy_kwh": round(
+                float(state.get("probe_battery_kwh", 0.0)), 4
+            ),
+        }
+        self.async_write_ha_state()
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self._hass,
+                f"{SIGNAL_POWER_DISTRIBUTION_UPDATED}_{self._entry_id}",
+                self._update_state,
+            )
+        )
+        self._update_state()
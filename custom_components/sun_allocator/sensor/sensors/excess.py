@@ -7,11 +7,20 @@ from homeassistant.const import UnitOfPower
 import homeassistant.util.dt as dt_util
 
 from .base import BaseSunAllocatorSensor
+from ...core import mppt_calibration
+from ...core.grid_loop import GridLoop
 from ...core.logger import journal_event, log_error, log_info
+from ...core.settings import (
+    MPPT_CALIBRATION_FORGETTING,
+    MPPT_CALIBRATION_MIN_LIGHT,
+    MPPT_CALIBRATION_VOLTAGE_BAND,
+)
 from ...core.solar_optimizer import calculate_current_max_power
 from ..utils import (
     calculate_excess_power_mppt,
     calculate_excess_power_export,
+    calculate_excess_power_grid_meter,
+    battery_blocks_excess,
     calculate_usage_percentage,
     detect_curtailment,
 )
@@ -32,9 +41,18 @@ from ...const import (
     CALC_METHOD_MPPT,
     CALC_METHOD_MPPT_PROBE,
     CALC_METHOD_EXPORT,
+    CALC_METHOD_GRID_METER,
+    CONF_GRID_POWER,
+    CONF_GRID_POWER_REVERSED,
+    CONF_GRID_EXPORT_TARGET_W,
+    DEFAULT_GRID_EXPORT_TARGET_W,
+    CONF_POWER_ALLOCATION,
     CONF_PV_FORECAST_SENSOR,
     CONF_PANEL_VMP,
     CONF_PANEL_IMP,
+    CONF_PANEL_ISC,
+    CONF_SIM_ENABLED,
+    BATTERY_CHARGE_IDLE_W,
     KEY_CALCULATION_REASON,
     KEY_ENERGY_HARVESTING_POSSIBLE,
     KEY_LIGHT_FACTOR,
@@ -57,6 +75,9 @@ class SunAllocatorExcessSensor(BaseSunAllocatorSensor):
     # Transitions to/from 0 are always published.
     _DEADBAND_W = 10.0
     _DEADBAND_PCT = 0.015
+    # Set once the grid_meter method has reported a missing meter, so the
+    # error is not repeated on every recompute.
+    _grid_meter_missing_logged = False
 
     def __init__(
         self,
@@ -107,6 +128,108 @@ class SunAllocatorExcessSensor(BaseSunAllocatorSensor):
         return abs(float(new) - float(last)) < band
 
 
+    def _grid_meter_excess(
+        self,
+        grid_power: Optional[float],
+        battery_power: float,
+        battery_power_reversed: bool,
+        **battery_guard: Any,
+    ) -> float:
+        """Excess from the grid meter, stepped once per meter reading (core/grid_loop.py).
+
+        Between readings the latched budget is returned; only the battery
+        discharge guard is applied live.
+        """
+        meter = self._config.get(CONF_GRID_POWER)
+        if grid_power is None:
+            if not meter and not self._grid_meter_missing_logged:
+                self._grid_meter_missing_logged = True
+                log_error("Grid meter method selected but no grid power sensor is configured.")
+            return 0.0
+        tolerance = battery_guard.get("battery_discharge_tolerance_w", 0.0)
+        if battery_blocks_excess(battery_power, battery_power_reversed, tolerance):
+            return 0.0
+
+        entry_data = (
+            (self.hass.data.get(DOMAIN, {}) or {}).get(self._entry_id)
+            if self.hass and self._entry_id else None
+        )
+        loop = GridLoop() if entry_data is None else entry_data.setdefault("_grid_loop", GridLoop())
+        state = self.hass.states.get(meter) if self.hass else None
+        read_at = (
+            (getattr(state, "last_reported", None) or state.last_updated).timestamp()
+            if state is not None else 0.0
+        )
+        export_w = float(grid_power) if self._config.get(CONF_GRID_POWER_REVERSED) else -float(grid_power)
+        target_w = float(self._config.get(CONF_GRID_EXPORT_TARGET_W, DEFAULT_GRID_EXPORT_TARGET_W))
+        correction = loop.step(read_at, export_w - target_w)
+        if correction is not None:
+            allocation = (entry_data or {}).get(CONF_POWER_ALLOCATION) or {}
+            loop.excess_w = calculate_excess_power_grid_meter(
+                allocated_load_w=sum(float(w or 0.0) for w in allocation.values()),
+                correction_w=correction,
+                battery_power=battery_power,
+                battery_power_reversed=battery_power_reversed,
+                **battery_guard,
+            )
+        self._update_attributes(
+            grid_export_w=round(export_w, 1),
+            grid_export_error_w=round(loop.error_w, 1),
+        )
+        return loop.excess_w
+
+
+    def _calibrate_model(
+        self,
+        mppt_readings: List[Dict[str, Any]],
+        per_mppt: List[Dict[str, Any]],
+        mppt_config: Dict[str, float],
+        net_charge_w: float,
+        curtailment_detected: bool,
+    ) -> None:
+        """Feed unconstrained operating points to the per-tracker model fit.
+
+        With the battery actively charging and no curtailment, nothing throttles
+        the panels, so each tracker sits at its real maximum power point (see
+        core/mppt_calibration.py). Repeated identical readings are skipped.
+        """
+        if (
+            not self.hass
+            or not self._entry_id
+            or curtailment_detected
+            or net_charge_w <= BATTERY_CHARGE_IDLE_W
+            or not self._config.get(CONF_BATTERY_POWER)
+            or self._config.get(CONF_SIM_ENABLED)
+        ):
+            return
+        entry_data = (self.hass.data.get(DOMAIN, {}) or {}).get(self._entry_id)
+        if entry_data is None:
+            return
+        calibration = entry_data.setdefault(
+            "mppt_calibration", mppt_calibration.initial_calibration()
+        )
+        last = entry_data.setdefault("_calibration_last", {})
+        for reading, info in zip(mppt_readings, per_mppt):
+            rel_v = float(info.get(KEY_RELATIVE_VOLTAGE, 0.0))
+            params = reading["panel_params"]
+            if (
+                not info.get(KEY_ENERGY_HARVESTING_POSSIBLE)
+                or not 1.0 - MPPT_CALIBRATION_VOLTAGE_BAND <= rel_v <= 1.0
+                or float(info.get(KEY_LIGHT_FACTOR, 0.0)) < MPPT_CALIBRATION_MIN_LIGHT
+                or not params[CONF_PANEL_ISC]
+            ):
+                continue
+            sample = (reading["pv_power"], reading["pv_voltage"])
+            if last.get(info["index"]) == sample:
+                continue
+            last[info["index"]] = sample
+            mppt_calibration.observe(
+                calibration, info["index"], rel_v,
+                params[CONF_PANEL_IMP] / params[CONF_PANEL_ISC], mppt_config,
+                forgetting=MPPT_CALIBRATION_FORGETTING,
+            )
+
+
     def _calculate_value(
         self,
         sensor_values: Dict[str, Any],
@@ -167,7 +290,7 @@ class SunAllocatorExcessSensor(BaseSunAllocatorSensor):
                 pv_voltage=pv_v,
                 pv_power=pv_p,
                 **r["panel_params"],
-                **mppt_config,
+                **{**mppt_config, **r.get("model_params", {})},
                 temperature_compensation=temp_compensation,
             )
             harvesting = bool(debug.get(KEY_ENERGY_HARVESTING_POSSIBLE))
@@ -198,6 +321,7 @@ class SunAllocatorExcessSensor(BaseSunAllocatorSensor):
                 "current_max_power": round(float(cmp_value), 1),
                 "untapped": round(untapped_i, 1),
                 **debug,
+                **r.get("model_params", {}),
             })
 
         # Aggregate sentinels for downstream attribute consumers.
@@ -209,8 +333,19 @@ class SunAllocatorExcessSensor(BaseSunAllocatorSensor):
 
         # Branch on the selected calculation method. mppt / mppt_probe publish the
         # same cautious MPPT value (probe acts only in the controller); export uses
-        # the energy-balance formula for grid-export inverters.
-        if method == CALC_METHOD_EXPORT:
+        # the energy-balance formula for grid-export inverters; grid_meter closes
+        # the loop on the measured export.
+        if method == CALC_METHOD_GRID_METER:
+            excess = self._grid_meter_excess(
+                grid_power=sensor_values.get(CONF_GRID_POWER),
+                battery_power=battery_power,
+                battery_power_reversed=battery_power_reversed,
+                configured_reserve=configured_reserve,
+                battery_soc=battery_soc,
+                sharing_soc=sharing_soc,
+                battery_discharge_tolerance_w=discharge_tolerance_w,
+            )
+        elif method == CALC_METHOD_EXPORT:
             excess = calculate_excess_power_export(
                 pv_power=total_pv_power,
                 consumption=consumption if has_consumption_sensor else None,
@@ -247,6 +382,12 @@ class SunAllocatorExcessSensor(BaseSunAllocatorSensor):
             discharge_tolerance_w=discharge_tolerance_w,
         )
 
+        self._calibrate_model(
+            mppt_readings, per_mppt, mppt_config,
+            net_charge_w=-battery_power if battery_power_reversed else battery_power,
+            curtailment_detected=curtailment_detected,
+        )
+
         usage = calculate_usage_percentage(total_pv_power, total_cmp)
         battery_discharging = (
             battery_power > 0 if battery_power_reversed else battery_power < 0
@@ -333,6 +474,11 @@ class SunAllocatorExcessSensor(BaseSunAllocatorSensor):
                     log_info(
                         "SunAllocator watchdog: data fresh again; normal operation resumed"
                     )
+                # Hand the exact value to the allocator (see setup_auto_control);
+                # the rounded state below is only for display.
+                feed = entry_data.get("excess_feed")
+                if feed is not None:
+                    feed(excess)
             except KeyError:
                 # During setup or teardown — safe to ignore.
                 pass
@@ -1,5 +1,6 @@
 """Power Distribution sensor for SunAllocator.
 Provides overview of total allocated power with per-device allocation in W and % plus metadata.
+Per-entity diagnostics are served by the ``get_diagnostics`` service instead of attributes.
 """
 
 from __future__ import annotations
@@ -15,15 +16,9 @@ from ...core.logger import log_debug, journal_event
 
 from ...const import (
     DOMAIN,
-    CONF_DEVICES,
     CONF_POWER_DISTRIBUTION,
     SENSOR_POWER_DISTRIBUTION_SUFFIX,
     SIGNAL_POWER_DISTRIBUTION_UPDATED,
-    CONF_DEVICE_ID,
-    CONF_DEVICE_NAME,
-    CONF_DEVICE_TYPE,
-    CONF_DEVICE_ENTITY,
-    CONF_AUTO_CONTROL_ENABLED,
 )
 from ..utils import build_device_reason, is_device_auto_control_enabled
 
@@ -48,7 +43,8 @@ class SunAllocatorPowerDistributionSensor(SensorEntity):
             "allocation_percent": None,
             "device_meta": None,
             "reasons": None,
-            "diagnostics": None,
+            "shed_latency_ms": None,
+            "preempted_runs": 0,
         }
 
 
@@ -59,6 +55,12 @@ class SunAllocatorPowerDistributionSensor(SensorEntity):
         self._attr_unique_id = f"{entry_id}_{SENSOR_POWER_DISTRIBUTION_SUFFIX}"
         self._state = 0.0
         self._attr_extra_state_attributes = self._get_default_attributes()
+        # Per-device sub-objects, rebuilt only for devices the allocator reports
+        # as changed and reused as-is for the others.
+        self._meta: Dict[str, Dict[str, Any]] = {}
+        self._percent: Dict[str, float] = {}
+        self._reasons: Dict[str, Dict[str, Any]] = {}
+        self._config: Any = None
 
 
     @property
@@ -78,107 +80,68 @@ class SunAllocatorPowerDistributionSensor(SensorEntity):
         """Return the cached state (updated via async_update)."""
         return self._state
 
+    def _refresh_device(
+        self,
+        dev_id: str,
+        device_status: Dict[str, Any],
+        allocation: Dict[str, float],
+        config: Any,
+        runtime_flags: Dict[str, bool] | None = None,
+    ) -> None:
+        """Rebuild the cached sub-objects of one device."""
+        status = device_status[dev_id]
+        pct = status.get("percent_actual")
+        if pct is None:
+            pct = status.get("percent_target", 0.0)
+        try:
+            self._percent[dev_id] = float(pct or 0.0)
+        except (TypeError, ValueError):
+            self._percent[dev_id] = 0.0
+        self._meta[dev_id] = dict(status)
+        self._reasons[dev_id] = build_device_reason(
+            dev_id,
+            device_status,
+            float((allocation.get(dev_id) or 0)),
+            is_device_auto_control_enabled(config, dev_id, runtime_flags),
+        )
+
     async def async_update(self) -> None:
-        """Compute and cache the sensor state and attributes."""
+        """Compute and cache the sensor state and attributes.
+
+        Only devices in the allocator's ``distribution_changed`` delta are
+        rebuilt; a new config (options reload) rebuilds everything. Per-entity
+        diagnostics are not part of the attributes: they are returned on demand
+        by the ``get_diagnostics`` service.
+        """
         try:
             data = self._hass.data.get(DOMAIN, {}).get(self._entry_id, {})
             pd_data: Dict[str, Any] = data.get(CONF_POWER_DISTRIBUTION, {}) or {}
             device_status: Dict[str, Any] = data.get("device_status", {}) or {}
             allocation: Dict[str, float] = pd_data.get("allocation", {}) or {}
-
             config = data.get("config", {})
-            all_devices = config.get(CONF_DEVICES, []) or []
-
-            filter_reasons = data.get("device_filter_reasons", {})
-            all_devices_info = []
-            all_device_ids = []
-
-            def _entity_exists(eid: str) -> bool:
-                """Check if entity exists using individual lookup instead of async_all()."""
-                if not eid:
-                    return False
-                # Strip |hvac_mode suffix for climate entities
-                clean_eid = eid.split("|")[0] if "|" in eid else eid
-                return self._hass.states.get(clean_eid) is not None
-
-            for dev in all_devices:
-                dev_id = dev.get(CONF_DEVICE_ID)
-                entity_id = dev.get(CONF_DEVICE_ENTITY)
-                device_type = dev.get(CONF_DEVICE_TYPE)
-                name = dev.get(CONF_DEVICE_NAME)
-
-                reason = None
-                if not entity_id:
-                    reason = "No entity_id configured"
-                elif not _entity_exists(entity_id):
-                    reason = "Entity not found in Home Assistant"
-                elif dev_id not in device_status:
-                    reason = filter_reasons.get(dev_id, "Filtered (unknown reason)")
-
-                all_devices_info.append({
-                    "device_id": dev_id,
-                    "name": name,
-                    "entity_id": entity_id,
-                    "type": device_type,
-                    "auto_control": dev.get(CONF_AUTO_CONTROL_ENABLED, "missing"),
-                    "in_device_status": (dev_id in device_status) if dev_id else False,
-                    "reason": reason,
-                })
-                if entity_id:
-                    all_device_ids.append(entity_id)
-
-            if not all_devices_info:
-                for dev_id in device_status:
-                    all_devices_info.append({
-                        "id": dev_id,
-                        "name": device_status[dev_id].get(CONF_DEVICE_NAME),
-                        "entity_id": device_status[dev_id].get(CONF_DEVICE_ENTITY),
-                        "type": device_status[dev_id].get(CONF_DEVICE_TYPE),
-                        "in_device_status": True,
-                        "reason": None,
-                    })
-                    all_device_ids.append(device_status[dev_id].get(CONF_DEVICE_ENTITY))
-
-            not_found_entities = [
-                eid for eid in all_device_ids if not _entity_exists(eid)
-            ]
+
+            changed = data.get("distribution_changed") or set()
+            data["distribution_changed"] = set()
+            if config is not self._config:
+                self._config = config
+                changed = set(device_status)
+            changed |= device_status.keys() - self._meta.keys()
+            for dev_id in self._meta.keys() - device_status.keys():
+                self._meta.pop(dev_id, None)
+                self._percent.pop(dev_id, None)
+                self._reasons.pop(dev_id, None)
+            changed &= device_status.keys()
+
+            for dev_id in changed:
+                self._refresh_device(
+                    dev_id, device_status, allocation, config, data.get("auto_control")
+                )
 
             total = float(pd_data.get("total_power", 0.0) or 0.0)
             remaining = float(pd_data.get("remaining_power", 0.0) or 0.0)
             allocated = float(pd_data.get("allocated_power", total - remaining) or 0.0)
 
-            allocation_percent: Dict[str, float] = {}
-            for dev_id, st in device_status.items():
-                pct = st.get("percent_actual")
-                if pct is None:
-                    pct = st.get("percent_target", 0.0)
-                try:
-                    allocation_percent[dev_id] = float(pct or 0.0)
-                except (TypeError, ValueError):
-                    allocation_percent[dev_id] = 0.0
-
-            reasons = {
-                dev_id: build_device_reason(
-                    dev_id,
-                    device_status,
-                    float((allocation.get(dev_id) or 0)),
-                    is_device_auto_control_enabled(config, dev_id),
-                )
-                for dev_id in device_status
-            }
-
-            diagnostics = {
-                "all_devices_info": all_devices_info,
-                "visible_devices": list(device_status.keys()),
-                "not_found_entities": not_found_entities,
-                "device_count": len(all_devices_info),
-                "visible_count": len(device_status),
-                "raw_data_keys": list(data.keys()),
-            }
-
-            old_allocated = self._attr_extra_state_attributes.get("allocated_power")
-            old_reasons = self._attr_extra_state_attributes.get("reasons")
-            if allocated != old_allocated or reasons != old_reasons:
+            if changed or allocated != self._attr_extra_state_attributes.get("allocated_power"):
                 log_debug("SunAllocatorPowerDistributionSensor state changed")
                 journal_event(
                     "power_distribution_status",
@@ -186,24 +149,33 @@ class SunAllocatorPowerDistributionSensor(SensorEntity):
                         "total": total,
                         "remaining": remaining,
                         "allocated": allocated,
-                        "allocation": allocation,
-                        "allocation_percent": allocation_percent,
-                        "device_meta": device_status,
-                        "reasons": reasons,
-                        "diagnostics": diagnostics,
+                        "changed": {
+                            dev_id: {
+                                "allocation_w": allocation.get(dev_id),
+                                "allocation_percent": self._percent[dev_id],
+                                "reason": self._reasons[dev_id],
+                            }
+                            for dev_id in sorted(changed)
+                        },
                     },
                 )
 
-            self._attr_extra_state_attributes.update({
+            attributes = {
                 "total_power": total,
                 "remaining_power": remaining,
                 "allocated_power": allocated,
                 "allocation_w": allocation,
-                "allocation_percent": allocation_percent,
-                "device_meta": {k: dict(v) for k, v in device_status.items()},
-                "reasons": reasons,
-                "diagnostics": diagnostics,
-            })
+                # Drop-to-shed latency of the last shed-first pass (core/preemption.py).
+                "shed_latency_ms": data.get("shed_latency_ms"),
+                "preempted_runs": data.get("preempted_runs", 0),
+            }
+            if changed or self._attr_extra_state_attributes.get("device_meta") is None:
+                attributes.update({
+                    "allocation_percent": {i: self._percent[i] for i in device_status},
+                    "device_meta": {i: self._meta[i] for i in device_status},
+                    "reasons": {i: self._reasons[i] for i in device_status},
+                })
+            self._attr_extra_state_attributes.update(attributes)
             self._state = allocated
 
         except (ValueError, TypeError, KeyError, AttributeError) as exc:
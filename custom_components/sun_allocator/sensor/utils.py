@@ -52,10 +52,20 @@ def get_device_entity_friendly_name(hass: HomeAssistant, device_config: Dict[str
     return None
 
 
-def is_device_auto_control_enabled(config_data: Dict[str, Any], device_id: str | None) -> bool:
-    """Return True if a device has auto-control enabled in the config entry data."""
+def is_device_auto_control_enabled(
+    config_data: Dict[str, Any],
+    device_id: str | None,
+    runtime_flags: Dict[str, bool] | None = None,
+) -> bool:
+    """Return True if a device has auto-control enabled.
+
+    ``runtime_flags`` (``entry_data["auto_control"]``, the switch toggles)
+    override the value in the config entry data.
+    """
     if not device_id:
         return False
+    if runtime_flags and device_id in runtime_flags:
+        return bool(runtime_flags[device_id])
     for dev in config_data.get(CONF_DEVICES, []) or []:
         if dev.get(CONF_DEVICE_ID) == device_id:
             return bool(dev.get(CONF_AUTO_CONTROL_ENABLED, False))
@@ -190,7 +200,7 @@ def build_device_reason(
 
 
 def get_sensor_state_safely(
-    hass: HomeAssistant, entity_id: Optional[str], sensor_name: str
+    hass: HomeAssistant, entity_id: Optional[str], sensor_name: str, states=None
 ) -> Tuple[float, bool]:
     """
     Safely get sensor state with proper error handling.
@@ -199,6 +209,8 @@ def get_sensor_state_safely(
         hass: Home Assistant instance
         entity_id: Entity ID of the sensor
         sensor_name: Human-readable name for logging
+        states: Optional ``hass.states``-like view to read from (e.g. the
+            allocator's per-cycle snapshot); defaults to ``hass.states``
 
     Returns:
         Tuple of (value, success) where success indicates if the value was retrieved
@@ -207,7 +219,7 @@ def get_sensor_state_safely(
         log_debug(f"{sensor_name} entity ID not configured")
         return 0.0, False
 
-    state = hass.states.get(entity_id)
+    state = (states if states is not None else hass.states).get(entity_id)
     if state is None:
         log_debug(
             f"{sensor_name} sensor '{entity_id}' not found - normal during startup"
@@ -234,16 +246,17 @@ def get_sensor_state_safely(
 
 
 def is_reading_stale(
-    hass: HomeAssistant, entity_id: Optional[str], max_age_s: float
+    hass: HomeAssistant, entity_id: Optional[str], max_age_s: float, states=None
 ) -> bool:
     """Return True if the entity's last update is older than ``max_age_s`` seconds.
 
     Returns False when there is nothing to judge (no entity, no timestamp, or
     max_age_s <= 0) — absence/unavailability is handled by the callers' own checks.
+    ``states`` is an optional ``hass.states``-like view to read from.
     """
     if not entity_id or max_age_s <= 0:
         return False
-    state = hass.states.get(entity_id)
+    state = (states if states is not None else hass.states).get(entity_id)
     if state is None:
         return False
     last = getattr(state, "last_updated", None) or getattr(state, "last_changed", None)
@@ -253,7 +266,7 @@ def is_reading_stale(
 
 
 def get_temperature_compensation_data(
-    hass: HomeAssistant, config: Dict[str, Any]
+    hass: HomeAssistant, config: Dict[str, Any], read_sensor=None
 ) -> Optional[Dict[str, float]]:
     """
     Get temperature compensation data if enabled.
@@ -261,6 +274,8 @@ def get_temperature_compensation_data(
     Args:
         hass: Home Assistant instance
         config: Configuration dictionary
+        read_sensor: Optional ``(hass, entity_id, name) -> (value, ok)`` reader
+            (e.g. the domain input cache); defaults to ``get_sensor_state_safely``
 
     Returns:
         Temperature compensation data or None if not enabled/available
@@ -272,7 +287,8 @@ def get_temperature_compensation_data(
     if not temp_sensor:
         return None
 
-    temp_value, success = get_sensor_state_safely(hass, temp_sensor, "Temperature")
+    read_sensor = read_sensor or get_sensor_state_safely
+    temp_value, success = read_sensor(hass, temp_sensor, "Temperature")
     if not success:
         return None
 
@@ -407,6 +423,54 @@ def calculate_excess_power_export(
     return max(0.0, excess)
 
 
+def battery_blocks_excess(
+    battery_power: float,
+    battery_power_reversed: bool,
+    battery_discharge_tolerance_w: float = 0.0,
+) -> bool:
+    """Discharge guard shared by the excess methods: the battery discharges
+    beyond the tolerance, so there is no surplus to hand out."""
+    net_charge_w = _battery_net_charge_w(battery_power, battery_power_reversed)
+    return net_charge_w < -battery_discharge_tolerance_w
+
+
+def calculate_excess_power_grid_meter(
+    allocated_load_w: float,
+    correction_w: float,
+    battery_power: float,
+    battery_power_reversed: bool,
+    configured_reserve: float = 0.0,
+    battery_soc: float | None = None,
+    sharing_soc: float = 0.0,
+    battery_discharge_tolerance_w: float = 0.0,
+) -> float:
+    """Grid-meter excess: the load the meter reading already reflects, plus a
+    feedback correction derived from the measured export.
+
+    ``excess = allocated_load + divertible_charge + correction``. With
+    ``correction = export − target`` this is the export method's balance read
+    off the meter instead of pv/consumption (``export + allocated`` equals
+    ``pv − consumption_without_devices − self − battery_charge``); the
+    grid_meter method passes its PI step instead (core/grid_loop.py). Battery
+    charge above the reserve is divertible surplus, as in
+    ``calculate_excess_power_export``, and the same discharge guard, tolerance
+    and SOC-modulated reserve apply.
+    """
+    if battery_blocks_excess(battery_power, battery_power_reversed, battery_discharge_tolerance_w):
+        return 0.0
+    net_charge_w = _battery_net_charge_w(battery_power, battery_power_reversed)
+    battery_charge_w = max(0.0, net_charge_w)
+    effective_reserve = _effective_reserve(configured_reserve, battery_soc, sharing_soc)
+    divertible_w = battery_charge_w - min(battery_charge_w, effective_reserve)
+
+    excess = float(allocated_load_w) + divertible_w + float(correction_w)
+    log_debug(
+        "GridMeter: Allocated=%sW, Divertible=%sW, Correction=%sW -> Excess=%sW",
+        allocated_load_w, divertible_w, correction_w, excess,
+    )
+    return max(0.0, excess)
+
+
 def calculate_excess_power_mppt(
     current_max_power: float,
     pv_power: float = 0.0,
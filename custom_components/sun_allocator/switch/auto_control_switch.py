@@ -16,6 +16,7 @@ from ..const import (
     CONF_DEVICE_ENTITY,
     CONF_DEVICE_TURN_OFF_ON_AUTO_CONTROL_DISABLE,
 )
+from ..core import auto_control
 from ..core.entity_control import turn_off_entity, parse_relay_entity
 from ..sensor.utils import get_device_info
 
@@ -23,9 +24,9 @@ from ..sensor.utils import get_device_info
 class SunAllocatorDeviceAutoControlSwitch(SwitchEntity, RestoreEntity):
     """Runtime toggle for auto-control of a single device.
 
-    State precedence on startup: RestoreEntity (last user state) > config value.
-    Toggling persists to the config entry without triggering a reload (via the
-    `_skip_reload` flag consumed by the entry update listener).
+    State precedence on startup: the runtime flag restored from the Store >
+    RestoreEntity (last user state) > config value. Toggling only changes the
+    runtime flag (see core/auto_control.py); the config entry is not written.
     """
 
     _attr_has_entity_name = True
@@ -55,10 +56,19 @@ class SunAllocatorDeviceAutoControlSwitch(SwitchEntity, RestoreEntity):
 
     async def async_added_to_hass(self) -> None:
         await super().async_added_to_hass()
-        last_state = await self.async_get_last_state()
-        if last_state is not None and last_state.state in ("on", STATE_OFF):
-            self._is_on = last_state.state != STATE_OFF
         entry_data = self._entry_data()
+        flags = (entry_data or {}).get("auto_control") or {}
+        if self._device_id in flags:
+            self._is_on = bool(flags[self._device_id])
+        else:
+            last_state = await self.async_get_last_state()
+            if last_state is not None and last_state.state in ("on", STATE_OFF):
+                self._is_on = last_state.state != STATE_OFF
+                # Nothing in the Store yet (first start after an upgrade, or the
+                # Store was lost): adopt the entity's own restored state.
+                auto_control.set_enabled(
+                    self._hass, self._entry_id, self._device_id, self._is_on
+                )
         if entry_data is not None:
             entry_data.setdefault("auto_control_switches", {})[self._device_id] = self
 
@@ -68,42 +78,23 @@ class SunAllocatorDeviceAutoControlSwitch(SwitchEntity, RestoreEntity):
             entry_data.get("auto_control_switches", {}).pop(self._device_id, None)
 
     def sync_state(self, is_on: bool) -> None:
-        """Sync state from config flow without persisting back to the config entry."""
+        """Follow a configured value changed through the options flow."""
         self._is_on = is_on
+        auto_control.set_enabled(self._hass, self._entry_id, self._device_id, is_on)
         self.async_write_ha_state()
 
-    async def _persist_to_config(self, is_on: bool) -> None:
-        """Persist new auto_control state to the config entry without reloading it."""
-        config_entry = self._hass.config_entries.async_get_entry(self._entry_id)
-        if config_entry is None:
-            return
-        devices = list(config_entry.data.get(CONF_DEVICES, []))
-        changed = False
-        for i, dev in enumerate(devices):
-            if dev.get(CONF_DEVICE_ID) == self._device_id:
-                if dev.get(CONF_AUTO_CONTROL_ENABLED) != is_on:
-                    devices[i] = {**dev, CONF_AUTO_CONTROL_ENABLED: is_on}
-                    changed = True
-                break
-        if changed:
-            entry_data = self._entry_data() or {}
-            entry_data["_skip_reload"] = True
-            self._hass.config_entries.async_update_entry(
-                config_entry, data={**config_entry.data, CONF_DEVICES: devices}
-            )
-
     async def async_turn_on(self, **kwargs: Any) -> None:
         self._is_on = True
         entry_data = self._entry_data()
         if entry_data:
             entry_data.get("manual_overrides", {}).pop(self._device_id, None)
+        auto_control.set_enabled(self._hass, self._entry_id, self._device_id, True)
         self.async_write_ha_state()
-        await self._persist_to_config(True)
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         self._is_on = False
+        auto_control.set_enabled(self._hass, self._entry_id, self._device_id, False)
         self.async_write_ha_state()
-        await self._persist_to_config(False)
         config_entry = self._hass.config_entries.async_get_entry(self._entry_id)
         if config_entry:
             dev_cfg = next(
@@ -59,5 +59,26 @@ class SunAllocatorRelay : public Component, public FloatOutput {
     bool zero_means_zero_{false};
 };
 
+// Apply a packed channel vector from SunAllocator's batched set_channels call:
+// percents[i] drives lights[i]. A negative entry leaves its channel untouched,
+// 0 turns it off, anything else sets the brightness to that percent.
+inline void apply_channel_percents(const std::vector<float> &percents,
+                                   const std::vector<light::LightState *> &lights) {
+  const size_t count = std::min(percents.size(), lights.size());
+  for (size_t i = 0; i < count; i++) {
+    const float percent = percents[i];
+    if (percent < 0.0f) {
+      continue;
+    }
+    if (percent == 0.0f) {
+      lights[i]->turn_off().perform();
+      continue;
+    }
+    auto call = lights[i]->turn_on();
+    call.set_brightness(clamp(percent / 100.0f, 0.0f, 1.0f));
+    call.perform();
+  }
+}
+
 }  // namespace sunallocator_relay
 }  // namespace esphome
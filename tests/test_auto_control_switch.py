@@ -12,6 +12,11 @@ from custom_components.sun_allocator.const import (
     CONF_AUTO_CONTROL_ENABLED,
     CONF_DEVICE_TURN_OFF_ON_AUTO_CONTROL_DISABLE,
 )
+from custom_components.sun_allocator.core import auto_control
+from custom_components.sun_allocator.core.device_restore import (
+    load_auto_control,
+    persist_auto_control,
+)
 from custom_components.sun_allocator.switch import async_setup_entry
 from custom_components.sun_allocator.switch.auto_control_switch import (
     SunAllocatorDeviceAutoControlSwitch,
@@ -74,8 +79,8 @@ async def test_devices_without_device_id_skipped():
 
 
 @pytest.mark.asyncio
-async def test_turn_off_persists_to_config_without_reload():
-    """Toggling the switch off must update the config entry without triggering a reload."""
+async def test_turn_off_sets_runtime_flag_without_config_write():
+    """Toggling the switch changes the runtime flag only; the config entry is untouched."""
     hass = _make_hass()
     devices = [{CONF_DEVICE_ID: "dev1", CONF_AUTO_CONTROL_ENABLED: True}]
     hass.data[DOMAIN]["entry_x"] = {"manual_overrides": {}}
@@ -84,14 +89,19 @@ async def test_turn_off_persists_to_config_without_reload():
     sw = SunAllocatorDeviceAutoControlSwitch(hass, "entry_x", devices[0])
     sw.async_write_ha_state = MagicMock()
 
-    await sw.async_turn_off()
+    with patch(
+        "custom_components.sun_allocator.core.auto_control.persist_auto_control"
+    ) as persist:
+        await sw.async_turn_off()
+        await sw.async_turn_on()
+        await sw.async_turn_off()
 
     assert sw.is_on is False
-    # _skip_reload guards against the listener triggering a full reload mid-toggle.
-    assert hass.data[DOMAIN]["entry_x"]["_skip_reload"] is True
-    hass.config_entries.async_update_entry.assert_called_once()
-    new_data = hass.config_entries.async_update_entry.call_args.kwargs["data"]
-    assert new_data[CONF_DEVICES][0][CONF_AUTO_CONTROL_ENABLED] is False
+    hass.config_entries.async_update_entry.assert_not_called()
+    assert hass.data[DOMAIN]["entry_x"]["auto_control"] == {"dev1": False}
+    # Every flip goes to the shared restore store, which batches the file write.
+    assert persist.call_count == 3
+    assert persist.call_args.args[2] == {"dev1": False}
 
 
 @pytest.mark.asyncio
@@ -194,3 +204,44 @@ async def test_sync_state_does_not_persist_to_config():
 
     assert sw.is_on is False
     hass.config_entries.async_update_entry.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_runtime_flag_from_store_wins_on_startup():
+    hass = _make_hass()
+    hass.data[DOMAIN]["entry_x"] = {"auto_control": {"dev1": True}}
+    devices = [{CONF_DEVICE_ID: "dev1", CONF_AUTO_CONTROL_ENABLED: False}]
+    sw = SunAllocatorDeviceAutoControlSwitch(hass, "entry_x", devices[0])
+
+    last_state = MagicMock()
+    last_state.state = "off"
+
+    with patch.object(SunAllocatorDeviceAutoControlSwitch, "async_get_last_state",
+                      new_callable=AsyncMock, return_value=last_state):
+        with patch("homeassistant.helpers.restore_state.RestoreEntity.async_added_to_hass",
+                   new_callable=AsyncMock):
+            await sw.async_added_to_hass()
+
+    assert sw.is_on is True
+
+
+def test_allocator_sees_runtime_flags():
+    devices = [
+        {CONF_DEVICE_ID: "dev1", CONF_AUTO_CONTROL_ENABLED: False},
+        {CONF_DEVICE_ID: "dev2", CONF_AUTO_CONTROL_ENABLED: True},
+    ]
+    entry_data = {"auto_control": {"dev1": True}}
+    effective = auto_control.effective_devices(entry_data, devices)
+    assert [d[CONF_AUTO_CONTROL_ENABLED] for d in effective] == [True, True]
+    assert effective[1] is devices[1]
+    assert devices[0][CONF_AUTO_CONTROL_ENABLED] is False
+    assert auto_control.from_storage({"dev1": True, "gone": False, "dev2": "x"}, ["dev1", "dev2"]) == {
+        "dev1": True
+    }
+
+
+async def test_runtime_flags_persist_in_the_restore_store(hass):
+    entry = MagicMock()
+    entry.entry_id = "entry_x"
+    persist_auto_control(hass, entry, {"dev1": False})
+    assert await load_auto_control(hass, entry) == {"dev1": False}
@@ -0,0 +1,123 @@
+"""Tests for batched multi-channel ESPHome control (core/channel_batch.py)."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from homeassistant.core import HomeAssistant, State
+
+from custom_components.sun_allocator.const import (
+    CONF_DEVICES,
+    CONF_DEVICE_ESPHOME_CHANNEL,
+    CONF_DEVICE_ESPHOME_NODE,
+    DEVICE_TYPE_CUSTOM,
+    DOMAIN,
+    RELAY_MODE_PROPORTIONAL,
+)
+from custom_components.sun_allocator.core import power_processor as pp
+from custom_components.sun_allocator.core.channel_batch import ChannelBatch, channel_of
+
+
+def _channel(index, priority, node="sunallocator-relay-c3-4ch"):
+    return {
+        "device_id": f"ch{index}", "device_name": f"Channel {index}",
+        "device_entity": f"light.sun_allocator_relay_{index}",
+        "device_type": DEVICE_TYPE_CUSTOM, "priority": priority,
+        "min_expected_w": 100, "max_expected_w": 1000,
+        "esphome_mode_select_entity": f"select.sun_allocator_mode_{index}",
+        "auto_control_enabled": True, "debounce_time": 0,
+        CONF_DEVICE_ESPHOME_NODE: node, CONF_DEVICE_ESPHOME_CHANNEL: index,
+    }
+
+
+def test_channel_of_and_vectors():
+    assert channel_of({CONF_DEVICE_ESPHOME_NODE: "Relay-C3", CONF_DEVICE_ESPHOME_CHANNEL: 2.0}) == (
+        "relay_c3", 2
+    )
+    assert channel_of({CONF_DEVICE_ESPHOME_NODE: ""}) is None
+    assert channel_of({CONF_DEVICE_ESPHOME_NODE: "n", CONF_DEVICE_ESPHOME_CHANNEL: 0}) is None
+
+    batch = ChannelBatch()
+    assert not batch.set_percent({}, 50.0)
+    assert batch.set_percent(_channel(3, 50, node="n"), 42.26)
+    assert batch.set_percent(_channel(1, 50, node="n"), 0.0)
+    # Channel 2 was not decided this pass: the node leaves it as is.
+    assert batch.vectors() == {"n": [0.0, -1.0, 42.3]}
+
+
+def _pass_hass(has_set_channels):
+    hass = MagicMock(spec=HomeAssistant)
+    states = {}
+    hass.states = MagicMock()
+    hass.states.get = states.get
+    hass.services = MagicMock()
+    hass.services.async_call = AsyncMock()
+    hass.services.has_service = MagicMock(return_value=has_set_channels)
+    config_entry = MagicMock()
+    config_entry.entry_id = "entry"
+    devices = [_channel(i, 100 - i) for i in range(1, 5)]
+    config_entry.data = {CONF_DEVICES: devices}
+    entry_data = {"power_allocation": {}}
+    hass.data = {DOMAIN: {"entry": entry_data}}
+    for device in devices:
+        states[device["device_entity"]] = State(device["device_entity"], "on")
+        select = device["esphome_mode_select_entity"]
+        states[select] = State(select, RELAY_MODE_PROPORTIONAL)
+    return hass, config_entry, entry_data
+
+
+@pytest.mark.asyncio
+async def test_pass_sends_one_call_per_node():
+    hass, config_entry, entry_data = _pass_hass(has_set_channels=True)
+
+    await pp.process_excess_power(hass, config_entry, 1500.0)
+
+    calls = hass.services.async_call.call_args_list
+    assert [(c.args[0], c.args[1]) for c in calls] == [
+        ("esphome", "sunallocator_relay_c3_4ch_set_channels")
+    ]
+    # Fill order: channel 1 takes 1000 W, channel 2 the remaining 500 W.
+    assert calls[0].args[2] == {"percents": [100.0, 50.0, 0.0, 0.0]}
+    assert entry_data["power_allocation"] == {"ch1": 1000.0, "ch2": 500.0, "ch3": 0.0, "ch4": 0.0}
+
+
+@pytest.mark.asyncio
+async def test_old_firmware_falls_back_to_per_light_calls():
+    """Without the node's set_channels action every channel is driven on its own."""
+    hass, config_entry, _ = _pass_hass(has_set_channels=False)
+
+    await pp.process_excess_power(hass, config_entry, 1500.0)
+
+    calls = hass.services.async_call.call_args_list
+    assert [(c.args[0], c.args[1], c.args[2]["entity_id"]) for c in calls] == [
+        ("light", "turn_on", "light.sun_allocator_relay_1"),
+        ("light", "turn_on", "light.sun_allocator_relay_2"),
+        ("light", "turn_off", "light.sun_allocator_relay_3"),
+        ("light", "turn_off", "light.sun_allocator_relay_4"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_shed_first_pass_pushes_channel_reductions_before_increases():
+    hass, config_entry, entry_data = _pass_hass(has_set_channels=True)
+    entry_data["power_allocation"] = {"ch1": 0.0, "ch2": 1000.0, "ch3": 0.0, "ch4": 0.0}
+    entry_data["device_on_state"] = {"ch2": True}
+    entry_data["_shed_requested_at"] = 0.0
+    calls = hass.services.async_call.call_args_list
+    sent_at_latency = []
+    record = pp.record_shed_latency
+
+    def _record(data):
+        sent_at_latency.append(len(calls))
+        record(data)
+
+    with patch.object(pp, "record_shed_latency", side_effect=_record):
+        await pp.process_excess_power(hass, config_entry, 1000.0, shed_first=True)
+
+    # Channel 2 is shed in the pass's push; channel 1's turn-on follows in a second one.
+    assert [c.args[2] for c in calls] == [
+        {"percents": [-1.0, 0.0, 0.0, 0.0]},
+        {"percents": [100.0]},
+    ]
+    assert sent_at_latency == [1]
+    assert "shed_latency_ms" in entry_data
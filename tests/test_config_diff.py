@@ -0,0 +1,109 @@
+"""Tests for hot-applying config updates (core/config_diff.py)."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import custom_components.sun_allocator as integration
+from custom_components.sun_allocator.const import (
+    CONF_AUTO_CONTROL_ENABLED,
+    CONF_BATTERY_POWER,
+    CONF_CALCULATION_METHOD,
+    CONF_DEVICE_ENTITY,
+    CONF_DEVICE_ID,
+    CONF_DEVICE_NAME,
+    CONF_DEVICE_PRIORITY,
+    CONF_DEVICES,
+    CONF_MPPT_INPUTS,
+    CONF_PANEL_VMP,
+    CONF_PV_POWER,
+    CONF_PV_VOLTAGE,
+    DOMAIN,
+)
+from custom_components.sun_allocator.core import auto_control, config_diff
+
+_DEVICE = {
+    CONF_DEVICE_ID: "boiler",
+    CONF_DEVICE_NAME: "Boiler",
+    CONF_DEVICE_ENTITY: "switch.boiler",
+    CONF_DEVICE_PRIORITY: 50,
+}
+_HUB = {
+    CONF_MPPT_INPUTS: [{CONF_PV_POWER: "sensor.pv", CONF_PV_VOLTAGE: "sensor.pv_v", CONF_PANEL_VMP: 36.0}],
+    CONF_BATTERY_POWER: "sensor.battery",
+    CONF_CALCULATION_METHOD: "mppt",
+    CONF_DEVICES: [_DEVICE],
+    "devices_str": "[...]",
+}
+
+
+def _with(hub=None, **device):
+    return {**_HUB, **(hub or {}), CONF_DEVICES: [{**_DEVICE, **device}], "devices_str": "[changed]"}
+
+
+def test_runtime_fields_are_hot():
+    change = config_diff.classify(_HUB, _with(**{CONF_DEVICE_PRIORITY: 80, CONF_DEVICE_NAME: "Tank"}))
+    assert change.structural is None and not change.hub
+    assert change.devices == {"boiler"} and change.renamed == {"boiler"}
+
+    panel = [{**_HUB[CONF_MPPT_INPUTS][0], CONF_PANEL_VMP: 37.5}]
+    change = config_diff.classify(_HUB, _with({CONF_MPPT_INPUTS: panel, CONF_CALCULATION_METHOD: "export"}))
+    assert change.structural is None and change.hub and not change.devices
+    assert config_diff.classify(_HUB, dict(_HUB)).empty
+
+
+def test_listener_inputs_and_device_set_are_structural():
+    assert config_diff.classify(_HUB, _with({CONF_BATTERY_POWER: "sensor.bat2"})).structural
+    assert config_diff.classify(_HUB, _with(**{CONF_DEVICE_ENTITY: "switch.other"})).structural
+    trackers = _HUB[CONF_MPPT_INPUTS] * 2
+    assert config_diff.classify(_HUB, _with({CONF_MPPT_INPUTS: trackers})).structural
+    assert config_diff.classify(_HUB, {**_HUB, CONF_DEVICES: []}).structural
+    assert config_diff.classify(None, _HUB).structural
+
+
+async def test_update_listener_applies_hot_changes_in_place():
+    sensor = MagicMock()
+    entry_data = {"config": _HUB, "hub_sensors": {"excess": sensor}, "probe_headroom_w": 600.0}
+    hass = MagicMock()
+    hass.data = {DOMAIN: {"entry": entry_data}}
+    hass.config_entries.async_reload = AsyncMock()
+    config_entry = MagicMock()
+    config_entry.entry_id = "entry"
+
+    config_entry.data = _with({CONF_CALCULATION_METHOD: "export"})
+    await integration.update_listener(hass, config_entry)
+    hass.config_entries.async_reload.assert_not_called()
+    sensor.apply_config.assert_called_once_with(config_entry.data)
+    assert entry_data["config"] is config_entry.data
+    assert entry_data["probe_headroom_w"] == 600.0
+
+    config_entry.data = _with({CONF_BATTERY_POWER: "sensor.bat2"})
+    await integration.update_listener(hass, config_entry)
+    hass.config_entries.async_reload.assert_awaited_once_with("entry")
+
+
+async def test_update_listener_makes_the_runtime_flag_follow_the_config():
+    """A saved auto_control_enabled change reaches the runtime flag, switch entity or not."""
+    entry_data = {"config": _with(**{CONF_AUTO_CONTROL_ENABLED: True}), "auto_control": {"boiler": True}}
+    hass = MagicMock()
+    hass.data = {DOMAIN: {"entry": entry_data}}
+    hass.config_entries.async_reload = AsyncMock()
+    config_entry = MagicMock()
+    config_entry.entry_id = "entry"
+
+    with patch.object(auto_control, "persist_auto_control") as persist:
+        config_entry.data = _with(**{CONF_AUTO_CONTROL_ENABLED: False})
+        await integration.update_listener(hass, config_entry)
+        assert entry_data["auto_control"] == {"boiler": False}
+        persist.assert_called_once()
+
+        # Unchanged configured value: a runtime toggle is left alone.
+        entry_data["auto_control"]["boiler"] = True
+        config_entry.data = _with(**{CONF_AUTO_CONTROL_ENABLED: False, CONF_DEVICE_PRIORITY: 70})
+        await integration.update_listener(hass, config_entry)
+        assert entry_data["auto_control"] == {"boiler": True}
+
+    switch = MagicMock()
+    entry_data["auto_control_switches"] = {"boiler": switch}
+    config_entry.data = _with(**{CONF_AUTO_CONTROL_ENABLED: True, CONF_DEVICE_ENTITY: "switch.other"})
+    await integration.update_listener(hass, config_entry)
+    switch.sync_state.assert_called_once_with(True)
+    hass.config_entries.async_reload.assert_awaited_once_with("entry")
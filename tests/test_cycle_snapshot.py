@@ -0,0 +1,124 @@
+"""Tests for the allocator's per-cycle state snapshot (core/snapshot.py)."""
+
+from collections import Counter
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from homeassistant.core import HomeAssistant, State
+
+from custom_components.sun_allocator.const import (
+    CONF_BATTERY_SOC_SENSOR,
+    CONF_DEVICES,
+    CONF_DEVICE_ACTUAL_POWER_SENSOR,
+    CONF_DEVICE_SCHEDULE_HELPER_ENTITY,
+    CONF_DEVICE_SCHEDULE_MODE,
+    CONF_ESPHOME_MODE_SELECT_ENTITY,
+    DEVICE_TYPE_STANDARD,
+    DOMAIN,
+    SCHEDULE_MODE_HELPER,
+)
+from custom_components.sun_allocator.core import power_processor as pp
+from custom_components.sun_allocator.core.snapshot import (
+    CycleSnapshot,
+    referenced_entities,
+)
+
+
+def _device(device_id, **extra):
+    device = {
+        "device_id": device_id,
+        "device_name": device_id.title(),
+        "device_entity": f"switch.{device_id}",
+        "device_type": DEVICE_TYPE_STANDARD,
+        "priority": 50,
+        "min_expected_w": 100,
+        "auto_control_enabled": True,
+        "debounce_time": 0,
+    }
+    device.update(extra)
+    return device
+
+
+@pytest.fixture
+def counting_hass():
+    """Mock hass whose ``states.get`` counts lookups per entity."""
+    hass = MagicMock(spec=HomeAssistant)
+    hass.data = {}
+    states = {}
+    lookups = Counter()
+
+    def _get(entity_id):
+        lookups[entity_id] += 1
+        return states.get(entity_id)
+
+    hass.states = MagicMock()
+    hass.states.get = _get
+    hass.states.async_set = lambda eid, st: states.__setitem__(eid, State(eid, st))
+    hass.services = MagicMock()
+    hass.services.async_call = AsyncMock()
+    hass.lookups = lookups
+    return hass
+
+
+def test_referenced_entities_deduplicates_and_skips_manual_devices():
+    shared = {CONF_DEVICE_ACTUAL_POWER_SENSOR: "sensor.meter"}
+    devices = [
+        _device("a", **shared),
+        _device("b", **shared, **{CONF_ESPHOME_MODE_SELECT_ENTITY: "select.b_mode"}),
+        _device("c", auto_control_enabled=False),
+    ]
+    assert referenced_entities({CONF_BATTERY_SOC_SENSOR: "sensor.soc"}, devices) == [
+        "sensor.soc", "switch.a", "sensor.meter", "switch.b", "select.b_mode",
+    ]
+
+
+def test_snapshot_is_pinned_at_collection(counting_hass):
+    counting_hass.states.async_set("switch.a", "off")
+    snapshot = CycleSnapshot(counting_hass, ["switch.a"])
+    counting_hass.states.async_set("switch.a", "on")
+
+    assert snapshot.get("switch.a").state == "off"
+    assert "switch.a" in snapshot and len(snapshot) == 1
+    # Entities outside the plan fall through to the live state machine.
+    assert snapshot.get("switch.other") is None
+
+
+def test_sensor_value_is_parsed_once(counting_hass):
+    counting_hass.states.async_set("sensor.meter", "42.5")
+    snapshot = CycleSnapshot(counting_hass, ["sensor.meter"])
+    with patch(
+        "custom_components.sun_allocator.core.snapshot.get_sensor_state_safely",
+        wraps=pp.get_sensor_state_safely,
+    ) as parse:
+        assert snapshot.sensor_value("sensor.meter", "Meter") == (42.5, True)
+        assert snapshot.sensor_value("sensor.meter", "Meter") == (42.5, True)
+    assert parse.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_process_excess_power_reads_each_entity_once(counting_hass):
+    helper = {
+        CONF_DEVICE_SCHEDULE_MODE: SCHEDULE_MODE_HELPER,
+        CONF_DEVICE_SCHEDULE_HELPER_ENTITY: "input_boolean.window",
+    }
+    devices = [
+        _device("a", **{CONF_DEVICE_ACTUAL_POWER_SENSOR: "sensor.meter"}, **helper),
+        _device("b", **{CONF_DEVICE_ACTUAL_POWER_SENSOR: "sensor.meter"}, **helper),
+    ]
+    config_entry = MagicMock()
+    config_entry.entry_id = "entry"
+    config_entry.data = {CONF_DEVICES: devices, CONF_BATTERY_SOC_SENSOR: "sensor.soc"}
+    counting_hass.data[DOMAIN] = {"entry": {"power_allocation": {}}}
+    for entity_id, value in (
+        ("switch.a", "on"), ("switch.b", "off"), ("sensor.meter", "150"),
+        ("input_boolean.window", "on"), ("sensor.soc", "80"),
+    ):
+        counting_hass.states.async_set(entity_id, value)
+
+    await pp.process_excess_power(counting_hass, config_entry, 500.0)
+
+    assert counting_hass.lookups == Counter({
+        "sensor.soc": 1, "switch.a": 1, "sensor.meter": 1,
+        "input_boolean.window": 1, "switch.b": 1,
+    })
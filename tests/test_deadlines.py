@@ -0,0 +1,250 @@
+"""Tests for the probe-tick fingerprint, the deadline heap and partial re-runs."""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+import custom_components.sun_allocator as integration
+from custom_components.sun_allocator.const import (
+    CONF_DEVICES,
+    CONF_DEVICE_CHECK_USABLE_TEMPLATE,
+    CONF_DEVICE_MIN_ON_TIME,
+    CONF_DEVICE_SCHEDULE_MODE,
+    CONF_START_TIME,
+    CONF_END_TIME,
+    SCHEDULE_MODE_HELPER,
+    SCHEDULE_MODE_STANDARD,
+    DOMAIN,
+)
+from custom_components.sun_allocator.core import deadlines
+from custom_components.sun_allocator.core import power_processor as pp
+from custom_components.sun_allocator.core.power_processor import (
+    MANUAL_OVERRIDE_TTL_SECONDS,
+)
+from custom_components.sun_allocator.core.schedule import next_schedule_change
+
+NOW = datetime(2026, 6, 1, 12, 0, tzinfo=timezone.utc)
+SLACK = timedelta(seconds=1)
+
+
+def _device(**extra):
+    device = {
+        "device_id": "heater",
+        "device_entity": "switch.heater",
+        "auto_control_enabled": True,
+    }
+    device.update(extra)
+    return device
+
+
+def _next_deadline(entry_data, devices):
+    """Head of a scheduler filled the way _arm_deadline_timer fills it."""
+    scheduler = deadlines.DeadlineScheduler()
+    scheduler.update_from(entry_data, devices, NOW)
+    return scheduler.next_at()
+
+
+def test_no_time_based_state_means_no_deadline():
+    assert _next_deadline({}, [_device()]) is None
+
+
+def test_earliest_of_override_retry_and_min_on():
+    entry_data = {
+        "manual_overrides": {"heater": {"since": NOW - timedelta(seconds=100), "state": True}},
+        "command_retries": {"heater": {"count": 1, "last_retry_at": NOW - timedelta(seconds=5)}},
+        "device_on_time_state": {"heater": {"last_on_time": NOW - timedelta(seconds=50)}},
+    }
+    device = _device(**{CONF_DEVICE_MIN_ON_TIME: 60})
+    # Override expires in 20 s, retry in 25 s, min on-time in 10 s.
+    assert _next_deadline(entry_data, [device]) == NOW + timedelta(seconds=10) + SLACK
+    del entry_data["device_on_time_state"]
+    assert _next_deadline(entry_data, [device]) == (
+        NOW - timedelta(seconds=100) + timedelta(seconds=MANUAL_OVERRIDE_TTL_SECONDS) + SLACK
+    )
+
+
+def test_past_deadlines_and_manual_devices_are_ignored():
+    entry_data = {
+        "device_on_time_state": {
+            "heater": {
+                "last_on_time": NOW - timedelta(hours=1),
+                "startup_until": (NOW + timedelta(seconds=30)).isoformat(),
+            }
+        },
+        "device_debounce_state": {
+            "heater": {"state_change_time": NOW - timedelta(seconds=2), "counter_debounce_start": None}
+        },
+    }
+    device = _device(**{CONF_DEVICE_MIN_ON_TIME: 60, "debounce_time": 10})
+    # Min on-time elapsed long ago; debounce completes in 8 s; grace (stored as ISO) in 30 s.
+    assert _next_deadline(entry_data, [device]) == NOW + timedelta(seconds=8) + SLACK
+    device["auto_control_enabled"] = False
+    assert _next_deadline(entry_data, [device]) is None
+
+
+def test_schedule_edges():
+    device = {
+        CONF_DEVICE_SCHEDULE_MODE: SCHEDULE_MODE_STANDARD,
+        CONF_START_TIME: "08:00",
+        CONF_END_TIME: "18:30",
+    }
+    assert next_schedule_change(device, NOW) == NOW.replace(hour=18, minute=30, second=1)
+    evening = NOW.replace(hour=19)
+    assert next_schedule_change(device, evening) == (evening + timedelta(days=1)).replace(hour=8)
+    assert next_schedule_change({CONF_DEVICE_SCHEDULE_MODE: SCHEDULE_MODE_HELPER}, NOW) is None
+
+
+def _hass(states):
+    hass = MagicMock()
+    hass.states.get = states.get
+    return hass
+
+
+def test_fingerprint_tracks_device_entities():
+    state = MagicMock(state="off", last_updated=NOW)
+    hass = _hass({"switch.heater": state})
+    kwargs = {"headroom_w": 0.0, "battery_healthy": False, "battery_soc": 80.0}
+    first = deadlines.input_fingerprint(hass, [_device()], 500.0, **kwargs)
+    assert first == deadlines.input_fingerprint(hass, [_device()], 500.04, **kwargs)
+    assert first != deadlines.input_fingerprint(hass, [_device()], 600.0, **kwargs)
+
+    state.state = "on"
+    assert first != deadlines.input_fingerprint(hass, [_device()], 500.0, **kwargs)
+
+    templated = _device(**{CONF_DEVICE_CHECK_USABLE_TEMPLATE: "{{ true }}"})
+    assert deadlines.input_fingerprint(hass, [templated], 500.0, **kwargs) is None
+
+
+@pytest.mark.asyncio
+async def test_unchanged_inputs_skip_until_refresh_interval():
+    config_entry = MagicMock()
+    config_entry.data = {CONF_DEVICES: [_device()]}
+    hass = _hass({"switch.heater": MagicMock(state="on", last_updated=NOW)})
+    entry_data = {"excess_sensor_id": "sensor.excess"}
+
+    assert not integration._allocation_inputs_unchanged(hass, config_entry, entry_data, 300.0)
+    integration._remember_allocation_inputs(hass, config_entry, entry_data, 300.0)
+    assert integration._allocation_inputs_unchanged(hass, config_entry, entry_data, 300.0)
+    assert not integration._allocation_inputs_unchanged(hass, config_entry, entry_data, 900.0)
+
+    entry_data["_last_allocation_ts"] -= integration.ALLOCATION_REFRESH_INTERVAL_SECONDS
+    assert not integration._allocation_inputs_unchanged(hass, config_entry, entry_data, 300.0)
+
+
+@pytest.mark.asyncio
+async def test_deadline_only_run_does_not_mark_other_inputs_seen():
+    pump = _device(device_id="pump", device_entity="switch.pump")
+    config_entry = MagicMock()
+    config_entry.data = {CONF_DEVICES: [_device(), pump]}
+    states = {
+        "switch.heater": MagicMock(state="on", last_updated=NOW),
+        "switch.pump": MagicMock(state="off", last_updated=NOW),
+    }
+    hass = _hass(states)
+    entry_data = {"excess_sensor_id": "sensor.excess"}
+
+    with patch.object(integration, "process_excess_power", new=AsyncMock()), \
+         patch.object(integration, "_arm_deadline_timer"):
+        await integration._queue_process_excess_power(hass, config_entry, entry_data, 300.0)
+        assert integration._allocation_inputs_unchanged(hass, config_entry, entry_data, 300.0)
+
+        # The pump is switched by hand, then only the heater's deadline re-runs.
+        states["switch.pump"] = MagicMock(state="on", last_updated=NOW + SLACK)
+        await integration._queue_process_excess_power(
+            hass, config_entry, entry_data, 300.0, only_devices={"heater"}
+        )
+    # The probe tick must still run the full pass that sees the pump's change.
+    assert not integration._allocation_inputs_unchanged(hass, config_entry, entry_data, 300.0)
+
+
+async def test_deadline_timer_runs_allocation_at_expiry(hass):
+    hass.states.async_set("sensor.excess", "250")
+    config_entry = MagicMock()
+    config_entry.data = {CONF_DEVICES: [_device()]}
+    override_since = integration.dt_util.now()
+    entry_data = {
+        "excess_sensor_id": "sensor.excess",
+        "deadline_scheduler": deadlines.DeadlineScheduler(),
+        "manual_overrides": {"heater": {"since": override_since, "state": True}},
+    }
+
+    with patch.object(integration, "async_track_point_in_time") as track:
+        integration._arm_deadline_timer(hass, config_entry, entry_data)
+        track.assert_called_once()
+        _, callback, when = track.call_args.args
+        assert when == override_since + timedelta(seconds=MANUAL_OVERRIDE_TTL_SECONDS) + SLACK
+
+        # Same deadline → the armed timer is kept.
+        integration._arm_deadline_timer(hass, config_entry, entry_data)
+        assert track.call_count == 1
+
+    with patch.object(integration, "_queue_process_excess_power", new=AsyncMock()) as queue:
+        await callback(when)
+    queue.assert_awaited_once_with(
+        hass, config_entry, entry_data, 250.0, only_devices={"heater"}
+    )
+    assert entry_data["unsub_deadline_timer"] is None
+
+
+def test_scheduler_keeps_one_live_deadline_per_device():
+    scheduler = deadlines.DeadlineScheduler()
+    scheduler.set("a", NOW + timedelta(seconds=30))
+    scheduler.set("b", NOW + timedelta(seconds=10))
+    scheduler.set("b", NOW + timedelta(seconds=40))  # superseded entry stays in the heap
+    assert scheduler.next_at() == NOW + timedelta(seconds=30)
+    assert len(scheduler) == 2
+
+    assert scheduler.pop_due(NOW + timedelta(seconds=35)) == {"a"}
+    assert scheduler.next_at() == NOW + timedelta(seconds=40)
+    scheduler.set("b", None)
+    assert scheduler.next_at() is None
+    assert scheduler.pop_due(NOW + timedelta(hours=1)) == set()
+
+
+def test_scheduler_update_from_drops_removed_devices():
+    scheduler = deadlines.DeadlineScheduler()
+    entry_data = {
+        "manual_overrides": {
+            "heater": {"since": NOW, "state": True},
+            "pump": {"since": NOW - timedelta(seconds=60), "state": True},
+        }
+    }
+    pump = _device(device_id="pump", device_entity="switch.pump")
+    scheduler.update_from(entry_data, [_device(), pump], NOW)
+    assert scheduler.pop_due(NOW + timedelta(seconds=MANUAL_OVERRIDE_TTL_SECONDS)) == {"pump"}
+    scheduler.update_from(entry_data, [], NOW)
+    assert scheduler.next_at() is None
+
+
+@pytest.mark.asyncio
+async def test_partial_run_only_touches_due_devices():
+    config_entry = MagicMock()
+    config_entry.entry_id = "entry"
+    high = _device(device_id="boiler", device_entity="switch.boiler", priority=90,
+                   min_expected_w=400, debounce_time=0, device_type="standard")
+    low = _device(priority=10, min_expected_w=300, debounce_time=0, device_type="standard")
+    config_entry.data = {CONF_DEVICES: [high, low]}
+    states = {
+        "switch.boiler": MagicMock(state="on", last_changed=NOW),
+        "switch.heater": MagicMock(state="off", last_changed=NOW),
+    }
+    hass = MagicMock()
+    hass.states.get = states.get
+    hass.services.async_call = AsyncMock()
+    entry_data = {
+        "power_allocation": {"boiler": 400.0, "heater": 0.0},
+        "device_status": {"boiler": {"allow_probe": True, "refusal_reasons": ["kept"]}},
+        "device_on_state": {"boiler": True, "heater": False},
+        "_device_on_state_initialized": True,
+    }
+    hass.data = {DOMAIN: {"entry": entry_data}}
+
+    with patch.object(pp, "async_dispatcher_send"):
+        await pp.process_excess_power(hass, config_entry, 600.0, only_devices={"heater"})
+
+    # The boiler was not re-evaluated but its 400 W still came off the pool first,
+    # so the heater (300 W minimum) does not fit into the remaining 200 W.
+    assert entry_data["device_status"]["boiler"]["refusal_reasons"] == ["kept"]
+    assert entry_data["power_allocation"] == {"boiler": 400.0, "heater": 0.0}
+    assert entry_data["power_distribution"]["remaining_power"] == 200.0
@@ -11,7 +11,11 @@ from custom_components.sun_allocator.const import (
     CONF_DEVICE_MIN_EXPECTED_W,
     CONF_DEVICE_DEBOUNCE_TIME,
     CONF_HYSTERESIS_W,
+    CONF_DEVICE_DEBOUNCE_MODE,
+    CONF_DEVICE_DEBOUNCE_ENERGY_WH,
+    DEBOUNCE_MODE_ENERGY,
 )
+from custom_components.sun_allocator.core.deadlines import device_deadline
 
 
 @pytest.mark.asyncio
@@ -76,3 +80,56 @@ async def test_debounce_logic(freezer):
         device, 50, device_on_state, device_debounce_state, cfg, now
     )
     assert not is_active  # Should be off now
+
+
+def _energy_device():
+    return {
+        CONF_DEVICE_ID: "heater",
+        CONF_DEVICE_MIN_EXPECTED_W: 1000,
+        CONF_DEVICE_DEBOUNCE_TIME: 15,
+        CONF_DEVICE_DEBOUNCE_MODE: DEBOUNCE_MODE_ENERGY,
+        CONF_DEVICE_DEBOUNCE_ENERGY_WH: 2.0,
+    }
+
+
+def _at(second):
+    return datetime(2024, 1, 1, 0, 0, second, tzinfo=dt_util.UTC)
+
+
+def test_energy_debounce_sheds_a_large_deficit_fast():
+    device = _energy_device()
+    cfg = {CONF_HYSTERESIS_W: 0}
+    on_state, debounce_state = {"heater": True}, {}
+
+    # 3.6 kW below the OFF threshold: the 2 Wh budget is spent after 2 s.
+    is_active, _ = _calculate_device_state(device, -2600, on_state, debounce_state, cfg, _at(0))
+    assert is_active
+    assert debounce_state["heater"]["energy_due"] == _at(2)
+    is_active, _ = _calculate_device_state(device, -2600, on_state, debounce_state, cfg, _at(1))
+    assert is_active
+    is_active, _ = _calculate_device_state(device, -2600, on_state, debounce_state, cfg, _at(2))
+    assert not is_active
+    assert "energy_wh" not in debounce_state["heater"]
+
+
+def test_energy_debounce_keeps_the_time_bound_for_small_deficits():
+    device = _energy_device()
+    cfg = {CONF_HYSTERESIS_W: 0}
+    on_state, debounce_state = {"heater": True}, {}
+
+    # 30 W short: 15 s only integrate 0.125 Wh, so the debounce time decides.
+    _calculate_device_state(device, 970, on_state, debounce_state, cfg, _at(0))
+    is_active, _ = _calculate_device_state(device, 970, on_state, debounce_state, cfg, _at(14))
+    assert is_active
+    is_active, _ = _calculate_device_state(device, 970, on_state, debounce_state, cfg, _at(15))
+    assert not is_active
+
+
+def test_energy_debounce_deadline():
+    device = _energy_device()
+    on_state, debounce_state = {"heater": False}, {}
+    _calculate_device_state(device, 2800, on_state, debounce_state, {CONF_HYSTERESIS_W: 0}, _at(0))
+    entry_data = {"device_debounce_state": debounce_state}
+    # 1.8 kW of surplus reaches 2 Wh after 4 s, well before the 15 s debounce.
+    assert device_deadline(device, entry_data, _at(0)) > _at(4)
+    assert device_deadline(device, entry_data, _at(0)) < _at(6)
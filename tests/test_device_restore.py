@@ -14,6 +14,9 @@ from custom_components.sun_allocator.const import (
 from custom_components.sun_allocator.core import device_restore as dr
 
 
+_STORE_KEY = "sun_allocator_entry_x_restore"
+
+
 def _entry(devices):
     cfg = MagicMock()
     cfg.entry_id = "entry_x"
@@ -21,21 +24,63 @@ def _entry(devices):
     return cfg
 
 
-@pytest.mark.asyncio
-async def test_persist_device_state_writes_only_when_changed():
-    hass = MagicMock()
+def _seed(hass_storage, data):
+    hass_storage[_STORE_KEY] = {"version": dr.STORAGE_VERSION, "key": _STORE_KEY, "data": data}
+
+
+async def test_persist_device_state_writes_only_when_changed(hass, hass_storage):
     cfg = _entry([])
-    storage = {"switch.x": {"last_percent": 50, "_restore_on": True}}
-    save_mock = AsyncMock()
+    _seed(hass_storage, {"switch.x": {"last_percent": 50, "_restore_on": True}})
+    await dr.get_restore_store(hass, cfg).async_load()
 
-    with patch.object(dr, "_load_restore_data", new_callable=AsyncMock, return_value=storage), \
-         patch.object(dr, "_save_restore_data", new=save_mock):
+    with patch.object(dr.Store, "async_delay_save") as delay_save:
         # Same values — no save.
-        await dr.persist_device_state(hass, cfg, "switch.x", percent=50, is_on=True)
-        save_mock.assert_not_awaited()
-        # Different percent — save fires.
-        await dr.persist_device_state(hass, cfg, "switch.x", percent=80, is_on=True)
-        save_mock.assert_awaited_once()
+        dr.persist_device_state(hass, cfg, "switch.x", percent=50, is_on=True)
+        delay_save.assert_not_called()
+        # Different percent — save scheduled.
+        dr.persist_device_state(hass, cfg, "switch.x", percent=80, is_on=True)
+        delay_save.assert_called_once()
+
+
+async def test_pending_save_is_not_pushed_back_by_later_writes(hass, hass_storage):
+    """Store.async_delay_save defers a pending write on every call; arm it once."""
+    cfg = _entry([])
+    store = dr.get_restore_store(hass, cfg)
+    await store.async_load()
+
+    with patch.object(dr.Store, "async_delay_save") as delay_save:
+        dr.persist_device_state(hass, cfg, "switch.x", percent=10)
+        dr.persist_device_state(hass, cfg, "switch.x", percent=20)
+        delay_save.assert_called_once()
+        # The write itself reads the live dict, then the next change re-arms it.
+        data_func = delay_save.call_args.args[0]
+        assert data_func()["switch.x"] == {"last_percent": 20}
+        dr.persist_device_state(hass, cfg, "switch.x", percent=30)
+        assert delay_save.call_count == 2
+
+
+async def test_concurrent_writers_keep_each_others_keys(hass, hass_storage):
+    """Writers share one in-memory dict; the batched write carries every key."""
+    cfg = _entry([])
+    _seed(hass_storage, {"switch.old": {"_restore_on": True}})
+    deadline = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+    # Queued before the first load, applied on top of it.
+    dr.persist_device_state(hass, cfg, "switch.x", percent=40)
+    await dr.load_grace_state(hass, cfg)
+    dr.persist_grace_state(hass, cfg, "dev1", deadline)
+    dr.persist_learned_state(
+        hass, cfg, energy={"total_kwh": 1.0}, draw_model={}, power_curves={}
+    )
+    dr.persist_mode_state(hass, cfg, "select.x_mode", "Proportional")
+    await dr.async_unload_restore_store(hass, cfg)
+
+    saved = hass_storage[_STORE_KEY]["data"]
+    assert saved["switch.old"] == {"_restore_on": True}
+    assert saved["switch.x"] == {"last_percent": 40}
+    assert saved["select.x_mode"] == {"last_mode": "Proportional"}
+    assert saved[dr._GRACE_STORAGE_KEY] == {"dev1": deadline.isoformat()}
+    assert saved[dr._ENERGY_STORAGE_KEY] == {"total_kwh": 1.0}
 
 
 @pytest.mark.asyncio
@@ -95,68 +140,37 @@ async def test_restore_all_skips_devices_already_in_target_state():
     set_power.assert_not_awaited()
 
 
-@pytest.mark.asyncio
-async def test_grace_state_round_trip():
+async def test_grace_state_round_trip(hass):
     """Persist + load grace state preserves the deadline."""
-    hass = MagicMock()
     cfg = _entry([])
-    storage: dict = {}
-
-    async def fake_load(_hass, _cfg):
-        # Mirror Store.async_load which returns a freshly-deserialised dict each call.
-        import copy
-        return copy.deepcopy(storage)
-
-    async def fake_save(_hass, _cfg, data):
-        storage.clear()
-        storage.update(data)
-
     deadline = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
-    with patch.object(dr, "_load_restore_data", new=fake_load), \
-         patch.object(dr, "_save_restore_data", new=fake_save):
-        await dr.persist_grace_state(hass, cfg, "dev1", deadline)
-        loaded = await dr.load_grace_state(hass, cfg)
+    dr.persist_grace_state(hass, cfg, "dev1", deadline)
 
-    assert loaded == {"dev1": deadline}
+    assert await dr.load_grace_state(hass, cfg) == {"dev1": deadline}
 
 
-@pytest.mark.asyncio
-async def test_grace_state_clear_on_none():
-    hass = MagicMock()
+async def test_grace_state_clear_on_none(hass, hass_storage):
     cfg = _entry([])
-    storage = {dr._GRACE_STORAGE_KEY: {"dev1": "2026-01-01T12:00:00+00:00"}}
+    _seed(hass_storage, {dr._GRACE_STORAGE_KEY: {"dev1": "2026-01-01T12:00:00+00:00"}})
+    await dr.get_restore_store(hass, cfg).async_load()
 
-    async def fake_load(_hass, _cfg):
-        return storage
-
-    save_mock = AsyncMock()
-
-    with patch.object(dr, "_load_restore_data", new=fake_load), \
-         patch.object(dr, "_save_restore_data", new=save_mock):
-        await dr.persist_grace_state(hass, cfg, "dev1", None)
+    dr.persist_grace_state(hass, cfg, "dev1", None)
+    await dr.async_unload_restore_store(hass, cfg)
 
-    save_mock.assert_awaited_once()
-    saved_data = save_mock.call_args.args[2]
-    assert "dev1" not in saved_data[dr._GRACE_STORAGE_KEY]
+    assert "dev1" not in hass_storage[_STORE_KEY]["data"][dr._GRACE_STORAGE_KEY]
 
 
-@pytest.mark.asyncio
-async def test_grace_state_idempotent_when_value_unchanged():
+async def test_grace_state_idempotent_when_value_unchanged(hass, hass_storage):
     """Re-persisting the same deadline must not write to storage again."""
-    hass = MagicMock()
     cfg = _entry([])
     deadline = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
-    storage = {dr._GRACE_STORAGE_KEY: {"dev1": deadline.isoformat()}}
-
-    async def fake_load(_hass, _cfg):
-        return storage
+    _seed(hass_storage, {dr._GRACE_STORAGE_KEY: {"dev1": deadline.isoformat()}})
+    await dr.get_restore_store(hass, cfg).async_load()
 
-    save_mock = AsyncMock()
-    with patch.object(dr, "_load_restore_data", new=fake_load), \
-         patch.object(dr, "_save_restore_data", new=save_mock):
-        await dr.persist_grace_state(hass, cfg, "dev1", deadline)
+    with patch.object(dr.Store, "async_delay_save") as delay_save:
+        dr.persist_grace_state(hass, cfg, "dev1", deadline)
 
-    save_mock.assert_not_awaited()
+    delay_save.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -215,3 +229,69 @@ async def test_restore_all_restores_mode_select_first():
     # Order: mode first, then power.
     set_mode.assert_awaited_once_with(hass, "select.bulb_mode", "Proportional")
     set_power.assert_awaited_once_with(hass, "light.bulb", 70)
+
+
+@pytest.mark.asyncio
+async def test_restore_all_runs_devices_concurrently_with_bounded_fanout():
+    """Devices restore in parallel, never more than max_concurrency at once."""
+    import asyncio
+
+    hass = MagicMock()
+    hass.states.get.return_value = None
+    devices = [
+        {CONF_DEVICE_ID: f"d{i}", CONF_DEVICE_ENTITY: f"switch.s{i}"} for i in range(10)
+    ]
+    storage = {f"switch.s{i}": {"_restore_on": True} for i in range(10)}
+    in_flight = {"now": 0, "peak": 0}
+
+    async def slow_set_power(_hass, _entity, _percent):
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+
+    with patch.object(dr, "_load_restore_data", new_callable=AsyncMock, return_value=storage), \
+         patch.object(dr, "set_power_for_entity", new=slow_set_power):
+        restored = await dr.restore_all_devices(hass, _entry(devices), max_concurrency=3)
+
+    assert restored == 10
+    assert in_flight["peak"] == 3
+
+
+@pytest.mark.asyncio
+async def test_restore_all_keeps_mode_before_relay_per_device_and_isolates_failures():
+    hass = MagicMock()
+    state_select = MagicMock()
+    state_select.state = "Off"
+    hass.states.get.side_effect = lambda eid: state_select if eid.startswith("select.") else None
+    devices = [
+        {
+            CONF_DEVICE_ID: f"d{i}",
+            CONF_DEVICE_ENTITY: f"light.l{i}",
+            CONF_ESPHOME_MODE_SELECT_ENTITY: f"select.m{i}",
+        }
+        for i in range(3)
+    ]
+    storage = {}
+    for i in range(3):
+        storage[f"select.m{i}"] = {"last_mode": "Proportional"}
+        storage[f"light.l{i}"] = {"last_percent": 40}
+    calls = []
+
+    async def set_mode(_hass, entity, _mode):
+        calls.append(("mode", entity))
+
+    async def set_power(_hass, entity, _percent):
+        if entity == "light.l1":
+            raise RuntimeError("boom")
+        calls.append(("power", entity))
+
+    with patch.object(dr, "_load_restore_data", new_callable=AsyncMock, return_value=storage), \
+         patch.object(dr, "set_mode_for_entity", new=set_mode), \
+         patch.object(dr, "set_power_for_entity", new=set_power):
+        restored = await dr.restore_all_devices(hass, _entry(devices))
+
+    # d1's relay failed but the other devices still restored.
+    assert restored == 2
+    for i in (0, 2):
+        assert calls.index(("mode", f"select.m{i}")) < calls.index(("power", f"light.l{i}"))
@@ -8,6 +8,9 @@ from custom_components.sun_allocator.const import (
     CONF_DEVICE_ID,
     CONF_AUTO_CONTROL_ENABLED,
     CONF_POWER_DISTRIBUTION,
+    CONF_DEVICE_SCHEDULE_MODE,
+    SCHEDULE_MODE_DISABLED,
+    SCHEDULE_MODE_STANDARD,
 )
 from custom_components.sun_allocator.sensor.sensors.device_power_alloc import (
     SunAllocatorDevicePowerSensor,
@@ -103,6 +106,22 @@ def test_power_sensor_reports_allocated_w():
     assert sensor.extra_state_attributes["power_percent"] == 80.0
 
 
+def test_power_sensor_follows_hot_applied_schedule_mode():
+    cfg = _device_config("dev1", **{CONF_DEVICE_SCHEDULE_MODE: SCHEDULE_MODE_DISABLED})
+    entry_data = {"config": {CONF_DEVICES: [cfg]}, "device_status": {}}
+    hass = _hass_with_data("entry_x", entry_data)
+    sensor = SunAllocatorDevicePowerSensor(hass, "entry_x", cfg)
+    sensor.async_write_ha_state = MagicMock()
+
+    # An options save that does not reload the entry swaps in the new config.
+    entry_data["config"] = {
+        CONF_DEVICES: [{**cfg, CONF_DEVICE_SCHEDULE_MODE: SCHEDULE_MODE_STANDARD}]
+    }
+    sensor._update_state()
+
+    assert sensor.extra_state_attributes["schedule_mode"] == SCHEDULE_MODE_STANDARD
+
+
 def test_is_device_auto_control_enabled_helper():
     config = {
         CONF_DEVICES: [
@@ -0,0 +1,124 @@
+"""Tests for the learned device draw (core/draw_model.py) and the probe jump it enables."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from homeassistant.core import HomeAssistant, State
+
+from custom_components.sun_allocator.const import (
+    CONF_DEVICES,
+    CONF_DEVICE_ACTUAL_POWER_SENSOR,
+    DEVICE_TYPE_STANDARD,
+    DOMAIN,
+    PROBE_STEP_W,
+)
+from custom_components.sun_allocator.core import draw_model, probe
+from custom_components.sun_allocator.core import power_processor as pp
+
+
+def test_ewma_converges_and_needs_min_samples():
+    model = draw_model.initial_model()
+    draw_model.observe(model, "ac", 600.0, alpha=0.5)
+    assert draw_model.learned_w(model, "ac", min_samples=2) is None
+    draw_model.observe(model, "ac", 800.0, alpha=0.5)
+    assert draw_model.learned_w(model, "ac", min_samples=2) == pytest.approx(700.0)
+    assert draw_model.learned_map(model, min_samples=3) == {}
+
+
+def test_from_storage_drops_malformed_and_removed():
+    raw = {"ac": {"w": 700, "n": 4}, "gone": {"w": 1, "n": 1}, "bad": {"w": "x"}, "zero": {"w": 0, "n": 2}}
+    assert draw_model.from_storage(raw, ["ac", "bad", "zero"]) == {"ac": {"w": 700.0, "n": 4}}
+    assert draw_model.from_storage(None) == {}
+
+
+def _waiting(priority, min_w, **extra):
+    st = {
+        "priority": priority, "min_expected_w": min_w, "is_enabled": False,
+        "refusal_reasons": [], "is_active_candidate": False, "allow_probe": True,
+    }
+    st.update(extra)
+    return st
+
+
+def test_jump_target_uses_next_waiting_device():
+    statuses = {
+        "pump": {"priority": 90, "is_enabled": True, "allocated_w": 200.0, "allow_probe": True},
+        "ac": _waiting(80, 500.0),
+        "heater": _waiting(10, 300.0),
+    }
+    assert probe.jump_target_w(statuses, {"ac": 700.0, "heater": 1000.0}) == 900.0
+    # Learned draw below the declared minimum never undercuts the allocator's threshold.
+    assert probe.jump_target_w(statuses, {"ac": 400.0}) == 700.0
+    # Highest-priority waiting device is not learned yet → blind steps.
+    assert probe.jump_target_w(statuses, {"heater": 1000.0}) is None
+    # Start-gated out → the next device is considered.
+    assert probe.jump_target_w(statuses, {"heater": 400.0}, untapped_w=120.0) == 600.0
+
+
+def test_plan_headroom_jumps_to_learned_level():
+    kwargs = dict(
+        enabled=True, has_target=True, battery_soc=100.0, net_charge_w=0.0,
+        discharge_tolerance_w=20.0, state=None, now_ts=100000.0,
+    )
+    assert probe.plan_headroom(**kwargs)["headroom_w"] == PROBE_STEP_W
+    assert probe.plan_headroom(**kwargs, jump_to_w=700.0)["headroom_w"] == 700.0
+    # Still capped (here by a forecast target).
+    assert probe.plan_headroom(**kwargs, jump_to_w=700.0, target_w=450.0)["headroom_w"] == 450.0
+
+
+def _ticks_until_running(jump_to_w, *, min_w=500.0, real_w=700.0, potential_w=1500.0):
+    """Replay a curtailed afternoon: one waiting device, battery full, solar to spare.
+
+    The allocator starts the device once the headroom covers ``min_w``; the
+    battery only discharges if the running load exceeds the hidden PV potential.
+    Returns the number of probe ticks until the device runs.
+    """
+    state = None
+    running = False
+    for tick in range(1, 60):
+        load = real_w if running else 0.0
+        state = probe.plan_headroom(
+            enabled=True, has_target=not running, battery_soc=100.0,
+            net_charge_w=min(0.0, potential_w - load), discharge_tolerance_w=20.0,
+            state=state, now_ts=100000.0 + 30.0 * tick, jump_to_w=None if running else jump_to_w,
+            floor_w=min_w if running else 0.0,
+        )
+        running = running or state["headroom_w"] >= min_w
+        if running:
+            return tick
+    return None
+
+
+def test_learned_draw_shortens_time_to_allocate():
+    blind = _ticks_until_running(None)
+    learned = _ticks_until_running(700.0)
+    assert (blind, learned) == (5, 1)  # 150 s → 30 s at PROBE_DWELL_S = 30
+
+
+@pytest.mark.asyncio
+async def test_process_excess_power_learns_on_state_draw():
+    hass = MagicMock(spec=HomeAssistant)
+    states = {}
+    hass.states = MagicMock()
+    hass.states.get = states.get
+    hass.services = MagicMock()
+    hass.services.async_call = AsyncMock()
+    config_entry = MagicMock()
+    config_entry.entry_id = "entry"
+    config_entry.data = {CONF_DEVICES: [{
+        "device_id": "ac", "device_name": "AC", "device_entity": "switch.ac",
+        "device_type": DEVICE_TYPE_STANDARD, "min_expected_w": 500,
+        "auto_control_enabled": True, "debounce_time": 0,
+        CONF_DEVICE_ACTUAL_POWER_SENSOR: "sensor.ac_w",
+    }]}
+    entry_data = {"power_allocation": {}}
+    hass.data = {DOMAIN: {"entry": entry_data}}
+    states["switch.ac"] = State("switch.ac", "on")
+
+    for reading in ("700", "720", "5"):  # the idle reading is ignored
+        states["sensor.ac_w"] = State("sensor.ac_w", reading)
+        await pp.process_excess_power(hass, config_entry, 800.0)
+
+    assert entry_data["draw_model"]["ac"]["n"] == 2
+    assert entry_data["draw_model"]["ac"]["w"] == pytest.approx(704.0)
@@ -0,0 +1,212 @@
+"""Tests for diverted-energy accounting (core/energy.py and its wiring)."""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from homeassistant.core import HomeAssistant, State
+
+from custom_components.sun_allocator.const import (
+    CONF_DEVICES,
+    CONF_DEVICE_ACTUAL_POWER_SENSOR,
+    DEVICE_TYPE_STANDARD,
+    DOMAIN,
+)
+from custom_components.sun_allocator.core import energy
+from custom_components.sun_allocator.core import power_processor as pp
+from custom_components.sun_allocator.sensor.sensors.device_energy import (
+    SunAllocatorDeviceEnergySensor,
+)
+from custom_components.sun_allocator.sensor.sensors.diverted_energy import (
+    SunAllocatorDivertedEnergySensor,
+)
+
+GAP = 300.0
+
+
+def test_first_cycle_only_arms_the_baseline():
+    state = energy.initial_state()
+    assert energy.integrate_cycle(state, {"a": 1000.0}, 100.0, max_gap_s=GAP) == 0.0
+    assert state["devices_kwh"] == {}
+    assert state["last_w"] == {"a": 1000.0}
+
+
+def test_trapezoidal_integration_between_cycles():
+    state = energy.initial_state()
+    energy.integrate_cycle(state, {"a": 1000.0}, 0.0, max_gap_s=GAP)
+    # Ramp 1000 W → 2000 W over 36 s: mean 1500 W * 36 s = 0.015 kWh.
+    added = energy.integrate_cycle(state, {"a": 2000.0}, 36.0, max_gap_s=GAP)
+    assert added == pytest.approx(0.015)
+    assert state["devices_kwh"]["a"] == pytest.approx(0.015)
+    assert state["total_kwh"] == pytest.approx(0.015)
+
+
+def test_falling_edge_is_integrated_when_device_drops_out():
+    state = energy.initial_state()
+    energy.integrate_cycle(state, {"a": 720.0}, 0.0, max_gap_s=GAP)
+    # Device no longer in the map (turned off): half the trapezoid still counts.
+    energy.integrate_cycle(state, {}, 10.0, max_gap_s=GAP)
+    assert state["devices_kwh"]["a"] == pytest.approx(0.001)
+    assert state["last_w"] == {}
+
+
+def test_long_gap_is_not_credited():
+    state = energy.initial_state()
+    energy.integrate_cycle(state, {"a": 1000.0}, 0.0, max_gap_s=GAP)
+    assert energy.integrate_cycle(state, {"a": 1000.0}, GAP + 1, max_gap_s=GAP) == 0.0
+    assert state["total_kwh"] == 0.0
+    # Baseline re-armed: the next normal step integrates again.
+    assert energy.integrate_cycle(state, {"a": 1000.0}, GAP + 37, max_gap_s=GAP) > 0.0
+
+
+def test_probe_battery_integration():
+    state = energy.initial_state()
+    energy.integrate_probe_battery(state, 200.0, 0.0, max_gap_s=GAP)
+    energy.integrate_probe_battery(state, 200.0, 18.0, max_gap_s=GAP)
+    assert state["probe_battery_kwh"] == pytest.approx(0.001)
+    # Negative input (charging) is clamped to zero draw.
+    energy.integrate_probe_battery(state, -500.0, 36.0, max_gap_s=GAP)
+    assert state["probe_last_w"] == 0.0
+
+
+def test_storage_round_trip_prunes_removed_devices_but_keeps_total():
+    state = energy.initial_state()
+    state["devices_kwh"] = {"a": 1.5, "gone": 0.5}
+    state["total_kwh"] = 2.0
+    state["probe_battery_kwh"] = 0.1
+    raw = energy.to_storage(state)
+    assert "last_w" not in raw
+
+    restored = energy.from_storage(raw, ["a"])
+    assert restored["devices_kwh"] == {"a": 1.5}
+    assert restored["total_kwh"] == 2.0
+    assert restored["probe_battery_kwh"] == 0.1
+    assert restored["last_ts"] is None
+
+
+def test_from_storage_drops_malformed_values():
+    restored = energy.from_storage({"devices_kwh": {"a": "x", "b": 1}, "total_kwh": None})
+    assert restored["devices_kwh"] == {"b": 1.0}
+    assert restored["total_kwh"] == 1.0
+    assert energy.from_storage(None) == energy.initial_state()
+
+
+@pytest.fixture
+def mock_hass():
+    hass = MagicMock(spec=HomeAssistant)
+    hass.data = {}
+    states = {}
+    hass.states = MagicMock()
+    hass.states.get = states.get
+    hass.states.async_set = lambda eid, st: states.__setitem__(eid, State(eid, st))
+    hass.services = MagicMock()
+    hass.services.async_call = AsyncMock()
+    return hass
+
+
+def _config_entry(**device_extra):
+    config_entry = MagicMock()
+    config_entry.entry_id = "test_entry"
+    device = {
+        "device_id": "heater",
+        "device_name": "Heater",
+        "device_entity": "switch.heater",
+        "device_type": DEVICE_TYPE_STANDARD,
+        "priority": 50,
+        "min_expected_w": 500,
+        "auto_control_enabled": True,
+        "debounce_time": 0,
+    }
+    device.update(device_extra)
+    config_entry.data = {CONF_DEVICES: [device]}
+    return config_entry
+
+
+@pytest.mark.asyncio
+async def test_process_excess_power_integrates_allocated_power(mock_hass):
+    config_entry = _config_entry()
+    mock_hass.data[DOMAIN] = {config_entry.entry_id: {"power_allocation": {}}}
+    mock_hass.states.async_set("switch.heater", "on")
+
+    t0 = datetime(2026, 6, 1, 12, 0, tzinfo=timezone.utc)
+    with patch.object(pp.dt_util, "now", return_value=t0):
+        await pp.process_excess_power(mock_hass, config_entry, 600)
+    with patch.object(pp.dt_util, "now", return_value=t0 + timedelta(seconds=60)):
+        await pp.process_excess_power(mock_hass, config_entry, 600)
+
+    state = mock_hass.data[DOMAIN][config_entry.entry_id]["energy_state"]
+    # 500 W (min_expected) for 60 s.
+    assert state["devices_kwh"]["heater"] == pytest.approx(500 * 60 / 3_600_000)
+
+
+@pytest.mark.asyncio
+async def test_process_excess_power_prefers_actual_power_sensor(mock_hass):
+    config_entry = _config_entry(**{CONF_DEVICE_ACTUAL_POWER_SENSOR: "sensor.heater_w"})
+    mock_hass.data[DOMAIN] = {config_entry.entry_id: {"power_allocation": {}}}
+    mock_hass.states.async_set("switch.heater", "on")
+    mock_hass.states.async_set("sensor.heater_w", "450")
+
+    t0 = datetime(2026, 6, 1, 12, 0, tzinfo=timezone.utc)
+    with patch.object(pp.dt_util, "now", return_value=t0):
+        await pp.process_excess_power(mock_hass, config_entry, 600)
+    with patch.object(pp.dt_util, "now", return_value=t0 + timedelta(seconds=60)):
+        await pp.process_excess_power(mock_hass, config_entry, 600)
+
+    state = mock_hass.data[DOMAIN][config_entry.entry_id]["energy_state"]
+    assert state["devices_kwh"]["heater"] == pytest.approx(450 * 60 / 3_600_000)
+
+
+@pytest.mark.asyncio
+async def test_process_excess_power_hands_learned_state_to_store_every_cycle(mock_hass):
+    config_entry = _config_entry()
+    mock_hass.data[DOMAIN] = {config_entry.entry_id: {"power_allocation": {}}}
+    mock_hass.states.async_set("switch.heater", "on")
+
+    t0 = datetime(2026, 6, 1, 12, 0, tzinfo=timezone.utc)
+    with patch.object(pp, "persist_learned_state") as persist:
+        with patch.object(pp.dt_util, "now", return_value=t0):
+            await pp.process_excess_power(mock_hass, config_entry, 600)
+        with patch.object(pp.dt_util, "now", return_value=t0 + timedelta(seconds=60)):
+            await pp.process_excess_power(mock_hass, config_entry, 600)
+
+    assert persist.call_count == 2
+    assert persist.call_args.kwargs["energy"]["total_kwh"] == pytest.approx(
+        500 * 60 / 3_600_000
+    )
+
+
+def test_learned_state_snapshot_copies_the_models():
+    entry_data = {
+        "energy_state": energy.initial_state(),
+        "draw_model": {"heater": {"w": 500.0, "n": 3}},
+        "power_curves": {"heater": {"w": [0.0, 250.0], "n": [1, 1]}},
+    }
+    snapshot = pp.learned_state_snapshot(entry_data)
+
+    entry_data["draw_model"]["heater"]["w"] = 900.0
+    entry_data["power_curves"]["heater"]["w"][1] = 900.0
+
+    assert snapshot["draw_model"] == {"heater": {"w": 500.0, "n": 3}}
+    assert snapshot["power_curves"]["heater"]["w"] == [0.0, 250.0]
+
+
+def test_energy_sensors_report_accumulators():
+    entry_data = {"energy_state": energy.initial_state()}
+    entry_data["energy_state"]["devices_kwh"] = {"dev1": 1.23456}
+    entry_data["energy_state"]["total_kwh"] = 2.5
+    entry_data["energy_state"]["probe_battery_kwh"] = 0.2
+    hass = MagicMock()
+    hass.data = {DOMAIN: {"entry_x": entry_data}}
+
+    dev = SunAllocatorDeviceEnergySensor(hass, "entry_x", {"device_id": "dev1"})
+    dev.async_write_ha_state = MagicMock()
+    dev._update_state()
+    assert dev.unique_id == "entry_x_dev1_energy"
+    assert dev.native_value == pytest.approx(1.2346)
+
+    hub = SunAllocatorDivertedEnergySensor(hass, "entry_x", 1)
+    hub.async_write_ha_state = MagicMock()
+    hub._update_state()
+    assert hub.native_value == 2.5
+    assert hub.extra_state_attributes["probe_battery_energy_kwh"] == 0.2
@@ -0,0 +1,157 @@
+"""Tests for the config-flow entity catalog and the pickers built on it."""
+
+from unittest.mock import patch
+
+from homeassistant.helpers.entity_registry import EVENT_ENTITY_REGISTRY_UPDATED
+
+from custom_components.sun_allocator.config import device_config
+from custom_components.sun_allocator.config.device_config import DeviceConfigMixin
+from custom_components.sun_allocator.config.device_config_form import (
+    build_device_selection_schema,
+)
+from custom_components.sun_allocator.config.entity_catalog import EntityCatalog
+from custom_components.sun_allocator.config.temperature_config import TemperatureConfigMixin
+from custom_components.sun_allocator.const import (
+    CONF_DEVICE_ENTITY,
+    CONF_DEVICE_TYPE,
+    DEVICE_TYPE_STANDARD,
+    NONE_OPTION,
+)
+
+
+class _Flow(DeviceConfigMixin):
+    def __init__(self, hass):
+        self.hass = hass
+        self._device_config = {CONF_DEVICE_TYPE: DEVICE_TYPE_STANDARD}
+
+
+async def test_catalog_indexes_by_domain_and_device_class(hass):
+    hass.states.async_set("sensor.pv", "100", {"device_class": "power"})
+    hass.states.async_set("sensor.pv_v", "300", {"device_class": "voltage"})
+    hass.states.async_set("switch.boiler", "off")
+
+    catalog = EntityCatalog(hass)
+    try:
+        assert [s.entity_id for s in catalog.states(["switch"])] == ["switch.boiler"]
+        assert [s.entity_id for s in catalog.states(["sensor"], ["power"])] == ["sensor.pv"]
+        assert catalog.states(["light"]) == []
+    finally:
+        catalog.async_close()
+
+
+async def test_catalog_follows_registry_events(hass):
+    hass.states.async_set("switch.old", "off")
+    catalog = EntityCatalog(hass)
+    try:
+        version = catalog.version
+        hass.states.async_set("switch.new", "on")
+        hass.bus.async_fire(
+            EVENT_ENTITY_REGISTRY_UPDATED,
+            {"action": "update", "entity_id": "switch.new", "old_entity_id": "switch.old"},
+        )
+        await hass.async_block_till_done()
+        assert [s.entity_id for s in catalog.states(["switch"])] == ["switch.new"]
+        assert catalog.version > version
+
+        hass.bus.async_fire(
+            EVENT_ENTITY_REGISTRY_UPDATED, {"action": "remove", "entity_id": "switch.new"}
+        )
+        await hass.async_block_till_done()
+        assert catalog.states(["switch"]) == []
+    finally:
+        catalog.async_close()
+
+    # Closed catalog no longer reacts.
+    hass.states.async_set("switch.later", "on")
+    hass.bus.async_fire(
+        EVENT_ENTITY_REGISTRY_UPDATED, {"action": "create", "entity_id": "switch.later"}
+    )
+    await hass.async_block_till_done()
+    assert catalog.states(["switch"]) == []
+
+
+async def test_catalog_search_matches_id_and_name(hass):
+    for i in range(3):
+        hass.states.async_set(f"switch.heater_{i}", "off", {"friendly_name": f"Heater {i}"})
+    hass.states.async_set("switch.pump", "off", {"friendly_name": "Garden PUMP"})
+    hass.states.async_set("light.heater_lamp", "on")
+    catalog = EntityCatalog(hass)
+    try:
+        found = catalog.search("heater", ["switch"])
+        assert sorted(s.entity_id for s in found) == [f"switch.heater_{i}" for i in range(3)]
+        assert [s.entity_id for s in catalog.search("garden pump", ["switch"])] == ["switch.pump"]
+        assert len(catalog.search("", ["switch", "light"])) == 5
+    finally:
+        catalog.async_close()
+
+
+async def test_device_picker_builds_options_once_per_catalog_version(hass):
+    hass.states.async_set("switch.boiler", "off", {"friendly_name": "Boiler"})
+    hass.states.async_set("sensor.noise", "1")
+    flow = _Flow(hass)
+
+    with patch.object(
+        device_config.DeviceConfigMixin, "_build_device_entity_options",
+        autospec=True, side_effect=lambda self, states, dt: [("switch.boiler", "🔌 Boiler", "Boiler")],
+    ) as build:
+        first = flow._get_device_entities(hass)
+        second = flow._get_device_entities(hass)
+    assert build.call_count == 1
+    assert first == second
+    assert first["all_entities"][0] == (NONE_OPTION, NONE_OPTION, "")
+    flow.async_remove()
+
+
+async def test_device_picker_truncates_and_searches(hass):
+    for i in range(5):
+        hass.states.async_set(f"switch.plug_{i}", "off", {"friendly_name": f"Plug {i}"})
+    hass.states.async_set("light.desk", "on", {"friendly_name": "Desk"})
+    flow = _Flow(hass)
+
+    capped = flow._get_device_entities(hass, limit=3)
+    assert capped["truncated"] is True
+    assert len(capped["all_entities"]) == 4  # None + 3
+
+    search_states = EntityCatalog.search
+    with patch.object(EntityCatalog, "search", autospec=True, side_effect=search_states) as search:
+        found = flow._get_device_entities(hass, search="desk", limit=3)
+    search.assert_called_once()
+    assert found["truncated"] is False
+    assert [v for v, _, _ in found["all_entities"]] == [NONE_OPTION, "light.desk"]
+    flow.async_remove()
+
+
+async def test_device_picker_keeps_the_edited_entity_past_the_cap(hass):
+    for i in range(5):
+        hass.states.async_set(f"switch.plug_{i}", "off", {"friendly_name": f"Plug {i}"})
+    hass.states.async_set(
+        "climate.room", "off", {"friendly_name": "Room", "hvac_modes": ["off", "heat", "cool"]}
+    )
+    flow = _Flow(hass)
+    flow._device_config.update({CONF_DEVICE_ENTITY: "switch.plug_4"})
+
+    capped = flow._get_device_entities(hass, limit=3)
+    values = [v for v, _, _ in capped["all_entities"]]
+    assert values == [NONE_OPTION, "switch.plug_4", "climate.room|cool", "climate.room|heat", "switch.plug_0"]
+    # Submitting the pre-selected default validates against the capped options.
+    schema = build_device_selection_schema(capped, flow._device_config)
+    assert schema({})[CONF_DEVICE_ENTITY] == "switch.plug_4"
+
+    flow._device_config.update({CONF_DEVICE_ENTITY: "climate.room", "hvac_mode": "heat"})
+    found = flow._get_device_entities(hass, search="plug", limit=3)
+    schema = build_device_selection_schema(found, flow._device_config, search="plug")
+    assert schema({})[CONF_DEVICE_ENTITY] == "climate.room|heat"
+    flow.async_remove()
+
+
+async def test_temperature_picker_uses_the_device_class_index(hass):
+    hass.states.async_set("sensor.outdoor", "12", {"device_class": "temperature"})
+    hass.states.async_set("sensor.panel_temp", "30")
+    hass.states.async_set("sensor.temp_hum", "40", {"device_class": "humidity"})
+    hass.states.async_set("sensor.pv", "100", {"device_class": "power"})
+    flow = TemperatureConfigMixin()
+
+    values = [option["value"] for option in flow._get_temperature_sensors(hass)]
+    assert NONE_OPTION in values
+    assert sorted(v for v in values if v != NONE_OPTION) == ["sensor.outdoor", "sensor.panel_temp"]
+    flow.async_remove()
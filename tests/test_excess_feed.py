@@ -0,0 +1,87 @@
+"""Tests for the in-process excess feed from the excess sensor to the allocator."""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+
+from conftest import create_test_config_entry
+
+import custom_components.sun_allocator as integration
+from custom_components.sun_allocator.const import (
+    DOMAIN,
+    CONF_PV_POWER,
+    CONF_PV_VOLTAGE,
+    CONF_PANEL_VMP,
+    CONF_PANEL_IMP,
+    CONF_PANEL_COUNT,
+    CONF_DEVICES,
+    CONF_DEVICE_ID,
+    CONF_DEVICE_ENTITY,
+    CONF_DEVICE_TYPE,
+    CONF_AUTO_CONTROL_ENABLED,
+    CONF_DEVICE_MIN_EXPECTED_W,
+    CONF_DEVICE_DEBOUNCE_TIME,
+    CONF_MIN_INVERTER_VOLTAGE,
+    DEVICE_TYPE_STANDARD,
+)
+
+
+@pytest.fixture
+async def entry_data(hass: HomeAssistant):
+    """An entry with one auto-controlled device, set up and tracking its excess sensor."""
+    await async_setup_component(hass, "switch", {})
+    config_entry = create_test_config_entry(extra_data={
+        CONF_PV_POWER: "sensor.test_pv_power",
+        CONF_PV_VOLTAGE: "sensor.test_pv_voltage",
+        CONF_PANEL_VMP: 30.0,
+        CONF_PANEL_IMP: 10.0,
+        CONF_PANEL_COUNT: 1,
+        CONF_MIN_INVERTER_VOLTAGE: 10.0,
+        CONF_DEVICES: [{
+            CONF_DEVICE_ID: "heater",
+            CONF_DEVICE_ENTITY: "switch.heater",
+            CONF_DEVICE_TYPE: DEVICE_TYPE_STANDARD,
+            CONF_AUTO_CONTROL_ENABLED: True,
+            CONF_DEVICE_MIN_EXPECTED_W: 50,
+            CONF_DEVICE_DEBOUNCE_TIME: 0,
+        }],
+    }, entry_id="feed_entry")
+    config_entry.add_to_hass(hass)
+    hass.states.async_set("sensor.test_pv_power", "250")
+    hass.states.async_set("sensor.test_pv_voltage", "35")
+    hass.states.async_set("switch.heater", "off")
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    yield hass.data[DOMAIN][config_entry.entry_id]
+    await hass.config_entries.async_unload(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def test_feed_queues_exact_values_past_its_deadband(hass, entry_data):
+    feed = entry_data["excess_feed"]
+    with patch.object(integration, "_queue_process_excess_power", new=AsyncMock()) as queue:
+        for value in (503.27, 504.9, 506.0, 507.3):
+            feed(value)
+        await hass.async_block_till_done()
+        assert [c.args[3] for c in queue.await_args_list] == [503.27, 506.0]
+        # Deadline re-runs and the probe tick read the exact value, not the display state.
+        assert integration._read_excess_value(
+            hass, entry_data["excess_sensor_id"], entry_data
+        ) == 507.3
+        # Reaching 0 W always queues a pass.
+        feed(0.0)
+        await hass.async_block_till_done()
+    assert queue.await_args_list[-1].args[3] == 0.0
+
+
+async def test_state_writes_no_longer_trigger_the_allocator(hass, entry_data):
+    with patch.object(integration, "_queue_process_excess_power", new=AsyncMock()) as queue:
+        hass.states.async_set(entry_data["excess_sensor_id"], "900")
+        await hass.async_block_till_done()
+    queue.assert_not_awaited()
+
+    entry_data["unsub_auto_control"]()
+    assert "excess_feed" not in entry_data
@@ -0,0 +1,109 @@
+"""Tests for the grid_meter calculation method (core/grid_loop.py)."""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+from homeassistant.core import HomeAssistant, State
+
+from custom_components.sun_allocator.const import (
+    CONF_CALCULATION_METHOD,
+    CONF_GRID_EXPORT_TARGET_W,
+    CONF_GRID_POWER,
+    CONF_POWER_ALLOCATION,
+    CALC_METHOD_GRID_METER,
+    DOMAIN,
+)
+from custom_components.sun_allocator.core.settings import GRID_METER_KI, GRID_METER_KP
+from custom_components.sun_allocator.sensor.sensors import excess as excess_module
+from custom_components.sun_allocator.sensor.sensors.excess import SunAllocatorExcessSensor
+from custom_components.sun_allocator.sensor.utils import calculate_excess_power_grid_meter
+
+_T0 = datetime(2026, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def test_grid_meter_formula_shares_the_export_battery_guard():
+    # Charge above the reserve is divertible, as in the export method.
+    assert calculate_excess_power_grid_meter(
+        allocated_load_w=300.0, correction_w=100.0,
+        battery_power=500.0, battery_power_reversed=False, configured_reserve=200.0,
+    ) == 700.0
+    # Discharging beyond the tolerance blocks everything.
+    assert calculate_excess_power_grid_meter(
+        allocated_load_w=300.0, correction_w=100.0,
+        battery_power=-50.0, battery_power_reversed=False,
+        battery_discharge_tolerance_w=20.0,
+    ) == 0.0
+    assert calculate_excess_power_grid_meter(
+        allocated_load_w=100.0, correction_w=-400.0,
+        battery_power=0.0, battery_power_reversed=False,
+    ) == 0.0
+
+
+def _sensor(states, entry_data):
+    hass = MagicMock(spec=HomeAssistant)
+    hass.data = {DOMAIN: {"entry": entry_data}}
+    hass.states = MagicMock()
+    hass.states.get = states.get
+    sensor = SunAllocatorExcessSensor.__new__(SunAllocatorExcessSensor)
+    sensor._config = {
+        CONF_CALCULATION_METHOD: CALC_METHOD_GRID_METER,
+        CONF_GRID_POWER: "sensor.grid",
+        CONF_GRID_EXPORT_TARGET_W: 50.0,
+    }
+    sensor._attr_extra_state_attributes = {}
+    sensor.hass = hass
+    sensor._entry_id = "entry"
+    return sensor
+
+
+def _read(sensor, states, grid_w, at, battery_w=0.0):
+    states["sensor.grid"] = State("sensor.grid", str(grid_w), last_updated=at)
+    return sensor._grid_meter_excess(
+        grid_power=grid_w, battery_power=battery_w, battery_power_reversed=False,
+        configured_reserve=0.0, battery_soc=None, sharing_soc=0.0,
+        battery_discharge_tolerance_w=20.0,
+    )
+
+
+def test_pi_steps_once_per_meter_reading_and_latches_between():
+    states = {}
+    entry_data = {CONF_POWER_ALLOCATION: {"boiler": 0.0}}
+    sensor = _sensor(states, entry_data)
+
+    # 1050 W exported against a 50 W target: one reading closes KI of the error.
+    first = _read(sensor, states, -1050.0, _T0)
+    assert first == GRID_METER_KI * 1000.0
+    assert sensor._attr_extra_state_attributes["grid_export_w"] == 1050.0
+
+    # The allocator placed the budget; a recompute before the next meter
+    # reading must not add the same step on top of it.
+    entry_data[CONF_POWER_ALLOCATION]["boiler"] = first
+    assert _read(sensor, states, -1050.0, _T0) == first
+
+    # Next reading: the remaining error is stepped on top of the placed load.
+    error = 1050.0 - first - 50.0
+    second = _read(sensor, states, -(1050.0 - first), _T0 + timedelta(seconds=5))
+    assert abs(second - (first + GRID_METER_KI * error + GRID_METER_KP * (error - 1000.0))) < 1e-6
+
+    # The discharge guard applies live, without waiting for the meter.
+    assert _read(sensor, states, -(1050.0 - first), _T0 + timedelta(seconds=5), battery_w=-200.0) == 0.0
+
+
+def test_missing_meter_reading_yields_no_excess():
+    states = {}
+    sensor = _sensor(states, {CONF_POWER_ALLOCATION: {"boiler": 400.0}})
+    assert sensor._grid_meter_excess(
+        grid_power=None, battery_power=0.0, battery_power_reversed=False,
+    ) == 0.0
+
+
+def test_missing_meter_is_logged_once(monkeypatch):
+    sensor = _sensor({}, {})
+    sensor._config = {CONF_CALCULATION_METHOD: CALC_METHOD_GRID_METER}
+    errors = MagicMock()
+    monkeypatch.setattr(excess_module, "log_error", errors)
+    for _ in range(3):
+        assert sensor._grid_meter_excess(
+            None, battery_power=0.0, battery_power_reversed=False
+        ) == 0.0
+    errors.assert_called_once()
@@ -0,0 +1,84 @@
+"""Tests for time-aligned hub snapshots (core/input_align.py)."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import homeassistant.util.dt as dt_util
+
+from custom_components.sun_allocator.const import (
+    CONF_BATTERY_POWER,
+    CONF_CONSUMPTION,
+    CONF_INPUT_ALIGNMENT,
+    CONF_MPPT_INPUTS,
+    CONF_PANEL_IMP,
+    CONF_PANEL_VMP,
+    CONF_PV_POWER,
+    CONF_PV_VOLTAGE,
+    DOMAIN,
+    INPUT_ALIGNMENT_HOLD,
+    INPUT_ALIGNMENT_INTERPOLATE,
+)
+from custom_components.sun_allocator.core.input_align import InputAligner
+from custom_components.sun_allocator.core.input_cache import get_input_cache
+from custom_components.sun_allocator.sensor.sensors.excess import SunAllocatorExcessSensor
+
+_T0 = datetime(2024, 6, 1, 12, 0, 0, tzinfo=dt_util.UTC)
+
+
+def test_common_time_ignores_long_silent_inputs():
+    aligner = InputAligner()
+    aligner.observe("a", 100.0, 1.0)
+    aligner.observe("b", 104.0, 2.0)
+    aligner.observe("c", 10.0, 3.0)  # silent for 94 s: steady, not waited for
+    assert aligner.common_time(["a", "b", "c"]) == 100.0
+    aligner.observe("a", 106.0, 4.0)
+    assert aligner.value_at("a", 103.0) == 1.0
+    assert aligner.value_at("a", 103.0, interpolate=True) == pytest.approx(2.5)
+    assert aligner.value_at("c", 103.0, interpolate=True) == 3.0
+
+
+def _set(hass, freezer, second, **values):
+    freezer.move_to(_T0 + timedelta(seconds=second))
+    cache = get_input_cache(hass)
+    for entity_id, value in values.items():
+        hass.states.async_set(f"sensor.{entity_id}", str(value))
+        cache.invalidate(f"sensor.{entity_id}")
+
+
+@pytest.mark.parametrize(
+    ("mode", "aligned_voltage"), [(INPUT_ALIGNMENT_HOLD, 30.0), (INPUT_ALIGNMENT_INTERPOLATE, 32.0)]
+)
+async def test_snapshot_waits_for_a_coherent_set(hass, freezer, mode, aligned_voltage):
+    hass.data.setdefault(DOMAIN, {})["hub"] = {}
+    config = {
+        CONF_MPPT_INPUTS: [{
+            CONF_PV_POWER: "sensor.pv", CONF_PV_VOLTAGE: "sensor.volt",
+            CONF_PANEL_VMP: 30.0, CONF_PANEL_IMP: 10.0,
+        }],
+        CONF_CONSUMPTION: "sensor.house",
+        CONF_BATTERY_POWER: "sensor.battery",
+        CONF_INPUT_ALIGNMENT: mode,
+    }
+    sensor = SunAllocatorExcessSensor(hass, config, "hub", 1)
+    entry_data = hass.data[DOMAIN]["hub"]
+
+    _set(hass, freezer, 0, pv=500, volt=30, house=300, battery=0)
+    first = sensor._get_shared_snapshot()
+    assert first["mppt_readings"][0]["pv_power"] == 500.0
+
+    # PV power moves, the other inputs have not reported since: nothing to recompute.
+    _set(hass, freezer, 2, pv=900)
+    sensor._invalidate_shared_snapshot()
+    assert sensor._get_shared_snapshot() is first
+    assert first["mppt_readings"][0]["pv_power"] == 500.0
+
+    # The rest catch up at t=3: the snapshot is evaluated at t=2, PV power's report.
+    _set(hass, freezer, 3, volt=33, house=310, battery=5)
+    sensor._invalidate_shared_snapshot()
+    snapshot = sensor._get_shared_snapshot()
+    assert snapshot is not first
+    reading = snapshot["mppt_readings"][0]
+    assert reading["pv_power"] == 900.0
+    assert reading["pv_voltage"] == pytest.approx(aligned_voltage)
+    assert entry_data["_input_aligner"].aligned_at == (_T0 + timedelta(seconds=2)).timestamp()
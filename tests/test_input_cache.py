@@ -0,0 +1,90 @@
+"""Tests for the domain-wide input cache (core/input_cache.py)."""
+
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+import homeassistant.util.dt as dt_util
+
+from custom_components.sun_allocator.const import (
+    CONF_BATTERY_POWER,
+    CONF_BATTERY_SOC_SENSOR,
+    CONF_CONSUMPTION,
+    CONF_MPPT_INPUTS,
+    CONF_PV_POWER,
+    DOMAIN,
+)
+from custom_components.sun_allocator.core import input_cache
+from custom_components.sun_allocator.core import power_processor as pp
+from custom_components.sun_allocator.sensor.sensors.excess import SunAllocatorExcessSensor
+
+_PARSE = "custom_components.sun_allocator.core.input_cache.get_sensor_state_safely"
+
+
+def _hub(hass, entry_id, index, pv_sensor):
+    hass.data.setdefault(DOMAIN, {})[entry_id] = {}
+    config = {
+        CONF_MPPT_INPUTS: [{CONF_PV_POWER: pv_sensor}],
+        CONF_CONSUMPTION: "sensor.house",
+        CONF_BATTERY_POWER: "sensor.battery",
+        CONF_BATTERY_SOC_SENSOR: "sensor.soc",
+    }
+    return SunAllocatorExcessSensor(hass, config, entry_id, index)
+
+
+async def test_two_hubs_parse_shared_inputs_once(hass):
+    for entity_id, value in (
+        ("sensor.pv_east", "800"), ("sensor.pv_west", "600"),
+        ("sensor.house", "400"), ("sensor.battery", "0"), ("sensor.soc", "90"),
+    ):
+        hass.states.async_set(entity_id, value)
+    east = _hub(hass, "east", 1, "sensor.pv_east")
+    west = _hub(hass, "west", 2, "sensor.pv_west")
+    parse = MagicMock(wraps=input_cache.get_sensor_state_safely)
+
+    with patch(_PARSE, new=parse):
+        east._get_shared_snapshot()
+        west._get_shared_snapshot()
+        assert sorted(c.args[1] for c in parse.call_args_list) == [
+            "sensor.battery", "sensor.house", "sensor.pv_east", "sensor.pv_west", "sensor.soc",
+        ]
+        # The allocator's SOC read reuses the hubs' parse.
+        assert pp._read_battery_soc(hass, {CONF_BATTERY_SOC_SENSOR: "sensor.soc"}) == 90.0
+        assert parse.call_count == 5
+
+        parse.reset_mock()
+        hass.states.async_set("sensor.battery", "-250")
+        east._invalidate_shared_snapshot()
+        west._invalidate_shared_snapshot()
+        east._get_shared_snapshot()
+        snapshot = west._get_shared_snapshot()
+    assert [c.args[1] for c in parse.call_args_list] == ["sensor.battery"]
+    assert snapshot["sensor_values"][CONF_BATTERY_POWER] == -250.0
+
+
+async def test_reader_ahead_of_the_event_never_sees_an_old_parse(hass):
+    cache = input_cache.get_input_cache(hass)
+    hass.states.async_set("sensor.battery", "100")
+    assert cache.reading(hass, "sensor.battery", "Battery Power") == (100.0, True)
+    # No invalidate() yet: the entry is still checked against the live state.
+    hass.states.async_set("sensor.battery", "unavailable")
+    assert cache.reading(hass, "sensor.battery", "Battery Power") == (0.0, False)
+    cache.invalidate("sensor.battery")
+    assert "sensor.battery" not in cache
+
+
+async def test_staleness_uses_the_cached_timestamp(hass):
+    cache = input_cache.get_input_cache(hass)
+    hass.states.async_set("sensor.soc", "80")
+    cache.reading(hass, "sensor.soc", "Battery SOC")
+    assert not cache.is_stale(hass, "sensor.soc", 60)
+    later = dt_util.utcnow() + timedelta(seconds=120)
+    with patch.object(input_cache.dt_util, "utcnow", return_value=later):
+        assert cache.is_stale(hass, "sensor.soc", 60)
+    assert not cache.is_stale(hass, "sensor.soc", 0)
+
+
+async def test_cache_is_dropped_with_the_domain(hass):
+    cache = input_cache.get_input_cache(hass)
+    assert input_cache.get_input_cache(hass) is cache
+    input_cache.drop_input_cache(hass)
+    assert input_cache.get_input_cache(hass) is not cache
@@ -0,0 +1,96 @@
+"""Tests for the streaming hub-input filters (core/input_filter.py)."""
+
+import math
+
+import pytest
+
+from custom_components.sun_allocator.const import (
+    CONF_BATTERY_POWER,
+    CONF_FILTER_BATTERY_POWER,
+    CONF_FILTER_EWMA_TAU_S,
+    CONF_FILTER_WINDOW,
+    CONF_MPPT_INPUTS,
+    CONF_PV_POWER,
+    DOMAIN,
+    INPUT_FILTER_EWMA,
+    INPUT_FILTER_MEDIAN,
+    INPUT_FILTER_OUTLIER,
+)
+from custom_components.sun_allocator.core.input_cache import get_input_cache
+from custom_components.sun_allocator.core.input_filter import InputFilter, filter_spec
+from custom_components.sun_allocator.core.settings import INPUT_FILTER_EWMA_SAMPLE_S
+from custom_components.sun_allocator.sensor.sensors.excess import SunAllocatorExcessSensor
+
+
+def _spec(kind, window=5, tau_s=10.0):
+    return filter_spec(
+        {"f": kind, CONF_FILTER_WINDOW: window, CONF_FILTER_EWMA_TAU_S: tau_s}, "f"
+    )
+
+
+def test_filter_spec_is_off_by_default():
+    assert filter_spec({}, CONF_FILTER_BATTERY_POWER) is None
+    assert _spec(INPUT_FILTER_MEDIAN, window=3) == ("median", 3, 10.0)
+
+
+def test_median_and_outlier_reject_a_compressor_spike():
+    median = InputFilter(_spec(INPUT_FILTER_MEDIAN, window=3))
+    outlier = InputFilter(_spec(INPUT_FILTER_OUTLIER, window=5))
+    samples = [-100.0, -110.0, -105.0, -2400.0, -108.0]
+    assert [median.push(v) for v in samples][-2:] == [-110.0, -108.0]
+    out = [outlier.push(v) for v in samples]
+    assert out[3] == pytest.approx(-107.5)
+    assert out[4] == -108.0
+
+    # A real step is accepted once it holds half the window.
+    outlier = InputFilter(_spec(INPUT_FILTER_OUTLIER, window=5))
+    for value in (100.0, 101.0, 99.0, 100.0, 100.0):
+        outlier.push(value)
+    assert [outlier.push(900.0) for _ in range(3)] == [100.0, 100.0, 900.0]
+
+
+def test_ewma_holds_the_previous_sample_across_the_gap():
+    ewma = InputFilter(_spec(INPUT_FILTER_EWMA, tau_s=10.0))
+    alpha = 1.0 - math.exp(-INPUT_FILTER_EWMA_SAMPLE_S / 10.0)
+    assert ewma.push(0.0, ts=0.0) == 0.0
+    # The input sat at 0 W until the step arrived; the step enters with one sample's weight.
+    assert ewma.push(100.0, ts=10.0) == pytest.approx(100.0 * alpha)
+    # Held at 100 W for one time constant: 1 - 1/e of the remaining gap is covered.
+    held = 100.0 * alpha + (100.0 - 100.0 * alpha) * (1.0 - math.exp(-1.0))
+    assert ewma.push(100.0, ts=20.0) == pytest.approx(held + alpha * (100.0 - held))
+
+
+def test_ewma_does_not_pass_a_spike_after_a_steady_stretch():
+    ewma = InputFilter(_spec(INPUT_FILTER_EWMA, tau_s=10.0))
+    ewma.push(100.0, ts=0.0)
+    # 60 s unchanged (no new state), then a one-second 2000 W spike.
+    spike = ewma.push(2000.0, ts=60.0)
+    after = ewma.push(100.0, ts=61.0)
+    assert spike < 300.0
+    assert after < 450.0
+    # Ten seconds later the spike has mostly decayed.
+    assert ewma.push(100.0, ts=71.0) < 220.0
+
+
+async def test_cache_feeds_each_state_once_and_keeps_raw_readers_raw(hass):
+    hass.data.setdefault(DOMAIN, {})["hub"] = {}
+    config = {
+        CONF_MPPT_INPUTS: [{CONF_PV_POWER: "sensor.pv"}],
+        CONF_BATTERY_POWER: "sensor.battery",
+        CONF_FILTER_BATTERY_POWER: INPUT_FILTER_MEDIAN,
+        CONF_FILTER_WINDOW: 3,
+    }
+    sensor = SunAllocatorExcessSensor(hass, config, "hub", 1)
+    cache = get_input_cache(hass)
+    for value in ("-100", "-2400", "-110"):
+        hass.states.async_set("sensor.battery", value)
+        cache.invalidate("sensor.battery")
+        # Read twice: the second read must not feed the same state again.
+        sensor._get_sensor_values()
+        values = sensor._get_sensor_values()
+    assert values[CONF_BATTERY_POWER] == -110.0
+    # The probe's unfiltered read still sees the live value.
+    assert cache.reading(hass, "sensor.battery", "Battery Power") == (-110.0, True)
+    hass.states.async_set("sensor.battery", "-120")
+    cache.invalidate("sensor.battery")
+    assert sensor._get_sensor_values()[CONF_BATTERY_POWER] == -120.0
@@ -0,0 +1,117 @@
+"""Tests for the online MPPT model calibration (core/mppt_calibration.py)."""
+
+import random
+from unittest.mock import MagicMock
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.sun_allocator.const import (
+    CONF_BATTERY_POWER,
+    CONF_CURVE_FACTOR_K,
+    CONF_EFFICIENCY_CORRECTION_FACTOR,
+    CONF_PANEL_IMP,
+    CONF_PANEL_ISC,
+    DOMAIN,
+    INTERNAL_CURVE_FACTOR_K,
+    INTERNAL_EFFICIENCY_CORRECTION_FACTOR,
+    KEY_ENERGY_HARVESTING_POSSIBLE,
+    KEY_LIGHT_FACTOR,
+    KEY_RELATIVE_VOLTAGE,
+)
+from custom_components.sun_allocator.core import mppt_calibration
+from custom_components.sun_allocator.core.device_restore import (
+    load_mppt_calibration,
+    persist_learned_state,
+)
+from custom_components.sun_allocator.sensor.sensors.excess import SunAllocatorExcessSensor
+
+PRIOR = {
+    CONF_CURVE_FACTOR_K: INTERNAL_CURVE_FACTOR_K,
+    CONF_EFFICIENCY_CORRECTION_FACTOR: INTERNAL_EFFICIENCY_CORRECTION_FACTOR,
+}
+FILL_FACTOR = 8.0 / 8.5
+
+
+def _model_ratio(params, relative_voltage):
+    """current_max_power / pv_power of the below-Vmp model."""
+    knee = (1.0 - FILL_FACTOR) * relative_voltage ** params[CONF_CURVE_FACTOR_K]
+    return relative_voltage * (1.0 - knee) / FILL_FACTOR * params[CONF_EFFICIENCY_CORRECTION_FACTOR]
+
+
+def test_fit_matches_the_real_maximum_power_point():
+    calibration = mppt_calibration.initial_calibration()
+    rng = random.Random(7)
+    # The inverter tracks this array a little below its datasheet Vmp.
+    for _ in range(29):
+        mppt_calibration.observe(
+            calibration, 0, rng.gauss(0.9, 0.01), FILL_FACTOR, PRIOR, forgetting=0.995
+        )
+    assert mppt_calibration.model_params(calibration, 0, min_samples=30) is None
+    assert _model_ratio(PRIOR, 0.9) < 0.97  # the default model reads untapped power here
+
+    mppt_calibration.observe(calibration, 0, 0.9, FILL_FACTOR, PRIOR, forgetting=0.995)
+    fitted = mppt_calibration.model_params(calibration, 0, min_samples=30)
+    assert abs(_model_ratio(fitted, 0.9) - 1.0) < 0.01
+    assert mppt_calibration.EFFICIENCY_BOUNDS[0] <= fitted[CONF_EFFICIENCY_CORRECTION_FACTOR] <= mppt_calibration.EFFICIENCY_BOUNDS[1]
+    assert mppt_calibration.K_BOUNDS[0] <= fitted[CONF_CURVE_FACTOR_K] <= mppt_calibration.K_BOUNDS[1]
+    # Above Vmp the parameters do not act; such samples are refused.
+    assert not mppt_calibration.observe(calibration, 0, 1.05, FILL_FACTOR, PRIOR, forgetting=0.995)
+
+
+def _sensor(entry_data):
+    hass = MagicMock(spec=HomeAssistant)
+    hass.data = {DOMAIN: {"entry": entry_data}}
+    sensor = SunAllocatorExcessSensor.__new__(SunAllocatorExcessSensor)
+    sensor._config = {CONF_BATTERY_POWER: "sensor.battery"}
+    sensor.hass = hass
+    sensor._entry_id = "entry"
+    return sensor
+
+
+def _feed(sensor, pv_power, relative_voltage, net_charge_w=300.0, curtailment=False):
+    reading = {
+        "pv_power": pv_power,
+        "pv_voltage": 300.0 * relative_voltage,
+        "panel_params": {CONF_PANEL_IMP: 8.0, CONF_PANEL_ISC: 8.5},
+    }
+    info = {
+        "index": 0,
+        KEY_RELATIVE_VOLTAGE: relative_voltage,
+        KEY_ENERGY_HARVESTING_POSSIBLE: True,
+        KEY_LIGHT_FACTOR: 0.5,
+    }
+    sensor._calibrate_model(
+        [reading], [info], PRIOR, net_charge_w=net_charge_w, curtailment_detected=curtailment
+    )
+
+
+def test_only_unconstrained_samples_are_fitted():
+    entry_data = {}
+    sensor = _sensor(entry_data)
+    _feed(sensor, 1500.0, 0.92, curtailment=True)
+    _feed(sensor, 1500.0, 0.92, net_charge_w=20.0)  # battery at its limit
+    _feed(sensor, 1500.0, 1.05)  # above Vmp
+    assert not entry_data.get("mppt_calibration")
+
+    _feed(sensor, 1500.0, 0.92)
+    _feed(sensor, 1500.0, 0.92)  # the same reading again
+    assert entry_data["mppt_calibration"]["0"]["n"] == 1
+    _feed(sensor, 1510.0, 0.93)
+    assert entry_data["mppt_calibration"]["0"]["n"] == 2
+
+
+async def test_fit_persists_with_the_learned_state(hass):
+    config_entry = MagicMock()
+    config_entry.entry_id = "entry"
+    calibration = mppt_calibration.initial_calibration()
+    mppt_calibration.observe(calibration, 1, 0.9, FILL_FACTOR, PRIOR, forgetting=0.995)
+    persist_learned_state(
+        hass, config_entry, energy={}, draw_model={}, power_curves={},
+        mppt_calibration=calibration,
+    )
+    restored = mppt_calibration.from_storage(await load_mppt_calibration(hass, config_entry))
+    assert restored == calibration
+    # Saving without a fit keeps the stored one.
+    persist_learned_state(hass, config_entry, energy={"x": 1}, draw_model={}, power_curves={})
+    assert await load_mppt_calibration(hass, config_entry) == calibration
+    assert mppt_calibration.from_storage({"0": {"theta": [1.0]}, "1": "x"}) == {}
@@ -212,6 +212,7 @@ def test_entity_ids_for_two_mppts():
     sensor._consumption = config[CONF_CONSUMPTION]
     sensor._battery_power = None
     sensor._battery_soc_sensor = None
+    sensor._grid_power = None
     sensor._pv_forecast_sensor = None
 
     ids = sensor._get_entity_ids_to_listen()
@@ -1,37 +1,309 @@
-"""Performance tests for large configurations."""
+"""Performance benchmarks for the allocator hot paths.
 
-import pytest
+Each benchmark times a hot path (best-of-N to shed scheduler noise) and divides
+the result by a fixed pure-Python calibration loop measured in the same process,
+so the stored number is a machine-independent *cost ratio* rather than seconds.
+Ratios are compared against ``tests/benchmarks/baselines.json``; a benchmark
+fails when it is slower than its baseline by more than the threshold.
+
+The benchmarks carry the ``benchmark`` marker, which ``pytest.ini`` deselects by
+default: wall-clock ratios still wobble with machine load, so they are run on
+demand (``pytest -m benchmark``) rather than gating every test run.
+
+Environment knobs:
+
+* ``SUN_ALLOCATOR_BENCH_THRESHOLD`` — allowed slowdown as a fraction
+  (default ``0.5`` = 50 %; ``inf`` disables the regression check).
+* ``SUN_ALLOCATOR_BENCH_UPDATE=1`` — record the current ratios as the new
+  baselines instead of checking them.
+
+Everything runs offline on the ``pytest-homeassistant-custom-component`` ``hass``
+fixture; device services are mocked with ``async_mock_service``.
+"""
+
+import json
+import os
 import time
+from pathlib import Path
+
+import pytest
+from pytest_homeassistant_custom_component.common import async_mock_service
+
+from conftest import create_test_config_entry, create_test_device
+
+from custom_components.sun_allocator.const import (
+    DOMAIN,
+    CONF_DEVICES,
+    CONF_DEVICE_PRIORITY,
+    CONF_DEVICE_DEBOUNCE_TIME,
+    CONF_DEVICE_ALLOCATION_STRATEGY,
+    CONF_MPPT_INPUTS,
+    CONF_PV_POWER,
+    CONF_PV_VOLTAGE,
+    CONF_PANEL_VMP,
+    CONF_PANEL_IMP,
+    CONF_PANEL_VOC,
+    CONF_PANEL_ISC,
+    CONF_PANEL_COUNT,
+    CONF_PANEL_CONFIGURATION,
+    CONF_BATTERY_POWER,
+    CONF_CONSUMPTION,
+    CONF_MIN_INVERTER_VOLTAGE,
+    PANEL_CONFIG_SERIES,
+    STRATEGY_FILL_ONE_BY_ONE,
+    STRATEGY_DISTRIBUTE_EVENLY,
+    STRATEGY_MAX_UTILIZATION,
+    STRATEGY_MIN_SWITCHING,
+)
+from custom_components.sun_allocator.core import device_restore as dr
+from custom_components.sun_allocator.core import probe
+from custom_components.sun_allocator.core.power_processor import process_excess_power
+from custom_components.sun_allocator.sensor.sensors.excess import SunAllocatorExcessSensor
+
+pytestmark = pytest.mark.benchmark
+
+_BASELINE_FILE = Path(__file__).parent / "benchmarks" / "baselines.json"
+_THRESHOLD = float(os.environ.get("SUN_ALLOCATOR_BENCH_THRESHOLD", "0.5"))
+_UPDATE = os.environ.get("SUN_ALLOCATOR_BENCH_UPDATE") == "1"
+
+_calibration_s: float | None = None
+
+
+def _calibration() -> float:
+    """Seconds for a fixed pure-Python workload (best of 7), cached per session."""
+    global _calibration_s  # pylint: disable=global-statement
+    if _calibration_s is None:
+        best = float("inf")
+        for _ in range(7):
+            start = time.perf_counter()
+            acc = {}
+            for i in range(20_000):
+                acc[i % 97] = acc.get(i % 97, 0.0) + i * 0.5
+            best = min(best, time.perf_counter() - start)
+        _calibration_s = best
+    return _calibration_s
+
+
+def _load_baselines() -> dict:
+    try:
+        return json.loads(_BASELINE_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _check_regression(name: str, seconds: float) -> None:
+    """Compare (or record) the normalized cost of one benchmark."""
+    ratio = seconds / _calibration()
+    baselines = _load_baselines()
+    if _UPDATE:
+        baselines[name] = round(ratio, 4)
+        _BASELINE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        _BASELINE_FILE.write_text(
+            json.dumps(dict(sorted(baselines.items())), indent=2) + "\n", encoding="utf-8"
+        )
+        return
+    baseline = baselines.get(name)
+    if baseline is None:
+        pytest.skip(f"no baseline for {name}; run with SUN_ALLOCATOR_BENCH_UPDATE=1")
+    limit = baseline * (1.0 + _THRESHOLD)
+    assert ratio <= limit, (
+        f"{name}: cost ratio {ratio:.3f} exceeds baseline {baseline:.3f} "
+        f"by more than {_THRESHOLD:.0%}"
+    )
+
+
+async def _time_async(func, *, number: int, rounds: int = 3) -> float:
+    """Best-of-``rounds`` mean seconds per call of an async callable."""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            await func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def _time_sync(func, *, number: int, rounds: int = 5) -> float:
+    """Best-of-``rounds`` mean seconds per call of a sync callable."""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+# ---------------------------------------------------------------------------
+# process_excess_power
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("device_count", [1, 10, 50, 200])
+@pytest.mark.parametrize(
+    "strategy",
+    [
+        STRATEGY_FILL_ONE_BY_ONE,
+        STRATEGY_DISTRIBUTE_EVENLY,
+        STRATEGY_MAX_UTILIZATION,
+        STRATEGY_MIN_SWITCHING,
+    ],
+)
+async def test_bench_process_excess_power(hass, device_count, strategy):
+    """Full allocation pass over N standard devices."""
+    async_mock_service(hass, "switch", "turn_on")
+    async_mock_service(hass, "switch", "turn_off")
+    devices = [
+        create_test_device(
+            f"bench_{i}",
+            {CONF_DEVICE_PRIORITY: 100 - (i % 100), CONF_DEVICE_DEBOUNCE_TIME: 0},
+        )
+        for i in range(device_count)
+    ]
+    entry = create_test_config_entry(
+        {CONF_DEVICES: devices, CONF_DEVICE_ALLOCATION_STRATEGY: strategy}
+    )
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {"power_allocation": {}}
+    for dev in devices:
+        hass.states.async_set(f"switch.{dev['device_id']}", "off")
+    # Enough surplus to start every device under every strategy: at least
+    # min_w + STRATEGY_START_MARGIN_W (10 + 50 W), which min-switching needs
+    # before it starts the single device.
+    excess = max(60.0, 50.0 * device_count)
+
+    async def _run():
+        await process_excess_power(hass, entry, excess)
+
+    await _run()  # warm-up: initial state sync + first switching
+    # Every strategy must time the same workload, not an idle pass.
+    allocation = hass.data[DOMAIN][entry.entry_id]["power_allocation"]
+    assert all(allocation.get(dev["device_id"]) for dev in devices), allocation
+    number = max(3, 200 // device_count)
+    seconds = await _time_async(_run, number=number)
+    await hass.async_block_till_done()
+    _check_regression(f"process_excess_power[{strategy}-{device_count}]", seconds)
+
+
+# ---------------------------------------------------------------------------
+# Hub sensor math
+# ---------------------------------------------------------------------------
+
+
+def _mppt_config(count: int) -> dict:
+    mppts = []
+    for i in range(count):
+        mppts.append({
+            CONF_PV_POWER: f"sensor.bench_pv_power_{i}",
+            CONF_PV_VOLTAGE: f"sensor.bench_pv_voltage_{i}",
+            CONF_PANEL_VMP: 36.0,
+            CONF_PANEL_IMP: 8.0,
+            CONF_PANEL_VOC: 44.0,
+            CONF_PANEL_ISC: 8.5,
+            CONF_PANEL_COUNT: 4,
+            CONF_PANEL_CONFIGURATION: PANEL_CONFIG_SERIES,
+        })
+    return {
+        CONF_MPPT_INPUTS: mppts,
+        CONF_BATTERY_POWER: "sensor.bench_battery_power",
+        CONF_CONSUMPTION: "sensor.bench_consumption",
+        CONF_MIN_INVERTER_VOLTAGE: 100.0,
+    }
+
+
+def _set_mppt_states(hass, count: int) -> None:
+    for i in range(count):
+        hass.states.async_set(f"sensor.bench_pv_power_{i}", str(600 + 10 * i))
+        hass.states.async_set(f"sensor.bench_pv_voltage_{i}", "150")
+    hass.states.async_set("sensor.bench_battery_power", "200")
+    hass.states.async_set("sensor.bench_consumption", "400")
+
+
+@pytest.mark.parametrize("mppt_count", [1, 2, 4, 8])
+async def test_bench_excess_calculate_value(hass, mppt_count):
+    """Excess sensor math on a prebuilt snapshot (no state reads)."""
+    _set_mppt_states(hass, mppt_count)
+    hass.data.setdefault(DOMAIN, {})["bench"] = {}
+    sensor = SunAllocatorExcessSensor(hass, _mppt_config(mppt_count), "bench", 1)
+    snapshot = sensor._get_shared_snapshot()
+
+    def _run():
+        sensor._calculate_value(**snapshot)
+
+    seconds = _time_sync(_run, number=200)
+    _check_regression(f"excess_calculate_value[{mppt_count}]", seconds)
+
+
+@pytest.mark.parametrize("mppt_count", [1, 8])
+async def test_bench_snapshot_rebuild(hass, mppt_count):
+    """Shared hub-sensor snapshot rebuild (state reads + config assembly)."""
+    _set_mppt_states(hass, mppt_count)
+    hass.data.setdefault(DOMAIN, {})["bench"] = {}
+    sensor = SunAllocatorExcessSensor(hass, _mppt_config(mppt_count), "bench", 1)
+
+    def _run():
+        sensor._invalidate_shared_snapshot()
+        sensor._get_shared_snapshot()
+
+    seconds = _time_sync(_run, number=200)
+    _check_regression(f"snapshot_rebuild[{mppt_count}]", seconds)
+
+
+# ---------------------------------------------------------------------------
+# Probe controller
+# ---------------------------------------------------------------------------
+
 
-from conftest import create_test_device
+def test_bench_plan_headroom():
+    """plan_headroom throughput over a charge/discharge sweep."""
+    net_charges = [(-300.0 + 37.0 * i) for i in range(20)]
 
+    def _run():
+        state = None
+        for i, net in enumerate(net_charges):
+            state = probe.plan_headroom(
+                enabled=True,
+                has_target=True,
+                battery_soc=95.0,
+                net_charge_w=net,
+                discharge_tolerance_w=100.0,
+                sharing_soc=90,
+                state=state,
+                now_ts=1_000.0 + 30.0 * i,
+                max_headroom_w=3000.0,
+                target_w=None,
+                approach_fraction=0.8,
+                floor_w=0.0,
+            )
 
-@pytest.mark.asyncio
-async def test_large_device_count_performance(hass):
-    """Test performance with many devices."""
-    # Test that we can create many devices quickly
-    start_time = time.time()
+    seconds = _time_sync(_run, number=100)
+    _check_regression("plan_headroom[20_ticks]", seconds)
 
-    # Just test device creation performance instead of full integration
-    test_devices = []
-    for i in range(50):
-        device = create_test_device(f"perf_device_{i}")
-        test_devices.append(device)
 
-    end_time = time.time()
+# ---------------------------------------------------------------------------
+# Restore store
+# ---------------------------------------------------------------------------
 
-    # Should complete within reasonable time
-    assert (end_time - start_time) < 2.0  # 2 seconds max
-    assert len(test_devices) == 50
 
+async def test_bench_restore_store_round_trip(hass, hass_storage):
+    """Update + flush of the restore store with 200 persisted entities."""
+    entry = create_test_config_entry()
+    key = f"sun_allocator_{entry.entry_id}_restore"
+    hass_storage[key] = {
+        "version": dr.STORAGE_VERSION,
+        "key": key,
+        "data": {f"switch.bench_{i}": {"_restore_on": bool(i % 2)} for i in range(200)},
+    }
+    store = dr.get_restore_store(hass, entry)
+    counter = {"n": 0}
 
-@pytest.mark.asyncio
-async def test_frequent_updates_performance(hass):
-    """Test performance with frequent sensor updates."""
-    # Simulate rapid sensor updates
-    for i in range(100):
-        hass.states.async_set("sensor.pv_power", str(200 + i))
-        await hass.async_block_till_done()
+    async def _run():
+        counter["n"] += 1
+        dr.persist_device_state(
+            hass, entry, "switch.bench_0", percent=float(counter["n"] % 100)
+        )
+        await store.async_load()
+        await store.async_flush()
 
-    # System should remain responsive
-    assert True  # If we get here without timeout, test passes
+    seconds = await _time_async(_run, number=50)
+    assert hass_storage[key]["data"]["switch.bench_0"]["last_percent"] == 50.0
+    _check_regression("restore_store_round_trip[200]", seconds)
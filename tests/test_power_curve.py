@@ -0,0 +1,156 @@
+"""Tests for the learned percent→watts curve (core/power_curve.py) and the closed loop."""
+
+import datetime as dt
+import math
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from homeassistant.core import HomeAssistant, State
+import homeassistant.util.dt as dt_util
+
+from custom_components.sun_allocator.const import (
+    CONF_DEVICES,
+    CONF_DEVICE_ACTUAL_POWER_SENSOR,
+    CONF_DEVICE_POWER_FEEDBACK,
+    DEVICE_TYPE_CUSTOM,
+    DOMAIN,
+    RELAY_MODE_PROPORTIONAL,
+)
+from custom_components.sun_allocator.core import power_curve
+from custom_components.sun_allocator.core.device_restore import (
+    load_draw_model,
+    load_power_curves,
+    persist_learned_state,
+)
+from custom_components.sun_allocator.core import power_processor as pp
+
+MAX_W = 2000.0
+
+
+def _dimmer(percent, max_w=MAX_W):
+    """Resistive load on a phase-angle dimmer: power of the conducted sine area."""
+    f = percent / 100.0
+    return max_w * (f - math.sin(2 * math.pi * f) / (2 * math.pi))
+
+
+def test_untrained_curve_is_the_straight_line():
+    curves = power_curve.initial_curves()
+    assert power_curve.watts_at(curves, "boiler", 50.0, MAX_W, min_samples=3) == 1000.0
+    assert power_curve.percent_for(curves, "boiler", 500.0, MAX_W, min_samples=3) == 25.0
+    assert not power_curve.trusted_at(curves, "boiler", 25.0, min_samples=3)
+
+
+def test_curve_learns_a_dimmer_and_inverts_it():
+    curves = power_curve.initial_curves()
+    for _ in range(3):
+        for percent in range(10, 101, 10):
+            power_curve.observe(curves, "boiler", percent, _dimmer(percent), MAX_W, alpha=0.2)
+
+    assert power_curve.trusted_at(curves, "boiler", 35.0, min_samples=3)
+    for percent in range(10, 101, 10):
+        assert power_curve.watts_at(
+            curves, "boiler", percent, MAX_W, min_samples=3
+        ) == pytest.approx(_dimmer(percent))
+    # Between knots it is piecewise linear; the inverse lands near the real percent.
+    assert power_curve.percent_for(
+        curves, "boiler", _dimmer(35.0), MAX_W, min_samples=3
+    ) == pytest.approx(35.0, abs=1.0)
+
+
+def test_untrusted_knots_interpolate_between_learned_ones():
+    curves = power_curve.initial_curves()
+    for _ in range(3):
+        power_curve.observe(curves, "boiler", 30.0, 300.0, MAX_W, alpha=0.2)
+    # 10 % and 20 % lie on the line from 0 W to the learned 300 W, not on max_w × p.
+    assert power_curve.watts_at(curves, "boiler", 20.0, MAX_W, min_samples=3) == pytest.approx(200.0)
+    assert power_curve.watts_at(curves, "boiler", 30.0, MAX_W, min_samples=3) == pytest.approx(300.0)
+
+
+def test_from_storage_drops_malformed_and_removed():
+    good = {"w": [float(i) for i in range(11)], "n": [0] * 11}
+    raw = {"boiler": good, "gone": good, "short": {"w": [1.0], "n": [1]}, "bad": {"w": "x"}}
+    assert power_curve.from_storage(raw, ["boiler", "short", "bad"]) == {"boiler": good}
+    assert power_curve.from_storage(None) == {}
+
+
+async def test_curves_persist_with_the_learned_state(hass):
+    config_entry = MagicMock()
+    config_entry.entry_id = "entry"
+    curves = power_curve.initial_curves()
+    power_curve.observe(curves, "boiler", 30.0, 300.0, MAX_W, alpha=0.2)
+    persist_learned_state(
+        hass, config_entry, energy={}, draw_model={"ac": {"w": 700.0, "n": 3}},
+        power_curves=curves,
+    )
+    assert power_curve.from_storage(await load_power_curves(hass, config_entry)) == curves
+    assert await load_draw_model(hass, config_entry) == {"ac": {"w": 700.0, "n": 3}}
+
+
+class _Snapshot:
+    def __init__(self, state):
+        self._state = state
+
+    def get(self, entity_id):
+        return self._state
+
+
+def test_closed_loop_tracks_target_on_a_dimmer():
+    entry_data = {}
+    device = {"device_id": "boiler", CONF_DEVICE_ACTUAL_POWER_SENSOR: "sensor.boiler_w",
+              CONF_DEVICE_POWER_FEEDBACK: True}
+    start = dt.datetime(2026, 6, 1, 12, tzinfo=dt.timezone.utc)
+    measured, reading = 0.0, None
+    for target, ticks in ((500.0, 30), (1200.0, 30), (500.0, 3)):
+        for _ in range(ticks):
+            start += dt.timedelta(seconds=30)
+            cache = {"sensor.boiler_w": (measured, reading is not None)}
+            percent = pp._feedback_percent(
+                entry_data, device, target, MAX_W, cache, _Snapshot(reading), start
+            )
+            measured = _dimmer(percent)
+            # The meter reports 10 s after the command.
+            reading = State(
+                "sensor.boiler_w", str(measured), last_updated=start + dt.timedelta(seconds=10)
+            )
+        accounted = pp._proportional_power_used(entry_data, device, target, MAX_W, percent)
+        assert measured == pytest.approx(target, rel=0.02)
+        assert accounted == pytest.approx(measured, rel=0.02)
+    # Open loop would command 25 % for 500 W; the dimmer draws under 40 % of that.
+    assert _dimmer(25.0) < 0.4 * 500.0
+
+
+@pytest.mark.asyncio
+async def test_process_excess_power_trains_the_curve():
+    hass = MagicMock(spec=HomeAssistant)
+    states = {}
+    hass.states = MagicMock()
+    hass.states.get = states.get
+    hass.services = MagicMock()
+    hass.services.async_call = AsyncMock()
+    config_entry = MagicMock()
+    config_entry.entry_id = "entry"
+    config_entry.data = {CONF_DEVICES: [{
+        "device_id": "boiler", "device_name": "Boiler", "device_entity": "light.boiler",
+        "device_type": DEVICE_TYPE_CUSTOM, "min_expected_w": 100, "max_expected_w": MAX_W,
+        "esphome_mode_select_entity": "select.boiler_mode",
+        "auto_control_enabled": True, "debounce_time": 0,
+        CONF_DEVICE_ACTUAL_POWER_SENSOR: "sensor.boiler_w", CONF_DEVICE_POWER_FEEDBACK: True,
+    }]}
+    entry_data = {"power_allocation": {}}
+    hass.data = {DOMAIN: {"entry": entry_data}}
+    states["light.boiler"] = State("light.boiler", "on")
+    states["select.boiler_mode"] = State("select.boiler_mode", RELAY_MODE_PROPORTIONAL)
+
+    start = dt_util.utcnow()
+    for tick in range(6):
+        now = start + dt.timedelta(seconds=30 * tick)
+        percent = entry_data["device_status"]["boiler"]["percent_target"] if tick else 0.0
+        states["sensor.boiler_w"] = State(
+            "sensor.boiler_w", str(_dimmer(percent)), last_updated=now - dt.timedelta(seconds=20)
+        )
+        with patch.object(pp.dt_util, "now", return_value=now):
+            await pp.process_excess_power(hass, config_entry, 500.0)
+
+    assert sum(entry_data["power_curves"]["boiler"]["n"]) >= 5
+    assert _dimmer(entry_data["device_status"]["boiler"]["percent_target"]) > 400.0
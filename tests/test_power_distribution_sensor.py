@@ -0,0 +1,113 @@
+"""Tests for the incremental power_distribution sensor and the get_diagnostics service."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from homeassistant.core import HomeAssistant, State
+
+from custom_components.sun_allocator.const import (
+    CONF_AUTO_CONTROL_ENABLED,
+    CONF_DEVICES,
+    CONF_POWER_ALLOCATION,
+    CONF_POWER_DISTRIBUTION,
+    DOMAIN,
+)
+from custom_components.sun_allocator.core import power_processor as pp
+from custom_components.sun_allocator.core.services import handle_get_diagnostics
+from custom_components.sun_allocator.sensor.sensors import power_distribution
+from custom_components.sun_allocator.sensor.sensors.power_distribution import (
+    SunAllocatorPowerDistributionSensor,
+)
+
+
+def _status(allocated_w, percent):
+    return {"allocated_w": allocated_w, "percent_target": percent, "is_enabled": allocated_w > 0}
+
+
+def _entry_data():
+    config = {CONF_DEVICES: [
+        {"device_id": d, "device_entity": f"switch.{d}", CONF_AUTO_CONTROL_ENABLED: True}
+        for d in ("a", "b", "c")
+    ]}
+    entry_data = {
+        "config": config,
+        "device_status": {},
+        CONF_POWER_ALLOCATION: {"a": 500.0, "b": 0.0, "c": 0.0},
+    }
+    entry_data["device_status"] = {
+        "a": _status(500.0, 100.0), "b": _status(0.0, 0.0), "c": _status(0.0, 0.0),
+    }
+    return entry_data
+
+
+def test_finalize_run_records_the_changed_devices():
+    entry_data = _entry_data()
+    pp._finalize_run(entry_data, 800.0, 300.0, {})
+    assert entry_data["distribution_changed"] == {"a", "b", "c"}
+
+    entry_data["distribution_changed"] = set()
+    prev_status = dict(entry_data["device_status"])
+    entry_data["device_status"]["b"] = _status(200.0, 40.0)
+    entry_data["device_status"]["c"] = _status(0.0, 0.0)  # new object, same content
+    entry_data[CONF_POWER_ALLOCATION]["b"] = 200.0
+    pp._finalize_run(entry_data, 800.0, 100.0, prev_status)
+    assert entry_data["distribution_changed"] == {"b"}
+
+
+@pytest.mark.asyncio
+async def test_sensor_rebuilds_only_changed_devices():
+    hass = MagicMock(spec=HomeAssistant)
+    entry_data = _entry_data()
+    hass.data = {DOMAIN: {"entry": entry_data}}
+    pp._finalize_run(entry_data, 800.0, 300.0, {})
+    sensor = SunAllocatorPowerDistributionSensor(hass, "entry", 0)
+
+    await sensor.async_update()
+    attrs = sensor.extra_state_attributes
+    assert "diagnostics" not in attrs
+    assert attrs["allocation_percent"] == {"a": 100.0, "b": 0.0, "c": 0.0}
+    assert sensor.native_value == 500.0
+    first_meta, first_reasons = attrs["device_meta"], attrs["reasons"]
+
+    prev_status = dict(entry_data["device_status"])
+    entry_data["device_status"]["b"] = _status(200.0, 40.0)
+    entry_data[CONF_POWER_ALLOCATION]["b"] = 200.0
+    pp._finalize_run(entry_data, 800.0, 100.0, prev_status)
+    with patch.object(
+        power_distribution, "build_device_reason", wraps=power_distribution.build_device_reason
+    ) as build_reason:
+        await sensor.async_update()
+    assert [c.args[0] for c in build_reason.call_args_list] == ["b"]
+    attrs = sensor.extra_state_attributes
+    assert attrs["allocation_percent"]["b"] == 40.0
+    assert attrs["device_meta"]["a"] is first_meta["a"]
+    assert attrs["reasons"]["c"] is first_reasons["c"]
+    assert attrs["device_meta"]["b"] is not first_meta["b"]
+
+    # Nothing changed: the per-device attribute dicts are kept as they are.
+    meta = attrs["device_meta"]
+    await sensor.async_update()
+    assert sensor.extra_state_attributes["device_meta"] is meta
+
+
+@pytest.mark.asyncio
+async def test_get_diagnostics_service_response():
+    hass = MagicMock(spec=HomeAssistant)
+    entry_data = _entry_data()
+    del entry_data["device_status"]["c"]
+    entry_data["device_filter_reasons"] = {"c": "Outside schedule"}
+    hass.data = {DOMAIN: {"entry": entry_data, "_device_index": {}}}
+    states = {"switch.a": State("switch.a", "on"), "switch.c": State("switch.c", "off")}
+    hass.states = MagicMock()
+    hass.states.get = states.get
+    call = MagicMock()
+    call.data = {}
+
+    response = await handle_get_diagnostics(hass, call)
+
+    diagnostics = response["entries"]["entry"]
+    assert diagnostics["not_found_entities"] == ["switch.b"]
+    assert diagnostics["visible_devices"] == ["a", "b"]
+    reasons = {info["device_id"]: info["reason"] for info in diagnostics["all_devices_info"]}
+    assert reasons == {"a": None, "b": "Entity not found in Home Assistant", "c": "Outside schedule"}
@@ -14,6 +14,7 @@ from custom_components.sun_allocator.const import (
     RELAY_MODE_PROPORTIONAL,
 )
 from custom_components.sun_allocator.core import power_processor as pp
+from custom_components.sun_allocator.core import strategies
 
 
 def _state(value):
@@ -72,8 +73,16 @@ def test_sync_initial_skips_unavailable_entities():
     assert state == {}
 
 
-def test_compute_proportional_allocations_distributes_by_max_w(monkeypatch):
-    """Two active proportional devices share remaining_power weighted by max_expected_w."""
+def _distribute(devices, device_status, budget):
+    """Shares the distribute strategy plans over ``_build_allocation_view``."""
+    view = pp._build_allocation_view(
+        devices, device_status, {}, {}, {}, budget, 0.0, {}, datetime.now(tz=timezone.utc)
+    )
+    return dict(strategies.distribute_evenly(view).shares)
+
+
+def test_distribute_shares_by_max_w(monkeypatch):
+    """Two active proportional devices share the budget weighted by max_expected_w."""
     monkeypatch.setattr(pp, "_calculate_device_state", lambda *args, **kw: (True, True))
     devices = [
         {CONF_DEVICE_ID: "a", CONF_DEVICE_TYPE: DEVICE_TYPE_CUSTOM},
@@ -83,15 +92,13 @@ def test_compute_proportional_allocations_distributes_by_max_w(monkeypatch):
         "a": {"mode": RELAY_MODE_PROPORTIONAL, "max_expected_w": 1000.0},
         "b": {"mode": RELAY_MODE_PROPORTIONAL, "max_expected_w": 3000.0},
     }
-    out = pp._compute_proportional_allocations(
-        devices, device_status, 800.0, {}, {}, {}, datetime.now(tz=timezone.utc)
-    )
+    out = _distribute(devices, device_status, 800.0)
     # Total max_w = 4000W; a gets 25%, b gets 75% of 800W.
     assert out["a"] == pytest.approx(200.0)
     assert out["b"] == pytest.approx(600.0)
 
 
-def test_compute_proportional_allocations_excludes_inactive(monkeypatch):
+def test_distribute_excludes_inactive(monkeypatch):
     """Inactive proportional devices are not in the pool."""
     seq = iter([(True, True), (False, False)])
     monkeypatch.setattr(pp, "_calculate_device_state", lambda *args, **kw: next(seq))
@@ -104,21 +111,15 @@ def test_compute_proportional_allocations_excludes_inactive(monkeypatch):
         "a": {"mode": RELAY_MODE_PROPORTIONAL, "max_expected_w": 1000.0},
         "b": {"mode": RELAY_MODE_PROPORTIONAL, "max_expected_w": 1000.0},
     }
-    out = pp._compute_proportional_allocations(
-        devices, device_status, 500.0, {}, {}, {}, datetime.now(tz=timezone.utc)
-    )
+    out = _distribute(devices, device_status, 500.0)
     assert out == {"a": pytest.approx(500.0)}
 
 
-def test_compute_proportional_allocations_skips_non_custom():
+def test_distribute_skips_non_custom():
     devices = [{CONF_DEVICE_ID: "a", CONF_DEVICE_TYPE: DEVICE_TYPE_STANDARD}]
     device_status = {"a": {"mode": RELAY_MODE_PROPORTIONAL, "max_expected_w": 1000.0}}
-    out = pp._compute_proportional_allocations(
-        devices, device_status, 500.0, {}, {}, {}, datetime.now(tz=timezone.utc)
-    )
-    assert out == {}
+    assert _distribute(devices, device_status, 500.0) == {}
 
 
-def test_compute_proportional_allocations_returns_empty_when_pool_empty():
-    out = pp._compute_proportional_allocations([], {}, 500.0, {}, {}, {}, datetime.now(tz=timezone.utc))
-    assert out == {}
+def test_distribute_returns_empty_when_pool_empty():
+    assert _distribute([], {}, 500.0) == {}
@@ -0,0 +1,114 @@
+"""Tests for preemptible, shed-first allocation passes (core/preemption.py)."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from homeassistant.core import HomeAssistant, State
+
+import custom_components.sun_allocator as integration
+from custom_components.sun_allocator.const import (
+    CONF_DEVICE_ALLOW_PROBE,
+    CONF_DEVICES,
+    DEVICE_TYPE_STANDARD,
+    DOMAIN,
+    KEY_STARTUP_GRACE_PERIOD,
+)
+from custom_components.sun_allocator.core import power_processor as pp
+
+
+def _device(device_id, priority):
+    return {
+        "device_id": device_id, "device_name": device_id,
+        "device_entity": f"switch.{device_id}", "device_type": DEVICE_TYPE_STANDARD,
+        "priority": priority, "min_expected_w": 300, "auto_control_enabled": True,
+        "debounce_time": 0, KEY_STARTUP_GRACE_PERIOD: 0,
+    }
+
+
+def _setup(devices, on=()):
+    hass = MagicMock(spec=HomeAssistant)
+    states = {
+        d["device_entity"]: State(d["device_entity"], "on" if d["device_id"] in on else "off")
+        for d in devices
+    }
+    hass.states = MagicMock()
+    hass.states.get = states.get
+    sent = []
+
+    async def _call(domain, service, data, **_):
+        entity_id = data["entity_id"]
+        sent.append((service, entity_id))
+        states[entity_id] = State(entity_id, "on" if service == "turn_on" else "off")
+
+    hass.services = MagicMock()
+    hass.services.async_call = AsyncMock(side_effect=_call)
+    config_entry = MagicMock()
+    config_entry.entry_id = "entry"
+    config_entry.data = {CONF_DEVICES: devices}
+    entry_data = {"power_allocation": {}}
+    hass.data = {DOMAIN: {"entry": entry_data}}
+    return hass, config_entry, entry_data, sent
+
+
+def _pool_running(shed_first):
+    devices = [_device("boiler", 90), _device("pool", 10)]
+    hass, config_entry, entry_data, sent = _setup(devices, on={"pool"})
+    entry_data["device_on_state"] = {"pool": True}
+    entry_data["power_allocation"] = {"pool": 300.0}
+    return pp.process_excess_power(hass, config_entry, 350.0, shed_first=shed_first), sent
+
+
+@pytest.mark.asyncio
+async def test_shed_first_pass_sends_turn_offs_before_turn_ons():
+    run, sent = _pool_running(shed_first=False)
+    await run
+    assert sent == [("turn_on", "switch.boiler"), ("turn_off", "switch.pool")]
+
+    run, sent = _pool_running(shed_first=True)
+    await run
+    assert sent == [("turn_off", "switch.pool"), ("turn_on", "switch.boiler")]
+
+
+@pytest.mark.asyncio
+async def test_large_drop_preempts_the_running_pass():
+    devices = [_device("boiler", 90), _device("heater", 50), _device("pool", 10)]
+    hass, config_entry, entry_data, sent = _setup(devices)
+    entry_data["_run_excess"] = 0.0
+    call = hass.services.async_call.side_effect
+
+    async def _call_then_drop(domain, service, data, **kwargs):
+        await call(domain, service, data, **kwargs)
+        if len(sent) == 1:
+            # The excess collapses while the first turn-on is in flight.
+            await integration._queue_process_excess_power(hass, config_entry, entry_data, 100.0)
+
+    hass.services.async_call.side_effect = _call_then_drop
+    await integration._queue_process_excess_power(hass, config_entry, entry_data, 1000.0)
+
+    # The heater and pool were never switched on; the re-plan shed the boiler.
+    assert sent == [("turn_on", "switch.boiler"), ("turn_off", "switch.boiler")]
+    assert entry_data["preempted_runs"] == 1
+    assert entry_data["shed_latency_ms"] >= 0.0
+    assert "_preempt" not in entry_data and "_shed_requested_at" not in entry_data
+    assert entry_data["power_allocation"] == {"boiler": 0.0, "heater": 0.0, "pool": 0.0}
+
+
+@pytest.mark.asyncio
+async def test_preempted_pass_charges_kept_devices_to_both_pools():
+    """Kept allocations draw real watts first, then probe headroom where allowed."""
+    devices = [{**_device("boiler", 90), CONF_DEVICE_ALLOW_PROBE: False}, _device("pool", 10)]
+    hass, config_entry, entry_data, sent = _setup(devices, on={"boiler", "pool"})
+    entry_data["device_on_state"] = {"boiler": True, "pool": True}
+    entry_data["power_allocation"] = {"boiler": 300.0, "pool": 300.0}
+    entry_data["probe_headroom_w"] = 1000.0
+    entry_data["_preempt"] = True
+
+    # real pool 100 W, extra (probe) pool 900 W; preempted before the first device.
+    await pp.process_excess_power(hass, config_entry, 100.0)
+
+    assert sent == []
+    assert entry_data["power_allocation"] == {"boiler": 300.0, "pool": 300.0}
+    # The boiler may only use the 100 W real pool; the pool takes 300 W of headroom.
+    assert entry_data["power_distribution"]["remaining_power"] == 600.0
+    assert entry_data["probe_funded_w"] == 300.0
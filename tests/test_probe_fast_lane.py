@@ -0,0 +1,108 @@
+"""Tests for the probe's event-driven back-off lane (probe.fast_lane_step)."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import custom_components.sun_allocator as integration
+from custom_components.sun_allocator.const import (
+    CONF_BATTERY_POWER,
+    PROBE_BACKOFF_STREAK,
+    PROBE_DWELL_S,
+    PROBE_FAST_BACKOFF_WH,
+    PROBE_STEP_W,
+)
+from custom_components.sun_allocator.core import probe
+
+TOL = 100.0
+
+
+def _probe_state(headroom=400.0, failures=0):
+    state = probe.initial_state()
+    state.update(headroom_w=headroom, failure_count=failures)
+    return state
+
+
+def _feed(readings, probe_state, fast_state=None):
+    """Feed ``(ts, net_charge_w)`` readings; return (fast_state, trip ts, new probe state)."""
+    for ts, net in readings:
+        fast_state, backed = probe.fast_lane_step(
+            fast_state, probe_state, net_charge_w=net, battery_soc=95.0,
+            discharge_tolerance_w=TOL, now_ts=ts,
+        )
+        if backed is not None:
+            return fast_state, ts, backed
+    return fast_state, None, None
+
+
+def test_sustained_overshoot_trips_on_energy_budget():
+    # 300 W beyond the tolerance: 0.5 Wh is spent after 6 s.
+    readings = [(float(t), -(TOL + 300.0)) for t in range(0, 20, 2)]
+    _, tripped_at, backed = _feed(readings, _probe_state())
+    assert tripped_at == 6.0
+    assert backed["headroom_w"] == 400.0 - PROBE_STEP_W
+    assert backed["backed_off"] is True
+    assert backed["failure_count"] == 1
+    assert backed["last_backoff_ts"] == 6.0
+
+
+def test_short_peak_and_recovery_reset_the_integral():
+    # A 1 s, 1 kW compressor peak, then back within tolerance.
+    fast, tripped_at, _ = _feed([(0.0, -1100.0), (1.0, -50.0), (30.0, -50.0)], _probe_state())
+    assert tripped_at is None
+    assert fast["deficit_wh"] == 0.0
+    # Within tolerance never accumulates.
+    fast, tripped_at, _ = _feed([(t, -TOL) for t in range(0, 600, 10)], _probe_state())
+    assert tripped_at is None and fast["deficit_wh"] == 0.0
+
+
+def test_idle_without_headroom():
+    fast, backed = probe.fast_lane_step(
+        {"deficit_wh": 0.4, "deficit_w": 500.0, "last_ts": 0.0},
+        _probe_state(headroom=0.0),
+        net_charge_w=-2000.0, battery_soc=None, discharge_tolerance_w=TOL, now_ts=60.0,
+    )
+    assert backed is None
+    assert fast == probe.initial_fast_state()
+
+
+def test_fast_lane_loses_less_battery_energy_than_the_tick():
+    overshoot_w = 300.0
+    fast_wh = overshoot_w * 6.0 / 3600.0
+    # The tick confirms only after PROBE_BACKOFF_STREAK discharging ticks, the first
+    # of which lands up to one dwell after the overshoot started.
+    tick_wh = overshoot_w * PROBE_DWELL_S * PROBE_BACKOFF_STREAK / 3600.0
+    readings = [(float(t), -(TOL + overshoot_w)) for t in range(0, 120, 2)]
+    _, tripped_at, _ = _feed(readings, _probe_state())
+    assert overshoot_w * tripped_at / 3600.0 == fast_wh >= PROBE_FAST_BACKOFF_WH
+    assert fast_wh < tick_wh / 5
+
+
+async def test_battery_event_backs_off_and_reallocates(hass):
+    hass.states.async_set("sensor.battery_power", "-600")
+    hass.states.async_set("sensor.excess", "120")
+    config_entry = MagicMock()
+    config_entry.data = {CONF_BATTERY_POWER: "sensor.battery_power"}
+    entry_data = {
+        "excess_sensor_id": "sensor.excess",
+        "probe_state": _probe_state(),
+        "probe_headroom_w": 400.0,
+        "probe_battery_healthy": True,
+    }
+
+    with patch.object(integration, "_queue_process_excess_power", new=AsyncMock()) as queue:
+        await integration._battery_fast_lane(hass, config_entry, entry_data, 1000.0)
+        queue.assert_not_awaited()
+        await integration._battery_fast_lane(hass, config_entry, entry_data, 1004.0)
+
+    queue.assert_awaited_once_with(hass, config_entry, entry_data, 120.0)
+    assert entry_data["probe_headroom_w"] == 400.0 - PROBE_STEP_W
+    assert entry_data["probe_state"]["ceiling_w"] == 400.0 - PROBE_STEP_W
+    assert entry_data["probe_battery_healthy"] is False
+
+
+async def test_battery_event_ignored_while_watchdog_alerted(hass):
+    hass.states.async_set("sensor.battery_power", "-3000")
+    config_entry = MagicMock()
+    config_entry.data = {CONF_BATTERY_POWER: "sensor.battery_power"}
+    entry_data = {"watchdog_alerted": True, "probe_state": _probe_state()}
+    await integration._battery_fast_lane(hass, config_entry, entry_data, 0.0)
+    assert "probe_fast_state" not in entry_data
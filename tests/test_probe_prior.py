@@ -0,0 +1,81 @@
+"""Tests for the probe's learned time-of-day headroom prior (core/probe_prior.py)."""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import custom_components.sun_allocator as integration
+from custom_components.sun_allocator.core import probe, probe_prior
+from custom_components.sun_allocator.core.device_restore import (
+    load_probe_prior,
+    persist_learned_state,
+)
+from custom_components.sun_allocator.core.settings import (
+    PROBE_PRIOR_HOLD_TICKS,
+    PROBE_PRIOR_MIN_SAMPLES,
+)
+
+_NOON = datetime(2026, 6, 1, 12, 10, tzinfo=timezone.utc)
+
+
+def test_cells_split_time_of_day_and_soc():
+    key = probe_prior.bucket_key(_NOON, 85.0, bucket_minutes=30, soc_band=20.0)
+    assert key == "24|4"
+    assert probe_prior.bucket_key(_NOON, None, bucket_minutes=30, soc_band=20.0) == "24|na"
+    assert probe_prior.bucket_key(_NOON, 100.0, bucket_minutes=30, soc_band=20.0) == "24|5"
+
+    prior = probe_prior.initial_prior()
+    probe_prior.record_hold(prior, key, 1000.0, alpha=0.5)
+    assert probe_prior.seed_w(prior, key, min_samples=2) is None
+    probe_prior.record_hold(prior, key, 600.0, alpha=0.5)
+    assert probe_prior.seed_w(prior, key, min_samples=2) == 800.0
+    assert probe_prior.from_storage({"a": {"w": "x", "n": 1}, "b": {"w": 5, "n": 3}}) == {
+        "b": {"w": 5.0, "n": 3}
+    }
+
+
+def _held(headroom, streak=0):
+    state = probe.initial_state()
+    state.update(headroom_w=headroom, discharge_streak=streak)
+    return state
+
+
+def test_sustained_holds_seed_the_first_step_after_restart():
+    entry_data = {}
+    now = _NOON
+    # Holding 1200 W for several ticks with the battery healthy.
+    for _ in range(PROBE_PRIOR_HOLD_TICKS * PROBE_PRIOR_MIN_SAMPLES):
+        now += timedelta(seconds=30)
+        integration._learn_probe_prior(entry_data, 1200.0, _held(1200.0), now, 95.0)
+    # A discharging tick does not count.
+    integration._learn_probe_prior(entry_data, 1200.0, _held(1200.0, streak=1), now, 95.0)
+    assert "_probe_hold" not in entry_data
+
+    # The session that learned it has already grown today: no seed.
+    integration._learn_probe_prior(entry_data, 1200.0, _held(1300.0), now, 95.0)
+    assert integration._probe_seed_w(entry_data, now, 95.0) is None
+
+    # After a restart the first growth step may jump to the learned headroom ...
+    restarted = {"probe_prior": entry_data["probe_prior"]}
+    assert integration._probe_seed_w(restarted, now, 95.0) == 1200.0
+    grown = probe.plan_headroom(
+        enabled=True, has_target=True, battery_soc=95.0, net_charge_w=0.0,
+        discharge_tolerance_w=100.0, state=None, now_ts=now.timestamp(),
+        jump_to_w=integration._probe_seed_w(restarted, now, 95.0),
+    )
+    assert grown["headroom_w"] == 1200.0
+    # ... once: the step consumes it until the next day.
+    integration._learn_probe_prior(restarted, 0.0, grown, now, 95.0)
+    assert integration._probe_seed_w(restarted, now, 95.0) is None
+    assert integration._probe_seed_w(restarted, now + timedelta(days=1), 95.0) == 1200.0
+    # Another SOC band has nothing learned.
+    assert integration._probe_seed_w({"probe_prior": restarted["probe_prior"]}, now, 30.0) is None
+
+
+async def test_prior_persists_with_the_learned_state(hass):
+    config_entry = MagicMock()
+    config_entry.entry_id = "entry"
+    prior = {"24|4": {"w": 1200.0, "n": 3}}
+    persist_learned_state(
+        hass, config_entry, energy={}, draw_model={}, power_curves={}, probe_prior=prior,
+    )
+    assert probe_prior.from_storage(await load_probe_prior(hass, config_entry)) == prior
@@ -0,0 +1,77 @@
+"""Tests for the startup readiness gate between device restore and allocation."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+import custom_components.sun_allocator as integration
+
+
+def _entry_data(ready: bool):
+    event = asyncio.Event()
+    if ready:
+        event.set()
+    return {"restore_ready": event, "startup_metrics": {"_t0": 0.0}}
+
+
+def _hass_with_excess(value):
+    hass = MagicMock()
+    state = MagicMock()
+    state.state = value
+    hass.states.get.return_value = state
+    return hass
+
+
+@pytest.mark.asyncio
+async def test_queue_defers_allocation_until_restore_ready():
+    entry_data = _entry_data(ready=False)
+    process = AsyncMock()
+    with patch.object(integration, "process_excess_power", new=process):
+        await integration._queue_process_excess_power(MagicMock(), MagicMock(), entry_data, 120.0)
+
+    process.assert_not_awaited()
+    assert entry_data["_pending_excess"] == 120.0
+
+
+@pytest.mark.asyncio
+async def test_initial_pass_waits_for_restore_then_runs_once():
+    hass = _hass_with_excess("250")
+    entry_data = _entry_data(ready=False)
+    process = AsyncMock()
+    with patch.object(integration, "process_excess_power", new=process):
+        task = asyncio.ensure_future(
+            integration._initial_pass(hass, MagicMock(), entry_data, "sensor.excess")
+        )
+        await asyncio.sleep(0)
+        process.assert_not_awaited()
+
+        entry_data["restore_ready"].set()
+        await task
+
+    process.assert_awaited_once()
+    assert process.await_args.args[2] == 250.0
+    assert "first_allocation_s" in entry_data["startup_metrics"]
+
+
+@pytest.mark.asyncio
+async def test_initial_pass_uses_deferred_value_when_sensor_not_numeric():
+    hass = _hass_with_excess("unknown")
+    entry_data = _entry_data(ready=True)
+    entry_data["_pending_excess"] = 80.0
+    process = AsyncMock()
+    with patch.object(integration, "process_excess_power", new=process):
+        await integration._initial_pass(hass, MagicMock(), entry_data, "sensor.excess")
+
+    assert process.await_args.args[2] == 80.0
+
+
+@pytest.mark.asyncio
+async def test_initial_pass_skips_when_no_value_available():
+    hass = _hass_with_excess("unavailable")
+    entry_data = _entry_data(ready=True)
+    process = AsyncMock()
+    with patch.object(integration, "process_excess_power", new=process):
+        await integration._initial_pass(hass, MagicMock(), entry_data, "sensor.excess")
+
+    process.assert_not_awaited()
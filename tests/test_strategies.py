@@ -0,0 +1,211 @@
+"""Tests for the allocation-strategy registry (core/strategies.py)."""
+
+import datetime as dt
+import math
+import random
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from homeassistant.core import HomeAssistant, State
+import homeassistant.util.dt as dt_util
+
+from custom_components.sun_allocator.config.advanced_config_form import (
+    build_advanced_config_schema,
+)
+from custom_components.sun_allocator.const import (
+    CONF_DEVICES,
+    CONF_DEVICE_ALLOCATION_STRATEGY,
+    CONF_SWITCHING_COST_W,
+    DEVICE_TYPE_STANDARD,
+    DOMAIN,
+    STRATEGY_DISTRIBUTE_EVENLY,
+    STRATEGY_FILL_ONE_BY_ONE,
+    STRATEGY_MAX_UTILIZATION,
+    STRATEGY_MIN_SWITCHING,
+)
+from custom_components.sun_allocator.core import power_processor as pp
+from custom_components.sun_allocator.core import strategies
+from custom_components.sun_allocator.core.strategies import (
+    AllocationPlan,
+    AllocationView,
+    DeviceView,
+)
+
+
+def _view(devices, real_w, extra_w=0.0, **kwargs):
+    return AllocationView(devices=tuple(devices), real_w=real_w, extra_w=extra_w, **kwargs)
+
+
+def _dev(device_id, priority, watts, *, running=False, allow_probe=True, proportional=False):
+    return DeviceView(
+        device_id=device_id, priority=priority, min_w=watts, max_w=watts * 1.1,
+        draw_w=watts, proportional=proportional, running=running, would_run=True,
+        allow_probe=allow_probe,
+    )
+
+
+def test_registry_lists_builtins_and_falls_back_to_fill():
+    assert strategies.available_strategies() == [
+        STRATEGY_FILL_ONE_BY_ONE, STRATEGY_DISTRIBUTE_EVENLY,
+        STRATEGY_MAX_UTILIZATION, STRATEGY_MIN_SWITCHING,
+    ]
+    assert strategies.plan_allocation("nope", _view([], 100.0)) == AllocationPlan()
+    schema = build_advanced_config_schema()
+    selector = schema.schema[CONF_DEVICE_ALLOCATION_STRATEGY]
+    assert selector.config["options"] == strategies.available_strategies()
+
+
+def test_max_utilization_packs_the_budget():
+    devices = [_dev("big", 90, 600.0), _dev("mid", 50, 500.0), _dev("small", 40, 450.0)]
+    plan = strategies.plan_allocation(STRATEGY_MAX_UTILIZATION, _view(devices, 1000.0))
+    # 500 + 450 strands 50 W; the greedy 600 W alone would strand 400 W.
+    assert plan.deselected == {"big"}
+    # Opt-out devices must fit the real pool on their own.
+    devices = [_dev("a", 90, 600.0, allow_probe=False), _dev("b", 50, 400.0, allow_probe=False)]
+    plan = strategies.plan_allocation(STRATEGY_MAX_UTILIZATION, _view(devices, 700.0, 300.0))
+    assert plan.deselected == {"b"}
+
+
+def test_max_utilization_gives_leftover_to_proportional():
+    devices = [_dev("heater", 50, 700.0), _dev("boiler", 40, 100.0, proportional=True)]
+    plan = strategies.plan_allocation(STRATEGY_MAX_UTILIZATION, _view(devices, 1000.0))
+    assert dict(plan.shares) == {"boiler": pytest.approx(110.0)}
+    plan = strategies.plan_allocation(STRATEGY_MAX_UTILIZATION, _view(devices, 700.0))
+    assert plan.deselected == {"boiler"}
+
+
+def test_max_utilization_respects_time_budget():
+    devices = [_dev(f"d{i}", 100 - i % 100, 37.0 + (i * 53) % 900) for i in range(400)]
+    started = time.monotonic()
+    plan = strategies.plan_allocation(
+        STRATEGY_MAX_UTILIZATION, _view(devices, 20000.0), time_budget_s=0.002
+    )
+    assert time.monotonic() - started < 0.1
+    chosen = [d for d in devices if d.device_id not in plan.deselected]
+    assert 19000.0 <= sum(d.draw_w for d in chosen) <= 20000.0
+
+
+def test_min_switching_serves_running_first_and_needs_margin():
+    devices = [_dev("high", 90, 500.0), _dev("low", 10, 400.0, running=True)]
+    plan = strategies.plan_allocation(STRATEGY_MIN_SWITCHING, _view(devices, 700.0))
+    assert plan.order == ("low", "high")
+    assert plan.deselected == {"high"}
+    plan = strategies.plan_allocation(STRATEGY_MIN_SWITCHING, _view(devices, 940.0))
+    assert plan.deselected == {"high"}  # 540 W left < 500 W + margin
+    plan = strategies.plan_allocation(STRATEGY_MIN_SWITCHING, _view(devices, 1000.0))
+    assert plan.deselected == frozenset()
+
+
+def test_min_switching_swaps_only_when_the_gain_pays_for_the_flips():
+    devices = [_dev("big", 90, 900.0), _dev("small", 10, 400.0, running=True)]
+    # Swapping diverts 500 W more for two flips.
+    view = _view(devices, 1000.0, switching_cost_w=300.0)
+    assert strategies.plan_allocation(STRATEGY_MIN_SWITCHING, view).deselected == {"big"}
+    view = _view(devices, 1000.0, switching_cost_w=200.0)
+    assert strategies.plan_allocation(STRATEGY_MIN_SWITCHING, view).deselected == {"small"}
+
+
+def _hass():
+    hass = MagicMock(spec=HomeAssistant)
+    states = {}
+    hass.states = MagicMock()
+    hass.states.get = states.get
+    hass.states.async_set = lambda eid, st: states.__setitem__(eid, State(eid, st))
+    hass.services = MagicMock()
+
+    async def _call(domain, service, data=None, **kwargs):
+        hass.states.async_set(data["entity_id"], "on" if service == "turn_on" else "off")
+
+    hass.services.async_call = AsyncMock(side_effect=_call)
+    return hass
+
+
+def _standard(device_id, priority, watts):
+    return {
+        "device_id": device_id, "device_name": device_id, "device_entity": f"switch.{device_id}",
+        "device_type": DEVICE_TYPE_STANDARD, "priority": priority, "min_expected_w": watts,
+        "auto_control_enabled": True, "debounce_time": 0,
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("strategy", "expected"),
+    [
+        (STRATEGY_FILL_ONE_BY_ONE, {"high": 500.0, "low": 0.0}),
+        (STRATEGY_MIN_SWITCHING, {"high": 0.0, "low": 400.0}),
+    ],
+)
+async def test_strategy_drives_the_control_pipeline(strategy, expected):
+    """A 400 W device runs; a 500 W higher-priority device is waiting; 700 W available."""
+    hass = _hass()
+    config_entry = MagicMock()
+    config_entry.entry_id = "entry"
+    config_entry.data = {
+        CONF_DEVICES: [_standard("high", 90, 500), _standard("low", 10, 400)],
+        CONF_DEVICE_ALLOCATION_STRATEGY: strategy,
+    }
+    entry_data = {
+        "power_allocation": {"high": 0.0, "low": 400.0},
+        "device_on_state": {"high": False, "low": True},
+        "_device_on_state_initialized": True,
+    }
+    hass.data = {DOMAIN: {"entry": entry_data}}
+    hass.states.async_set("switch.high", "off")
+    hass.states.async_set("switch.low", "on")
+
+    await pp.process_excess_power(hass, config_entry, 700.0)
+
+    assert entry_data["power_allocation"] == expected
+
+
+def _replayed_day(seed=7):
+    """Excess, one reading per minute from 06:00 to 18:00, with drifting cloud."""
+    rng = random.Random(seed)
+    cloud, excess = 0.0, []
+    for minute in range(12 * 60):
+        cloud = 0.8 * cloud + rng.gauss(0, 60)
+        excess.append(max(0.0, 1500 * math.sin(math.pi * minute / 720) + cloud - 200))
+    return excess
+
+
+async def _replay(strategy, switching_cost_w):
+    """(relay flips, diverted kWh) of three relays over the replayed day."""
+    hass = _hass()
+    devices = [_standard("boiler", 90, 600), _standard("heater", 60, 450), _standard("pump", 40, 350)]
+    config_entry = MagicMock()
+    config_entry.entry_id = "entry"
+    config_entry.data = {
+        CONF_DEVICES: devices,
+        CONF_DEVICE_ALLOCATION_STRATEGY: strategy,
+        CONF_SWITCHING_COST_W: switching_cost_w,
+    }
+    entry_data = {"power_allocation": {}}
+    hass.data = {DOMAIN: {"entry": entry_data}}
+    for device in devices:
+        hass.states.async_set(device["device_entity"], "off")
+
+    start = dt_util.now().replace(hour=6, minute=0)
+    flips, wh, previous = 0, 0.0, {}
+    for minute, excess in enumerate(_replayed_day()):
+        with patch.object(pp.dt_util, "now", return_value=start + dt.timedelta(minutes=minute)):
+            await pp.process_excess_power(hass, config_entry, excess)
+        on = {d["device_id"]: hass.states.get(d["device_entity"]).state == "on" for d in devices}
+        flips += sum(1 for i, is_on in on.items() if is_on != previous.get(i, False))
+        previous = on
+        wh += sum(entry_data["power_allocation"].values()) / 60.0
+    return flips, wh / 1000.0
+
+
+@pytest.mark.asyncio
+async def test_replayed_day_flip_count_vs_diverted_energy():
+    """Fill: 136 flips / 7.84 kWh; min_switching at 100 W: 60 / 7.55; at 300 W: 42 / 7.03."""
+    fill_flips, fill_kwh = await _replay(STRATEGY_FILL_ONE_BY_ONE, 0)
+    flips, kwh = await _replay(STRATEGY_MIN_SWITCHING, 100)
+    costly_flips, costly_kwh = await _replay(STRATEGY_MIN_SWITCHING, 300)
+
+    assert flips < fill_flips / 2
+    assert kwh > 0.95 * fill_kwh
+    assert costly_flips <= flips and costly_kwh <= kwh